@@ -1,72 +1,523 @@
 # collect.py  (paho-mqtt v2 compatible)
+"""
+Long-running telemetry collector.
+
+Keeps one MQTT session and writes frames incrementally as columnar chunks
+(.npz with one array per column, or Parquet when pyarrow is installed).
+Each recorded run is a segment tagged with scenario / command / run id.
+
+Commands (stdin, one per line, or JSON on the control topic):
+    start <scenario> <throttle> <steer> [duration]
+    stop
+    quit
+
+    {"cmd": "start", "scenario": "fwd_straight", "throttle": 60, "steer": 0, "duration": 2.0}
+
+The gateway holds a GUI lease (LEASE_GUI_MS, 1 s) and ramps throttle
+down when no drive command renews it, so the segment command is
+re-published every CONTROL_REFRESH_SEC while a timed run is driving.
+
+The gateway adapts the telemetry period (idle / boost); the model is
+trained on 50 ms frames, so the collector pins the period while it runs
+(--tel-period-ms):
+- the policy found in the retained rate state before the first pin is
+  restored on exit; a crashed collector releases the pin through its
+  MQTT last will ({"policy": "default"}, the gateway's --tel-rate)
+- the pin is repeated every TEL_PIN_REFRESH_SEC and at once when the
+  rate state shows it was lost (gateway restart)
+"""
+import os
 import sys
 import json
 import time
-import csv
+import queue
+import argparse
+import threading
+from datetime import datetime
+
+import numpy as np
 import paho.mqtt.client as mqtt
 
 BROKER = "192.168.0.75"
 PORT = 1883
 CMD_TOPIC = "mobility/control/drive"
 TEL_TOPIC = "mobility/telemetry/parsed"
+CTRL_TOPIC = "mobility/collect/control"
+TEL_CTRL_TOPIC = "mobility/control/telemetry"
+TEL_RATE_TOPIC = "mobility/telemetry/rate"
 
-throttle = int(sys.argv[1])
-steer = int(sys.argv[2])
-duration = float(sys.argv[3])      # seconds
-out_csv = sys.argv[4]
+CMD_TTL_MS = 300
+CONTROL_REFRESH_SEC = 0.25
+STOP_TAIL_SEC = 0.2
+TEL_PERIOD_MS = 50
+TEL_PIN_WAIT_SEC = 1.0      # wait this long for the retained rate state before pinning
+TEL_PIN_REFRESH_SEC = 5.0
 
-fields = [
+FIELDS = [
     "ts_ms", "ax", "ay", "az",
     "gx", "gy", "gz",
     "dist_cm", "throttle", "steer"
 ]
 
-rows = []
+COLUMN_DTYPES = {
+    "ts_ms": np.int64,
+    "ax": np.int16, "ay": np.int16, "az": np.int16,
+    "gx": np.int16, "gy": np.int16, "gz": np.int16,
+    "dist_cm": np.int32,
+    "throttle": np.int16, "steer": np.int16,
+    "segment": np.int32,
+}
+
+
+# ============================================================
+# Chunk writer
+# ============================================================
+class ChunkWriter:
+    """
+    Preallocated column buffers, swapped out and written by a background
+    thread when full or every `flush_sec`. The MQTT callback only does an
+    in-place row write.
+    """
+
+    def __init__(self, out_dir: str, chunk_rows: int = 2048, flush_sec: float = 2.0, fmt: str = "npz"):
+        self.out_dir = out_dir
+        self.chunk_rows = int(chunk_rows)
+        self.flush_sec = float(flush_sec)
+        self.fmt = fmt
+
+        os.makedirs(out_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._cols = self._alloc()
+        self._n = 0
+        self._chunk_idx = self._next_chunk_index()
+        self._last_flush = time.monotonic()
+        self.rows_written = 0
+
+        self._q = queue.Queue()
+        self._thread = threading.Thread(target=self._writer_loop, daemon=True)
+        self._thread.start()
+
+    def _next_chunk_index(self) -> int:
+        # continue numbering when a session directory is reused
+        idx = [
+            int(f.split("-")[1].split(".")[0])
+            for f in os.listdir(self.out_dir)
+            if f.startswith("chunk-") and not f.endswith(".tmp")
+        ]
+        return (max(idx) + 1) if idx else 0
+
+    def _alloc(self):
+        return {k: np.zeros(self.chunk_rows, dtype=dt) for k, dt in COLUMN_DTYPES.items()}
+
+    def append(self, row: dict, segment: int):
+        with self._lock:
+            i = self._n
+            for k in FIELDS:
+                self._cols[k][i] = row.get(k, 0) or 0
+            self._cols["segment"][i] = segment
+            self._n += 1
+            if self._n == self.chunk_rows:
+                self._swap_locked()
+
+    def tick(self):
+        """
+        Time-based flush (called periodically by the main loop).
+        """
+        with self._lock:
+            if self._n and (time.monotonic() - self._last_flush) >= self.flush_sec:
+                self._swap_locked()
+
+    def _swap_locked(self):
+        cols = {k: v[:self._n] for k, v in self._cols.items()}
+        self._q.put((self._chunk_idx, cols))
+        self._chunk_idx += 1
+        self._cols = self._alloc()
+        self._n = 0
+        self._last_flush = time.monotonic()
+
+    def _writer_loop(self):
+        while True:
+            item = self._q.get()
+            if item is None:
+                return
+            idx, cols = item
+            path = os.path.join(self.out_dir, f"chunk-{idx:06d}.{self.fmt}")
+            tmp = path + ".tmp"
+            try:
+                if self.fmt == "parquet":
+                    import pyarrow as pa
+                    import pyarrow.parquet as pq
+                    pq.write_table(pa.table(cols), tmp)
+                else:
+                    with open(tmp, "wb") as f:
+                        np.savez(f, **cols)
+                os.replace(tmp, path)
+                self.rows_written += len(cols["ts_ms"])
+            except Exception as e:
+                print("[WARN] chunk write failed:", e)
+
+    def close(self):
+        with self._lock:
+            if self._n:
+                self._swap_locked()
+        self._q.put(None)
+        self._thread.join()
+
+
+def load_session(session_dir: str):
+    """
+    Load a session directory.
+    Returns (columns: dict[str, np.ndarray], segments: list[dict]).
+    """
+    names = sorted(
+        f for f in os.listdir(session_dir)
+        if f.startswith("chunk-") and (f.endswith(".npz") or f.endswith(".parquet"))
+    )
+    parts = {k: [] for k in COLUMN_DTYPES}
+    for name in names:
+        path = os.path.join(session_dir, name)
+        if name.endswith(".parquet"):
+            import pyarrow.parquet as pq
+            t = pq.read_table(path)
+            for k in parts:
+                parts[k].append(t.column(k).to_numpy())
+        else:
+            with np.load(path) as z:
+                for k in parts:
+                    parts[k].append(z[k])
+
+    cols = {
+        k: (np.concatenate(v) if v else np.zeros(0, dtype=COLUMN_DTYPES[k]))
+        for k, v in parts.items()
+    }
+
+    segments = []
+    seg_path = os.path.join(session_dir, "segments.jsonl")
+    if os.path.exists(seg_path):
+        with open(seg_path, "r", encoding="utf-8") as f:
+            segments = [json.loads(line) for line in f if line.strip()]
+    return cols, segments
+
+
+# ============================================================
+# Collector
+# ============================================================
+class Collector:
+    def __init__(self, broker: str, port: int, out_dir: str, fmt: str, tel_period_ms: int = TEL_PERIOD_MS):
+        self.broker = broker
+        self.port = port
+        self.tel_period_ms = int(tel_period_ms)
+        self.writer = ChunkWriter(out_dir, fmt=fmt)
+        self.seg_path = os.path.join(out_dir, "segments.jsonl")
+
+        self._seg_lock = threading.Lock()
+        self._segment = -1          # active segment id, -1 = not recording
+        self._seg_info = None
+        self._seg_rows = 0
+        self._next_seg = self._load_next_segment_id()
+        self._stop_at = None
+        self._close_at = None
+        self._drive = (0, 0)        # segment command, re-sent while _stop_at is pending
+        self._next_refresh = None
+
+        # telemetry period pin (MQTT thread writes, tick() reads)
+        self._pin = {"policy": "fixed", "period_ms": self.tel_period_ms}
+        self._prev_policy = None    # gateway policy before the first pin
+        self._connected_at = None
+        self._pinned_at = None
+
+        self.client = mqtt.Client(
+            client_id="rpi5-collector",
+            callback_api_version=mqtt.CallbackAPIVersion.VERSION2
+        )
+        self.client.on_connect = self._on_connect
+        self.client.on_message = self._on_message
+        if self.tel_period_ms:
+            self.client.will_set(TEL_CTRL_TOPIC, json.dumps({"policy": "default"}), qos=1)
+
+    def _load_next_segment_id(self) -> int:
+        if not os.path.exists(self.seg_path):
+            return 0
+        with open(self.seg_path, "r", encoding="utf-8") as f:
+            ids = [json.loads(line)["segment"] for line in f if line.strip()]
+        return (max(ids) + 1) if ids else 0
+
+    # --------------------------------------------------
+    # MQTT
+    # --------------------------------------------------
+    def start(self):
+        self.client.connect(self.broker, self.port, 30)
+        self.client.loop_start()
 
-# v2 callback signature
-def on_message(client, userdata, message):
+    def _on_connect(self, client, userdata, flags, rc, prop):
+        if rc == 0:
+            client.subscribe(TEL_TOPIC, qos=0)
+            client.subscribe(CTRL_TOPIC, qos=1)
+            print(f"[MQTT] connected {self.broker}:{self.port}")
+            if self.tel_period_ms:
+                # tick() pins once the retained rate state is in (or after TEL_PIN_WAIT_SEC)
+                client.subscribe(TEL_RATE_TOPIC, qos=1)
+                self._pinned_at = None
+                self._connected_at = time.monotonic()
+
+    # v2 callback signature
+    def _on_message(self, client, userdata, message):
+        if message.topic == CTRL_TOPIC:
+            self.handle_command(message.payload.decode(errors="ignore"))
+            return
+        if message.topic == TEL_RATE_TOPIC:
+            self._on_rate_state(message.payload)
+            return
+
+        try:
+            data = json.loads(message.payload.decode())
+        except Exception as e:
+            print("[WARN] parse failed:", e)
+            return
+
+        with self._seg_lock:
+            seg = self._segment
+            if seg >= 0:
+                self._seg_rows += 1
+        if seg >= 0:
+            self.writer.append(data, seg)
+
+    def _publish_drive(self, throttle: int, steer: int):
+        cmd = {
+            "throttle": int(throttle),
+            "steer": int(steer),
+            "ts_ms": int(time.time() * 1000),
+            "ttl_ms": CMD_TTL_MS,
+        }
+        self.client.publish(CMD_TOPIC, json.dumps(cmd), qos=0)
+
+    def _publish_tel_policy(self, policy: dict):
+        return self.client.publish(TEL_CTRL_TOPIC, json.dumps(policy), qos=1)
+
+    def _on_rate_state(self, payload: bytes):
+        try:
+            state = json.loads(payload.decode())
+            policy = str(state["policy"])
+        except Exception as e:
+            print("[WARN] rate state parse failed:", e)
+            return
+        pinned = policy == "fixed" and state.get("period_ms") == self.tel_period_ms
+        if self._prev_policy is None and self._pinned_at is None:
+            # first state seen: what the gateway ran before this session
+            prev = {"policy": policy}
+            if policy == "fixed":
+                prev["period_ms"] = state.get("period_ms")
+            self._prev_policy = prev
+        elif self._pinned_at is not None and not pinned:
+            # pin lost (gateway restarted with its own policy): redo it now
+            self._pinned_at = None
+
+    def _tick_tel_pin(self, now: float):
+        if not self.tel_period_ms or self._connected_at is None:
+            return
+        if self._pinned_at is None:
+            if self._prev_policy is None and now - self._connected_at < TEL_PIN_WAIT_SEC:
+                return
+        elif now - self._pinned_at < TEL_PIN_REFRESH_SEC:
+            return
+        self._pinned_at = now
+        self._publish_tel_policy(self._pin)
+
+    # --------------------------------------------------
+    # Segments
+    # --------------------------------------------------
+    def begin_segment(self, scenario: str, throttle: int, steer: int, duration: float | None):
+        if self.busy():
+            # a timed run or its stop tail is still going; never cut it short
+            print(f"[WARN] start {scenario} ignored: segment still running")
+            return
+        self.end_segment()
+        with self._seg_lock:
+            seg = self._next_seg
+            self._next_seg += 1
+            self._seg_info = {
+                "segment": seg,
+                "scenario": scenario,
+                "throttle": int(throttle),
+                "steer": int(steer),
+                "run_id": f"{scenario}-{datetime.now().strftime('%Y%m%d-%H%M%S')}-{seg}",
+                "start_ms": int(time.time() * 1000),
+            }
+            self._seg_rows = 0
+            self._segment = seg
+            self._stop_at = (time.monotonic() + duration) if duration else None
+            self._close_at = None
+            self._drive = (int(throttle), int(steer))
+            self._next_refresh = time.monotonic() + CONTROL_REFRESH_SEC
+
+        self._publish_drive(throttle, steer)
+        print(f"[SEG {seg}] start {scenario} T={throttle} S={steer} duration={duration}")
+
+    def request_stop(self):
+        """
+        Send the stop command; keep recording for STOP_TAIL_SEC.
+        """
+        self._publish_drive(0, 0)
+        with self._seg_lock:
+            self._stop_at = None
+            if self._segment >= 0:
+                self._close_at = time.monotonic() + STOP_TAIL_SEC
+
+    def end_segment(self):
+        with self._seg_lock:
+            if self._segment < 0:
+                return
+            info = dict(self._seg_info)
+            info["end_ms"] = int(time.time() * 1000)
+            info["rows"] = self._seg_rows
+            self._segment = -1
+            self._seg_info = None
+            self._stop_at = None
+            self._close_at = None
+
+        with open(self.seg_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(info) + "\n")
+        print(f"[SEG {info['segment']}] done rows={info['rows']}")
+
+    def busy(self) -> bool:
+        with self._seg_lock:
+            return self._segment >= 0 and (self._stop_at is not None or self._close_at is not None)
+
+    def tick(self):
+        now = time.monotonic()
+        with self._seg_lock:
+            stop_due = self._stop_at is not None and now >= self._stop_at
+            close_due = self._close_at is not None and now >= self._close_at
+            refresh_due = (
+                self._stop_at is not None and not stop_due
+                and self._next_refresh is not None and now >= self._next_refresh
+            )
+            if refresh_due:
+                self._next_refresh = now + CONTROL_REFRESH_SEC
+            throttle, steer = self._drive
+        if refresh_due:
+            # renew the gateway lease for the rest of the run
+            self._publish_drive(throttle, steer)
+        if stop_due:
+            self.request_stop()
+        if close_due:
+            self.end_segment()
+        self._tick_tel_pin(now)
+        self.writer.tick()
+
+    # --------------------------------------------------
+    # Commands
+    # --------------------------------------------------
+    def handle_command(self, text: str) -> bool:
+        """
+        Apply one control command. Returns False on "quit".
+        """
+        text = text.strip()
+        if not text:
+            return True
+
+        try:
+            if text.startswith("{"):
+                obj = json.loads(text)
+                cmd = str(obj.get("cmd", "")).lower()
+                args = obj
+            else:
+                parts = text.split()
+                cmd = parts[0].lower()
+                args = {}
+                if cmd == "start":
+                    args = {
+                        "scenario": parts[1],
+                        "throttle": int(parts[2]),
+                        "steer": int(parts[3]),
+                        "duration": float(parts[4]) if len(parts) > 4 else None,
+                    }
+
+            if cmd == "start":
+                self.begin_segment(
+                    str(args["scenario"]),
+                    int(args.get("throttle", 0)),
+                    int(args.get("steer", 0)),
+                    args.get("duration"),
+                )
+            elif cmd == "stop":
+                self.request_stop()
+            elif cmd == "quit":
+                return False
+            else:
+                print(f"[WARN] unknown command: {text}")
+        except Exception as e:
+            print(f"[WARN] bad command '{text}': {e}")
+        return True
+
+    def close(self):
+        self._publish_drive(0, 0)
+        time.sleep(STOP_TAIL_SEC)
+        self.end_segment()
+        if self.tel_period_ms:
+            self._connected_at = None
+            # the policy seen before the pin; without one, the gateway's startup policy
+            release = self._prev_policy or {"policy": "default"}
+            try:
+                self._publish_tel_policy(release).wait_for_publish(1.0)
+            except Exception as e:
+                print("[WARN] telemetry policy release failed:", e)
+        self.client.loop_stop()
+        self.client.disconnect()
+        self.writer.close()
+        print(f"[DONE] wrote {self.writer.rows_written} rows -> {self.writer.out_dir}")
+
+
+def _stdin_reader(q: queue.Queue):
+    for line in sys.stdin:
+        q.put(line)
+    q.put("quit")
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Streaming telemetry collector")
+    p.add_argument("--broker", default=BROKER)
+    p.add_argument("--port", type=int, default=PORT)
+    p.add_argument("--out", default="data/train/session", help="session directory")
+    p.add_argument("--format", choices=["npz", "parquet"], default="npz")
+    p.add_argument(
+        "--tel-period-ms", type=int, default=TEL_PERIOD_MS,
+        help=f"pin the gateway telemetry period while collecting (default: {TEL_PERIOD_MS}, 0 = leave adaptive)",
+    )
+    return p.parse_args()
+
+
+def main():
+    args = parse_args()
+    col = Collector(args.broker, args.port, args.out, args.format, args.tel_period_ms)
+    col.start()
+
+    lines = queue.Queue()
+    threading.Thread(target=_stdin_reader, args=(lines,), daemon=True).start()
+
+    quitting = False
     try:
-        data = json.loads(message.payload.decode())
-        rows.append({k: data.get(k, "") for k in fields})
-    except Exception as e:
-        print("[WARN] parse failed:", e)
-
-client = mqtt.Client(
-    client_id="rpi5-collector",
-    callback_api_version=mqtt.CallbackAPIVersion.VERSION2
-)
-
-client.on_message = on_message
-client.connect(BROKER, PORT, 30)
-client.subscribe(TEL_TOPIC, qos=1)
-client.loop_start()
-
-# send command
-cmd = json.dumps({"throttle": throttle, "steer": steer})
-client.publish(CMD_TOPIC, cmd, qos=1)
-
-time.sleep(duration)
-
-# stop
-client.publish(CMD_TOPIC, json.dumps({"throttle": 0, "steer": 0}), qos=1)
-time.sleep(0.2)
-
-client.loop_stop()
-client.disconnect()
-
-# append CSV
-write_header = False
-try:
-    with open(out_csv, "r"):
-        pass
-except FileNotFoundError:
-    write_header = True
+        while True:
+            if not quitting:
+                try:
+                    line = lines.get(timeout=0.02)
+                    quitting = not col.handle_command(line)
+                except queue.Empty:
+                    pass
+            else:
+                time.sleep(0.02)
+
+            col.tick()
 
-with open(out_csv, "a", newline="") as f:
-    writer = csv.DictWriter(f, fieldnames=fields)
-    if write_header:
-        writer.writeheader()
-    writer.writerows(rows)
+            # let a timed run finish before leaving
+            if quitting and not col.busy():
+                break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        col.close()
 
-print(f"[DONE] wrote {len(rows)} rows -> {out_csv}")
 
+if __name__ == "__main__":
+    main()
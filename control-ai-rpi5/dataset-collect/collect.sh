@@ -1,6 +1,10 @@
 #!/bin/bash
 # collect.sh
 # usage: ./collect.sh <scenario> <throttle> <steer> <repeat>
+#
+# Starts one collect.py session (single MQTT connection) and sends it a
+# "start" command per ENTER. Frames are written incrementally to
+# data/train/<scenario>/ as columnar chunks.
 
 SCENARIO=$1
 THROTTLE=$2
@@ -8,47 +12,53 @@ STEER=$3
 REPEAT=$4
 
 DURATION=2.0
+STOP_WAIT=0.5   # > collect.py STOP_TAIL_SEC
 BASE_DIR="data/train"
-OUT_CSV="${BASE_DIR}/${SCENARIO}.csv"
+OUT_DIR="${BASE_DIR}/${SCENARIO}"
 
 if [ -z "$REPEAT" ]; then
   echo "Usage: ./collect.sh <scenario> <throttle> <steer> <repeat>"
   exit 1
 fi
 
-mkdir -p "$BASE_DIR"
+mkdir -p "$OUT_DIR"
 
 echo "======================================"
 echo " Scenario : $SCENARIO"
 echo " Command  : throttle=$THROTTLE steer=$STEER"
 echo " Duration : ${DURATION}s per run"
 echo " Repeat   : $REPEAT times"
-echo " Output   : $OUT_CSV"
+echo " Output   : $OUT_DIR"
 echo "======================================"
 echo "ENTER → collect once | Ctrl+C → stop"
 echo ""
 
-COUNT=1
+run_loop() {
+  COUNT=1
+  while [ $COUNT -le $REPEAT ]
+  do
+    echo "--------------------------------------" >&2
+    echo "Run ${COUNT}/${REPEAT}" >&2
+    echo "→ 차량 위치 잡고 ENTER" >&2
+    read < /dev/tty || break
+
+    echo "start $SCENARIO $THROTTLE $STEER $DURATION"
+    # wait for the run and its stop tail before the next prompt
+    sleep "$DURATION"
+    sleep "$STOP_WAIT"
+
+    COUNT=$((COUNT + 1))
+  done
+  echo "quit"
+}
 
 trap_ctrlc() {
   echo ""
-  echo "[STOP] interrupted at ${COUNT}/${REPEAT}"
-  exit 0
+  echo "[STOP] interrupted"
 }
 trap trap_ctrlc SIGINT
 
-while [ $COUNT -le $REPEAT ]
-do
-  echo "--------------------------------------"
-  echo "Run ${COUNT}/${REPEAT}"
-  echo "→ 차량 위치 잡고 ENTER"
-  read
-
-  python3 collect.py "$THROTTLE" "$STEER" "$DURATION" "$OUT_CSV"
-
-  COUNT=$((COUNT + 1))
-done
+run_loop | python3 collect.py --out "$OUT_DIR"
 
 echo ""
 echo "[DONE] all ${REPEAT} runs completed"
-
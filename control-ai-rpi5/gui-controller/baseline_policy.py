@@ -0,0 +1,216 @@
+# baseline_policy.py
+import math
+
+STATES = ("idle", "fwd", "rev", "turn")
+
+
+class BaselinePolicy:
+    """
+    Per-state anomaly baseline and alert policy (Qt-free).
+
+    Shared by MainWindow (live, now = time.time()) and score_sessions.py
+    (offline, now = frame timestamp), so both apply identical rules:
+
+    - state from the current command (get_state)
+    - burn-in: Welford mean/std over the first burnin_n scores per state,
+      thr = mu + k * sigma
+    - adaptation: EWMA(alpha) of mu/sigma, only for scores < thr * safe_ratio
+    - hold-offs: no baseline update after BRAKE / US_BRAKE or right after
+      entering idle; no alerts right after BRAKE
+    - alerts: score > thr, debounced per state
+    """
+
+    def __init__(
+        self,
+        burnin_n=60,
+        k=4.0,
+        safe_ratio=0.7,
+        ewma_alpha=0.02,
+        brake_freeze_sec=1.5,
+        brake_alert_mute_sec=1.0,
+        idle_freeze_on_entry_sec=0.7,
+        us_brake_hold_sec=2.0,
+        alert_debounce_sec=1.0,
+        on_log=None,
+    ):
+        self.BASELINE_BURNIN_N = int(burnin_n)
+        self.BASELINE_K = float(k)
+        self.BASELINE_SAFE_RATIO = float(safe_ratio)
+        self.BASELINE_EWMA_ALPHA = float(ewma_alpha)
+
+        # (A) Disable baseline update after BRAKE
+        self.BASELINE_FREEZE_AFTER_BRAKE_SEC = float(brake_freeze_sec)
+        # (B) Suppress alerts after BRAKE
+        self.ALERT_MUTE_AFTER_BRAKE_SEC = float(brake_alert_mute_sec)
+        # (C) Disable idle baseline update after idle entry
+        self.IDLE_BASELINE_FREEZE_ON_ENTRY_SEC = float(idle_freeze_on_entry_sec)
+        # (D) Disable baseline update after US_BRAKE
+        self.US_BRAKE_HOLD_SEC = float(us_brake_hold_sec)
+
+        self.ALERT_DEBOUNCE_SEC = float(alert_debounce_sec)
+
+        self.on_log = on_log
+        self.reset()
+
+    def reset(self):
+        self.baseline = {}
+        self._last_alert_ts = {}
+        self._us_brake_recent_until = 0.0
+        self._baseline_freeze_until = 0.0
+        self._alert_mute_until = 0.0
+        self._idle_baseline_freeze_until = 0.0
+        self._prev_state = None
+
+    # --------------------------------------------------
+    # Scenario classification
+    # --------------------------------------------------
+    @staticmethod
+    def get_state(throttle: float, steer: float) -> str:
+        t = float(throttle)
+        s = float(steer)
+
+        if abs(t) < 5 and abs(s) < 10:
+            return "idle"
+        if abs(s) >= 50:
+            return "turn"
+        if t > 5:
+            return "fwd"
+        if t < -5:
+            return "rev"
+        return "idle"
+
+    # --------------------------------------------------
+    # Events
+    # --------------------------------------------------
+    def on_brake(self, now: float):
+        self._baseline_freeze_until = max(
+            self._baseline_freeze_until,
+            now + self.BASELINE_FREEZE_AFTER_BRAKE_SEC
+        )
+        self._alert_mute_until = max(
+            self._alert_mute_until,
+            now + self.ALERT_MUTE_AFTER_BRAKE_SEC
+        )
+
+    def on_us_brake(self, now: float):
+        self._us_brake_recent_until = now + self.US_BRAKE_HOLD_SEC
+
+    def on_score(self, score: float, throttle: float, steer: float, now: float):
+        """
+        Apply one anomaly score.
+        Returns (state, thr, alert): thr is the state threshold before this
+        score was applied (None during burn-in); alert is True when an alert
+        should be emitted (already debounced).
+        """
+        state = self.get_state(throttle, steer)
+
+        if self._prev_state != "idle" and state == "idle":
+            self._idle_baseline_freeze_until = max(
+                self._idle_baseline_freeze_until,
+                now + self.IDLE_BASELINE_FREEZE_ON_ENTRY_SEC
+            )
+        self._prev_state = state
+
+        b = self.baseline.get(state)
+        thr = b.get("thr") if b else None
+
+        alert = False
+        if thr is not None and score > thr and now >= self._alert_mute_until:
+            last = self._last_alert_ts.get(state, 0.0)
+            if (now - last) >= self.ALERT_DEBOUNCE_SEC:
+                self._last_alert_ts[state] = now
+                alert = True
+
+        self._baseline_update(state, score, b, now)
+        return state, thr, alert
+
+    # --------------------------------------------------
+    # Baseline update
+    # --------------------------------------------------
+    def _baseline_update(self, state: str, score: float, b, now: float):
+        """
+        Burn-in or EWMA update of the state baseline, unless a hold-off
+        window is active.
+        """
+        if now < self._us_brake_recent_until:
+            return
+        if now < self._baseline_freeze_until:
+            return
+        if state == "idle" and now < self._idle_baseline_freeze_until:
+            return
+
+        if (b is None) or (b.get("thr") is None):
+            self._baseline_welford_push(state, score)
+            return
+
+        if score <= float(b["thr"]):
+            self._baseline_ewma_update_if_safe(state, score)
+
+    def _baseline_welford_push(self, state: str, x: float):
+        b = self.baseline.get(state)
+        if b is None:
+            b = {"n": 0, "mean": 0.0, "M2": 0.0, "mu": None, "sigma": None, "thr": None}
+            self.baseline[state] = b
+
+        b["n"] += 1
+        n = b["n"]
+        delta = x - b["mean"]
+        b["mean"] += delta / n
+        delta2 = x - b["mean"]
+        b["M2"] += delta * delta2
+
+        if b["n"] == self.BASELINE_BURNIN_N:
+            var = b["M2"] / max(1, (b["n"] - 1))
+            sigma = math.sqrt(max(var, 1e-12))
+            mu = b["mean"]
+            b["mu"] = mu
+            b["sigma"] = sigma
+            b["thr"] = mu + self.BASELINE_K * sigma
+
+            if self.on_log:
+                self.on_log(
+                    f"Baseline READY[{state}] mu={mu:.6f} sigma={sigma:.6f} thr={b['thr']:.6f}"
+                )
+
+    def _baseline_ewma_update_if_safe(self, state: str, score: float):
+        b = self.baseline.get(state)
+        if not b or b["thr"] is None:
+            return
+
+        thr = float(b["thr"])
+        if thr <= 0:
+            return
+
+        if score >= thr * self.BASELINE_SAFE_RATIO:
+            return
+
+        alpha = self.BASELINE_EWMA_ALPHA
+        mu = float(b["mu"])
+        sigma = float(b["sigma"])
+
+        mu_new = (1 - alpha) * mu + alpha * score
+        var = sigma * sigma
+        var_new = (1 - alpha) * var + alpha * ((score - mu_new) ** 2)
+        sigma_new = math.sqrt(max(var_new, 1e-12))
+
+        b["mu"] = mu_new
+        b["sigma"] = sigma_new
+        b["thr"] = mu_new + self.BASELINE_K * sigma_new
+
+    # --------------------------------------------------
+    # Status
+    # --------------------------------------------------
+    def status_text(self) -> str:
+        parts = []
+        for st in STATES:
+            b = self.baseline.get(st)
+            if not b:
+                parts.append(f"{st}:0/{self.BASELINE_BURNIN_N}")
+                continue
+
+            n = int(b.get("n", 0))
+            if b.get("thr") is None:
+                parts.append(f"{st}:{n}/{self.BASELINE_BURNIN_N}")
+            else:
+                parts.append(f"{st}:READY")
+        return "Baseline[" + " | ".join(parts) + "]"
@@ -0,0 +1,132 @@
+# bench_engine_frame.py
+"""
+Microbenchmark: per-frame feature path of PredictorEngine.
+
+  legacy : dict -> np.array, per-frame std + 1e-6, deque + np.stack
+  ring   : FeatureMap.transform_into() straight into the [2*T_IN, F] ring,
+           folded reciprocal std, contiguous window view
+
+The model is replaced by a fixed linear map (no torch needed) so only the
+feature path is timed; both paths must produce identical scores.
+
+    python bench_engine_frame.py --frames 200000
+"""
+import json
+import time
+import argparse
+from collections import deque
+
+import numpy as np
+
+from config import MODEL_CONFIG_PATH, SCALER_PATH, INFER_STRIDE
+from predictor_engine import PredictorEngine, FeatureMap, load_scaler_stats
+
+SENSORS = ("ax", "ay", "az", "gx", "gy", "gz")
+
+
+class LegacyEngine:
+    """The per-frame path before the ring buffer (reference)."""
+
+    def __init__(self, t_in, t_out, stride, mean, std, cmd_scale, predict):
+        self.T_IN, self.T_OUT, self.stride = t_in, t_out, stride
+        self.sensor_mean, self.sensor_std = mean[:6], std[:6]
+        self.cmd = cmd_scale
+        self._predict = predict
+        self.x_buf = deque(maxlen=t_in)
+        self.pending = deque()
+        self.step = 0
+
+    @staticmethod
+    def _scale_cmd(v, lo, hi):
+        return 2.0 * (v - lo) / (hi - lo) - 1.0
+
+    def _scale_frame(self, data):
+        sensor = np.array([data[k] for k in SENSORS], dtype=np.float32)
+        sensor_s = (sensor - self.sensor_mean) / (self.sensor_std + 1e-6)
+        thr_s = self._scale_cmd(float(data["throttle"]), self.cmd["THR_MIN"], self.cmd["THR_MAX"])
+        str_s = self._scale_cmd(float(data["steer"]), self.cmd["STR_MIN"], self.cmd["STR_MAX"])
+        return np.array([*sensor_s, thr_s, str_s], dtype=np.float32), sensor_s
+
+    def update(self, data):
+        x_s, sensor_s = self._scale_frame(data)
+        if self.pending:
+            self.pending[0]["actual"].append(sensor_s)
+            if len(self.pending[0]["actual"]) == self.T_OUT:
+                act = np.stack(self.pending[0]["actual"])
+                score = float(np.mean((self.pending[0]["pred"] - act) ** 2))
+                self.pending.popleft()
+                return score
+        self.x_buf.append(x_s)
+        self.step += 1
+        if len(self.x_buf) == self.T_IN and (self.step % self.stride == 0):
+            self.pending.append({"pred": self._predict(np.stack(self.x_buf)), "actual": []})
+        return None
+
+
+def make_ring_engine(cfg, mean, std, predict):
+    eng = object.__new__(PredictorEngine)
+    eng.cfg = cfg
+    eng.T_IN, eng.T_OUT, eng.stride = int(cfg["T_IN"]), int(cfg["T_OUT"]), INFER_STRIDE
+    eng.features = FeatureMap(cfg, mean, std)
+    eng.profiler = None
+    eng._init_buffers()
+    eng._predict = predict
+    return eng
+
+
+def make_frames(n, seed=0):
+    rng = np.random.default_rng(seed)
+    s = rng.normal(0, 1000, size=(n, 6))
+    thr = rng.choice([0, 60, -60], size=n)
+    st = rng.choice([0, 100, -100], size=n)
+    frames = []
+    for i in range(n):
+        d = {k: float(s[i, j]) for j, k in enumerate(SENSORS)}
+        d.update(throttle=int(thr[i]), steer=int(st[i]), dist_cm=50.0, ts_ms=i * 50, seq=i)
+        frames.append(d)
+    return frames
+
+
+def run(engine, frames):
+    scores = []
+    t0 = time.perf_counter()
+    for d in frames:
+        s = engine.update(d)
+        if s is not None:
+            scores.append(s)
+    return time.perf_counter() - t0, np.array(scores)
+
+
+def main():
+    p = argparse.ArgumentParser(description="PredictorEngine per-frame path benchmark")
+    p.add_argument("--frames", type=int, default=200_000)
+    args = p.parse_args()
+
+    with open(MODEL_CONFIG_PATH) as f:
+        cfg = json.load(f)
+    mean, std = load_scaler_stats(SCALER_PATH)
+    t_in, t_out = int(cfg["T_IN"]), int(cfg["T_OUT"])
+
+    rng = np.random.default_rng(1)
+    w = rng.normal(size=(t_in * 8, t_out * 6)).astype(np.float32) / (t_in * 8)
+
+    def predict(x):
+        return (np.ascontiguousarray(x).reshape(-1) @ w).reshape(t_out, 6)
+
+    frames = make_frames(args.frames)
+    legacy = LegacyEngine(t_in, t_out, INFER_STRIDE, mean, std, cfg["cmd_scale"], predict)
+    ring = make_ring_engine(cfg, mean, std, predict)
+
+    t_legacy, s_legacy = run(legacy, frames)
+    t_ring, s_ring = run(ring, frames)
+
+    n = len(frames)
+    print(f"frames={n} scores={len(s_ring)}")
+    print(f"legacy: {t_legacy / n * 1e6:7.2f} us/frame")
+    print(f"ring  : {t_ring / n * 1e6:7.2f} us/frame  ({t_legacy / t_ring:.2f}x)")
+    same = len(s_legacy) == len(s_ring) and np.allclose(s_legacy, s_ring, rtol=1e-5, atol=1e-7)
+    print("scores match:", same)
+
+
+if __name__ == "__main__":
+    main()
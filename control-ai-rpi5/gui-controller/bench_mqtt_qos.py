@@ -0,0 +1,114 @@
+# bench_mqtt_qos.py
+"""
+Latency benchmark for the MQTT delivery profiles against a local broker.
+
+Publisher and subscriber run in the same process (same clock), so the
+measured value is the one-way broker round trip for each profile.
+
+    python bench_mqtt_qos.py --broker 127.0.0.1 --count 2000 --rate 200
+"""
+import argparse
+import json
+import threading
+import time
+
+import numpy as np
+import paho.mqtt.client as mqtt
+
+from config import BROKER_PORT, MQTT_PROFILES
+
+BENCH_TOPIC = "bench/qos"
+
+# profile name -> (pub qos, sub qos)
+CASES = {
+    "telemetry (qos0)": (MQTT_PROFILES["telemetry"]["qos"], MQTT_PROFILES["telemetry"]["qos"]),
+    "control (qos0+ttl)": (MQTT_PROFILES["control"]["qos"], MQTT_PROFILES["control"]["qos"]),
+    "legacy (qos1)": (1, 1),
+    "qos2": (2, 2),
+}
+
+
+def run_case(broker, port, pub_qos, sub_qos, count, rate, payload_bytes):
+    lat_ns = np.full(count, np.nan)
+    done = threading.Event()
+    ready = threading.Event()
+    received = [0]
+
+    def on_connect(c, userdata, flags, rc, prop):
+        c.subscribe(BENCH_TOPIC, qos=sub_qos)
+
+    def on_subscribe(c, userdata, mid, rc_list, prop):
+        ready.set()
+
+    def on_message(c, userdata, msg):
+        now = time.perf_counter_ns()
+        obj = json.loads(msg.payload)
+        i = obj["i"]
+        if 0 <= i < count and np.isnan(lat_ns[i]):
+            lat_ns[i] = now - obj["t"]
+            received[0] += 1
+            if received[0] == count:
+                done.set()
+
+    sub = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
+    sub.on_connect = on_connect
+    sub.on_subscribe = on_subscribe
+    sub.on_message = on_message
+    sub.connect(broker, port)
+    sub.loop_start()
+
+    pub = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
+    pub.connect(broker, port)
+    pub.loop_start()
+
+    if not ready.wait(5.0):
+        raise RuntimeError("subscribe timed out")
+
+    pad = "x" * max(0, payload_bytes - 40)
+    period = 1.0 / rate
+    t_next = time.perf_counter()
+    for i in range(count):
+        body = json.dumps({"i": i, "t": time.perf_counter_ns(), "p": pad})
+        pub.publish(BENCH_TOPIC, body, qos=pub_qos)
+        t_next += period
+        delay = t_next - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+    done.wait(5.0)
+
+    for c in (pub, sub):
+        c.disconnect()
+        c.loop_stop()
+
+    ok = lat_ns[~np.isnan(lat_ns)] / 1e6
+    return ok, count - len(ok)
+
+
+def main():
+    p = argparse.ArgumentParser(description="MQTT delivery profile latency benchmark")
+    p.add_argument("--broker", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=BROKER_PORT)
+    p.add_argument("--count", type=int, default=2000)
+    p.add_argument("--rate", type=float, default=200.0, help="messages/sec")
+    p.add_argument("--payload", type=int, default=160, help="approx payload bytes")
+    args = p.parse_args()
+
+    print(f"broker={args.broker}:{args.port} count={args.count} rate={args.rate}/s")
+    print(f"{'profile':22s} {'p50':>8s} {'p95':>8s} {'p99':>8s} {'max':>8s} {'lost':>6s}  (ms)")
+    for name, (pub_qos, sub_qos) in CASES.items():
+        lat, lost = run_case(
+            args.broker, args.port, pub_qos, sub_qos,
+            args.count, args.rate, args.payload,
+        )
+        if len(lat) == 0:
+            print(f"{name:22s} no messages received")
+            continue
+        p50, p95, p99 = np.percentile(lat, [50, 95, 99])
+        print(
+            f"{name:22s} {p50:8.3f} {p95:8.3f} {p99:8.3f} {lat.max():8.3f} {lost:6d}"
+        )
+
+
+if __name__ == "__main__":
+    main()
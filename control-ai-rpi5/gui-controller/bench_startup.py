@@ -0,0 +1,124 @@
+# bench_startup.py
+"""
+Startup-time breakdown for the GUI.
+
+Each measurement runs in a fresh interpreter (cold module cache, warm OS
+page cache after the first repeat) and reports the median.
+
+  1) import cost per dependency, measured alone
+  2) time until MainWindow is constructed (what the user waits for)
+  3) background loads: init_firestore() and PredictorEngine()
+
+    python bench_startup.py --repeat 5
+"""
+import os
+import sys
+import argparse
+import subprocess
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+MODULES = [
+    "numpy",
+    "zoneinfo",
+    "PySide6.QtWidgets",
+    "paho.mqtt.client",
+    "torch",
+    "firebase_admin",
+    "firebase_admin.firestore",
+    "joblib",
+    "sklearn.preprocessing",
+    "predictor_engine",
+    "firebase_uploader",
+    "mainwindow",
+]
+
+IMPORT_SNIPPET = """
+import time
+t = time.perf_counter()
+import {mod}
+print(time.perf_counter() - t)
+"""
+
+WINDOW_SNIPPET = """
+import time
+t0 = time.perf_counter()
+from PySide6.QtWidgets import QApplication
+app = QApplication([])
+from mainwindow import MainWindow
+t1 = time.perf_counter()
+w = MainWindow(broker_ip="127.0.0.1")
+w.show()
+app.processEvents()
+t2 = time.perf_counter()
+print(t1 - t0, t2 - t1)
+w._loader.wait()
+"""
+
+LOAD_SNIPPET = """
+import time
+t0 = time.perf_counter()
+from firebase_uploader import init_firestore
+init_firestore()
+t1 = time.perf_counter()
+from predictor_engine import PredictorEngine
+PredictorEngine()
+t2 = time.perf_counter()
+print(t1 - t0, t2 - t1)
+"""
+
+
+def run(snippet: str, repeat: int):
+    env = dict(os.environ)
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    rows = []
+    for _ in range(repeat):
+        r = subprocess.run(
+            [sys.executable, "-c", snippet],
+            cwd=HERE,
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+        if r.returncode != 0:
+            err = (r.stderr.strip().splitlines() or ["?"])[-1]
+            return None, err
+        rows.append([float(v) for v in r.stdout.strip().splitlines()[-1].split()])
+    return np.median(np.array(rows), axis=0), None
+
+
+def main():
+    p = argparse.ArgumentParser(description="GUI startup-time breakdown")
+    p.add_argument("--repeat", type=int, default=5)
+    args = p.parse_args()
+
+    print(f"[1] import cost (fresh interpreter, median of {args.repeat})")
+    for mod in MODULES:
+        t, err = run(IMPORT_SNIPPET.format(mod=mod), args.repeat)
+        if t is None:
+            print(f"  {mod:28s}   n/a  ({err})")
+        else:
+            print(f"  {mod:28s} {t[0] * 1000:8.1f} ms")
+
+    print("\n[2] window startup")
+    t, err = run(WINDOW_SNIPPET, args.repeat)
+    if t is None:
+        print(f"  n/a ({err})")
+    else:
+        print(f"  imports (Qt + mainwindow)    {t[0] * 1000:8.1f} ms")
+        print(f"  MainWindow() + show          {t[1] * 1000:8.1f} ms")
+        print(f"  total until window shown     {(t[0] + t[1]) * 1000:8.1f} ms")
+
+    print("\n[3] background loads (ModelLoader)")
+    t, err = run(LOAD_SNIPPET, args.repeat)
+    if t is None:
+        print(f"  n/a ({err})")
+    else:
+        print(f"  init_firestore()             {t[0] * 1000:8.1f} ms")
+        print(f"  PredictorEngine()            {t[1] * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
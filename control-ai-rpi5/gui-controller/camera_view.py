@@ -0,0 +1,297 @@
+# camera_view.py
+import time
+import struct
+import random
+import threading
+from collections import deque
+
+import numpy as np
+
+from PySide6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QCheckBox
+from PySide6.QtCore import Qt, QTimer, Signal, QRectF
+from PySide6.QtGui import QImage, QPainter, QColor
+
+from config import PREVIEW_LEASE_REFRESH_SEC, PREVIEW_PROBE_SEC
+
+from mqtt_manager import SequenceTracker
+
+# gateway camera_preview.HEADER:
+# magic | version | quality | seq | ts_ms (capture) | width | height | pub_ms
+PREVIEW_HEADER = struct.Struct("<2sBBIqHHH")
+PREVIEW_MAGIC = b"PV"
+
+
+class PreviewFrame:
+    __slots__ = ("image", "seq", "quality", "ts_ms", "pub_ms", "nbytes", "decode_ms", "luma")
+
+    def __init__(self, image, seq, quality, ts_ms, pub_ms, nbytes, decode_ms, luma):
+        self.image = image
+        self.seq = seq
+        self.quality = quality
+        self.ts_ms = ts_ms
+        self.pub_ms = pub_ms
+        self.nbytes = nbytes
+        self.decode_ms = decode_ms
+        self.luma = luma
+
+
+def decode_preview(payload: bytes, with_luma: bool = False) -> PreviewFrame | None:
+    """
+    Header + JPEG -> PreviewFrame (QImage decode is safe off the UI thread).
+    Returns None for a foreign or corrupt payload.
+    """
+    if len(payload) <= PREVIEW_HEADER.size:
+        return None
+    magic, _ver, quality, seq, ts_ms, _w, _h, pub_ms = PREVIEW_HEADER.unpack_from(payload)
+    if magic != PREVIEW_MAGIC:
+        return None
+
+    t0 = time.perf_counter()
+    image = QImage.fromData(payload[PREVIEW_HEADER.size:], "JPG")
+    if image.isNull():
+        return None
+    decode_ms = (time.perf_counter() - t0) * 1000.0
+
+    luma = None
+    if with_luma:
+        gray = image.convertToFormat(QImage.Format_Grayscale8)
+        rows = np.frombuffer(gray.constBits(), np.uint8, gray.bytesPerLine() * gray.height())
+        luma = float(rows.reshape(gray.height(), gray.bytesPerLine())[:, :gray.width()].mean())
+
+    return PreviewFrame(image, seq, quality, ts_ms, pub_ms, len(payload), decode_ms, luma)
+
+
+# ============================================================
+# Glass-to-glass latency probe
+# ============================================================
+class LatencyProbe:
+    """
+    The window flashes a patch black / white; with the gesture camera
+    aimed at it, the flash shows up as a jump in preview brightness.
+    Latency = patch painted -> first preview frame with the new level
+    painted (display, camera, encoder, MQTT, decode and both repaints).
+    The result is quantized by the preview frame interval.
+    """
+
+    MIN_CONTRAST = 40.0
+
+    def __init__(self, history: int = 200):
+        self.level = False
+        self.t_flip = None
+        self._luma = deque(maxlen=30)
+        self.results = deque(maxlen=history)
+
+    def flipped(self, t: float) -> None:
+        """Patch repainted with the new level at t (monotonic)."""
+        self.t_flip = t
+
+    def on_frame(self, luma: float, t: float) -> float | None:
+        self._luma.append(luma)
+        lo, hi = min(self._luma), max(self._luma)
+        if self.t_flip is None or hi - lo < self.MIN_CONTRAST:
+            return None
+        if (luma > (lo + hi) / 2.0) != self.level:
+            return None
+        lat_ms = (t - self.t_flip) * 1000.0
+        self.t_flip = None
+        self.results.append(lat_ms)
+        return lat_ms
+
+    def reset(self) -> None:
+        self.t_flip = None
+        self._luma.clear()
+        self.results.clear()
+
+
+class ProbePatch(QWidget):
+    def __init__(self, probe: LatencyProbe, parent=None):
+        super().__init__(parent)
+        self.probe = probe
+        self._painted = True
+        self.setMinimumSize(160, 120)
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self._flip)
+
+    def start(self):
+        self.probe.reset()
+        self._schedule()
+
+    def stop(self):
+        self._timer.stop()
+
+    def _schedule(self):
+        # jittered so the flashes do not lock to the preview frame phase
+        self._timer.start(int(PREVIEW_PROBE_SEC * 1000 * random.uniform(0.8, 1.2)))
+
+    def _flip(self):
+        self.probe.level = not self.probe.level
+        self._painted = False
+        self.update()
+        self._schedule()
+
+    def paintEvent(self, event):
+        p = QPainter(self)
+        p.fillRect(self.rect(), QColor("#ffffff" if self.probe.level else "#000000"))
+        p.end()
+        if not self._painted:
+            self._painted = True
+            self.probe.flipped(time.monotonic())
+
+
+# ============================================================
+# Preview canvas
+# ============================================================
+class PreviewCanvas(QWidget):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.frame = None
+        self.setMinimumSize(320, 240)
+
+    def paintEvent(self, event):
+        p = QPainter(self)
+        p.fillRect(self.rect(), QColor("#202020"))
+        if self.frame is not None:
+            img = self.frame.image
+            scale = min(self.width() / img.width(), self.height() / img.height())
+            w, h = img.width() * scale, img.height() * scale
+            p.drawImage(QRectF((self.width() - w) / 2, (self.height() - h) / 2, w, h), img)
+        else:
+            p.setPen(QColor("#c0c0c0"))
+            p.drawText(self.rect(), Qt.AlignCenter, "waiting for mobility/camera/preview")
+        p.end()
+
+
+class CameraPreviewWindow(QWidget):
+    """
+    Top-level window showing the gateway camera preview.
+
+    push() runs on the MQTT thread: it decodes into the latest slot and
+    signals the UI thread only when no repaint is pending, so a slow UI
+    drops frames instead of queueing them. While visible the window
+    keeps the gateway's viewer lease (request_preview(True)).
+    """
+
+    sig_frame = Signal()
+
+    def __init__(self, request_preview, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Camera Preview")
+        self.setWindowFlag(Qt.Window, True)
+        self._request_preview = request_preview
+
+        self._lock = threading.Lock()
+        self._latest = None
+        self._signaled = False
+        self._probe_on = False
+
+        self._seq = SequenceTracker()
+        self._shown = deque(maxlen=50)       # (t_mono, nbytes)
+        self._age_ms = deque(maxlen=50)      # capture (gateway clock) -> painted (local clock)
+
+        self.canvas = PreviewCanvas(self)
+        self.probe = LatencyProbe()
+        self.patch = ProbePatch(self.probe, self)
+        self.patch.hide()
+
+        self.statusLabel = QLabel("-", self)
+        self.probeBox = QCheckBox("latency test (aim the camera at the patch)", self)
+        self.probeBox.toggled.connect(self._on_probe_toggled)
+
+        view = QHBoxLayout()
+        view.addWidget(self.canvas, 2)
+        view.addWidget(self.patch, 1)
+
+        lay = QVBoxLayout(self)
+        lay.addLayout(view, 1)
+        lay.addWidget(self.statusLabel)
+        lay.addWidget(self.probeBox)
+
+        self.sig_frame.connect(self._on_frame)
+
+        self._lease_timer = QTimer(self)
+        self._lease_timer.timeout.connect(lambda: self._request_preview(True))
+
+        self._status_timer = QTimer(self)
+        self._status_timer.timeout.connect(self._update_status)
+
+        self.resize(560, 360)
+
+    # --------------------------------------------------
+    # MQTT thread
+    # --------------------------------------------------
+    def push(self, payload: bytes):
+        frame = decode_preview(payload, with_luma=self._probe_on)
+        if frame is None:
+            return
+        with self._lock:
+            self._latest = frame
+            if self._signaled:
+                return
+            self._signaled = True
+        self.sig_frame.emit()
+
+    # --------------------------------------------------
+    # UI thread
+    # --------------------------------------------------
+    def _on_frame(self):
+        with self._lock:
+            frame = self._latest
+            self._latest = None
+            self._signaled = False
+        if frame is None:
+            return
+
+        self._seq.update(frame.seq)
+        self.canvas.frame = frame
+        self.canvas.repaint()
+
+        now = time.monotonic()
+        self._shown.append((now, frame.nbytes))
+        self._age_ms.append(time.time() * 1000.0 - frame.ts_ms)
+        if self._probe_on and frame.luma is not None:
+            self.probe.on_frame(frame.luma, now)
+
+    def _update_status(self):
+        f = self.canvas.frame
+        if f is None or len(self._shown) < 2:
+            self.statusLabel.setText("no preview (gateway --preview off, or no camera)")
+            return
+        span = self._shown[-1][0] - self._shown[0][0]
+        fps = (len(self._shown) - 1) / span if span > 0 else 0.0
+        kbps = sum(n for _, n in self._shown) * 8 / 1000.0 / span if span > 0 else 0.0
+        age = sorted(self._age_ms)[len(self._age_ms) // 2]
+        text = (
+            f"{f.image.width()}x{f.image.height()} q{f.quality}  {fps:.1f} fps  {kbps:.0f} kbit/s  "
+            f"loss {self._seq.loss_ratio() * 100:.1f}%  |  capture->shown {age:.0f} ms "
+            f"(gateway {f.pub_ms} ms, decode {f.decode_ms:.1f} ms)"
+        )
+        if self._probe_on:
+            r = sorted(self.probe.results)
+            if r:
+                text += f"  |  glass-to-glass n={len(r)} p50 {r[len(r) // 2]:.0f} ms max {r[-1]:.0f} ms"
+            else:
+                text += "  |  glass-to-glass: waiting for flashes"
+        self.statusLabel.setText(text)
+
+    def _on_probe_toggled(self, on: bool):
+        self._probe_on = on
+        self.patch.setVisible(on)
+        if on:
+            self.patch.start()
+        else:
+            self.patch.stop()
+
+    def showEvent(self, event):
+        self._request_preview(True)
+        self._lease_timer.start(int(PREVIEW_LEASE_REFRESH_SEC * 1000))
+        self._status_timer.start(500)
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        self._lease_timer.stop()
+        self._status_timer.stop()
+        self.patch.stop()
+        self._request_preview(False)
+        super().hideEvent(event)
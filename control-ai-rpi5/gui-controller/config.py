@@ -1,5 +1,8 @@
 # config.py
-import pytz
+# stdlib only: also imported by the gateway's edge scorer process
+# (vision-gateway-rpi4/edge_scorer.py via predictor_engine), which has no
+# GUI dependencies installed
+from zoneinfo import ZoneInfo
 
 # ============================================================
 # MQTT
@@ -11,25 +14,98 @@ TOPIC_PUB_CONTROL   = "mobility/control/drive"
 TOPIC_PUB_MODE      = "mobility/control/mode"
 TOPIC_SUB_TELEMETRY = "mobility/telemetry/parsed"
 TOPIC_SUB_STATUS    = "mobility/alert/event"
+TOPIC_PUB_METRICS   = "mobility/metrics/rpi5"
+TOPIC_SUB_PROFILE   = "mobility/metrics/rpi5/profile"   # payload: capture seconds
+TOPIC_PUB_TEL_CTRL  = "mobility/control/telemetry"      # gateway telemetry rate policy
+TOPIC_SUB_PREVIEW   = "mobility/camera/preview"         # gateway camera preview (header + JPEG)
+TOPIC_PUB_PREVIEW_CTRL = "mobility/control/preview"     # preview viewer lease
+
+# Per-topic delivery profiles
+# - telemetry: QoS 0, frames carry "seq" so loss is measured instead of retried
+# - control  : QoS 0 latest-value, stamped with ts_ms/ttl_ms; the gateway
+#              drops commands that are expired or older than the last applied
+# - mode     : QoS 1 retained, so a restarted gateway gets the current mode
+# - status   : QoS 1 (rare, must not be lost)
+# - tel_ctrl : QoS 1, dropped when queued offline for longer than ttl_ms
+# - preview  : QoS 0 frame stream; subscribed only while the preview is shown
+MQTT_PROFILES = {
+    "telemetry": {"qos": 0, "retain": False},
+    "control":   {"qos": 0, "retain": False, "ttl_ms": 300},
+    "mode":      {"qos": 1, "retain": True},
+    "status":    {"qos": 1, "retain": False},
+    "metrics":   {"qos": 0, "retain": True},
+    "tel_ctrl":  {"qos": 1, "retain": False, "ttl_ms": 1000},
+    "preview":   {"qos": 0, "retain": False},
+    "preview_ctrl": {"qos": 0, "retain": False},
+}
+
+# GUI re-publishes its current command at this period while in GUI mode;
+# the gateway ramps throttle to 0 when no command arrives within its
+# lease (LEASE_GUI_MS in gateway.py, 1000 ms)
+CONTROL_REFRESH_SEC = 0.25
+
+# After this long without a delivered command (link loss, GUI stall, mode
+# switch) the gateway lease has lapsed; the refresh then sends throttle 0
+# until the operator issues a new command
+CONTROL_LEASE_SEC = 1.0
+
+# reconnect backoff (seconds) and offline outbound queue
+MQTT_RECONNECT_MIN_DELAY = 1
+MQTT_RECONNECT_MAX_DELAY = 30
+MQTT_OFFLINE_QUEUE_MAX = 16
 
 # ============================================================
 # Predictor
 # ============================================================
 MODEL_TS_PATH = "./predictor_ts.pt"
-SCALER_PATH   = "./sensor_scaler.pkl"
+SCALER_PATH   = "./sensor_scaler.npz"   # mean/scale arrays (convert_scaler.py)
+
+# artifact config: T_IN / T_OUT, feature_order_X / _Y, cmd_scale
+# (exported with the model; the engine derives its input layout from it)
+MODEL_CONFIG_PATH = "./config.json"
+
+# bundle from training/train.py (version dir or export root with `latest`);
+# when set, model / scaler / config all come from the bundle
+MODEL_BUNDLE_DIR = None
 
-T_IN = 20
-T_OUT = 20
 INFER_STRIDE = 5
 
-# cmd scaling (dataset convention)
-THR_MIN, THR_MAX = -100.0, 100.0
-STR_MIN, STR_MAX = -100.0, 100.0
+# The model runs on a fixed 50 ms frame grid; telemetry at other rates
+# (gateway idle / boost policy) is resampled onto it (frame_resampler.py)
+MODEL_FRAME_MS = 50
+
+# Ask the gateway for boosted telemetry (25 ms) while the anomaly score is
+# at least this fraction of the state threshold (at most once per second)
+TELEMETRY_BOOST_RATIO = 0.8
+TELEMETRY_BOOST_SEC = 3.0
+
+# ============================================================
+# Latency instrumentation (stage_profiler.py)
+# ============================================================
+METRICS_PUBLISH_SEC = 10       # stage histogram summary on TOPIC_PUB_METRICS
+PROFILE_DUMP_DIR = "./profiles"
+PROFILE_CAPTURE_SEC = 10       # default on-demand cProfile capture length
+
+# ============================================================
+# Telemetry plot
+# ============================================================
+PLOT_RATE_HZ = 40          # max telemetry rate per vehicle (gateway boost: 25 ms)
+PLOT_BUFFER_SEC = 120      # ring buffer history per vehicle
+PLOT_WINDOW_SEC = 30       # visible time window
+PLOT_MAX_FPS = 15          # redraw cap
+
+# ============================================================
+# Camera preview (camera_view.py)
+# ============================================================
+# The gateway encodes only while a viewer lease is held (PREVIEW_LEASE_SEC
+# in gateway.py, 5 s); the open preview window refreshes it at this period
+PREVIEW_LEASE_REFRESH_SEC = 2.0
+PREVIEW_PROBE_SEC = 1.5    # latency test: mean time between patch flashes
 
 # ============================================================
 # Timezone
 # ============================================================
-KOREA_TZ = pytz.timezone("Asia/Seoul")
+KOREA_TZ = ZoneInfo("Asia/Seoul")
 
 # ============================================================
 # Firebase
@@ -37,3 +113,16 @@ KOREA_TZ = pytz.timezone("Asia/Seoul")
 FIREBASE_KEY_PATH = "./qt-gui-controller-db-key.json"
 FIRESTORE_COLLECTION = "telemetry"
 FIRESTORE_ALERT_COLLECTION = "alert"
+
+# Upload pipeline
+FIRESTORE_QUEUE_MAX = 2000      # bounded in-memory queue (per kind)
+FIRESTORE_BATCH_MAX = 400       # docs per batched commit (Firestore limit: 500)
+FIRESTORE_FLUSH_SEC = 5.0       # commit interval
+FIRESTORE_TELEMETRY_MODE = "summary"   # "summary" (windowed aggregates) | "raw"
+FIRESTORE_DOWNSAMPLE = 20       # raw mode: keep 1 of N telemetry frames (20 Hz -> 1 Hz)
+FIRESTORE_SUMMARY_SEC = 1.0     # summary mode: aggregation window
+FIRESTORE_BURST_PRE = 40        # raw frames kept before an alert (2 s @ 20 Hz)
+FIRESTORE_BURST_POST = 20       # raw frames captured after an alert
+FIRESTORE_BURST_COLLECTION = "telemetry_burst"
+FIRESTORE_SPOOL_DIR = "./spool"
+FIRESTORE_SPOOL_MAX_MB = 64
@@ -0,0 +1,29 @@
+# convert_scaler.py
+"""
+One-off conversion of the notebook's sklearn scaler pickle into plain
+arrays, so the GUI does not need joblib / sklearn at runtime.
+
+    python convert_scaler.py sensor_scaler.pkl sensor_scaler.npz
+"""
+import sys
+
+import numpy as np
+import joblib
+
+
+def main():
+    src = sys.argv[1] if len(sys.argv) > 1 else "sensor_scaler.pkl"
+    dst = sys.argv[2] if len(sys.argv) > 2 else "sensor_scaler.npz"
+
+    scaler = joblib.load(src)
+    mean = np.asarray(scaler.mean_, dtype=np.float32)
+    scale = np.asarray(scaler.scale_, dtype=np.float32)
+    np.savez(dst, mean=mean, scale=scale)
+
+    print(f"{src} -> {dst}")
+    print("mean :", mean)
+    print("scale:", scale)
+
+
+if __name__ == "__main__":
+    main()
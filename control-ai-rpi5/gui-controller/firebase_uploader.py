@@ -1,12 +1,32 @@
+import os
+import glob
+import json
 import time
+import threading
+import itertools
+from collections import deque
 from datetime import datetime
 
 from PySide6.QtCore import QThread
 
-import firebase_admin
-from firebase_admin import credentials, firestore
-
-from config import FIREBASE_KEY_PATH, FIRESTORE_COLLECTION, FIRESTORE_ALERT_COLLECTION, KOREA_TZ
+from config import (
+    FIREBASE_KEY_PATH,
+    FIRESTORE_COLLECTION,
+    FIRESTORE_ALERT_COLLECTION,
+    FIRESTORE_QUEUE_MAX,
+    FIRESTORE_BATCH_MAX,
+    FIRESTORE_FLUSH_SEC,
+    FIRESTORE_TELEMETRY_MODE,
+    FIRESTORE_DOWNSAMPLE,
+    FIRESTORE_SUMMARY_SEC,
+    FIRESTORE_BURST_PRE,
+    FIRESTORE_BURST_POST,
+    FIRESTORE_BURST_COLLECTION,
+    FIRESTORE_SPOOL_DIR,
+    FIRESTORE_SPOOL_MAX_MB,
+    KOREA_TZ,
+)
+from telemetry_aggregator import TelemetryAggregator
 
 
 def init_firestore():
@@ -14,8 +34,12 @@ def init_firestore():
     Initialize Firestore.
     Returns a Firestore client on success, or None on failure.
     The application continues running even if initialization fails.
+    Honors FIRESTORE_EMULATOR_HOST for local testing.
     """
     try:
+        import firebase_admin
+        from firebase_admin import credentials, firestore
+
         cred = credentials.Certificate(FIREBASE_KEY_PATH)
         firebase_admin.initialize_app(cred)
         db = firestore.client()
@@ -26,66 +50,307 @@ def init_firestore():
         return None
 
 
-def upload_alert(db, alert_payload: dict):
+def _server_time() -> str:
+    return datetime.now(KOREA_TZ).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+
+
+# ============================================================
+# Sinks
+# ============================================================
+class FirestoreSink:
+    """
+    Writes documents with Firestore batched writes (one commit per batch).
     """
-    Upload a single alert document to Firestore.
 
-    - Collection: FIRESTORE_ALERT_COLLECTION (default: "alert")
-    - Document id: server_time (Asia/Seoul) with milliseconds to reduce collision
+    MAX_BATCH = 500  # Firestore limit per batch
+
+    def __init__(self, db):
+        self.db = db
+
+    def write(self, docs):
+        """
+        docs: list of (collection, doc_id, payload). Raises on failure.
+        """
+        for i in range(0, len(docs), self.MAX_BATCH):
+            batch = self.db.batch()
+            for coll, doc_id, payload in docs[i:i + self.MAX_BATCH]:
+                batch.set(self.db.collection(coll).document(doc_id), payload)
+            batch.commit()
+
+
+class MemorySink:
+    """
+    In-process stand-in for Firestore (tests / offline runs).
+    Set `online = False` to simulate an outage.
     """
-    if not db:
-        return False
 
-    try:
-        ts = datetime.now(KOREA_TZ).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
-        payload = dict(alert_payload or {})
-        payload["server_time"] = ts
-        db.collection(FIRESTORE_ALERT_COLLECTION).document(ts).set(payload)
-        return True
-    except Exception as e:
-        print("Firebase alert upload error:", e)
-        return False
+    def __init__(self):
+        self.docs = {}
+        self.commits = 0
+        self.online = True
 
+    def write(self, docs):
+        if not self.online:
+            raise ConnectionError("MemorySink offline")
+        for coll, doc_id, payload in docs:
+            self.docs.setdefault(coll, {})[doc_id] = payload
+        self.commits += 1
 
+
+# ============================================================
+# Disk spool (offline periods)
+# ============================================================
+class DiskSpool:
+    """
+    Append-only JSONL spool. Failed batches are written as one file each
+    and replayed oldest-first once the sink is reachable again.
+    Oldest files are discarded when the spool exceeds its size cap.
+    """
+
+    def __init__(self, path=FIRESTORE_SPOOL_DIR, max_mb=FIRESTORE_SPOOL_MAX_MB):
+        self.path = path
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._counter = itertools.count()
+
+    def _files(self):
+        return sorted(glob.glob(os.path.join(self.path, "spool-*.jsonl")))
+
+    def pending(self) -> int:
+        return len(self._files())
+
+    def put(self, docs):
+        os.makedirs(self.path, exist_ok=True)
+        name = f"spool-{time.time_ns():020d}-{next(self._counter):06d}.jsonl"
+        tmp = os.path.join(self.path, name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            for coll, doc_id, payload in docs:
+                f.write(json.dumps({"c": coll, "id": doc_id, "d": payload}) + "\n")
+        os.replace(tmp, os.path.join(self.path, name))
+        self._enforce_cap()
+
+    def _enforce_cap(self):
+        files = self._files()
+        total = sum(os.path.getsize(p) for p in files)
+        while files and total > self.max_bytes:
+            p = files.pop(0)
+            total -= os.path.getsize(p)
+            os.remove(p)
+            print("Firebase spool full, dropped", os.path.basename(p))
+
+    def replay(self, sink, max_files: int = 4) -> int:
+        """
+        Push up to max_files spooled batches to the sink.
+        Stops at the first failure. Returns the number of documents sent.
+        """
+        sent = 0
+        for p in self._files()[:max_files]:
+            with open(p, "r", encoding="utf-8") as f:
+                docs = [
+                    (o["c"], o["id"], o["d"])
+                    for o in (json.loads(line) for line in f if line.strip())
+                ]
+            sink.write(docs)
+            os.remove(p)
+            sent += len(docs)
+        return sent
+
+
+# ============================================================
+# Upload thread
+# ============================================================
 class TelemetryUploadThread(QThread):
     """
-    Periodically uploads the latest telemetry data to Firestore.
-    Upload interval is 1 second.
+    Background Firestore writer.
+
+    - update_data() / submit_alert() never block and never touch the network.
+    - Telemetry is either aggregated into FIRESTORE_SUMMARY_SEC summary
+      documents (plus raw bursts around alerts) or, in "raw" mode,
+      downsampled to 1 of FIRESTORE_DOWNSAMPLE frames. Both feed a bounded
+      queue; the oldest document is dropped when full.
+    - Alerts use a separate queue and trigger an immediate flush.
+    - Documents are committed as batched writes every FIRESTORE_FLUSH_SEC
+      or when FIRESTORE_BATCH_MAX documents are pending.
+    - Failed batches go to the disk spool and are replayed on recovery.
     """
-    def __init__(self, db):
+
+    def __init__(self, db, sink=None, spool=None):
         super().__init__()
         self.db = db
+        self.sink = sink or (FirestoreSink(db) if db else None)
+        self.spool = spool or DiskSpool()
         self.running = True
-        self.latest_data = None
+
+        self._tel_q = deque(maxlen=FIRESTORE_QUEUE_MAX)
+        self._alert_q = deque(maxlen=FIRESTORE_QUEUE_MAX)
+        self._wake = threading.Event()
+        self._seq = itertools.count()
+        self._frame_n = 0
+
+        self.aggregator = None
+        if FIRESTORE_TELEMETRY_MODE == "summary":
+            self.aggregator = TelemetryAggregator(
+                window_sec=FIRESTORE_SUMMARY_SEC,
+                burst_pre=FIRESTORE_BURST_PRE,
+                burst_post=FIRESTORE_BURST_POST,
+            )
+
+        self.stats = {
+            "written": 0,
+            "batches": 0,
+            "dropped": 0,
+            "spooled": 0,
+            "replayed": 0,
+        }
+
+    def attach(self, db, sink=None):
+        """
+        Set the Firestore client after construction (it is initialized in
+        the background at startup). Call before start().
+        """
+        self.db = db
+        self.sink = sink or (FirestoreSink(db) if db else None)
+
+    def _doc_id(self, ts: str) -> str:
+        # ms timestamp + process-local sequence: unique, still sortable
+        return f"{ts}_{next(self._seq):06d}"
+
+    def _enqueue_telemetry(self, collection: str, payload: dict):
+        ts = _server_time()
+        payload["server_time"] = ts
+
+        if len(self._tel_q) == self._tel_q.maxlen:
+            self.stats["dropped"] += 1
+        self._tel_q.append((collection, self._doc_id(ts), payload))
+        if len(self._tel_q) >= FIRESTORE_BATCH_MAX:
+            self._wake.set()
 
     def update_data(self, data: dict):
         """
-        Update the latest telemetry data to be uploaded.
+        Offer one telemetry frame for upload (aggregated or downsampled).
         """
-        self.latest_data = data
+        if not self.sink:
+            return
+
+        if self.aggregator is not None:
+            ts_ms = int(data.get("ts_ms") or time.time() * 1000)
+            summary = self.aggregator.push(data, ts_ms)
+            if summary is not None:
+                self._enqueue_telemetry(FIRESTORE_COLLECTION, summary)
+
+            burst = self.aggregator.pop_burst()
+            if burst:
+                self._enqueue_telemetry(
+                    FIRESTORE_BURST_COLLECTION,
+                    {
+                        "kind": "burst",
+                        "ts_ms": burst[0].get("ts_ms"),
+                        "n": len(burst),
+                        "frames": burst,
+                    },
+                )
+            return
+
+        self._frame_n += 1
+        if (self._frame_n % FIRESTORE_DOWNSAMPLE) != 0:
+            return
+        self._enqueue_telemetry(FIRESTORE_COLLECTION, dict(data))
+
+    def update_score(self, score: float):
+        """
+        Feed one anomaly score into the current summary window.
+        """
+        if self.aggregator is not None:
+            self.aggregator.push_score(score)
+
+    def submit_alert(self, alert_payload: dict):
+        """
+        Queue one alert document and wake the writer.
+        """
+        if not self.sink:
+            return
+
+        ts = _server_time()
+        payload = dict(alert_payload or {})
+        payload["server_time"] = ts
+
+        if len(self._alert_q) == self._alert_q.maxlen:
+            self.stats["dropped"] += 1
+        self._alert_q.append((FIRESTORE_ALERT_COLLECTION, self._doc_id(ts), payload))
+        self._wake.set()
+
+        if self.aggregator is not None:
+            self.aggregator.mark_alert()
+
+    def _drain(self):
+        docs = []
+        while self._alert_q and len(docs) < FIRESTORE_BATCH_MAX:
+            docs.append(self._alert_q.popleft())
+        while self._tel_q and len(docs) < FIRESTORE_BATCH_MAX:
+            docs.append(self._tel_q.popleft())
+        return docs
+
+    def flush(self):
+        """
+        Write everything currently queued. Called from the worker thread
+        (and once more on stop).
+        """
+        while True:
+            docs = self._drain()
+            if not docs:
+                break
+            try:
+                self.sink.write(docs)
+                self.stats["written"] += len(docs)
+                self.stats["batches"] += 1
+            except Exception as e:
+                print("Firebase upload error (spooling):", e)
+                self._spool(docs)
+                return
+
+        try:
+            self.stats["replayed"] += self.spool.replay(self.sink)
+        except Exception:
+            pass
+
+    def _spool(self, docs):
+        try:
+            self.spool.put(docs)
+            self.stats["spooled"] += len(docs)
+        except Exception as e:
+            self.stats["dropped"] += len(docs)
+            print("Firebase spool error:", e)
 
     def run(self):
         """
         Main thread loop.
-        Uploads the latest telemetry data to Firestore every second.
+        Flushes on a fixed interval, on alerts, or when a batch fills up.
         """
+        if not self.sink:
+            return
+
+        next_flush = time.monotonic() + FIRESTORE_FLUSH_SEC
         while self.running:
-            time.sleep(1.0)
+            timeout = max(0.0, next_flush - time.monotonic())
+            woke = self._wake.wait(timeout)
+            self._wake.clear()
 
-            if not self.db or not self.latest_data:
-                continue
+            if not self.running:
+                break
 
-            try:
-                ts = datetime.now(KOREA_TZ).strftime("%Y-%m-%d %H:%M:%S")
-                payload = dict(self.latest_data)
-                payload["server_time"] = ts
+            now = time.monotonic()
+            if woke or now >= next_flush:
+                self.flush()
+                next_flush = now + FIRESTORE_FLUSH_SEC
 
-                self.db.collection(FIRESTORE_COLLECTION).document(ts).set(payload)
-            except Exception as e:
-                print("Firebase upload error:", e)
+        if self.aggregator is not None:
+            summary = self.aggregator.flush()
+            if summary is not None:
+                self._enqueue_telemetry(FIRESTORE_COLLECTION, summary)
+        self.flush()
 
     def stop(self):
         """
-        Stop the upload thread loop.
+        Stop the upload thread loop (pending documents are flushed).
         """
         self.running = False
+        self._wake.set()
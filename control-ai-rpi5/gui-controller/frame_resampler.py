@@ -0,0 +1,51 @@
+"""
+frame_resampler.py
+
+Maps telemetry frames onto the predictor's fixed time base.
+
+The model was trained on 50 ms frames (T_IN / T_OUT count frames), but
+the gateway now changes the firmware telemetry period at runtime
+(200 ms idle, 50 ms cruise, 25 ms boost; mobility/telemetry/rate).
+push(ts_ms) tells how many 50 ms ticks a frame covers, so the caller can
+feed it to the engine that many times (sample-and-hold):
+
+    200 ms frames -> 4 ticks each
+     50 ms frames -> 1 tick each
+     25 ms frames -> 1 tick every other frame, 0 for the rest
+
+Frame timestamps are the gateway's ts_ms. Jitter within `tolerance`
+of a period does not add or drop a tick. A gap longer than max_gap_ms
+(link down, vehicle restart) restarts the grid and is reported, so the
+caller can reset the engine instead of holding one frame for seconds.
+"""
+
+
+class FrameResampler:
+    def __init__(self, period_ms: float = 50.0, max_gap_ms: float = 1000.0, tolerance: float = 0.3):
+        self.period_ms = float(period_ms)
+        self.max_gap_ms = float(max_gap_ms)
+        self._tol = self.period_ms * float(tolerance)
+        self._due = None
+        self._last = None
+
+    def push(self, ts_ms: float) -> tuple[int, bool]:
+        """
+        Returns (ticks, gap): ticks = engine updates for this frame,
+        gap = True when the grid restarted (first frame or a long gap).
+        """
+        ts = float(ts_ms)
+        if self._last is None or ts - self._last > self.max_gap_ms or ts < self._last - self.max_gap_ms:
+            self._last = ts
+            self._due = ts + self.period_ms
+            return 1, True
+        self._last = ts
+
+        n = 0
+        while ts > self._due - self._tol:
+            n += 1
+            self._due += self.period_ms
+        return n, False
+
+    def reset(self) -> None:
+        self._due = None
+        self._last = None
@@ -1,17 +1,43 @@
 import json
 import time
-import math
 from datetime import datetime
 
 from PySide6.QtWidgets import QMainWindow
 from PySide6.QtCore import Signal, Slot, QTimer
+from PySide6.QtGui import QShortcut, QKeySequence
 
 from ui_form import Ui_MainWindow
 
-from config import KOREA_TZ
-from mqtt_manager import MqttManager
-from predictor_engine import PredictorEngine
-from firebase_uploader import init_firestore, TelemetryUploadThread, upload_alert
+from config import (
+    KOREA_TZ,
+    METRICS_PUBLISH_SEC,
+    CONTROL_REFRESH_SEC,
+    PROFILE_DUMP_DIR,
+    PROFILE_CAPTURE_SEC,
+    MODEL_FRAME_MS,
+    TELEMETRY_BOOST_RATIO,
+    TELEMETRY_BOOST_SEC,
+)
+from mqtt_manager import MqttManager, SequenceTracker
+from firebase_uploader import TelemetryUploadThread
+from model_loader import ModelLoader
+from stage_profiler import StageProfiler
+from baseline_policy import BaselinePolicy
+from frame_resampler import FrameResampler
+from telemetry_plot import TelemetryStore, TelemetryPlotWindow
+from camera_view import CameraPreviewWindow
+
+
+# telemetry -> alert path, in order
+PROFILE_STAGES = (
+    "on_message",     # whole MQTT callback
+    "json_decode",
+    "scale_frame",
+    "predict",
+    "baseline",
+    "alert_upload",
+    "ui_log",
+)
 
 
 class MainWindow(QMainWindow):
@@ -36,6 +62,15 @@ class MainWindow(QMainWindow):
         self.sig_log_command.connect(self.update_command_ui)
         self.sig_log_sensing.connect(self.update_sensing_ui)
 
+        # --------------------------------------------------
+        # Latency instrumentation (always on)
+        # --------------------------------------------------
+        self.profiler = StageProfiler(PROFILE_STAGES, dump_dir=PROFILE_DUMP_DIR)
+        self._metrics_last_ts = 0.0
+        QShortcut(QKeySequence("Ctrl+Shift+P"), self).activated.connect(
+            lambda: self._on_profile_request("")
+        )
+
         # --------------------------------------------------
         # Control mode (GUI / Gesture)
         # --------------------------------------------------
@@ -43,24 +78,33 @@ class MainWindow(QMainWindow):
         self._apply_mode_ui()
 
         # --------------------------------------------------
-        # Firebase
+        # Telemetry plot (ring buffers filled from the MQTT thread)
         # --------------------------------------------------
-        self.db = init_firestore()
-        self.upload_thread = TelemetryUploadThread(self.db)
+        self.plot_store = TelemetryStore()
+        self.plot_window = None
+
+        # Gesture camera preview (created on first use; frames arrive on
+        # the MQTT thread only while it is shown)
+        self.camera_window = None
 
         # --------------------------------------------------
-        # Predictor engine
+        # Firebase + Predictor engine (loaded in background)
         # --------------------------------------------------
+        # torch / firebase_admin imports take seconds on the RPi5, so the
+        # window is shown first and both are attached when ready.
+        self.db = None
+        self.upload_thread = TelemetryUploadThread(None)
+
         self.engine = None
-        try:
-            self.engine = PredictorEngine()
-            self.sig_log_command.emit(
-                f"System: Predictor loaded on {self.engine.device}"
-            )
-        except Exception as e:
-            self.sig_log_command.emit(
-                f"Error: Predictor init failed - {e}"
-            )
+        self._engine_state = "loading"
+        self.sig_log_command.emit("System: Loading predictor...")
+
+        self._loader = ModelLoader(self)
+        self._loader.sig_db_ready.connect(self._on_db_ready)
+        self._loader.sig_engine_ready.connect(self._on_engine_ready)
+        self._loader.sig_engine_failed.connect(self._on_engine_failed)
+        self._loader.sig_timing.connect(self.update_command_ui)
+        self._loader.start()
 
         # --------------------------------------------------
         # MQTT manager
@@ -71,7 +115,15 @@ class MainWindow(QMainWindow):
             on_connected=self._on_mqtt_connected,
             on_telemetry=self._on_telemetry_text,
             on_status=self._on_status_text,
+            on_profile_request=self._on_profile_request,
+            profiler=self.profiler,
+            on_preview=self._on_preview_frame,
         )
+        self._tel_seq = SequenceTracker()
+
+        # Variable telemetry rate -> the model's 50 ms frame grid
+        self._resampler = FrameResampler(MODEL_FRAME_MS)
+        self._last_boost_req_ts = 0.0
 
         # --------------------------------------------------
         # Anomaly score output control (1 Hz)
@@ -81,39 +133,15 @@ class MainWindow(QMainWindow):
         self._last_printed_ts = 0.0
 
         # --------------------------------------------------
-        # US_BRAKE debounce and recent window
+        # US_BRAKE debounce
         # --------------------------------------------------
         self._last_us_brake_ts = 0.0
-        self._us_brake_recent_until = 0.0
-
-        # --------------------------------------------------
-        # Hold-off / freeze policies
-        # --------------------------------------------------
-        # (A) Disable baseline update for 1.5s after BRAKE
-        self.BASELINE_FREEZE_AFTER_BRAKE_SEC = 1.5
-        self._baseline_freeze_until = 0.0
-
-        # (B) Suppress alerts for 1.0s after BRAKE
-        self.ALERT_MUTE_AFTER_BRAKE_SEC = 1.0
-        self._alert_mute_until = 0.0
-
-        # (C) Disable idle baseline update for 0.7s after idle entry
-        self.IDLE_BASELINE_FREEZE_ON_ENTRY_SEC = 0.7
-        self._idle_baseline_freeze_until = 0.0
-
-        # Previous state for transition detection
-        self._prev_state = None
 
         # --------------------------------------------------
-        # Baseline parameters
+        # Per-state baseline, hold-offs and alert debounce
+        # (shared with the offline scorer, see baseline_policy.py)
         # --------------------------------------------------
-        self.BASELINE_BURNIN_N = 60
-        self.BASELINE_K = 4.0
-        self.BASELINE_SAFE_RATIO = 0.7
-        self.BASELINE_EWMA_ALPHA = 0.02
-
-        self._baseline = {}
-        self._last_alert_ts = {}
+        self.policy = BaselinePolicy(on_log=self.sig_log_command.emit)
 
         # Cached telemetry for state classification
         self._last_throttle = 0.0
@@ -131,6 +159,13 @@ class MainWindow(QMainWindow):
         self._ui_timer.timeout.connect(self._ui_tick)
         self._ui_timer.start(1000)
 
+        # --------------------------------------------------
+        # Control refresh (gateway dead-man lease)
+        # --------------------------------------------------
+        self._control_timer = QTimer(self)
+        self._control_timer.timeout.connect(self._refresh_control)
+        self._control_timer.start(int(CONTROL_REFRESH_SEC * 1000))
+
         self.sig_log_command.emit("System: Ready")
 
     # ==================================================
@@ -160,6 +195,37 @@ class MainWindow(QMainWindow):
         except Exception:
             pass
 
+    # ==================================================
+    # Background loader results
+    # ==================================================
+    @Slot(object)
+    def _on_db_ready(self, db):
+        self.db = db
+        self.upload_thread.attach(db)
+
+        # START pressed while Firebase was still initializing
+        started = False
+        try:
+            started = (self.ui.startBtn.text() == "STOP")
+        except Exception:
+            pass
+        if db and started and not self.upload_thread.isRunning():
+            self.upload_thread.running = True
+            self.upload_thread.start()
+            self.sig_log_command.emit("System: Firebase Upload Started")
+
+    @Slot(object)
+    def _on_engine_ready(self, engine):
+        engine.profiler = self.profiler
+        self.engine = engine
+        self._engine_state = "ready"
+        self.sig_log_command.emit(f"System: Predictor loaded on {engine.device}")
+
+    @Slot(str)
+    def _on_engine_failed(self, msg: str):
+        self._engine_state = "failed"
+        self.sig_log_command.emit(f"Error: Predictor init failed - {msg}")
+
     def _publish_current_mode_if_possible(self):
         try:
             self.mqtt.publish_mode(self.control_mode)
@@ -171,6 +237,7 @@ class MainWindow(QMainWindow):
     # ==================================================
     @Slot(str)
     def update_command_ui(self, msg: str):
+        t0 = time.perf_counter_ns()
         try:
             self.ui.commandTable.appendPlainText(msg)
             self.ui.commandTable.verticalScrollBar().setValue(
@@ -178,9 +245,11 @@ class MainWindow(QMainWindow):
             )
         except Exception:
             pass
+        self.profiler.record("ui_log", time.perf_counter_ns() - t0)
 
     @Slot(str)
     def update_sensing_ui(self, msg: str):
+        t0 = time.perf_counter_ns()
         try:
             sb = self.ui.sensingTable.verticalScrollBar()
             at_bottom = (sb.maximum() - sb.value() < 10)
@@ -189,30 +258,15 @@ class MainWindow(QMainWindow):
                 sb.setValue(sb.maximum())
         except Exception:
             pass
-
-    # ==================================================
-    # Baseline status formatting
-    # ==================================================
-    def _baseline_status_text(self) -> str:
-        states = ["idle", "fwd", "rev", "turn"]
-        parts = []
-        for st in states:
-            b = self._baseline.get(st)
-            if not b:
-                parts.append(f"{st}:0/{self.BASELINE_BURNIN_N}")
-                continue
-
-            n = int(b.get("n", 0))
-            if b.get("thr") is None:
-                parts.append(f"{st}:{n}/{self.BASELINE_BURNIN_N}")
-            else:
-                parts.append(f"{st}:READY")
-        return "Baseline[" + " | ".join(parts) + "]"
+        self.profiler.record("ui_log", time.perf_counter_ns() - t0)
 
     # ==================================================
     # Periodic UI tick
     # ==================================================
     def _ui_tick(self):
+        self._update_mqtt_status()
+        self._publish_metrics_if_due()
+
         if self._latest_anomaly_score is not None:
             now = time.time()
             if (now - self._last_printed_ts) >= 0.95:
@@ -232,98 +286,83 @@ class MainWindow(QMainWindow):
 
         now2 = time.time()
         if (now2 - self._baseline_last_ui_ts) >= self.BASELINE_UI_INTERVAL:
-            txt = self._baseline_status_text()
+            txt = self.policy.status_text()
             if txt != self._baseline_last_text:
                 self.sig_log_command.emit(txt)
                 self._baseline_last_text = txt
             self._baseline_last_ui_ts = now2
 
-    # ==================================================
-    # Scenario classification
-    # ==================================================
-    def _get_state(self, throttle: float, steer: float) -> str:
-        t = float(throttle)
-        s = float(steer)
-
-        if abs(t) < 5 and abs(s) < 10:
-            return "idle"
-        if abs(s) >= 50:
-            return "turn"
-        if t > 5:
-            return "fwd"
-        if t < -5:
-            return "rev"
-        return "idle"
-
-    # ==================================================
-    # Baseline burn-in (Welford)
-    # ==================================================
-    def _baseline_welford_push(self, state: str, x: float):
-        b = self._baseline.get(state)
-        if b is None:
-            b = {"n": 0, "mean": 0.0, "M2": 0.0, "mu": None, "sigma": None, "thr": None}
-            self._baseline[state] = b
-
-        b["n"] += 1
-        n = b["n"]
-        delta = x - b["mean"]
-        b["mean"] += delta / n
-        delta2 = x - b["mean"]
-        b["M2"] += delta * delta2
-
-        if b["n"] == self.BASELINE_BURNIN_N:
-            var = b["M2"] / max(1, (b["n"] - 1))
-            sigma = math.sqrt(max(var, 1e-12))
-            mu = b["mean"]
-            b["mu"] = mu
-            b["sigma"] = sigma
-            b["thr"] = mu + self.BASELINE_K * sigma
-
-            self.sig_log_command.emit(
-                f"Baseline READY[{state}] mu={mu:.6f} sigma={sigma:.6f} thr={b['thr']:.6f}"
+    def _update_mqtt_status(self):
+        if not self.mqtt.client:
+            try:
+                self.ui.statusbar.showMessage(f"model={self._engine_state}")
+            except Exception:
+                pass
+            return
+        m = self.mqtt.metrics()
+        state = "connected" if m["connected"] else "reconnecting"
+        try:
+            self.ui.statusbar.showMessage(
+                f"MQTT {state} | reconnects={m['reconnect_count']} "
+                f"| downtime={m['downtime_sec']:.1f}s | queue={m['queue_depth']} "
+                f"| tel_loss={self._tel_seq.loss_ratio() * 100:.1f}% "
+                f"| model={self._engine_state}"
             )
+        except Exception:
+            pass
 
     # ==================================================
-    # Baseline EWMA update (safe zone only)
+    # Latency metrics / on-demand profiling
     # ==================================================
-    def _baseline_ewma_update_if_safe(self, state: str, score: float):
-        b = self._baseline.get(state)
-        if not b or b["thr"] is None:
-            return
-
-        thr = float(b["thr"])
-        if thr <= 0:
-            return
-
-        if score >= thr * self.BASELINE_SAFE_RATIO:
+    def _publish_metrics_if_due(self):
+        now = time.time()
+        if (now - self._metrics_last_ts) < METRICS_PUBLISH_SEC:
             return
+        self._metrics_last_ts = now
+
+        self.mqtt.publish_metrics(
+            {
+                "ts_ms": int(now * 1000),
+                "stages": self.profiler.snapshot(),
+                "mqtt": self.mqtt.metrics(),
+                "tel_loss": self._tel_seq.loss_ratio(),
+                "upload": dict(self.upload_thread.stats),
+                "model": self._engine_state,
+            }
+        )
 
-        alpha = self.BASELINE_EWMA_ALPHA
-        mu = float(b["mu"])
-        sigma = float(b["sigma"])
-
-        mu_new = (1 - alpha) * mu + alpha * score
-        var = sigma * sigma
-        var_new = (1 - alpha) * var + alpha * ((score - mu_new) ** 2)
-        sigma_new = math.sqrt(max(var_new, 1e-12))
-
-        b["mu"] = mu_new
-        b["sigma"] = sigma_new
-        b["thr"] = mu_new + self.BASELINE_K * sigma_new
+    def _on_profile_request(self, payload_text: str):
+        """
+        Start a cProfile capture of the telemetry handler; the histogram
+        snapshot and .prof file are written to PROFILE_DUMP_DIR when it ends.
+        Called from the MQTT thread (profile topic) or the Ctrl+Shift+P shortcut.
+        """
+        try:
+            sec = float(payload_text) if payload_text.strip() else PROFILE_CAPTURE_SEC
+        except ValueError:
+            sec = PROFILE_CAPTURE_SEC
+        self.profiler.request_capture(sec)
+        self.sig_log_command.emit(
+            f"System: Profiling telemetry path for {sec:.0f}s -> {PROFILE_DUMP_DIR}"
+        )
 
     # ==================================================
-    # Alert emission (debounced)
+    # Alert emission
     # ==================================================
-    def _emit_alert(self, state: str, score: float, thr: float, telemetry=None):
-        now = time.time()
-        last = self._last_alert_ts.get(state, 0.0)
-        if (now - last) < 1.0:
-            return
-
+    def _emit_alert(self, state: str, score: float, thr: float, telemetry=None, attribution=None):
         tstamp = datetime.now(KOREA_TZ).strftime("%H:%M:%S")
         self.sig_log_sensing.emit(
             f"[{tstamp}] ANOMALY state={state} score={score:.6f} thr={thr:.6f}"
         )
+        if attribution:
+            axes = " ".join(
+                f"{k}={v:.3f}" for k, v in attribution["per_axis"].items()
+            )
+            self.sig_log_sensing.emit(
+                f"    top={attribution['top_axis']} "
+                f"peak={attribution['peak_axis']}@t+{attribution['peak_step']} "
+                f"({attribution['peak_err']:.3f}) | {axes}"
+            )
 
         try:
             alert_doc = {
@@ -331,14 +370,15 @@ class MainWindow(QMainWindow):
                 "state": state,
                 "score": float(score),
                 "threshold": float(thr),
+                "attribution": attribution,
                 "telemetry": dict(telemetry) if telemetry else None,
             }
-            upload_alert(self.db, alert_doc)
+            t0 = time.perf_counter_ns()
+            self.upload_thread.submit_alert(alert_doc)
+            self.profiler.record("alert_upload", time.perf_counter_ns() - t0)
         except Exception:
             pass
 
-        self._last_alert_ts[state] = now
-
     # ==================================================
     # Control commands
     # ==================================================
@@ -349,6 +389,14 @@ class MainWindow(QMainWindow):
             f"[{t}] {label} >> T:{self.cur_throttle}, S:{self.cur_steer}"
         )
 
+    def _refresh_control(self):
+        """
+        Keep the gateway's GUI lease alive; without it the gateway ramps
+        throttle down to 0 (GUI crash / MQTT link loss).
+        """
+        if self.control_mode == "GUI":
+            self.mqtt.refresh_control()
+
     def start(self):
         try:
             txt = self.ui.startBtn.text()
@@ -377,23 +425,20 @@ class MainWindow(QMainWindow):
 
             if self.engine:
                 self.engine.reset()
+            self._resampler.reset()
 
             self._latest_anomaly_score = None
             self._last_printed_score = None
             self._last_printed_ts = 0.0
 
-            self._baseline.clear()
-            self._last_alert_ts.clear()
-            self._us_brake_recent_until = 0.0
-
-            self._baseline_freeze_until = 0.0
-            self._alert_mute_until = 0.0
-            self._idle_baseline_freeze_until = 0.0
-            self._prev_state = None
+            self.policy.reset()
 
             self._baseline_last_ui_ts = 0.0
             self._baseline_last_text = ""
 
+            self.plot_store.clear()
+            self._tel_seq.reset()
+
             if self.upload_thread.isRunning():
                 self.upload_thread.stop()
                 self.upload_thread.wait()
@@ -423,21 +468,39 @@ class MainWindow(QMainWindow):
         self.cur_throttle = 0
         self.sendControlCommand("BRAKE(throttle=0)")
 
-        now = time.time()
-        self._baseline_freeze_until = max(
-            self._baseline_freeze_until,
-            now + self.BASELINE_FREEZE_AFTER_BRAKE_SEC
-        )
-        self._alert_mute_until = max(
-            self._alert_mute_until,
-            now + self.ALERT_MUTE_AFTER_BRAKE_SEC
-        )
+        self.policy.on_brake(time.time())
 
         self.sig_log_command.emit(
-            f"System: BRAKE holdoff baseline={self.BASELINE_FREEZE_AFTER_BRAKE_SEC:.1f}s, "
-            f"alert={self.ALERT_MUTE_AFTER_BRAKE_SEC:.1f}s"
+            f"System: BRAKE holdoff baseline={self.policy.BASELINE_FREEZE_AFTER_BRAKE_SEC:.1f}s, "
+            f"alert={self.policy.ALERT_MUTE_AFTER_BRAKE_SEC:.1f}s"
         )
 
+    def toggle_plot(self):
+        if self.plot_window is None:
+            self.plot_window = TelemetryPlotWindow(self.plot_store)
+
+        show = not self.plot_window.isVisible()
+        self.plot_window.setVisible(show)
+        try:
+            self.ui.plotBtn.setText(
+                "Hide Telemetry Plot" if show else "Show Telemetry Plot"
+            )
+        except Exception:
+            pass
+
+    def toggle_camera(self):
+        if self.camera_window is None:
+            self.camera_window = CameraPreviewWindow(self.mqtt.set_preview)
+
+        show = not self.camera_window.isVisible()
+        self.camera_window.setVisible(show)
+        try:
+            self.ui.cameraBtn.setText(
+                "Hide Camera Preview" if show else "Show Camera Preview"
+            )
+        except Exception:
+            pass
+
     def toggle_mode(self):
         self.control_mode = "Gesture" if self.control_mode == "GUI" else "GUI"
         self._apply_mode_ui()
@@ -450,19 +513,65 @@ class MainWindow(QMainWindow):
     def _on_mqtt_connected(self):
         self._publish_current_mode_if_possible()
 
+    def _on_preview_frame(self, payload: bytes):
+        window = self.camera_window
+        if window is not None:
+            window.push(payload)
+
     def _on_status_text(self, payload_text: str):
         """
-        Handle US_BRAKE events and apply baseline hold-off.
-        Also uploads US_BRAKE to Firestore alert collection.
+        Handle US_BRAKE / TTC_GUARD / edge ANOMALY events and apply baseline hold-off.
+        Also uploads them to Firestore alert collection.
         """
         text = payload_text.strip()
         status_blob = text
+        obj = None
         try:
             obj = json.loads(text)
             status_blob = f"{obj.get('event', '')} {text}"
         except Exception:
             pass
 
+        if obj and obj.get("event") == "TTC_GUARD":
+            # gateway throttle cut ahead of the MCU fail-safe: same hold-off
+            if obj.get("level") != "CLEAR":
+                self.policy.on_us_brake(time.time())
+            tstamp = datetime.now(KOREA_TZ).strftime("%H:%M:%S")
+            self.sig_log_sensing.emit(
+                f"[{tstamp}] TTC_GUARD {obj.get('level')} "
+                f"ttc={obj.get('ttc_ms')}ms dist={obj.get('dist_cm')}cm cap={obj.get('cap')}"
+            )
+            try:
+                self.upload_thread.submit_alert(
+                    {"type": "TTC_GUARD", "source": "GATEWAY", "raw": obj}
+                )
+            except Exception:
+                pass
+            return
+
+        if obj and obj.get("event") == "UART_LINK":
+            # gateway <-> MCU link; drive commands are dropped while DOWN
+            tstamp = datetime.now(KOREA_TZ).strftime("%H:%M:%S")
+            detail = obj.get("reason") if obj.get("state") == "DOWN" else f"after {obj.get('down_ms')}ms"
+            self.sig_log_sensing.emit(f"[{tstamp}] UART_LINK {obj.get('state')} {obj.get('port')} ({detail})")
+            return
+
+        if obj and obj.get("event") == "ANOMALY" and obj.get("source") == "EDGE":
+            # RPi4 edge scorer; also raised while this GUI is not scoring
+            tstamp = datetime.now(KOREA_TZ).strftime("%H:%M:%S")
+            self.sig_log_sensing.emit(
+                f"[{tstamp}] ANOMALY(EDGE) state={obj.get('state')} "
+                f"score={obj.get('score', 0.0):.6f} thr={obj.get('thr') or 0.0:.6f} "
+                f"edge={obj.get('edge_ms')}ms"
+            )
+            try:
+                self.upload_thread.submit_alert(
+                    {"type": "ANOMALY", "source": "EDGE", "raw": obj}
+                )
+            except Exception:
+                pass
+            return
+
         if "US_BRAKE" in status_blob:
             now = time.time()
 
@@ -479,73 +588,87 @@ class MainWindow(QMainWindow):
                         "source": "MCU",
                         "raw": status_blob,
                     }
-                    upload_alert(self.db, alert_doc)
+                    self.upload_thread.submit_alert(alert_doc)
                 except Exception:
                     pass
 
-            self._us_brake_recent_until = now + 2.0
+            self.policy.on_us_brake(now)
 
     def _on_telemetry_text(self, payload_text: str):
         try:
+            t0 = time.perf_counter_ns()
             data = json.loads(payload_text)
+            self.profiler.record("json_decode", time.perf_counter_ns() - t0)
+            self._tel_seq.update(data.get("seq"))
 
             self._last_throttle = float(data.get("throttle", 0.0))
             self._last_steer = float(data.get("steer", 0.0))
 
+            vtel = self.plot_store.get(self.plot_store.vehicle_id(data))
+            vtel.push_frame(time.monotonic(), data)
+
             if self.upload_thread.isRunning():
                 self.upload_thread.update_data(data)
 
             if not self.engine:
                 return
 
-            score = self.engine.update(data)
+            ticks, gap = self._resampler.push(data.get("ts_ms", time.time() * 1000))
+            if gap:
+                self.engine.reset()
+            score = None
+            for _ in range(ticks):
+                s = self.engine.update(data)
+                if s is not None:
+                    score = s
             if score is None:
                 return
 
-            score = float(score)
-            self._latest_anomaly_score = score
-
-            state = self._get_state(self._last_throttle, self._last_steer)
-            now = time.time()
-
-            if self._prev_state != "idle" and state == "idle":
-                self._idle_baseline_freeze_until = max(
-                    self._idle_baseline_freeze_until,
-                    now + self.IDLE_BASELINE_FREEZE_ON_ENTRY_SEC
-                )
-            self._prev_state = state
+            self._handle_score(float(score), data, vtel)
 
-            b = self._baseline.get(state)
+        except Exception as e:
+            self.sig_log_command.emit(f"Rx Error: {e}")
 
-            alert_allowed = (now >= self._alert_mute_until)
-            if b and b.get("thr") is not None:
-                thr = float(b["thr"])
-                if score > thr and alert_allowed:
-                    self._emit_alert(state, score, thr, data)
+    def _handle_score(self, score: float, data: dict, vtel):
+        """Baseline / alert for one anomaly score; asks the gateway for a
+        higher telemetry rate while the score approaches the threshold."""
+        self._latest_anomaly_score = score
+        self.upload_thread.update_score(score)
 
-            if now < self._us_brake_recent_until:
-                return
-            if now < self._baseline_freeze_until:
-                return
-            if state == "idle" and now < self._idle_baseline_freeze_until:
-                return
+        t0 = time.perf_counter_ns()
+        state, thr, alert = self.policy.on_score(
+            score, self._last_throttle, self._last_steer, time.time()
+        )
+        self.profiler.record("baseline", time.perf_counter_ns() - t0)
 
-            if (b is None) or (b.get("thr") is None):
-                self._baseline_welford_push(state, score)
-                return
+        vtel.push_score(time.monotonic(), score, thr)
 
-            if score <= float(b["thr"]):
-                self._baseline_ewma_update_if_safe(state, score)
+        if alert:
+            self._emit_alert(
+                state, score, thr, data, self.engine.last_attribution
+            )
 
-        except Exception as e:
-            self.sig_log_command.emit(f"Rx Error: {e}")
+        if thr is not None and score >= TELEMETRY_BOOST_RATIO * thr:
+            now = time.time()
+            if now - self._last_boost_req_ts >= 1.0:
+                self._last_boost_req_ts = now
+                self.mqtt.publish_telemetry_control(
+                    {"boost_sec": TELEMETRY_BOOST_SEC, "reason": "anomaly"}
+                )
 
     # ==================================================
     # Close event
     # ==================================================
     def closeEvent(self, event):
+        # releases the gateway preview lease while MQTT is still up
+        if self.camera_window is not None:
+            self.camera_window.close()
+
         self.mqtt.stop()
 
+        if self._loader.isRunning():
+            self._loader.wait()
+
         if self.upload_thread.isRunning():
             self.upload_thread.stop()
             self.upload_thread.wait()
@@ -553,4 +676,7 @@ class MainWindow(QMainWindow):
         if self.engine:
             self.engine.reset()
 
+        if self.plot_window is not None:
+            self.plot_window.close()
+
         event.accept()
@@ -0,0 +1,41 @@
+# model_loader.py
+import time
+
+from PySide6.QtCore import QThread, Signal
+
+
+class ModelLoader(QThread):
+    """
+    Loads the slow startup dependencies off the GUI thread:
+    Firestore (firebase_admin) and the predictor (torch + TorchScript).
+
+    Firestore is initialized first so uploads can start while torch is
+    still importing. Each result is delivered by its own signal.
+    """
+
+    sig_db_ready = Signal(object)        # Firestore client or None
+    sig_engine_ready = Signal(object)    # PredictorEngine
+    sig_engine_failed = Signal(str)
+    sig_timing = Signal(str)
+
+    def run(self):
+        # imported here: both modules are cheap, their dependencies are not
+        from firebase_uploader import init_firestore
+        from predictor_engine import PredictorEngine
+
+        t0 = time.perf_counter()
+        db = init_firestore()
+        t1 = time.perf_counter()
+        self.sig_db_ready.emit(db)
+
+        try:
+            engine = PredictorEngine()
+        except Exception as e:
+            self.sig_engine_failed.emit(str(e))
+            return
+        t2 = time.perf_counter()
+
+        self.sig_engine_ready.emit(engine)
+        self.sig_timing.emit(
+            f"System: startup load firebase={t1 - t0:.2f}s predictor={t2 - t1:.2f}s"
+        )
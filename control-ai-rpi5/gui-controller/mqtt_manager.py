@@ -1,4 +1,8 @@
 import json
+import time
+import threading
+from collections import OrderedDict
+
 import paho.mqtt.client as mqtt
 
 from config import (
@@ -7,14 +11,84 @@ from config import (
     TOPIC_PUB_MODE,
     TOPIC_SUB_TELEMETRY,
     TOPIC_SUB_STATUS,
+    TOPIC_PUB_METRICS,
+    TOPIC_SUB_PROFILE,
+    TOPIC_PUB_TEL_CTRL,
+    TOPIC_SUB_PREVIEW,
+    TOPIC_PUB_PREVIEW_CTRL,
+    MQTT_RECONNECT_MIN_DELAY,
+    MQTT_RECONNECT_MAX_DELAY,
+    MQTT_OFFLINE_QUEUE_MAX,
+    MQTT_PROFILES,
+    CONTROL_LEASE_SEC,
 )
 
 
+class SequenceTracker:
+    """
+    Loss / reorder accounting for QoS 0 streams that carry a "seq" field.
+    A large backwards jump is treated as a publisher restart.
+    """
+
+    RESET_GAP = 1000
+
+    def __init__(self):
+        self.last = None
+        self.received = 0
+        self.lost = 0
+        self.reordered = 0
+        self.resets = 0
+
+    def update(self, seq) -> None:
+        if seq is None:
+            return
+        seq = int(seq)
+        self.received += 1
+
+        if self.last is None:
+            self.last = seq
+            return
+
+        gap = seq - self.last
+        if gap == 1:
+            self.last = seq
+        elif gap > 1:
+            self.lost += gap - 1
+            self.last = seq
+        elif gap > -self.RESET_GAP:
+            # late duplicate / reordered frame
+            self.reordered += 1
+        else:
+            self.resets += 1
+            self.last = seq
+
+    def loss_ratio(self) -> float:
+        total = self.received + self.lost
+        return (self.lost / total) if total else 0.0
+
+    def reset(self):
+        self.__init__()
+
+
 class MqttManager:
     """
     MQTT wrapper independent from Qt.
+
+    - Connects asynchronously (never blocks the caller) and reconnects
+      with exponential backoff handled by the paho network thread.
+    - While disconnected, outbound messages go to a bounded latest-wins
+      queue (one slot per topic) that is flushed on reconnect.
+    - Subscriptions are restored on every (re)connect.
+    - The camera preview topic is subscribed only while a viewer asks for
+      it (set_preview), so the frames do not cross the network otherwise.
     """
 
+    SUBSCRIPTIONS = (
+        (TOPIC_SUB_TELEMETRY, MQTT_PROFILES["telemetry"]["qos"]),
+        (TOPIC_SUB_STATUS, MQTT_PROFILES["status"]["qos"]),
+        (TOPIC_SUB_PROFILE, MQTT_PROFILES["status"]["qos"]),
+    )
+
     def __init__(
         self,
         broker_ip: str,
@@ -23,6 +97,10 @@ class MqttManager:
         on_telemetry,
         on_status,
         on_disconnected=None,
+        queue_max=MQTT_OFFLINE_QUEUE_MAX,
+        on_profile_request=None,
+        profiler=None,
+        on_preview=None,
     ):
         if not broker_ip:
             raise ValueError("broker_ip must be provided")
@@ -35,17 +113,50 @@ class MqttManager:
         self.on_telemetry = on_telemetry
         self.on_status = on_status
         self.on_disconnected = on_disconnected
+        self.on_profile_request = on_profile_request
+        self.on_preview = on_preview
+        self._preview_on = False
+
+        # StageProfiler (optional): times every _on_message callback
+        self.profiler = profiler
 
         self.client = None
         self.connected = False
+        self._stopping = False
+
+        # Control message sequence (latest-value semantics on the gateway)
+        self._control_seq = 0
+        self._last_control = None
+        self._control_sent_at = None
+
+        # Offline outbound queue: topic -> (payload, qos, retain, expires_at)
+        self._queue = OrderedDict()
+        self._queue_max = int(queue_max)
+        self._queue_lock = threading.Lock()
+
+        # Connection-state metrics
+        self._connect_count = 0
+        self._queue_dropped = 0
+        self._queue_flushed = 0
+        self._down_since = None
+        self._downtime_total = 0.0
 
     def start(self):
         self.client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
         self.client.on_connect = self._on_connect
         self.client.on_message = self._on_message
         self.client.on_disconnect = self._on_disconnect
+        self.client.reconnect_delay_set(
+            min_delay=MQTT_RECONNECT_MIN_DELAY,
+            max_delay=MQTT_RECONNECT_MAX_DELAY,
+        )
+
+        self._stopping = False
+        self._down_since = time.monotonic()
 
-        self.client.connect(self.broker_ip, self.broker_port)
+        # connect_async + loop_start: DNS/TCP connect and retries run on
+        # the paho network thread, so a broker outage never freezes the UI.
+        self.client.connect_async(self.broker_ip, self.broker_port)
         self.client.loop_start()
 
         self.on_log(
@@ -56,37 +167,187 @@ class MqttManager:
         if not self.client:
             return
 
+        self._stopping = True
         try:
-            self.client.loop_stop()
             self.client.disconnect()
+            self.client.loop_stop()
         except Exception:
             pass
 
         self.connected = False
+        self.client = None
+        with self._queue_lock:
+            self._queue.clear()
         self.on_log("System: MQTT Disconnected")
 
+    # --------------------------------------------------
+    # Publish helpers
+    # --------------------------------------------------
+    def _publish(self, topic: str, payload, profile: dict) -> bool:
+        """
+        Publish now if connected, otherwise enqueue (latest wins per topic).
+        Returns True if the message was handed to the client.
+        """
+        qos = int(profile["qos"])
+        retain = bool(profile.get("retain", False))
+
+        if self.connected and self.client:
+            info = self.client.publish(topic, payload, qos=qos, retain=retain)
+            if info.rc == mqtt.MQTT_ERR_SUCCESS:
+                return True
+
+        ttl_ms = profile.get("ttl_ms")
+        expires_at = (time.monotonic() + ttl_ms / 1000.0) if ttl_ms else None
+        self._enqueue(topic, payload, qos, retain, expires_at)
+        return False
+
+    def _enqueue(self, topic: str, payload, qos: int, retain: bool, expires_at):
+        with self._queue_lock:
+            if topic in self._queue:
+                # latest value replaces the stale one
+                self._queue.pop(topic)
+                self._queue_dropped += 1
+            elif len(self._queue) >= self._queue_max:
+                self._queue.popitem(last=False)
+                self._queue_dropped += 1
+            self._queue[topic] = (payload, qos, retain, expires_at)
+
+    def _flush_queue(self, client):
+        with self._queue_lock:
+            items = list(self._queue.items())
+            self._queue.clear()
+
+        now = time.monotonic()
+        sent = 0
+        for topic, (payload, qos, retain, expires_at) in items:
+            if expires_at is not None and now > expires_at:
+                # stale control command; never replay it
+                self._queue_dropped += 1
+                continue
+            client.publish(topic, payload, qos=qos, retain=retain)
+            sent += 1
+
+        self._queue_flushed += sent
+        if sent:
+            self.on_log(f"System: Flushed {sent} queued message(s)")
+
     def publish_control(self, throttle: int, steer: int):
-        if not self.connected or not self.client:
-            self.on_log("Error: MQTT not connected")
+        if not self.client:
+            self.on_log("Error: MQTT not started")
             return
 
+        self._last_control = (int(throttle), int(steer))
+        self._control_sent_at = time.monotonic()
+        profile = MQTT_PROFILES["control"]
+        self._control_seq += 1
         payload = {
             "throttle": int(throttle),
             "steer": int(steer),
+            "seq": self._control_seq,
+            "ts_ms": int(time.time() * 1000),
+            "ttl_ms": int(profile["ttl_ms"]),
         }
-        self.client.publish(
-            TOPIC_PUB_CONTROL,
-            json.dumps(payload),
-            qos=1,
-        )
+        if not self._publish(TOPIC_PUB_CONTROL, json.dumps(payload), profile):
+            self.on_log("System: MQTT offline, command queued")
+
+    def refresh_control(self):
+        """
+        Re-send the last control command with a fresh ts_ms (gateway
+        dead-man lease). Only while connected: an offline refresh would be
+        stale by the time the queue is flushed.
+
+        If nothing was delivered for CONTROL_LEASE_SEC the gateway has
+        already ramped the car down; a non-zero throttle is then replaced
+        by 0 so a reconnect never resumes driving without a new command.
+        """
+        if not (self.client and self.connected and self._last_control):
+            return
+        now = time.monotonic()
+        throttle, steer = self._last_control
+        lapsed = self._control_sent_at is None or now - self._control_sent_at > CONTROL_LEASE_SEC
+        if throttle != 0 and lapsed:
+            throttle = 0
+            self._last_control = (0, steer)
+            self.on_log("System: Control lease lapsed, throttle reset to 0 until the next command")
+
+        profile = MQTT_PROFILES["control"]
+        self._control_seq += 1
+        payload = {
+            "throttle": throttle,
+            "steer": steer,
+            "seq": self._control_seq,
+            "ts_ms": int(time.time() * 1000),
+            "ttl_ms": int(profile["ttl_ms"]),
+        }
+        if self._publish(TOPIC_PUB_CONTROL, json.dumps(payload), profile):
+            self._control_sent_at = now
 
     def publish_mode(self, mode: str):
-        if not self.connected or not self.client:
-            self.on_log("Error: MQTT not connected (mode)")
+        if not self.client:
+            self.on_log("Error: MQTT not started (mode)")
+            return
+
+        if self._publish(TOPIC_PUB_MODE, mode, MQTT_PROFILES["mode"]):
+            self.on_log(f"System: Mode published => {mode}")
+        else:
+            self.on_log(f"System: MQTT offline, mode queued => {mode}")
+
+    def publish_metrics(self, payload: dict):
+        """
+        Publish a metrics document (QoS 0, retained; silently skipped
+        when MQTT is not started).
+        """
+        if not self.client:
+            return
+        self._publish(TOPIC_PUB_METRICS, json.dumps(payload), MQTT_PROFILES["metrics"])
+
+    def publish_telemetry_control(self, payload: dict):
+        """
+        Gateway telemetry rate request ({"boost_sec", "reason"} or
+        {"policy", "period_ms"}); silently skipped when MQTT is not started.
+        """
+        if not self.client:
+            return
+        self._publish(TOPIC_PUB_TEL_CTRL, json.dumps(payload), MQTT_PROFILES["tel_ctrl"])
+
+    def set_preview(self, on: bool):
+        """
+        Camera preview viewer lease: subscribe and ask the gateway to
+        encode (repeat while shown), or unsubscribe and release it.
+        """
+        if not self.client:
             return
+        changed = on != self._preview_on
+        self._preview_on = on
+        if changed and self.connected:
+            if on:
+                self.client.subscribe(TOPIC_SUB_PREVIEW, qos=MQTT_PROFILES["preview"]["qos"])
+            else:
+                self.client.unsubscribe(TOPIC_SUB_PREVIEW)
+        self._publish(TOPIC_PUB_PREVIEW_CTRL, json.dumps({"on": bool(on)}), MQTT_PROFILES["preview_ctrl"])
+
+    # --------------------------------------------------
+    # Metrics
+    # --------------------------------------------------
+    def metrics(self) -> dict:
+        """
+        Snapshot of connection-state metrics.
+        """
+        downtime = self._downtime_total
+        if self._down_since is not None:
+            downtime += time.monotonic() - self._down_since
 
-        self.client.publish(TOPIC_PUB_MODE, mode, qos=1)
-        self.on_log(f"System: Mode published => {mode}")
+        with self._queue_lock:
+            depth = len(self._queue)
+
+        return {
+            "connected": self.connected,
+            "reconnect_count": max(0, self._connect_count - 1),
+            "downtime_sec": downtime,
+            "queue_depth": depth,
+            "queue_dropped": self._queue_dropped,
+            "queue_flushed": self._queue_flushed,
+        }
 
     # --------------------------------------------------
     # MQTT callbacks
@@ -94,25 +355,63 @@ class MqttManager:
     def _on_connect(self, client, userdata, flags, rc, prop):
         if rc == 0:
             self.connected = True
-            self.on_log("System: MQTT Connected")
+            self._connect_count += 1
+            if self._down_since is not None:
+                self._downtime_total += time.monotonic() - self._down_since
+                self._down_since = None
 
-            client.subscribe(TOPIC_SUB_TELEMETRY, qos=1)
-            client.subscribe(TOPIC_SUB_STATUS, qos=1)
+            if self._connect_count > 1:
+                self.on_log(
+                    f"System: MQTT Reconnected (#{self._connect_count - 1})"
+                )
+            else:
+                self.on_log("System: MQTT Connected")
 
+            for topic, qos in self.SUBSCRIPTIONS:
+                client.subscribe(topic, qos=qos)
+            if self._preview_on:
+                client.subscribe(TOPIC_SUB_PREVIEW, qos=MQTT_PROFILES["preview"]["qos"])
+
+            self._flush_queue(client)
             self.on_connected()
+        else:
+            self.on_log(f"Error: MQTT connect refused ({rc})")
 
     def _on_disconnect(self, client, userdata, flags, rc, prop):
+        was_connected = self.connected
         self.connected = False
+        if self._down_since is None:
+            self._down_since = time.monotonic()
+
+        if was_connected and not self._stopping:
+            self.on_log(f"System: MQTT link lost ({rc}), reconnecting")
+
         if self.on_disconnected:
             self.on_disconnected()
 
     def _on_message(self, client, userdata, msg):
+        if msg.topic == TOPIC_SUB_PREVIEW:
+            # binary payload; kept out of the telemetry stage profile
+            if self.on_preview and self._preview_on:
+                self.on_preview(msg.payload)
+            return
+
+        t0 = time.perf_counter_ns()
         try:
             payload_text = msg.payload.decode(errors="ignore")
         except Exception:
             payload_text = ""
 
-        if msg.topic == TOPIC_SUB_STATUS:
+        if msg.topic == TOPIC_SUB_TELEMETRY:
+            if self.profiler:
+                self.profiler.profiled(self.on_telemetry, payload_text)
+            else:
+                self.on_telemetry(payload_text)
+        elif msg.topic == TOPIC_SUB_STATUS:
             self.on_status(payload_text)
-        elif msg.topic == TOPIC_SUB_TELEMETRY:
-            self.on_telemetry(payload_text)
+        elif msg.topic == TOPIC_SUB_PROFILE:
+            if self.on_profile_request:
+                self.on_profile_request(payload_text)
+
+        if self.profiler:
+            self.profiler.record("on_message", time.perf_counter_ns() - t0)
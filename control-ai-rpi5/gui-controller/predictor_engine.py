@@ -1,117 +1,291 @@
+import os
+import json
+import time
+import operator
 from collections import deque
 
 import numpy as np
-import joblib
-import torch
 
 from config import (
+    MODEL_BUNDLE_DIR,
+    MODEL_CONFIG_PATH,
     MODEL_TS_PATH,
     SCALER_PATH,
-    T_IN,
-    T_OUT,
     INFER_STRIDE,
-    THR_MIN,
-    THR_MAX,
-    STR_MIN,
-    STR_MAX,
 )
 
+# cmd_scale keys per command feature (training/export convention)
+CMD_SCALE_KEYS = {
+    "throttle": ("THR_MIN", "THR_MAX"),
+    "steer": ("STR_MIN", "STR_MAX"),
+}
+
+
+def resolve_bundle(path: str) -> str:
+    """
+    Accept a bundle directory or an export root written by
+    training/train.py (follows its `latest` file).
+    """
+    latest = os.path.join(path, "latest")
+    if os.path.isfile(latest):
+        with open(latest) as f:
+            return os.path.join(path, f.read().strip())
+    return path
+
+
+def load_scaler_stats(path: str):
+    """
+    Scaler stats (mean, scale) as float32 arrays.
+    Supports .npz / .json bundles and the legacy sklearn pickle.
+    """
+    if path.endswith(".npz"):
+        with np.load(path) as z:
+            mean, scale = z["mean"], z["scale"]
+    elif path.endswith(".json"):
+        with open(path) as f:
+            obj = json.load(f)
+        mean, scale = obj["mean"], obj["scale"]
+    else:
+        import joblib  # legacy: sklearn StandardScaler pickle
+
+        scaler = joblib.load(path)
+        mean, scale = scaler.mean_, scaler.scale_
+    return np.asarray(mean, dtype=np.float32), np.asarray(scale, dtype=np.float32)
+
+
+class FeatureMap:
+    """
+    Telemetry dict -> scaled model columns, compiled once from the
+    artifact config.
+
+    keys      : telemetry keys read per frame (X order, then Y-only keys)
+    mul / add : per-key affine scaling (standardize or cmd range [-1, 1]),
+                reciprocal std folded in at load time
+    n_x       : leading columns fed to the model
+    y_cols    : columns compared against the prediction (slice if contiguous)
+    """
+
+    def __init__(self, cfg: dict, mean: np.ndarray, scale: np.ndarray):
+        x_keys = list(cfg["feature_order_X"])
+        y_keys = list(cfg["feature_order_Y"])
+        cmd_scale = cfg.get("cmd_scale", {})
+        # scaler was fit on these features, in this order
+        scaler_keys = list(cfg.get("scaler_features", y_keys))
+
+        if len(mean) < len(scaler_keys) or len(scale) < len(scaler_keys):
+            raise ValueError(
+                f"scaler has {len(mean)} features, config expects {scaler_keys}"
+            )
+
+        self.keys = tuple(x_keys + [k for k in y_keys if k not in x_keys])
+        mul = np.empty(len(self.keys), dtype=np.float32)
+        add = np.empty(len(self.keys), dtype=np.float32)
+
+        for i, k in enumerate(self.keys):
+            if k in CMD_SCALE_KEYS and k not in scaler_keys:
+                lo_key, hi_key = CMD_SCALE_KEYS[k]
+                if lo_key not in cmd_scale or hi_key not in cmd_scale:
+                    raise ValueError(f"cmd_scale missing {lo_key}/{hi_key} for '{k}'")
+                lo, hi = float(cmd_scale[lo_key]), float(cmd_scale[hi_key])
+                # 2 * (v - lo) / (hi - lo) - 1
+                mul[i] = 2.0 / (hi - lo)
+                add[i] = -2.0 * lo / (hi - lo) - 1.0
+            elif k in scaler_keys:
+                j = scaler_keys.index(k)
+                std = float(scale[j]) + 1e-6
+                mul[i] = 1.0 / std
+                add[i] = -float(mean[j]) / std
+            else:
+                raise ValueError(f"no scaling rule for feature '{k}'")
+
+        self.mul = mul
+        self.add = add
+        self.n_keys = len(self.keys)
+        self.n_x = len(x_keys)
+        self.n_y = len(y_keys)
+        self.y_names = tuple(y_keys)
+
+        y_idx = [self.keys.index(k) for k in y_keys]
+        if y_idx == list(range(y_idx[0], y_idx[0] + len(y_idx))):
+            self.y_cols = slice(y_idx[0], y_idx[0] + len(y_idx))  # view, no copy
+        else:
+            self.y_cols = np.array(y_idx)
+
+        get = operator.itemgetter(*self.keys)
+        self._get = get if len(self.keys) > 1 else (lambda d: (get(d),))
+
+    def transform_into(self, data: dict, out: np.ndarray):
+        """
+        Scale one frame in place into out [n_keys] (float32, no allocation
+        besides the key tuple). Raises KeyError when a configured key is missing.
+        """
+        out[:] = self._get(data)
+        np.multiply(out, self.mul, out=out)
+        np.add(out, self.add, out=out)
+
+    def transform_columns(self, columns: dict) -> np.ndarray:
+        """
+        Batch variant for recorded sessions: {key: [N] array} -> [N, n_keys]
+        float32, same scaling as transform_into().
+        """
+        out = np.empty((len(columns[self.keys[0]]), self.n_keys), dtype=np.float32)
+        for i, k in enumerate(self.keys):
+            out[:, i] = columns[k]
+        np.multiply(out, self.mul, out=out)
+        np.add(out, self.add, out=out)
+        return out
+
 
 class PredictorEngine:
     def __init__(
         self,
         model_path=MODEL_TS_PATH,
         scaler_path=SCALER_PATH,
-        t_in=T_IN,
-        t_out=T_OUT,
+        config_path=MODEL_CONFIG_PATH,
         stride=INFER_STRIDE,
         device=None,
+        bundle_dir=MODEL_BUNDLE_DIR,
     ):
-        self.T_IN = int(t_in)
-        self.T_OUT = int(t_out)
+        # Versioned bundle (training/train.py) overrides all paths
+        if bundle_dir:
+            bundle_dir = resolve_bundle(bundle_dir)
+            config_path = os.path.join(bundle_dir, "config.json")
+
+        with open(config_path) as f:
+            self.cfg = json.load(f)
+
+        if bundle_dir:
+            files = self.cfg["files"]
+            model_path = os.path.join(bundle_dir, files["model"])
+            scaler_path = os.path.join(bundle_dir, files["scaler"])
+
+        self.T_IN = int(self.cfg["T_IN"])
+        self.T_OUT = int(self.cfg["T_OUT"])
         self.stride = int(stride)
 
+        # torch is imported here (not at module import) so the GUI can
+        # start before it is loaded; see ModelLoader in model_loader.py
+        import torch
+
+        self._torch = torch
         self.device = device or ("cuda" if torch.cuda.is_available() else "cpu")
 
         # Load TorchScript model
         self.model = torch.jit.load(model_path, map_location=self.device)
         self.model.eval()
 
-        # Load scaler (trained on sensor channels only)
-        scaler = joblib.load(scaler_path)
-        self.sensor_mean = scaler.mean_[:6].astype(np.float32)
-        self.sensor_std = scaler.scale_[:6].astype(np.float32)
+        # Feature extraction compiled from the artifact config
+        mean, scale = load_scaler_stats(scaler_path)
+        self.features = FeatureMap(self.cfg, mean, scale)
 
-        # Input buffer: scaled [6 sensors + 2 commands]
-        self.x_buf = deque(maxlen=self.T_IN)
+        self._init_buffers()
+
+        # Optional StageProfiler ("scale_frame" / "predict" stages)
+        self.profiler = None
+
+        # Output shape validation
+        n_x, n_y = self.features.n_x, self.features.n_y
+        with torch.no_grad():
+            try:
+                y = self.model(torch.zeros(1, self.T_IN, n_x, device=self.device))
+            except RuntimeError as e:
+                raise RuntimeError(
+                    f"Predictor rejects input [1, {self.T_IN}, {n_x}] from config: {e}"
+                ) from e
+        if list(y.shape) != [1, self.T_OUT, n_y]:
+            raise RuntimeError(
+                f"Predictor output shape mismatch: got {list(y.shape)}, "
+                f"config expects {[1, self.T_OUT, n_y]}"
+            )
+
+    def _init_buffers(self):
+        # Input ring: scaled frames, each written at row p and mirrored at
+        # p + T_IN, so the last T_IN frames are always the contiguous slice
+        # ring[p + 1 : p + 1 + T_IN] (no np.stack per inference)
+        self._ring = np.zeros((2 * self.T_IN, self.features.n_keys), dtype=np.float32)
+        self._pos = 0
+        self._filled = 0
 
         # Pending prediction queue
         # Each item waits until T_OUT actual frames are collected
         self.pending = deque()
 
         self.step = 0
+        self.last_attribution = None
 
-        # Output shape validation
-        with torch.no_grad():
-            y = self.model(torch.zeros(1, self.T_IN, 8))
-        if list(y.shape) != [1, self.T_OUT, 6]:
-            raise RuntimeError(
-                f"Predictor output shape mismatch: got {list(y.shape)}"
-            )
+    def _scale_frame(self, data: dict):
+        """
+        Scale one telemetry frame directly into the next ring row.
+        The row only becomes part of the input window after _push_frame().
+        Returns:
+            row : scaled frame [n_keys] (view into the ring)
+        """
+        row = self._ring[self._pos]
+        self.features.transform_into(data, row)
+        return row
 
-    @staticmethod
-    def _scale_cmd(v, lo, hi):
+    def _push_frame(self):
         """
-        Linearly scale a command value to [-1, 1].
+        Commit the row written by _scale_frame() to the input window.
         """
-        return 2.0 * (v - lo) / (hi - lo) - 1.0
+        p = self._pos
+        self._ring[p + self.T_IN] = self._ring[p]
+        self._pos = (p + 1) % self.T_IN
+        if self._filled < self.T_IN:
+            self._filled += 1
 
-    def _scale_frame(self, data: dict):
+    def _window(self) -> np.ndarray:
         """
-        Scale one telemetry frame.
-        Returns:
-            x   : scaled input vector [8]
-            sensor_s : scaled sensor vector [6]
-        """
-        sensor = np.array(
-            [
-                data["ax"],
-                data["ay"],
-                data["az"],
-                data["gx"],
-                data["gy"],
-                data["gz"],
-            ],
-            dtype=np.float32,
-        )
-
-        sensor_s = (sensor - self.sensor_mean) / (self.sensor_std + 1e-6)
-
-        thr_s = self._scale_cmd(
-            float(data["throttle"]),
-            THR_MIN,
-            THR_MAX,
-        )
-        str_s = self._scale_cmd(
-            float(data["steer"]),
-            STR_MIN,
-            STR_MAX,
-        )
-
-        x = np.array([*sensor_s, thr_s, str_s], dtype=np.float32)
-        return x, sensor_s
-
-    @torch.no_grad()
+        Last T_IN committed frames, oldest first: [T_IN, n_x] view.
+        """
+        p = self._pos
+        return self._ring[p:p + self.T_IN, :self.features.n_x]
+
     def _predict(self, x_seq: np.ndarray) -> np.ndarray:
         """
         Run model inference.
-        Input shape : [T_IN, 8]
-        Output shape: [T_OUT, 6]
+        Input shape : [T_IN, n_x]
+        Output shape: [T_OUT, n_y]
         """
-        x = torch.from_numpy(x_seq[None]).to(self.device)
-        y = self.model(x)
+        torch = self._torch
+        with torch.no_grad():
+            x = torch.from_numpy(x_seq[None]).to(self.device)
+            y = self.model(x)
         return y.squeeze(0).cpu().numpy()
 
+    def _predict_batch(self, x: np.ndarray) -> np.ndarray:
+        """
+        Batched inference.
+        Input shape : [B, T_IN, n_x]
+        Output shape: [B, T_OUT, n_y]
+        """
+        torch = self._torch
+        with torch.no_grad():
+            y = self.model(torch.from_numpy(x).to(self.device))
+        return y.cpu().numpy()
+
+    def _score(self, pred: np.ndarray, act: np.ndarray) -> float:
+        """
+        Window score plus its breakdown from one squared-error pass.
+        The breakdown is left in self.last_attribution.
+        """
+        se = (pred - act) ** 2                  # [T_OUT, n_y]
+        per_axis = se.mean(axis=0)              # [n_y]
+        per_step = se.mean(axis=1)              # [T_OUT]
+        peak = int(np.argmax(se))
+        peak_step, peak_axis = divmod(peak, se.shape[1])
+
+        names = self.features.y_names
+        self.last_attribution = {
+            "per_axis": {names[j]: float(per_axis[j]) for j in range(len(names))},
+            "per_step": [float(v) for v in per_step],
+            "top_axis": names[int(np.argmax(per_axis))],
+            "peak_step": peak_step,
+            "peak_axis": names[peak_axis],
+            "peak_err": float(se[peak_step, peak_axis]),
+        }
+        return float(per_step.mean())
+
     def update(self, data: dict):
         """
         Process one telemetry frame.
@@ -119,39 +293,126 @@ class PredictorEngine:
         Returns:
             anomaly_score (float) when future T_OUT frames are fully observed.
             None if prediction is not yet complete.
+        When a score is returned, self.last_attribution holds its per-axis /
+        per-step error breakdown (see _score).
         """
-        x_s, sensor_s = self._scale_frame(data)
+        prof = self.profiler
+        t0 = time.perf_counter_ns()
+        row = self._scale_frame(data)
+        if prof:
+            prof.record("scale_frame", time.perf_counter_ns() - t0)
 
         # Complete pending prediction by collecting actual future frames
         if self.pending:
-            self.pending[0]["actual"].append(sensor_s)
-            if len(self.pending[0]["actual"]) == self.T_OUT:
-                pred = self.pending[0]["pred"]
-                act = np.stack(self.pending[0]["actual"])
-                score = float(np.mean((pred - act) ** 2))
+            head = self.pending[0]
+            head["actual"][head["n"]] = row[self.features.y_cols]
+            head["n"] += 1
+            if head["n"] == self.T_OUT:
+                score = self._score(head["pred"], head["actual"])
                 self.pending.popleft()
                 return score
 
         # Push scaled input frame
-        self.x_buf.append(x_s)
+        self._push_frame()
         self.step += 1
 
         # Schedule new prediction every stride
-        if len(self.x_buf) == self.T_IN and (self.step % self.stride == 0):
-            y_pred = self._predict(np.stack(self.x_buf))
+        if self._filled == self.T_IN and (self.step % self.stride == 0):
+            t0 = time.perf_counter_ns()
+            y_pred = self._predict(self._window())
+            if prof:
+                prof.record("predict", time.perf_counter_ns() - t0)
             self.pending.append(
                 {
                     "pred": y_pred,
-                    "actual": [],
+                    "actual": np.empty((self.T_OUT, self.features.n_y), dtype=np.float32),
+                    "n": 0,
                 }
             )
 
         return None
 
+    # --------------------------------------------------
+    # Offline (recorded session) scoring
+    # --------------------------------------------------
+    def schedule(self, n_frames: int):
+        """
+        Replay update()'s bookkeeping over n_frames frames without
+        inference: which frames form each prediction's input window and
+        which frames it is scored against.
+
+        Returns:
+            win_idx : [M, T_IN]  frame indices of each input window
+            act_idx : [M, T_OUT] frame indices of the actual future frames;
+                      act_idx[:, -1] is the frame at which update() returns
+                      the score
+        Predictions that are still pending at the end are dropped.
+        """
+        t_in, t_out = self.T_IN, self.T_OUT
+        pushed = np.empty(n_frames, dtype=np.int64)
+        n_pushed = 0
+        step = 0
+        pending = deque()
+        ends, acts = [], []
+
+        for i in range(n_frames):
+            if pending:
+                head = pending[0]
+                head[1].append(i)
+                if len(head[1]) == t_out:
+                    ends.append(head[0])
+                    acts.append(head[1])
+                    pending.popleft()
+                    continue
+
+            pushed[n_pushed] = i
+            n_pushed += 1
+            step += 1
+
+            if n_pushed >= t_in and (step % self.stride == 0):
+                pending.append((n_pushed, []))
+
+        if not ends:
+            empty = np.empty((0, t_in), dtype=np.int64)
+            return empty, np.empty((0, t_out), dtype=np.int64)
+
+        win_idx = pushed[np.asarray(ends)[:, None] - t_in + np.arange(t_in)]
+        return win_idx, np.asarray(acts, dtype=np.int64)
+
+    def score_frames(self, x_scaled: np.ndarray, batch_size: int = 2048):
+        """
+        Score a whole recorded session at once: [N, n_keys] scaled frames
+        (FeatureMap.transform_columns) -> the scores update() would have
+        returned frame by frame.
+
+        Returns:
+            emit_idx : [M] frame index at which each score is produced
+            scores   : [M] window MSE
+            per_axis : [M, n_y] per-axis error (see _score)
+        """
+        win_idx, act_idx = self.schedule(len(x_scaled))
+        m = len(win_idx)
+        n_x, y_cols = self.features.n_x, self.features.y_cols
+
+        scores = np.empty(m, dtype=np.float32)
+        per_axis = np.empty((m, self.features.n_y), dtype=np.float32)
+        for a in range(0, m, batch_size):
+            b = min(m, a + batch_size)
+            x = np.ascontiguousarray(x_scaled[win_idx[a:b], :n_x])
+            pred = self._predict_batch(x)
+            act = x_scaled[act_idx[a:b]][:, :, y_cols]
+            se = (pred - act) ** 2              # [B, T_OUT, n_y]
+            per_axis[a:b] = se.mean(axis=1)
+            scores[a:b] = se.mean(axis=(1, 2))
+
+        return act_idx[:, -1], scores, per_axis
+
     def reset(self):
         """
         Reset internal buffers and counters.
         """
-        self.x_buf.clear()
+        self._pos = 0
+        self._filled = 0
         self.pending.clear()
         self.step = 0
+        self.last_attribution = None
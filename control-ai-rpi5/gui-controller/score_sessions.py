@@ -0,0 +1,285 @@
+# score_sessions.py
+"""
+Offline batch scorer for recorded sessions + threshold-tuning report.
+
+Replays recorded telemetry through the same PredictorEngine windowing and
+the same BaselinePolicy as the GUI, but vectorized: every prediction of a
+session is run as large [B, T_IN, n_x] batches, and sessions are spread
+over a process pool (one engine per worker, loaded once).
+
+Inputs (any mix):
+  *.csv      columns ts_ms, ax..gz, dist_cm, throttle, steer (header row)
+  directory  session written by dataset-collect/collect.py (chunk-*.npz)
+
+Outputs (--out):
+  <session>.scores.csv   every score: ts_ms, state, score, thr, alert, top_axis
+  alerts.csv             alert timeline over all sessions (current policy)
+  sweep.csv              alerts per hour for every BASELINE_K x
+                         BASELINE_SAFE_RATIO x BASELINE_EWMA_ALPHA combination
+
+Offline approximations:
+  - `now` is the frame timestamp (ts_ms / 1000) instead of time.time()
+  - BRAKE hold-off is triggered where the recorded throttle drops from
+    non-zero to 0 (the button itself is not recorded)
+  - US_BRAKE events are not in the telemetry, so that hold-off never fires
+
+    python score_sessions.py --out reports data/*.csv data/fwd_straight
+    python score_sessions.py --k 3 4 5 --safe 0.6 0.7 0.8 --alpha 0.01 0.02 0.05 ...
+"""
+import os
+import csv
+import glob
+import time
+import argparse
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from config import MODEL_BUNDLE_DIR, INFER_STRIDE
+from baseline_policy import BaselinePolicy, STATES
+from predictor_engine import PredictorEngine
+
+CMD_COLS = ("throttle", "steer")
+
+_engine = None
+
+
+# ============================================================
+# Session loading
+# ============================================================
+def load_session(path: str) -> dict:
+    """
+    Recorded session -> {column: [N] array}, sorted by ts_ms.
+    """
+    if os.path.isdir(path):
+        names = sorted(
+            glob.glob(os.path.join(path, "chunk-*.npz")) + glob.glob(os.path.join(path, "chunk-*.parquet"))
+        )
+        if not names:
+            raise ValueError(f"{path}: no chunk-*.npz / chunk-*.parquet files")
+        parts = {}
+        for name in names:
+            if name.endswith(".parquet"):
+                # collect.py --format parquet
+                import pyarrow.parquet as pq
+
+                t = pq.read_table(name)
+                for c in t.column_names:
+                    parts.setdefault(c, []).append(t.column(c).to_numpy())
+            else:
+                with np.load(name) as z:
+                    for c in z.files:
+                        parts.setdefault(c, []).append(z[c])
+        cols = {c: np.concatenate(v) for c, v in parts.items()}
+    else:
+        with open(path, newline="") as f:
+            header = next(csv.reader(f))
+        data = np.loadtxt(path, delimiter=",", skiprows=1, ndmin=2)
+        cols = {c.strip(): data[:, i] for i, c in enumerate(header)}
+
+    if "ts_ms" not in cols:
+        raise ValueError(f"{path}: missing ts_ms column")
+    order = np.argsort(cols["ts_ms"], kind="stable")
+    return {c: v[order] for c, v in cols.items()}
+
+
+def session_name(path: str) -> str:
+    return os.path.splitext(os.path.basename(os.path.normpath(path)))[0]
+
+
+# ============================================================
+# Worker side: batched scoring
+# ============================================================
+def _init_worker(bundle_dir, stride, threads):
+    global _engine
+    _engine = PredictorEngine(stride=stride, device="cpu", bundle_dir=bundle_dir)
+    _engine._torch.set_num_threads(threads)
+
+
+def score_session(path: str, max_gap_ms: float, batch_size: int) -> dict:
+    """
+    Score one session. Gaps > max_gap_ms split it into segments that are
+    scored independently (the live engine would not see such a gap).
+    """
+    eng = _engine
+    cols = load_session(path)
+    missing = [k for k in eng.features.keys + CMD_COLS if k not in cols]
+    if missing:
+        raise ValueError(f"{path}: missing columns {missing}")
+
+    ts = cols["ts_ms"].astype(np.float64)
+    x = eng.features.transform_columns(cols)
+
+    cuts = np.flatnonzero(np.diff(ts) > max_gap_ms) + 1
+    bounds = np.concatenate([[0], cuts, [len(ts)]])
+
+    emit, scores, top = [], [], []
+    duration = 0.0
+    for a, b in zip(bounds[:-1], bounds[1:]):
+        duration += (ts[b - 1] - ts[a]) / 1000.0
+        idx, s, per_axis = eng.score_frames(x[a:b], batch_size)
+        emit.append(idx + a)
+        scores.append(s)
+        top.append(np.argmax(per_axis, axis=1) if len(per_axis) else np.empty(0, dtype=np.int64))
+
+    emit = np.concatenate(emit)
+    thr_cmd = cols["throttle"].astype(np.float64)
+    brake = np.flatnonzero((thr_cmd[1:] == 0) & (thr_cmd[:-1] != 0)) + 1
+
+    return {
+        "name": session_name(path),
+        "frames": len(ts),
+        "duration_s": duration,
+        "ts": ts[emit],
+        "throttle": thr_cmd[emit],
+        "steer": cols["steer"].astype(np.float64)[emit],
+        "score": np.concatenate(scores),
+        "top_axis": np.concatenate(top),
+        "brake_ts": ts[brake],
+        "y_names": eng.features.y_names,
+    }
+
+
+# ============================================================
+# Policy replay
+# ============================================================
+def replay(sess: dict, policy: BaselinePolicy):
+    """
+    Feed one scored session through the policy in time order.
+    Returns (states, thrs, alerts) aligned with sess["score"].
+    """
+    ts, brake_ts = sess["ts"] / 1000.0, sess["brake_ts"] / 1000.0
+    thr_cmd, steer, score = sess["throttle"], sess["steer"], sess["score"]
+
+    states, thrs = [], []
+    alerts = np.zeros(len(score), dtype=bool)
+    j = 0
+    for i in range(len(score)):
+        now = ts[i]
+        while j < len(brake_ts) and brake_ts[j] <= now:
+            policy.on_brake(brake_ts[j])
+            j += 1
+        state, thr, alert = policy.on_score(float(score[i]), thr_cmd[i], steer[i], now)
+        states.append(state)
+        thrs.append(thr)
+        alerts[i] = alert
+    return states, thrs, alerts
+
+
+def sweep_point(sessions, k, safe_ratio, alpha) -> dict:
+    """
+    Alert counts for one parameter combination; the policy restarts per
+    session, like START/STOP in the GUI.
+    """
+    per_state = dict.fromkeys(STATES, 0)
+    for sess in sessions:
+        states, _, alerts = replay(
+            sess, BaselinePolicy(k=k, safe_ratio=safe_ratio, ewma_alpha=alpha)
+        )
+        for i in np.flatnonzero(alerts):
+            per_state[states[i]] += 1
+
+    hours = sum(s["duration_s"] for s in sessions) / 3600.0
+    total = sum(per_state.values())
+    return {
+        "k": k,
+        "safe_ratio": safe_ratio,
+        "ewma_alpha": alpha,
+        "alerts": total,
+        "alerts_per_hour": round(float(total / hours), 2) if hours > 0 else 0.0,
+        **{f"alerts_{st}": n for st, n in per_state.items()},
+    }
+
+
+# ============================================================
+# Reports
+# ============================================================
+def write_session_report(out_dir: str, sess: dict):
+    y_names = sess["y_names"]
+    states, thrs, alerts = replay(sess, BaselinePolicy())
+
+    with open(os.path.join(out_dir, f"{sess['name']}.scores.csv"), "w", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["ts_ms", "state", "score", "thr", "alert", "top_axis"])
+        for i in range(len(sess["score"])):
+            thr = thrs[i]
+            w.writerow([
+                int(sess["ts"][i]),
+                states[i],
+                f"{sess['score'][i]:.6f}",
+                "" if thr is None else f"{thr:.6f}",
+                int(alerts[i]),
+                y_names[sess["top_axis"][i]],
+            ])
+
+    return [
+        (sess["name"], int(sess["ts"][i]), states[i], float(sess["score"][i]),
+         thrs[i], y_names[sess["top_axis"][i]])
+        for i in np.flatnonzero(alerts)
+    ]
+
+
+def main():
+    p = argparse.ArgumentParser(description="Batch-score recorded sessions and sweep alert thresholds")
+    p.add_argument("inputs", nargs="+", help="CSV files or collect.py session directories")
+    p.add_argument("--out", default="./score_report")
+    p.add_argument("--bundle", default=MODEL_BUNDLE_DIR, help="model bundle (default: config.py paths)")
+    p.add_argument("--stride", type=int, default=INFER_STRIDE)
+    p.add_argument("--batch", type=int, default=2048, help="windows per inference batch")
+    p.add_argument("--max-gap-ms", type=float, default=1000.0)
+    p.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    p.add_argument("--threads", type=int, default=1, help="torch threads per worker")
+    p.add_argument("--k", type=float, nargs="+", default=[3.0, 3.5, 4.0, 4.5, 5.0])
+    p.add_argument("--safe", type=float, nargs="+", default=[0.6, 0.7, 0.8])
+    p.add_argument("--alpha", type=float, nargs="+", default=[0.01, 0.02, 0.05])
+    args = p.parse_args()
+
+    os.makedirs(args.out, exist_ok=True)
+    t0 = time.perf_counter()
+
+    with ProcessPoolExecutor(
+        max_workers=args.workers,
+        initializer=_init_worker,
+        initargs=(args.bundle, args.stride, args.threads),
+    ) as pool:
+        futs = [pool.submit(score_session, path, args.max_gap_ms, args.batch) for path in args.inputs]
+        sessions = [f.result() for f in futs]
+        t_score = time.perf_counter() - t0
+
+        grid = list(itertools.product(args.k, args.safe, args.alpha))
+        rows = list(pool.map(sweep_point, itertools.repeat(sessions, len(grid)), *zip(*grid)))
+
+    alerts = []
+    for sess in sessions:
+        alerts += write_session_report(args.out, sess)
+
+    with open(os.path.join(args.out, "alerts.csv"), "w", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["session", "ts_ms", "state", "score", "thr", "top_axis"])
+        for name, ts, st, score, thr, top in alerts:
+            w.writerow([name, ts, st, f"{score:.6f}", f"{thr:.6f}", top])
+
+    with open(os.path.join(args.out, "sweep.csv"), "w", newline="") as f:
+        w = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+        w.writeheader()
+        w.writerows(rows)
+
+    elapsed = time.perf_counter() - t0
+    hours = sum(s["duration_s"] for s in sessions) / 3600.0
+    n_frames = sum(s["frames"] for s in sessions)
+    n_scores = sum(len(s["score"]) for s in sessions)
+
+    print(f"sessions={len(sessions)} frames={n_frames} scores={n_scores} recorded={hours:.2f} h")
+    print(f"scoring {t_score:.2f} s, total {elapsed:.2f} s ({hours * 3600.0 / max(elapsed, 1e-9):.0f}x realtime)")
+    print(f"alerts (K={BaselinePolicy().BASELINE_K}, current policy): {len(alerts)} -> {args.out}/alerts.csv")
+    print("\n  K     safe  alpha   alerts/h  " + "  ".join(f"{st:>5s}" for st in STATES))
+    for r in sorted(rows, key=lambda r: (r["k"], r["safe_ratio"], r["ewma_alpha"])):
+        print(
+            f"  {r['k']:<5.2f} {r['safe_ratio']:<5.2f} {r['ewma_alpha']:<6.3f} {r['alerts_per_hour']:9.2f}  "
+            + "  ".join(f"{r['alerts_' + st]:5d}" for st in STATES)
+        )
+
+
+if __name__ == "__main__":
+    main()
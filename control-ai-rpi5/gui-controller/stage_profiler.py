@@ -0,0 +1,167 @@
+# stage_profiler.py
+"""
+Always-on per-stage latency histograms for the telemetry -> alert path.
+
+record() is a bit_length() bucket increment in a preallocated list
+(power-of-two ns buckets, 1 ns .. ~68 s), so a frame with every stage
+instrumented costs a few microseconds (~0.01% of the 50 ms budget;
+`python stage_profiler.py` measures it).
+
+Counters are updated without a lock from the MQTT and Qt threads; under
+the GIL a lost increment is possible but rare, which is acceptable for
+latency statistics.
+
+On-demand capture: request_capture(sec) makes profiled() run the wrapped
+handler under cProfile until the deadline, then writes a .prof file and
+a JSON histogram snapshot to the dump directory.
+"""
+import os
+import json
+import time
+import cProfile
+import threading
+
+import numpy as np
+
+N_BUCKETS = 37  # bucket b holds [2^(b-1), 2^b) ns; last bucket is open-ended
+
+
+class StageProfiler:
+    def __init__(self, stages, dump_dir="./profiles"):
+        self.stages = tuple(stages)
+        self.dump_dir = dump_dir
+        self._hist = {s: [0] * N_BUCKETS for s in self.stages}
+        self._sum = dict.fromkeys(self.stages, 0)
+        self._max = dict.fromkeys(self.stages, 0)
+        self._t_start = time.time()
+
+        self._capture_until = 0.0
+        self._capture = None
+        self._capture_lock = threading.Lock()
+
+    # --------------------------------------------------
+    # Hot path
+    # --------------------------------------------------
+    def record(self, stage: str, dt_ns: int):
+        b = dt_ns.bit_length()
+        self._hist[stage][b if b < N_BUCKETS else N_BUCKETS - 1] += 1
+        self._sum[stage] += dt_ns
+        if dt_ns > self._max[stage]:
+            self._max[stage] = dt_ns
+
+    def profiled(self, fn, *args):
+        """
+        Call fn(*args); under cProfile while a capture is requested.
+        """
+        if not self._capture_until:
+            return fn(*args)
+
+        with self._capture_lock:
+            prof = self._capture
+            if prof is None:
+                return fn(*args)
+            prof.enable()
+        try:
+            return fn(*args)
+        finally:
+            prof.disable()
+            if time.monotonic() >= self._capture_until:
+                self._finish_capture()
+
+    # --------------------------------------------------
+    # Snapshot / export
+    # --------------------------------------------------
+    def snapshot(self) -> dict:
+        """
+        Per stage: count, mean / p50 / p95 / p99 / max in microseconds.
+        Percentiles are bucket upper bounds (within 2x, capped at max).
+        """
+        upper_us = (2.0 ** np.arange(N_BUCKETS)) / 1000.0
+        out = {}
+        for s in self.stages:
+            h = np.asarray(self._hist[s], dtype=np.int64)
+            n = int(h.sum())
+            if n == 0:
+                out[s] = {"n": 0}
+                continue
+            c = np.cumsum(h)
+            mx = round(self._max[s] / 1000.0, 2)
+            p50, p95, p99 = (
+                min(mx, float(upper_us[np.searchsorted(c, q * n)]))
+                for q in (0.5, 0.95, 0.99)
+            )
+            out[s] = {
+                "n": n,
+                "mean_us": round(self._sum[s] / n / 1000.0, 2),
+                "p50_us": p50,
+                "p95_us": p95,
+                "p99_us": p99,
+                "max_us": mx,
+            }
+        return out
+
+    def raw(self) -> dict:
+        return {
+            "since": self._t_start,
+            "bucket": "b -> [2^(b-1), 2^b) ns",
+            "hist": {s: list(self._hist[s]) for s in self.stages},
+            "sum_ns": dict(self._sum),
+            "max_ns": dict(self._max),
+        }
+
+    def reset(self):
+        for s in self.stages:
+            self._hist[s] = [0] * N_BUCKETS
+            self._sum[s] = 0
+            self._max[s] = 0
+        self._t_start = time.time()
+
+    # --------------------------------------------------
+    # On-demand dump
+    # --------------------------------------------------
+    def request_capture(self, seconds: float):
+        with self._capture_lock:
+            if self._capture is None:
+                self._capture = cProfile.Profile()
+            self._capture_until = time.monotonic() + max(0.1, float(seconds))
+
+    def capturing(self) -> bool:
+        return self._capture is not None
+
+    def _finish_capture(self):
+        with self._capture_lock:
+            prof = self._capture
+            self._capture = None
+            self._capture_until = 0.0
+        if prof is not None:
+            self.dump(prof)
+
+    def dump(self, prof=None) -> str:
+        """
+        Write the histogram snapshot (and cProfile stats if given).
+        Returns the path prefix.
+        """
+        os.makedirs(self.dump_dir, exist_ok=True)
+        prefix = os.path.join(self.dump_dir, time.strftime("profile-%Y%m%d-%H%M%S"))
+        with open(prefix + ".json", "w") as f:
+            json.dump({"summary": self.snapshot(), **self.raw()}, f, indent=2)
+        if prof is not None:
+            prof.dump_stats(prefix + ".prof")
+        return prefix
+
+
+def _bench(n=200_000):
+    prof = StageProfiler(["a", "b", "c", "d", "e", "f", "g"])
+    clock = time.perf_counter_ns
+    t0 = time.perf_counter()
+    for _ in range(n):
+        t = clock()
+        prof.record("a", clock() - t)
+    per = (time.perf_counter() - t0) / n
+    frame = per * len(prof.stages)
+    print(f"record+2 clock reads: {per * 1e9:.0f} ns")
+    print(f"7 stages per frame  : {frame * 1e6:.2f} us = {frame / 0.05 * 100:.4f}% of 50 ms")
+
+
+if __name__ == "__main__":
+    _bench()
@@ -0,0 +1,158 @@
+# telemetry_aggregator.py
+import threading
+from collections import deque, Counter
+
+import numpy as np
+
+IMU_KEYS = ("ax", "ay", "az", "gx", "gy", "gz")
+
+
+class TelemetryAggregator:
+    """
+    Windowed telemetry summaries for cloud upload.
+
+    push() accumulates frames of the current window (by ts_ms) in a
+    preallocated array and returns a summary document when a window closes.
+    Summary documents stay flat-compatible with raw telemetry documents
+    (ts_ms, ax..gz as means, dist_cm as min, throttle/steer as the dominant
+    command) and add per-axis min/max/mean/std under "imu".
+
+    Raw bursts: the last `burst_pre` frames are kept; after mark_alert()
+    `burst_post` more frames are collected and returned by pop_burst().
+    """
+
+    def __init__(self, window_sec=1.0, rate_hz=20, burst_pre=40, burst_post=20):
+        self.window_ms = int(window_sec * 1000)
+        cap = max(8, int(window_sec * rate_hz * 4))
+
+        self._imu = np.empty((cap, len(IMU_KEYS)), dtype=np.float32)
+        self._dist = np.empty(cap, dtype=np.float32)
+        self._n = 0
+        self._cmd = Counter()
+        self._score_max = None
+        self._alerts = 0
+        self._win = None
+        self._ts_last = 0
+
+        self._history = deque(maxlen=int(burst_pre))
+        self._burst_post = int(burst_post)
+        self._burst = None
+        self._burst_left = 0
+        self._bursts = deque()
+
+        self._lock = threading.Lock()
+
+    # --------------------------------------------------
+    # Input
+    # --------------------------------------------------
+    def push(self, data: dict, ts_ms: int):
+        """
+        Add one frame. Returns a summary dict when the previous window closed.
+        """
+        with self._lock:
+            out = None
+            win = ts_ms // self.window_ms
+            if self._win is not None and win != self._win:
+                out = self._summarize()
+            if self._win is None or win != self._win:
+                self._win = win
+
+            if self._n == len(self._dist):
+                # rate higher than expected; grow once rather than drop
+                self._imu = np.concatenate((self._imu, np.empty_like(self._imu)))
+                self._dist = np.concatenate((self._dist, np.empty_like(self._dist)))
+
+            i = self._n
+            self._imu[i] = [data.get(k, np.nan) for k in IMU_KEYS]
+            self._dist[i] = data.get("dist_cm", np.nan)
+            self._n += 1
+            self._cmd[(int(data.get("throttle", 0)), int(data.get("steer", 0)))] += 1
+            self._ts_last = ts_ms
+
+            self._history.append(data)
+            if self._burst is not None:
+                self._burst.append(data)
+                self._burst_left -= 1
+                if self._burst_left <= 0:
+                    self._bursts.append(self._burst)
+                    self._burst = None
+
+            return out
+
+    def push_score(self, score: float):
+        with self._lock:
+            s = float(score)
+            if self._score_max is None or s > self._score_max:
+                self._score_max = s
+
+    def mark_alert(self):
+        """
+        Count an alert in the current window and start a raw burst capture.
+        An alert during an active capture extends it.
+        """
+        with self._lock:
+            self._alerts += 1
+            if self._burst is None:
+                self._burst = list(self._history)
+            self._burst_left = self._burst_post
+
+    # --------------------------------------------------
+    # Output
+    # --------------------------------------------------
+    def flush(self):
+        """
+        Close the current (partial) window. Returns a summary or None.
+        """
+        with self._lock:
+            out = self._summarize()
+            self._win = None
+            return out
+
+    def pop_burst(self):
+        """
+        Return one completed raw burst (list of frames) or None.
+        """
+        with self._lock:
+            return self._bursts.popleft() if self._bursts else None
+
+    def _summarize(self):
+        n = self._n
+        if n == 0:
+            return None
+
+        imu = self._imu[:n]
+        mn = np.nanmin(imu, axis=0)
+        mx = np.nanmax(imu, axis=0)
+        mean = np.nanmean(imu, axis=0)
+        std = np.nanstd(imu, axis=0)
+
+        (thr, st), _ = self._cmd.most_common(1)[0]
+        dist_min = float(np.nanmin(self._dist[:n]))
+
+        doc = {
+            "kind": "summary",
+            "ts_ms": int(self._win * self.window_ms),
+            "window_ms": self.window_ms,
+            "n": n,
+            "dist_cm": dist_min,
+            "throttle": thr,
+            "steer": st,
+            "cmd_hist": {f"{t},{s}": c for (t, s), c in self._cmd.items()},
+            "score_max": self._score_max,
+            "alerts": self._alerts,
+            "imu": {},
+        }
+        for j, k in enumerate(IMU_KEYS):
+            doc[k] = round(float(mean[j]), 3)
+            doc["imu"][k] = {
+                "min": float(mn[j]),
+                "max": float(mx[j]),
+                "mean": round(float(mean[j]), 3),
+                "std": round(float(std[j]), 3),
+            }
+
+        self._n = 0
+        self._cmd.clear()
+        self._score_max = None
+        self._alerts = 0
+        return doc
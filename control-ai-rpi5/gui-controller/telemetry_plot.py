@@ -0,0 +1,352 @@
+# telemetry_plot.py
+import threading
+
+import numpy as np
+
+from PySide6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QComboBox, QLabel
+from PySide6.QtCore import Qt, QTimer, QPointF, QRectF
+from PySide6.QtGui import QPainter, QPen, QColor, QPolygonF
+
+from config import (
+    PLOT_BUFFER_SEC,
+    PLOT_RATE_HZ,
+    PLOT_WINDOW_SEC,
+    PLOT_MAX_FPS,
+)
+
+FRAME_CHANNELS = ("ax", "ay", "az", "gx", "gy", "gz", "dist_cm", "throttle", "steer")
+SCORE_CHANNELS = ("score", "thr")
+
+DEFAULT_VEHICLE = "default"
+
+
+# ============================================================
+# Ring buffer storage
+# ============================================================
+class RingBuffer:
+    """
+    Preallocated (time, channels) ring buffer.
+    push() writes one row in place; snapshot() returns an ordered copy.
+    Safe to push from the MQTT thread while the UI thread reads.
+    """
+
+    def __init__(self, capacity: int, n_channels: int):
+        self.capacity = int(capacity)
+        self.t = np.zeros(self.capacity, dtype=np.float64)
+        self.data = np.full((self.capacity, n_channels), np.nan, dtype=np.float32)
+        self.head = 0
+        self.count = 0
+        self.version = 0
+        self._lock = threading.Lock()
+
+    def push(self, t: float, row):
+        with self._lock:
+            i = self.head
+            self.t[i] = t
+            self.data[i] = row
+            self.head = (i + 1) % self.capacity
+            if self.count < self.capacity:
+                self.count += 1
+            self.version += 1
+
+    def snapshot(self, since: float | None = None):
+        """
+        Return (t, data) in chronological order, optionally only rows with t >= since.
+        """
+        with self._lock:
+            n = self.count
+            if n < self.capacity:
+                t = self.t[:n].copy()
+                d = self.data[:n].copy()
+            else:
+                h = self.head
+                t = np.concatenate((self.t[h:], self.t[:h]))
+                d = np.concatenate((self.data[h:], self.data[:h]))
+
+        if since is not None and len(t):
+            k = int(np.searchsorted(t, since, side="left"))
+            t, d = t[k:], d[k:]
+        return t, d
+
+    def clear(self):
+        with self._lock:
+            self.head = 0
+            self.count = 0
+            self.data.fill(np.nan)
+            self.version += 1
+
+
+class VehicleTelemetry:
+    """
+    Per-vehicle telemetry and anomaly score history.
+    """
+
+    def __init__(self, buffer_sec=PLOT_BUFFER_SEC, rate_hz=PLOT_RATE_HZ):
+        cap = max(16, int(buffer_sec * rate_hz))
+        self.frames = RingBuffer(cap, len(FRAME_CHANNELS))
+        self.scores = RingBuffer(cap, len(SCORE_CHANNELS))
+        self._row = np.empty(len(FRAME_CHANNELS), dtype=np.float32)
+
+    def push_frame(self, t: float, data: dict):
+        row = self._row
+        for i, key in enumerate(FRAME_CHANNELS):
+            v = data.get(key)
+            row[i] = np.nan if v is None else v
+        self.frames.push(t, row)
+
+    def push_score(self, t: float, score: float, thr=None):
+        self.scores.push(t, (score, np.nan if thr is None else thr))
+
+    def clear(self):
+        self.frames.clear()
+        self.scores.clear()
+
+
+class TelemetryStore:
+    """
+    Thread-safe map of vehicle id -> VehicleTelemetry.
+    """
+
+    def __init__(self):
+        self._vehicles = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def vehicle_id(data: dict) -> str:
+        return str(data.get("vehicle_id") or DEFAULT_VEHICLE)
+
+    def get(self, vid: str) -> VehicleTelemetry:
+        with self._lock:
+            v = self._vehicles.get(vid)
+            if v is None:
+                v = VehicleTelemetry()
+                self._vehicles[vid] = v
+            return v
+
+    def ids(self):
+        with self._lock:
+            return sorted(self._vehicles)
+
+    def clear(self):
+        with self._lock:
+            for v in self._vehicles.values():
+                v.clear()
+
+
+# ============================================================
+# Downsampling
+# ============================================================
+def minmax_decimate(t: np.ndarray, y: np.ndarray, n_bins: int):
+    """
+    Reduce (t, y) to at most 2*n_bins points, keeping the min and max of
+    each bin so short spikes (collisions) survive long windows.
+    """
+    n = len(t)
+    if n <= 2 * n_bins or n_bins <= 0:
+        return t, y
+
+    per = n // n_bins
+    m = per * n_bins
+    start = n - m
+    tb = t[start:].reshape(n_bins, per)
+    yb = y[start:].reshape(n_bins, per)
+
+    # all-NaN bins (e.g. score before burn-in) stay NaN
+    yfill_lo = np.where(np.isnan(yb), np.inf, yb)
+    yfill_hi = np.where(np.isnan(yb), -np.inf, yb)
+    i_lo = yfill_lo.argmin(axis=1)
+    i_hi = yfill_hi.argmax(axis=1)
+
+    # emit (min, max) in time order within each bin
+    first = np.minimum(i_lo, i_hi)
+    second = np.maximum(i_lo, i_hi)
+    rows = np.arange(n_bins)
+
+    t_out = np.empty(2 * n_bins, dtype=t.dtype)
+    y_out = np.empty(2 * n_bins, dtype=y.dtype)
+    t_out[0::2] = tb[rows, first]
+    t_out[1::2] = tb[rows, second]
+    y_out[0::2] = yb[rows, first]
+    y_out[1::2] = yb[rows, second]
+    return t_out, y_out
+
+
+# ============================================================
+# Plot widget
+# ============================================================
+# (title, [(source, channel, color)])
+PLOT_LAYOUT = [
+    ("accel", [("f", "ax", "#e6194b"), ("f", "ay", "#3cb44b"), ("f", "az", "#4363d8")]),
+    ("gyro", [("f", "gx", "#e6194b"), ("f", "gy", "#3cb44b"), ("f", "gz", "#4363d8")]),
+    ("dist_cm", [("f", "dist_cm", "#f58231")]),
+    ("cmd", [("f", "throttle", "#911eb4"), ("f", "steer", "#42d4f4")]),
+    ("anomaly", [("s", "score", "#000000"), ("s", "thr", "#e6194b")]),
+]
+
+
+class TelemetryPlotCanvas(QWidget):
+    """
+    Stacked strip charts drawn with QPainter.
+    Data is pulled from the store by a capped-rate timer; nothing is drawn
+    from the MQTT thread.
+    """
+
+    def __init__(self, store: TelemetryStore, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self.vehicle = DEFAULT_VEHICLE
+        self.window_sec = float(PLOT_WINDOW_SEC)
+
+        self._frame_idx = {k: i for i, k in enumerate(FRAME_CHANNELS)}
+        self._score_idx = {k: i for i, k in enumerate(SCORE_CHANNELS)}
+        self._seen_version = (-1, -1)
+
+        self.setMinimumSize(480, 400)
+
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self._on_timer)
+        self._timer.start(int(1000 / max(1, PLOT_MAX_FPS)))
+
+    def set_vehicle(self, vid: str):
+        self.vehicle = vid
+        self._seen_version = (-1, -1)
+
+    def _on_timer(self):
+        if not self.isVisible():
+            return
+        v = self.store.get(self.vehicle)
+        ver = (v.frames.version, v.scores.version)
+        if ver == self._seen_version:
+            return
+        self._seen_version = ver
+        self.update()
+
+    def paintEvent(self, event):
+        v = self.store.get(self.vehicle)
+
+        tf, df = v.frames.snapshot()
+        ts, ds = v.scores.snapshot()
+
+        t_end = max(tf[-1] if len(tf) else 0.0, ts[-1] if len(ts) else 0.0)
+        t_start = t_end - self.window_sec
+
+        if len(tf):
+            k = int(np.searchsorted(tf, t_start))
+            tf, df = tf[k:], df[k:]
+        if len(ts):
+            k = int(np.searchsorted(ts, t_start))
+            ts, ds = ts[k:], ds[k:]
+
+        p = QPainter(self)
+        p.fillRect(self.rect(), QColor("#ffffff"))
+
+        n = len(PLOT_LAYOUT)
+        w = self.width()
+        h = self.height()
+        row_h = h / n
+        left = 56.0
+        right = 6.0
+        n_bins = max(8, int((w - left - right) / 2))
+
+        for r, (title, curves) in enumerate(PLOT_LAYOUT):
+            top = r * row_h + 4
+            area = QRectF(left, top, w - left - right, row_h - 10)
+
+            series = []
+            for src, ch, color in curves:
+                if src == "f":
+                    t, y = tf, df[:, self._frame_idx[ch]]
+                else:
+                    t, y = ts, ds[:, self._score_idx[ch]]
+                if len(t) == 0:
+                    continue
+                t, y = minmax_decimate(t, y, n_bins)
+                series.append((t, y, color))
+
+            y_range = self._draw_axes(p, area, title, series)
+            for t, y, color in series:
+                self._draw_curve(p, area, t, y, color, t_start, self.window_sec, y_range)
+
+        p.end()
+
+    def _draw_axes(self, p: QPainter, area: QRectF, title: str, series):
+        p.setPen(QPen(QColor("#c0c0c0"), 1))
+        p.drawRect(area)
+
+        lo, hi = self._y_range(series)
+
+        p.setPen(QPen(QColor("#404040"), 1))
+        p.drawText(QRectF(0, area.top(), area.left() - 4, 14), Qt.AlignRight, f"{hi:.3g}")
+        p.drawText(QRectF(0, area.bottom() - 14, area.left() - 4, 14), Qt.AlignRight, f"{lo:.3g}")
+        p.drawText(QRectF(0, area.center().y() - 7, area.left() - 4, 14), Qt.AlignRight, title)
+        return lo, hi
+
+    @staticmethod
+    def _y_range(series):
+        lo, hi = np.inf, -np.inf
+        for _, y, _ in series:
+            if len(y) and not np.all(np.isnan(y)):
+                lo = min(lo, float(np.nanmin(y)))
+                hi = max(hi, float(np.nanmax(y)))
+        if not np.isfinite(lo):
+            return 0.0, 1.0
+        if hi - lo < 1e-9:
+            pad = max(1.0, abs(hi) * 0.1)
+            return lo - pad, hi + pad
+        return lo, hi
+
+    @staticmethod
+    def _draw_curve(p: QPainter, area: QRectF, t, y, color, t_start, span, y_range):
+        lo, hi = y_range
+        xs = area.left() + (t - t_start) / span * area.width()
+        ys = area.bottom() - (y - lo) / (hi - lo) * area.height()
+
+        ok = ~np.isnan(ys)
+        if not ok.any():
+            return
+
+        p.setPen(QPen(QColor(color), 1))
+        p.drawPolyline(QPolygonF([QPointF(float(a), float(b)) for a, b in zip(xs[ok], ys[ok])]))
+
+
+class TelemetryPlotWindow(QWidget):
+    """
+    Top-level window hosting the plot canvas and a vehicle selector.
+    """
+
+    def __init__(self, store: TelemetryStore, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Telemetry Plot")
+        self.setWindowFlag(Qt.Window, True)
+        self.store = store
+
+        self.vehicleBox = QComboBox(self)
+        self.vehicleBox.addItem(DEFAULT_VEHICLE)
+        self.vehicleBox.currentTextChanged.connect(self._on_vehicle_changed)
+
+        self.canvas = TelemetryPlotCanvas(store, self)
+
+        top = QHBoxLayout()
+        top.addWidget(QLabel("vehicle", self))
+        top.addWidget(self.vehicleBox, 1)
+
+        lay = QVBoxLayout(self)
+        lay.addLayout(top)
+        lay.addWidget(self.canvas, 1)
+
+        # refresh the vehicle list at a slow rate
+        self._ids_timer = QTimer(self)
+        self._ids_timer.timeout.connect(self._refresh_vehicles)
+        self._ids_timer.start(1000)
+
+        self.resize(640, 560)
+
+    def _refresh_vehicles(self):
+        have = {self.vehicleBox.itemText(i) for i in range(self.vehicleBox.count())}
+        for vid in self.store.ids():
+            if vid not in have:
+                self.vehicleBox.addItem(vid)
+
+    def _on_vehicle_changed(self, vid: str):
+        if vid:
+            self.canvas.set_vehicle(vid)
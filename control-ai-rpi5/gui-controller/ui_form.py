@@ -89,6 +89,16 @@ class Ui_MainWindow(object):
         self.leftBtn.setGeometry(QRect(40, 362, 91, 51))
         self.leftBtn.setFont(font)
 
+        self.plotBtn = QPushButton(self.centralwidget)
+        self.plotBtn.setObjectName(u"plotBtn")
+        self.plotBtn.setGeometry(QRect(410, 362, 371, 51))
+        self.plotBtn.setFont(font)
+
+        self.cameraBtn = QPushButton(self.centralwidget)
+        self.cameraBtn.setObjectName(u"cameraBtn")
+        self.cameraBtn.setGeometry(QRect(410, 425, 371, 51))
+        self.cameraBtn.setFont(font)
+
         self.startBtn = QPushButton(self.centralwidget)
         self.startBtn.setObjectName(u"startBtn")
         self.startBtn.setGeometry(QRect(690, 12, 91, 51))
@@ -114,6 +124,8 @@ class Ui_MainWindow(object):
         self.startBtn.clicked.connect(MainWindow.start)
 
         self.modeSwitchBtn.clicked.connect(MainWindow.toggle_mode)
+        self.plotBtn.clicked.connect(MainWindow.toggle_plot)
+        self.cameraBtn.clicked.connect(MainWindow.toggle_camera)
 
         QMetaObject.connectSlotsByName(MainWindow)
     # setupUi
@@ -131,5 +143,7 @@ class Ui_MainWindow(object):
         self.startBtn.setText(QCoreApplication.translate("MainWindow", u"START", None))
 
         self.modeSwitchBtn.setText(QCoreApplication.translate("MainWindow", u"Switch to Gesture Mode", None))
+        self.plotBtn.setText(QCoreApplication.translate("MainWindow", u"Show Telemetry Plot", None))
+        self.cameraBtn.setText(QCoreApplication.translate("MainWindow", u"Show Camera Preview", None))
     # retranslateUi
 
@@ -0,0 +1,3 @@
+"""
+Predictor training utilities (dataset building, storage, training CLI).
+"""
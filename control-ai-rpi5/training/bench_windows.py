@@ -0,0 +1,114 @@
+# bench_windows.py
+"""
+Benchmark: notebook loop vs vectorized window builder on a synthetic
+multi-hour recording. Also checks that both produce identical samples.
+
+    python -m training.bench_windows --hours 3
+"""
+import argparse
+import time
+
+import numpy as np
+
+from training.dataset import USE_COLS, build_past_future_samples
+
+
+def notebook_build_past_future_samples(df, t_in, t_out, stride, max_gap_ms):
+    """Reference: the loop from rpi5-ai-model.ipynb (unchanged)."""
+    X_list, Y_list = [], []
+
+    ts = np.asarray(df["ts_ms"])
+    data = np.column_stack([np.asarray(df[c]) for c in USE_COLS]).astype(np.float32)
+
+    N = len(ts)
+    total_len = t_in + t_out
+
+    def dominant_ratio(x):
+        vals, counts = np.unique(x, return_counts=True)
+        return counts.max() / len(x)
+
+    for start in range(0, N - total_len + 1, stride):
+        end = start + total_len
+
+        ts_window = ts[start:end]
+        if np.any(np.diff(ts_window) > max_gap_ms):
+            continue
+
+        window = data[start:end]
+
+        cmd_win = window[:, 6:8]
+        thr = cmd_win[:, 0]
+        st = cmd_win[:, 1]
+
+        if dominant_ratio(thr) < 0.95 or dominant_ratio(st) < 0.95:
+            continue
+
+        X_list.append(window[:t_in])
+        Y_list.append(window[t_in:][:, :6])
+
+    if len(X_list) == 0:
+        return None, None
+
+    return np.stack(X_list), np.stack(Y_list)
+
+
+def synthetic_recording(hours: float, fs: int = 20, seed: int = 0) -> dict:
+    """
+    Piecewise-constant commands (2-10 s segments), noisy IMU and
+    occasional timestamp gaps, like back-to-back collect.sh runs.
+    """
+    rng = np.random.default_rng(seed)
+    n = int(hours * 3600 * fs)
+
+    dt = np.full(n, 1000 // fs, dtype=np.int64)
+    dt[rng.random(n) < 0.002] += rng.integers(200, 2000)
+    ts = np.cumsum(dt)
+
+    thr = np.empty(n, dtype=np.int16)
+    st = np.empty(n, dtype=np.int16)
+    i = 0
+    while i < n:
+        seg = int(rng.integers(2 * fs, 10 * fs))
+        thr[i:i + seg] = rng.choice([-60, 0, 60])
+        st[i:i + seg] = rng.choice([-100, -40, 0, 40, 100])
+        i += seg
+
+    # sparse command glitches (stale frames around transitions)
+    glitch = rng.random(n) < 0.01
+    thr[glitch] = 0
+
+    cols = {"ts_ms": ts, "throttle": thr, "steer": st}
+    for k in ("ax", "ay", "az", "gx", "gy", "gz"):
+        cols[k] = rng.normal(0, 500, n).astype(np.int16)
+    return cols
+
+
+def main():
+    p = argparse.ArgumentParser(description="Window builder benchmark")
+    p.add_argument("--hours", type=float, default=3.0)
+    p.add_argument("--t-in", type=int, default=20)
+    p.add_argument("--t-out", type=int, default=20)
+    p.add_argument("--stride", type=int, default=5)
+    p.add_argument("--max-gap-ms", type=float, default=150)
+    args = p.parse_args()
+
+    rec = synthetic_recording(args.hours)
+    print(f"frames: {len(rec['ts_ms'])} ({args.hours:g} h @ 20 Hz)")
+
+    t0 = time.perf_counter()
+    Xr, Yr = notebook_build_past_future_samples(rec, args.t_in, args.t_out, args.stride, args.max_gap_ms)
+    t_loop = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    Xv, Yv = build_past_future_samples(rec, args.t_in, args.t_out, args.stride, args.max_gap_ms)
+    t_vec = time.perf_counter() - t0
+
+    same = np.array_equal(Xr, Xv) and np.array_equal(Yr, Yv)
+    print(f"samples: {len(Xv)}  identical: {same}")
+    print(f"notebook loop : {t_loop * 1000:9.1f} ms")
+    print(f"vectorized    : {t_vec * 1000:9.1f} ms")
+    print(f"speedup       : {t_loop / t_vec:9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
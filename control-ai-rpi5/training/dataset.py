@@ -0,0 +1,156 @@
+# dataset.py
+"""
+Vectorized (past -> future) window builder for the predictor.
+
+Replaces the per-start Python loop of the notebook:
+- gap check   : prefix sum over "gap > max_gap_ms" edges
+- cmd filter  : majority test against the window median (exact for
+                min_dominant > 0.5)
+- windows     : strided views over the frame array (no copy)
+"""
+import numpy as np
+from numpy.lib.stride_tricks import as_strided, sliding_window_view
+
+SENSOR_COLS = ["ax", "ay", "az", "gx", "gy", "gz"]
+CMD_COLS = ["throttle", "steer"]
+USE_COLS = SENSOR_COLS + CMD_COLS
+
+SENSOR_DIM = len(SENSOR_COLS)
+
+
+def frame_array(df, cols=USE_COLS, dtype=np.float32) -> np.ndarray:
+    """
+    Stack columns of a DataFrame or a dict of arrays into (N, len(cols)).
+    """
+    return np.column_stack([np.asarray(df[c], dtype=dtype) for c in cols])
+
+
+def window_view(data: np.ndarray, length: int) -> np.ndarray:
+    """
+    Zero-copy view of all windows: (N - length + 1, length, C).
+    """
+    data = np.ascontiguousarray(data)
+    n, c = data.shape
+    m = n - length + 1
+    if m <= 0:
+        return data[:0].reshape(0, length, c)
+    s0, s1 = data.strides
+    return as_strided(data, shape=(m, length, c), strides=(s0, s0, s1), writeable=False)
+
+
+def gap_free_mask(ts: np.ndarray, length: int, max_gap_ms: float) -> np.ndarray:
+    """
+    mask[s] is True when no consecutive timestamp gap inside
+    ts[s : s + length] exceeds max_gap_ms.
+    """
+    ts = np.asarray(ts)
+    bad = np.diff(ts) > max_gap_ms
+    c = np.concatenate(([0], np.cumsum(bad, dtype=np.int64)))
+    m = len(ts) - length + 1
+    if m <= 0:
+        return np.zeros(0, dtype=bool)
+    return (c[length - 1:length - 1 + m] - c[:m]) == 0
+
+
+def dominant_mask(x: np.ndarray, length: int, starts: np.ndarray, min_dominant: float = 0.95) -> np.ndarray:
+    """
+    For each start, True when the most frequent value of x[s : s + length]
+    covers at least min_dominant of the window.
+
+    For min_dominant > 0.5 the dominant value (if it passes) is the window
+    median, so one partition + one compare replaces np.unique per window.
+    """
+    if min_dominant <= 0.5:
+        raise ValueError("min_dominant must be > 0.5")
+
+    if len(starts) == 0:
+        return np.zeros(0, dtype=bool)
+
+    win = sliding_window_view(np.asarray(x), length)[starts]
+    k = length // 2
+    med = np.partition(win, k, axis=1)[:, k:k + 1]
+    count = np.count_nonzero(win == med, axis=1)
+    return count >= min_dominant * length
+
+
+def valid_window_starts(
+    ts,
+    cmd,
+    t_in: int,
+    t_out: int,
+    stride: int,
+    max_gap_ms: float,
+    min_dominant: float = 0.95,
+) -> np.ndarray:
+    """
+    Start indices (stepping by stride) of windows that are gap-free and
+    whose every command channel is stable.
+
+    ts : (N,) timestamps in ms
+    cmd: (N, K) command channels
+    """
+    total = t_in + t_out
+    n = len(ts)
+    if n < total:
+        return np.zeros(0, dtype=np.int64)
+
+    starts = np.arange(0, n - total + 1, stride, dtype=np.int64)
+    keep = gap_free_mask(ts, total, max_gap_ms)[starts]
+    starts = starts[keep]
+
+    cmd = np.asarray(cmd)
+    if cmd.ndim == 1:
+        cmd = cmd[:, None]
+    for j in range(cmd.shape[1]):
+        if len(starts) == 0:
+            break
+        starts = starts[dominant_mask(cmd[:, j], total, starts, min_dominant)]
+    return starts
+
+
+def build_past_future_samples(
+    df,
+    t_in: int,
+    t_out: int,
+    stride: int,
+    max_gap_ms: float,
+    min_dominant: float = 0.95,
+    copy: bool = True,
+):
+    """
+    df: pandas DataFrame (or dict of columns) sorted by ts_ms
+    return:
+      X: (N, T_IN, 8)  past sensor+cmd
+      Y: (N, T_OUT, 6) future sensors only
+    or (None, None) when no window survives the filters.
+
+    With copy=False and stride-aligned, fully valid data, X/Y are views of
+    the frame array; otherwise rows are gathered once.
+    """
+    ts = np.asarray(df["ts_ms"])
+    data = frame_array(df)
+
+    starts = valid_window_starts(
+        ts,
+        data[:, SENSOR_DIM:],
+        t_in,
+        t_out,
+        stride,
+        max_gap_ms,
+        min_dominant,
+    )
+    if len(starts) == 0:
+        return None, None
+
+    total = t_in + t_out
+    win = window_view(data, total)
+
+    n_starts = len(range(0, len(data) - total + 1, stride))
+    if not copy and len(starts) == n_starts:
+        sel = win[::stride]
+        return sel[:, :t_in], sel[:, t_in:, :SENSOR_DIM]
+
+    # one gather per output, each already contiguous
+    X = win[starts, :t_in]
+    Y = win[starts, t_in:, :SENSOR_DIM]
+    return X, Y
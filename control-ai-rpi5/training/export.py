@@ -0,0 +1,92 @@
+# export.py
+"""
+Versioned artifact bundle for PredictorEngine.
+
+    <out_root>/v003/
+        predictor_ts.pt      TorchScript model (input [1, T_IN, 8])
+        predictor_state.pt   state_dict (for fine-tuning)
+        sensor_scaler.npz    mean / scale float32 arrays (no sklearn needed)
+        config.json          window, feature order, cmd_scale, score stats,
+                             training metadata and file checksums
+    <out_root>/latest        text file with the newest version name
+"""
+import os
+import re
+import json
+import hashlib
+from datetime import datetime
+
+import numpy as np
+import torch
+
+BUNDLE_FORMAT = 1
+
+MODEL_FILE = "predictor_ts.pt"
+STATE_FILE = "predictor_state.pt"
+SCALER_FILE = "sensor_scaler.npz"
+CONFIG_FILE = "config.json"
+LATEST_FILE = "latest"
+
+
+def _next_version(out_root: str) -> str:
+    n = 0
+    if os.path.isdir(out_root):
+        for name in os.listdir(out_root):
+            m = re.fullmatch(r"v(\d+)", name)
+            if m:
+                n = max(n, int(m.group(1)))
+    return f"v{n + 1:03d}"
+
+
+def _sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def export_bundle(model, mean, scale, cfg: dict, out_root: str) -> str:
+    """
+    Write a new bundle version. cfg must contain T_IN, T_OUT,
+    feature_order_X, feature_order_Y and cmd_scale.
+    Returns the bundle directory.
+    """
+    version = _next_version(out_root)
+    out_dir = os.path.join(out_root, version)
+    os.makedirs(out_dir)
+
+    model = model.cpu().eval()
+    n_in = len(cfg["feature_order_X"])
+    example = torch.zeros(1, int(cfg["T_IN"]), n_in)
+    with torch.no_grad():
+        traced = torch.jit.trace(model, example)
+    traced.save(os.path.join(out_dir, MODEL_FILE))
+    torch.save(model.state_dict(), os.path.join(out_dir, STATE_FILE))
+
+    np.savez(
+        os.path.join(out_dir, SCALER_FILE),
+        mean=np.asarray(mean, dtype=np.float32),
+        scale=np.asarray(scale, dtype=np.float32),
+    )
+
+    cfg = dict(cfg)
+    cfg["bundle_format"] = BUNDLE_FORMAT
+    cfg["version"] = version
+    cfg["created"] = datetime.now().isoformat(timespec="seconds")
+    cfg["files"] = {
+        "model": MODEL_FILE,
+        "state_dict": STATE_FILE,
+        "scaler": SCALER_FILE,
+    }
+    cfg["sha256"] = {
+        name: _sha256(os.path.join(out_dir, name))
+        for name in (MODEL_FILE, STATE_FILE, SCALER_FILE)
+    }
+    with open(os.path.join(out_dir, CONFIG_FILE), "w") as f:
+        json.dump(cfg, f, indent=2)
+
+    with open(os.path.join(out_root, LATEST_FILE), "w") as f:
+        f.write(version + "\n")
+    return out_dir
+
@@ -0,0 +1,39 @@
+# model.py
+import torch.nn as nn
+
+
+class ConvPredictor(nn.Module):
+    """
+    Past -> Future sensor predictor (same network as rpi5-ai-model.ipynb)
+    Input : (B, T_IN, in_dim)   (sensor6 + cmd2)
+    Output: (B, T_OUT, out_dim) (future sensors)
+    """
+
+    def __init__(self, t_in=20, t_out=20, in_dim=8, out_dim=6, hidden=64, k=3, dropout=0.1):
+        super().__init__()
+        self.t_in = t_in
+        self.t_out = t_out
+
+        # (B, T, C) -> (B, C, T) for Conv1d
+        self.enc = nn.Sequential(
+            nn.Conv1d(in_dim, hidden, kernel_size=k, padding=k // 2),
+            nn.ReLU(),
+            nn.Dropout(dropout),
+
+            nn.Conv1d(hidden, hidden, kernel_size=k, padding=k // 2),
+            nn.ReLU(),
+            nn.Dropout(dropout),
+        )
+
+        # (B, hidden, T_IN) -> (B, hidden, T_OUT)
+        self.time_proj = nn.Linear(t_in, t_out)
+
+        # (B, hidden, T_OUT) -> (B, out_dim, T_OUT)
+        self.head = nn.Conv1d(hidden, out_dim, kernel_size=1)
+
+    def forward(self, x):
+        x = x.transpose(1, 2)           # (B, in_dim, T_IN)
+        h = self.enc(x)                 # (B, hidden, T_IN)
+        h = self.time_proj(h)           # (B, hidden, T_OUT)
+        y = self.head(h)                # (B, out_dim, T_OUT)
+        return y.transpose(1, 2)        # (B, T_OUT, out_dim)
@@ -0,0 +1,271 @@
+# store.py
+"""
+On-disk window dataset.
+
+Layout (one directory):
+    frames.f32     raw float32 frames, shape (N_frames, 8) in USE_COLS order
+    windows.npy    int64 global start index of every valid window
+    meta.json      shape, window config and per-source offsets
+
+Frames are stored once; windows are only start indices, so the dataset
+costs 32 bytes per frame instead of (T_IN + T_OUT) * 32 per window, and
+is memory-mapped instead of loaded.
+
+    python -m training.store build --out data/store data/train/*.csv data/train/fwd_straight
+"""
+import os
+import json
+import glob
+import argparse
+
+import numpy as np
+
+from training.dataset import USE_COLS, SENSOR_DIM, frame_array, valid_window_starts
+
+FRAMES_FILE = "frames.f32"
+WINDOWS_FILE = "windows.npy"
+META_FILE = "meta.json"
+
+
+# ============================================================
+# Source loading
+# ============================================================
+def _load_csv(path: str) -> dict:
+    import pandas as pd
+
+    df = pd.read_csv(path)
+    missing = [c for c in ["ts_ms"] + USE_COLS if c not in df.columns]
+    if missing:
+        raise ValueError(f"missing columns {missing}")
+    return {c: df[c].to_numpy() for c in ["ts_ms"] + USE_COLS}
+
+
+def _load_session_dir(path: str) -> dict:
+    """
+    Read columnar chunks written by dataset-collect/collect.py
+    (.npz, or .parquet with --format parquet; pyarrow needed for those).
+    """
+    names = sorted(
+        glob.glob(os.path.join(path, "chunk-*.npz")) + glob.glob(os.path.join(path, "chunk-*.parquet"))
+    )
+    parts = {c: [] for c in ["ts_ms"] + USE_COLS}
+    for name in names:
+        if name.endswith(".parquet"):
+            import pyarrow.parquet as pq
+
+            t = pq.read_table(name, columns=list(parts))
+            for c in parts:
+                parts[c].append(t.column(c).to_numpy())
+        else:
+            with np.load(name) as z:
+                for c in parts:
+                    parts[c].append(z[c])
+    if not names:
+        raise ValueError("no chunk-*.npz / chunk-*.parquet files")
+    return {c: np.concatenate(v) for c, v in parts.items()}
+
+
+def load_source(path: str) -> dict:
+    cols = _load_session_dir(path) if os.path.isdir(path) else _load_csv(path)
+    order = np.argsort(cols["ts_ms"], kind="stable")
+    return {c: np.asarray(v)[order] for c, v in cols.items()}
+
+
+# ============================================================
+# Build / open
+# ============================================================
+def build_store(
+    sources,
+    out_dir: str,
+    t_in: int = 20,
+    t_out: int = 20,
+    stride: int = 5,
+    max_gap_ms: float = 150,
+    min_dominant: float = 0.95,
+) -> dict:
+    """
+    Append every source to one frame file and record its valid windows.
+    Sources are processed one at a time, so peak memory is one source.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    frames_path = os.path.join(out_dir, FRAMES_FILE)
+
+    offset = 0
+    all_starts = []
+    meta_sources = []
+
+    with open(frames_path, "wb") as f:
+        for path in sources:
+            name = os.path.basename(os.path.normpath(path)).replace(".csv", "")
+            try:
+                cols = load_source(path)
+            except Exception as e:
+                print(f"Skip {name} ({e})")
+                continue
+
+            data = frame_array(cols)
+            starts = valid_window_starts(
+                cols["ts_ms"],
+                data[:, SENSOR_DIM:],
+                t_in,
+                t_out,
+                stride,
+                max_gap_ms,
+                min_dominant,
+            )
+            if len(starts) == 0:
+                print(f"[Warn] {name}: no valid samples after filtering")
+                continue
+
+            f.write(np.ascontiguousarray(data, dtype=np.float32).tobytes())
+            all_starts.append(starts + offset)
+            meta_sources.append(
+                {
+                    "name": name,
+                    "path": path,
+                    "frame_offset": offset,
+                    "n_frames": int(len(data)),
+                    "window_offset": int(sum(len(s) for s in all_starts[:-1])),
+                    "n_windows": int(len(starts)),
+                }
+            )
+            offset += len(data)
+            print(f"- {name:18s}: {len(starts):6d} samples")
+
+    windows = np.concatenate(all_starts) if all_starts else np.zeros(0, dtype=np.int64)
+    np.save(os.path.join(out_dir, WINDOWS_FILE), windows.astype(np.int64))
+
+    meta = {
+        "n_frames": int(offset),
+        "n_features": len(USE_COLS),
+        "feature_order": USE_COLS,
+        "T_IN": int(t_in),
+        "T_OUT": int(t_out),
+        "stride": int(stride),
+        "max_gap_ms": float(max_gap_ms),
+        "min_dominant": float(min_dominant),
+        "sources": meta_sources,
+    }
+    with open(os.path.join(out_dir, META_FILE), "w") as f:
+        json.dump(meta, f, indent=2)
+    return meta
+
+
+class WindowStore:
+    """
+    Read-only view of a store directory (memory-mapped).
+    The memmap is opened lazily so each DataLoader worker maps its own.
+    """
+
+    def __init__(self, store_dir: str):
+        self.store_dir = store_dir
+        with open(os.path.join(store_dir, META_FILE)) as f:
+            self.meta = json.load(f)
+        self.t_in = int(self.meta["T_IN"])
+        self.t_out = int(self.meta["T_OUT"])
+        self.windows = np.load(os.path.join(store_dir, WINDOWS_FILE), mmap_mode="r")
+        self._frames = None
+
+    @property
+    def frames(self) -> np.ndarray:
+        if self._frames is None:
+            self._frames = np.memmap(
+                os.path.join(self.store_dir, FRAMES_FILE),
+                dtype=np.float32,
+                mode="r",
+                shape=(self.meta["n_frames"], self.meta["n_features"]),
+            )
+        return self._frames
+
+    def __getstate__(self):
+        # do not pickle the mapping into worker processes
+        state = dict(self.__dict__)
+        state["_frames"] = None
+        return state
+
+    def __len__(self):
+        return len(self.windows)
+
+    def window(self, i: int) -> np.ndarray:
+        """
+        Raw (T_IN + T_OUT, 8) window i (a view into the memmap).
+        """
+        s = int(self.windows[i])
+        return self.frames[s:s + self.t_in + self.t_out]
+
+    def split_time_block(self, val_ratio: float = 0.2):
+        """
+        Per-source time-block split (front -> train, tail -> val), the same
+        rule as the notebook. Returns (train_idx, val_idx) into windows.
+        """
+        tr, va = [], []
+        for src in self.meta["sources"]:
+            n = src["n_windows"]
+            o = src["window_offset"]
+            cut = int(n * (1 - val_ratio))
+            cut = max(1, min(cut, n - 1))
+            tr.append(np.arange(o, o + cut))
+            va.append(np.arange(o + cut, o + n))
+        cat = lambda xs: np.concatenate(xs) if xs else np.zeros(0, dtype=np.int64)
+        return cat(tr), cat(va)
+
+    def sensor_stats(self, window_idx, chunk_frames: int = 1 << 20):
+        """
+        Mean / std (ddof=0) of sensor channels over the past part of the given
+        windows, each frame weighted by how many windows contain it.
+        Matches StandardScaler.fit(X_train[:, :, :6].reshape(-1, 6)) while
+        streaming the memmap in chunks.
+        """
+        n = self.meta["n_frames"]
+        starts = np.asarray(self.windows)[np.asarray(window_idx)]
+        w = np.zeros(n + 1, dtype=np.int64)
+        np.add.at(w, starts, 1)
+        np.add.at(w, starts + self.t_in, -1)
+        w = np.cumsum(w[:-1]).astype(np.float64)
+
+        total = w.sum()
+        s1 = np.zeros(SENSOR_DIM)
+        s2 = np.zeros(SENSOR_DIM)
+        for a in range(0, n, chunk_frames):
+            x = np.asarray(self.frames[a:a + chunk_frames, :SENSOR_DIM], dtype=np.float64)
+            wc = w[a:a + chunk_frames, None]
+            s1 += (wc * x).sum(axis=0)
+        mean = s1 / total
+        for a in range(0, n, chunk_frames):
+            x = np.asarray(self.frames[a:a + chunk_frames, :SENSOR_DIM], dtype=np.float64)
+            wc = w[a:a + chunk_frames, None]
+            s2 += (wc * (x - mean) ** 2).sum(axis=0)
+        std = np.sqrt(s2 / total)
+        # StandardScaler keeps zero-variance features unscaled
+        std[std == 0] = 1.0
+        return mean.astype(np.float32), std.astype(np.float32)
+
+
+def main():
+    p = argparse.ArgumentParser(description="Memory-mapped window store")
+    sub = p.add_subparsers(dest="cmd", required=True)
+
+    b = sub.add_parser("build", help="build a store from CSV files / session dirs")
+    b.add_argument("sources", nargs="+")
+    b.add_argument("--out", required=True)
+    b.add_argument("--t-in", type=int, default=20)
+    b.add_argument("--t-out", type=int, default=20)
+    b.add_argument("--stride", type=int, default=5)
+    b.add_argument("--max-gap-ms", type=float, default=150)
+
+    args = p.parse_args()
+    if args.cmd == "build":
+        meta = build_store(
+            args.sources,
+            args.out,
+            t_in=args.t_in,
+            t_out=args.t_out,
+            stride=args.stride,
+            max_gap_ms=args.max_gap_ms,
+        )
+        n_win = sum(s["n_windows"] for s in meta["sources"])
+        print(f"frames={meta['n_frames']} windows={n_win} -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# torch_data.py
+"""
+PyTorch Dataset / DataLoader over a WindowStore.
+
+Windows are sliced from the memory-mapped frame file and scaled per item,
+so memory use does not grow with the dataset and the page cache does the
+caching. Scaling matches the notebook:
+- sensors : (x - mean) / std      (train-only stats)
+- commands: 2 * (v - lo) / (hi - lo) - 1
+"""
+import numpy as np
+import torch
+from torch.utils.data import Dataset, DataLoader
+
+from training.dataset import SENSOR_DIM
+from training.store import WindowStore
+
+CMD_SCALE = {"THR_MIN": -100.0, "THR_MAX": 100.0, "STR_MIN": -100.0, "STR_MAX": 100.0}
+
+
+class WindowDataset(Dataset):
+    """
+    Item i -> (X (T_IN, 8), Y (T_OUT, 6)) float32 tensors, scaled.
+    """
+
+    def __init__(self, store: WindowStore, indices, mean, std, cmd_scale=CMD_SCALE):
+        self.store = store
+        self.indices = np.asarray(indices, dtype=np.int64)
+        self.t_in = store.t_in
+
+        # x_scaled = x * mul + add for all 8 channels
+        thr_lo, thr_hi = cmd_scale["THR_MIN"], cmd_scale["THR_MAX"]
+        str_lo, str_hi = cmd_scale["STR_MIN"], cmd_scale["STR_MAX"]
+        std = np.asarray(std, dtype=np.float32)
+        mean = np.asarray(mean, dtype=np.float32)
+        self._mul = np.concatenate(
+            (1.0 / std, [2.0 / (thr_hi - thr_lo), 2.0 / (str_hi - str_lo)])
+        ).astype(np.float32)
+        self._add = np.concatenate(
+            (
+                -mean / std,
+                [-2.0 * thr_lo / (thr_hi - thr_lo) - 1.0, -2.0 * str_lo / (str_hi - str_lo) - 1.0],
+            )
+        ).astype(np.float32)
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __getitem__(self, i):
+        w = np.asarray(self.store.window(self.indices[i]), dtype=np.float32)
+        w = w * self._mul + self._add
+        x = torch.from_numpy(w[:self.t_in])
+        y = torch.from_numpy(np.ascontiguousarray(w[self.t_in:, :SENSOR_DIM]))
+        return x, y
+
+
+def make_loader(ds: WindowDataset, batch_size=64, shuffle=False, drop_last=False, num_workers=0, seed=None):
+    """
+    DataLoader with worker settings suited to memmap-backed items.
+    Each worker maps the frame file itself (WindowStore drops the mapping
+    when pickled).
+    """
+    g = None
+    if seed is not None:
+        g = torch.Generator()
+        g.manual_seed(seed)
+    return DataLoader(
+        ds,
+        batch_size=batch_size,
+        shuffle=shuffle,
+        drop_last=drop_last,
+        num_workers=num_workers,
+        persistent_workers=num_workers > 0,
+        prefetch_factor=4 if num_workers > 0 else None,
+        generator=g,
+    )
@@ -0,0 +1,222 @@
+# train.py
+"""
+Headless predictor training (CPU, deterministic).
+
+    python -m training.train --store data/store --out export
+    python -m training.train --build data/train/*.csv --store data/store --out export
+
+Steps (same rules as rpi5-ai-model.ipynb):
+  1) window store (optionally built from CSV files / session dirs)
+  2) per-source time-block split, train-only sensor stats
+  3) ConvPredictor + Adam + MSE, ReduceLROnPlateau, early stopping
+  4) train/val window-score percentiles
+  5) versioned bundle (export.py) loadable by PredictorEngine
+"""
+import os
+import time
+import random
+import argparse
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+from training.dataset import USE_COLS, SENSOR_COLS
+from training.store import WindowStore, build_store
+from training.torch_data import CMD_SCALE, WindowDataset, make_loader
+from training.model import ConvPredictor
+from training.export import export_bundle
+
+
+def seed_everything(seed: int):
+    random.seed(seed)
+    np.random.seed(seed)
+    torch.manual_seed(seed)
+    torch.use_deterministic_algorithms(True)
+
+
+class EarlyStopping:
+    """
+    Stops when val loss has not improved by min_delta for `patience` epochs.
+    Keeps a copy of the best weights.
+    """
+
+    def __init__(self, patience=8, min_delta=1e-5):
+        self.patience = patience
+        self.min_delta = min_delta
+        self.best = float("inf")
+        self.best_epoch = 0
+        self.best_state = None
+        self.bad = 0
+
+    def step(self, val_loss: float, model: nn.Module, epoch: int) -> bool:
+        """
+        Returns True when training should stop.
+        """
+        if val_loss < self.best - self.min_delta:
+            self.best = val_loss
+            self.best_epoch = epoch
+            self.best_state = {k: v.detach().clone() for k, v in model.state_dict().items()}
+            self.bad = 0
+            return False
+        self.bad += 1
+        return self.bad >= self.patience
+
+
+def run_epoch(model, loader, criterion, optimizer=None):
+    train = optimizer is not None
+    model.train(train)
+    total, n = 0.0, 0
+    with torch.set_grad_enabled(train):
+        for xb, yb in loader:
+            yhat = model(xb)
+            loss = criterion(yhat, yb)
+            if train:
+                optimizer.zero_grad()
+                loss.backward()
+                optimizer.step()
+            total += loss.item() * xb.size(0)
+            n += xb.size(0)
+    return total / max(n, 1)
+
+
+@torch.no_grad()
+def window_scores(model, loader) -> np.ndarray:
+    """
+    Window score = mean over (T_OUT, 6) of squared error (PredictorEngine score).
+    """
+    model.eval()
+    out = []
+    for xb, yb in loader:
+        out.append(((model(xb) - yb) ** 2).mean(dim=(1, 2)).numpy())
+    return np.concatenate(out) if out else np.zeros(0)
+
+
+def main():
+    p = argparse.ArgumentParser(description="Headless predictor training")
+    p.add_argument("--store", required=True, help="window store directory")
+    p.add_argument("--build", nargs="*", default=None, help="CSV files / session dirs to (re)build the store from")
+    p.add_argument("--out", default="export", help="bundle root (versions are created inside)")
+    p.add_argument("--t-in", type=int, default=20)
+    p.add_argument("--t-out", type=int, default=20)
+    p.add_argument("--stride", type=int, default=5)
+    p.add_argument("--max-gap-ms", type=float, default=150)
+    p.add_argument("--val-ratio", type=float, default=0.2)
+    p.add_argument("--epochs", type=int, default=40)
+    p.add_argument("--batch-size", type=int, default=64)
+    p.add_argument("--lr", type=float, default=1e-3)
+    p.add_argument("--hidden", type=int, default=64)
+    p.add_argument("--patience", type=int, default=8, help="early stopping patience (epochs)")
+    p.add_argument("--lr-patience", type=int, default=3, help="ReduceLROnPlateau patience (epochs)")
+    p.add_argument("--workers", type=int, default=2, help="DataLoader worker processes")
+    p.add_argument("--threads", type=int, default=0, help="torch intra-op threads (0 = default)")
+    p.add_argument("--seed", type=int, default=42)
+    args = p.parse_args()
+
+    seed_everything(args.seed)
+    if args.threads > 0:
+        torch.set_num_threads(args.threads)
+
+    if args.build:
+        print("[Build store]")
+        build_store(
+            args.build,
+            args.store,
+            t_in=args.t_in,
+            t_out=args.t_out,
+            stride=args.stride,
+            max_gap_ms=args.max_gap_ms,
+        )
+
+    store = WindowStore(args.store)
+    tr, va = store.split_time_block(args.val_ratio)
+    if len(tr) == 0 or len(va) == 0:
+        raise SystemExit("store has no train/val windows")
+    mean, std = store.sensor_stats(tr)
+    print(f"[Split] train={len(tr)} val={len(va)} | T_IN={store.t_in} T_OUT={store.t_out}")
+
+    train_ds = WindowDataset(store, tr, mean, std)
+    val_ds = WindowDataset(store, va, mean, std)
+    train_loader = make_loader(
+        train_ds, args.batch_size, shuffle=True, drop_last=True,
+        num_workers=args.workers, seed=args.seed,
+    )
+    val_loader = make_loader(val_ds, args.batch_size * 2, num_workers=args.workers)
+
+    model = ConvPredictor(
+        t_in=store.t_in, t_out=store.t_out,
+        in_dim=len(USE_COLS), out_dim=len(SENSOR_COLS), hidden=args.hidden,
+    )
+    criterion = nn.MSELoss()
+    optimizer = torch.optim.Adam(model.parameters(), lr=args.lr)
+    scheduler = torch.optim.lr_scheduler.ReduceLROnPlateau(
+        optimizer, factor=0.5, patience=args.lr_patience
+    )
+    stopper = EarlyStopping(patience=args.patience)
+
+    history = []
+    for epoch in range(1, args.epochs + 1):
+        t0 = time.perf_counter()
+        train_loss = run_epoch(model, train_loader, criterion, optimizer)
+        val_loss = run_epoch(model, val_loader, criterion)
+        scheduler.step(val_loss)
+        lr = optimizer.param_groups[0]["lr"]
+        history.append({"epoch": epoch, "train": train_loss, "val": val_loss, "lr": lr})
+        print(
+            f"[Epoch {epoch:03d}] Train Loss: {train_loss:.6f} | Val Loss: {val_loss:.6f} "
+            f"| lr={lr:.1e} | {time.perf_counter() - t0:.1f}s"
+        )
+        if stopper.step(val_loss, model, epoch):
+            print(f"Early stop (best epoch {stopper.best_epoch})")
+            break
+
+    if stopper.best_state is None:
+        # no epoch run (--epochs 0) or every val loss was NaN: nothing worth exporting
+        raise SystemExit(
+            f"no usable epoch (epochs={args.epochs}, last val loss="
+            f"{history[-1]['val'] if history else None}); bundle not written"
+        )
+    model.load_state_dict(stopper.best_state)
+
+    eval_train = make_loader(train_ds, 256, num_workers=args.workers)
+    train_win = window_scores(model, eval_train)
+    val_win = window_scores(model, make_loader(val_ds, 256, num_workers=args.workers))
+
+    cfg = {
+        "T_IN": store.t_in,
+        "T_OUT": store.t_out,
+        "feature_order_X": list(USE_COLS),
+        "feature_order_Y": list(SENSOR_COLS),
+        "scaler_features": list(SENSOR_COLS),
+        "cmd_scale": dict(CMD_SCALE),
+        "score": {
+            "type": "window_mse_mean",
+            "per_step_mse_dim_mean": True,
+            "train_p95": float(np.percentile(train_win, 95)),
+            "train_p99": float(np.percentile(train_win, 99)),
+            "val_mean": float(val_win.mean()),
+        },
+        "training": {
+            "seed": args.seed,
+            "epochs_run": len(history),
+            "best_epoch": stopper.best_epoch,
+            "best_val_loss": stopper.best,
+            "batch_size": args.batch_size,
+            "lr": args.lr,
+            "hidden": args.hidden,
+            "val_ratio": args.val_ratio,
+            "n_train": int(len(tr)),
+            "n_val": int(len(va)),
+            "store": os.path.abspath(args.store),
+            "sources": [s["name"] for s in store.meta["sources"]],
+            "history": history,
+        },
+    }
+    out_dir = export_bundle(model, mean, std, cfg, args.out)
+
+    print("Thresholds (from TRAIN): p95 =", cfg["score"]["train_p95"], "| p99 =", cfg["score"]["train_p99"])
+    print("Saved bundle:", out_dir)
+
+
+if __name__ == "__main__":
+    main()
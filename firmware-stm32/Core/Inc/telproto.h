@@ -0,0 +1,46 @@
+/*
+ * telproto.h
+ *
+ *  Binary UART framing for telemetry / status (see gateway uart_proto.py)
+ *
+ *  Frame: COBS( type | seq | body | crc16 ) 0x00
+ *  - little-endian fields, CRC-16/CCITT-FALSE over type..body
+ *  - selected at runtime with "$PRO,BIN" / "$PRO,ASC" from the gateway
+ *  - telemetry period set at runtime with "$CFG,TEL_MS,<ms>"
+ */
+
+#ifndef INC_TELPROTO_H_
+#define INC_TELPROTO_H_
+
+#include "main.h"
+
+#define TELPROTO_MODE_ASCII		0
+#define TELPROTO_MODE_BIN		1
+
+#define TELPROTO_TYPE_TEL		0x01
+#define TELPROTO_TYPE_STS		0x02
+#define TELPROTO_TYPE_CFG		0x03
+
+#define TELPROTO_CFG_TEL_MS		0x01
+
+#define TELPROTO_STS_US_BRAKE	0x01
+
+// TEL: 2 header + 18 body + 2 CRC -> COBS +1, delimiter +1
+#define TELPROTO_MAX_FRAME		32
+
+// Telemetry period: ControlTask refreshes the state every 20 ms
+#define TELPROTO_PERIOD_DEFAULT	50
+#define TELPROTO_PERIOD_MIN		20
+#define TELPROTO_PERIOD_MAX		1000
+
+extern volatile uint8_t g_telMode;		// current telemetry format
+extern volatile uint8_t g_telModeReq;	// requested by $PRO (applied by TelemetryTask)
+extern volatile uint16_t g_telPeriodMs;		// current telemetry period
+extern volatile uint16_t g_telPeriodReq;	// requested by $CFG (applied by TelemetryTask)
+
+uint16_t TelProto_Crc16(const uint8_t *data, uint16_t len);
+uint16_t TelProto_EncodeTel(uint8_t *out, uint8_t seq, const RcCarState_t *st);
+uint16_t TelProto_EncodeSts(uint8_t *out, uint8_t seq, uint8_t code);
+uint16_t TelProto_EncodeCfg(uint8_t *out, uint8_t seq, uint8_t key, uint16_t value);
+
+#endif /* INC_TELPROTO_H_ */
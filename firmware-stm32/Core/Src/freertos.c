@@ -31,6 +31,7 @@
 #include "usart.h"
 #include "i2c.h"
 #include "motorhat.h"
+#include "telproto.h"
 
 extern volatile uint32_t g_distance;
 extern uint8_t rx_buffer[];
@@ -43,6 +44,7 @@ extern uint8_t rx_buffer[];
 
 /* Private define ------------------------------------------------------------*/
 /* USER CODE BEGIN PD */
+#define TEL_FLAG_CFG	0x02	// CommRxTask -> TelemetryTask: $CFG received
 
 /* USER CODE END PD */
 
@@ -214,6 +216,8 @@ void StartControlTask(void *argument)
 	static uint8_t brake_tick = 0;
 	static uint8_t is_braking_active = 0;
 	static uint8_t is_sent_brake_msg = 0;
+	static uint8_t sts_frame[TELPROTO_MAX_FRAME];	// DMA source, must outlive the call
+	static uint8_t sts_seq = 0;
 
 	MotorHat_Init();
 	Motor_SetSteer(0);
@@ -277,7 +281,15 @@ void StartControlTask(void *argument)
 			  const char *msg = "$STS,US_BRAKE\r\n";
 			  if ((HAL_UART_GetState(&huart1) & HAL_UART_STATE_BUSY_TX) != HAL_UART_STATE_BUSY_TX)
 			  {
-				  HAL_UART_Transmit_DMA(&huart1, (uint8_t *)msg, strlen(msg));
+				  if (g_telMode == TELPROTO_MODE_BIN)
+				  {
+					  uint16_t n = TelProto_EncodeSts(sts_frame, sts_seq++, TELPROTO_STS_US_BRAKE);
+					  HAL_UART_Transmit_DMA(&huart1, sts_frame, n);
+				  }
+				  else
+				  {
+					  HAL_UART_Transmit_DMA(&huart1, (uint8_t *)msg, strlen(msg));
+				  }
 				  is_sent_brake_msg = 1;
 			  }
 		  }
@@ -325,6 +337,12 @@ void StartTelemetryTask(void *argument)
   /* USER CODE BEGIN StartTelemetryTask */
 	char tx_buffer[128];
 	RcCarState_t current_state;
+	uint8_t tel_seq = 0;
+	uint8_t cfg_ack = 0;
+	uint32_t flags;
+	uint32_t next_tick = osKernelGetTickCount();
+	int32_t wait;
+	int len;
 
   /* Infinite loop */
   for(;;)
@@ -336,13 +354,44 @@ void StartTelemetryTask(void *argument)
 		  osMutexRelease(stateMutexHandle);
 	  }
 
-	  // Packet formatting ($TEL)
-	  // spec: $TEL, AX, AY, AZ, GX, GY, GZ, DIST, THROTTLE, STEER
-	  int len = sprintf(tx_buffer, "$TEL,%d,%d,%d,%d,%d,%d,%lu,%d,%d\r\n",
-			  current_state.ax, current_state.ay, current_state.az,
-			  current_state.gx, current_state.gy, current_state.gz,
-			  current_state.distance_cm,
-			  current_state.throttle, current_state.steer);
+	  if (g_telModeReq != g_telMode)
+	  {
+		  // $PRO request: ack in ASCII (last plain-text line), switch from the next frame
+		  len = sprintf(tx_buffer, "$STS,PRO,%s\r\n",
+				  (g_telModeReq == TELPROTO_MODE_BIN) ? "BIN" : "ASC");
+		  g_telMode = g_telModeReq;
+		  tel_seq = 0;
+	  }
+	  else if (cfg_ack)
+	  {
+		  // $CFG request: apply the period and ack it in the current format
+		  g_telPeriodMs = g_telPeriodReq;
+		  if (g_telMode == TELPROTO_MODE_BIN)
+		  {
+			  len = TelProto_EncodeCfg((uint8_t *)tx_buffer, 0, TELPROTO_CFG_TEL_MS, g_telPeriodMs);
+		  }
+		  else
+		  {
+			  len = sprintf(tx_buffer, "$STS,CFG,TEL_MS,%u\r\n", (unsigned)g_telPeriodMs);
+		  }
+		  cfg_ack = 0;
+		  next_tick = osKernelGetTickCount();
+	  }
+	  else if (g_telMode == TELPROTO_MODE_BIN)
+	  {
+		  // Binary frame: 24 bytes vs ~45 for the ASCII line (telproto.h)
+		  len = TelProto_EncodeTel((uint8_t *)tx_buffer, tel_seq++, &current_state);
+	  }
+	  else
+	  {
+		  // Packet formatting ($TEL)
+		  // spec: $TEL, AX, AY, AZ, GX, GY, GZ, DIST, THROTTLE, STEER
+		  len = sprintf(tx_buffer, "$TEL,%d,%d,%d,%d,%d,%d,%lu,%d,%d\r\n",
+				  current_state.ax, current_state.ay, current_state.az,
+				  current_state.gx, current_state.gy, current_state.gz,
+				  current_state.distance_cm,
+				  current_state.throttle, current_state.steer);
+	  }
 
 	  // Transmit UART DMA
 	  //if (HAL_UART_GetState(&huart1) == HAL_UART_STATE_READY)
@@ -355,8 +404,20 @@ void StartTelemetryTask(void *argument)
 		  HAL_UART_Transmit_DMA(&huart1, (uint8_t *)tx_buffer, len);
 	  }
 
-	  // Every 50ms
-	  osDelay(50);
+	  // Every g_telPeriodMs (default 50ms, set by $CFG); a $CFG wakes the task early
+	  next_tick += g_telPeriodMs;
+	  wait = (int32_t)(next_tick - osKernelGetTickCount());
+	  if (wait <= 0)
+	  {
+		  // overran the period: restart the schedule
+		  next_tick = osKernelGetTickCount();
+		  wait = 1;
+	  }
+	  flags = osThreadFlagsWait(TEL_FLAG_CFG, osFlagsWaitAny, (uint32_t)wait);
+	  if ((flags & osFlagsError) == 0U)
+	  {
+		  cfg_ack = 1;
+	  }
   }
   /* USER CODE END StartTelemetryTask */
 }
@@ -407,6 +468,40 @@ void StartCommRxTask(void *argument)
 				  }
 			  }
 		  }
+		  else if (!strcmp(token, "$PRO"))
+		  {
+			  // Format: $PRO,BIN | $PRO,ASC  (telemetry format, acked by TelemetryTask)
+			  char *s_mode = strtok(NULL, ",\r\n");
+
+			  if (s_mode != NULL)
+			  {
+				  if (!strcmp(s_mode, "BIN"))
+				  {
+					  g_telModeReq = TELPROTO_MODE_BIN;
+				  }
+				  else if (!strcmp(s_mode, "ASC"))
+				  {
+					  g_telModeReq = TELPROTO_MODE_ASCII;
+				  }
+			  }
+		  }
+		  else if (!strcmp(token, "$CFG"))
+		  {
+			  // Format: $CFG,TEL_MS,<ms>  (telemetry period, acked by TelemetryTask)
+			  char *s_key = strtok(NULL, ",");
+			  char *s_val = strtok(NULL, ",\r\n");
+
+			  if (s_key != NULL && s_val != NULL && !strcmp(s_key, "TEL_MS"))
+			  {
+				  int32_t ms = atoi(s_val);
+
+				  if (ms < TELPROTO_PERIOD_MIN) ms = TELPROTO_PERIOD_MIN;
+				  if (ms > TELPROTO_PERIOD_MAX) ms = TELPROTO_PERIOD_MAX;
+
+				  g_telPeriodReq = (uint16_t)ms;
+				  osThreadFlagsSet(TelemetryTaskHandle, TEL_FLAG_CFG);
+			  }
+		  }
 		  else if (!strcmp(token, "$TUN"))
 		  {
 			  // Format: $TUN,TYPE,VALUE
@@ -0,0 +1,115 @@
+/*
+ * telproto.c
+ *
+ *  Binary UART framing for telemetry / status
+ */
+
+#include "telproto.h"
+
+volatile uint8_t g_telMode = TELPROTO_MODE_ASCII;
+volatile uint8_t g_telModeReq = TELPROTO_MODE_ASCII;
+volatile uint16_t g_telPeriodMs = TELPROTO_PERIOD_DEFAULT;
+volatile uint16_t g_telPeriodReq = TELPROTO_PERIOD_DEFAULT;
+
+uint16_t TelProto_Crc16(const uint8_t *data, uint16_t len)
+{
+	uint16_t crc = 0xFFFF;
+
+	for (uint16_t i = 0; i < len; i++)
+	{
+		crc ^= (uint16_t)data[i] << 8;
+		for (uint8_t b = 0; b < 8; b++)
+		{
+			crc = (crc & 0x8000) ? (crc << 1) ^ 0x1021 : (crc << 1);
+		}
+	}
+	return crc;
+}
+
+static void put_i16(uint8_t *p, int16_t v)
+{
+	p[0] = (uint8_t)((uint16_t)v & 0xFF);
+	p[1] = (uint8_t)((uint16_t)v >> 8);
+}
+
+// COBS-encode len bytes of in and append the 0x00 delimiter; returns bytes written
+static uint16_t cobs_frame(const uint8_t *in, uint16_t len, uint8_t *out)
+{
+	uint16_t code_idx = 0;
+	uint16_t w = 1;
+	uint8_t code = 1;
+
+	for (uint16_t r = 0; r < len; r++)
+	{
+		if (in[r] == 0)
+		{
+			out[code_idx] = code;
+			code_idx = w++;
+			code = 1;
+		}
+		else
+		{
+			out[w++] = in[r];
+			if (++code == 0xFF)
+			{
+				out[code_idx] = code;
+				code_idx = w++;
+				code = 1;
+			}
+		}
+	}
+	out[code_idx] = code;
+	out[w++] = 0x00;
+	return w;
+}
+
+static uint16_t seal(uint8_t *raw, uint16_t len, uint8_t *out)
+{
+	uint16_t crc = TelProto_Crc16(raw, len);
+	raw[len++] = (uint8_t)(crc & 0xFF);
+	raw[len++] = (uint8_t)(crc >> 8);
+	return cobs_frame(raw, len, out);
+}
+
+uint16_t TelProto_EncodeTel(uint8_t *out, uint8_t seq, const RcCarState_t *st)
+{
+	uint8_t raw[24];
+	uint32_t dist = st->distance_cm > 0xFFFF ? 0xFFFF : st->distance_cm;
+
+	raw[0] = TELPROTO_TYPE_TEL;
+	raw[1] = seq;
+	put_i16(&raw[2], st->ax);
+	put_i16(&raw[4], st->ay);
+	put_i16(&raw[6], st->az);
+	put_i16(&raw[8], st->gx);
+	put_i16(&raw[10], st->gy);
+	put_i16(&raw[12], st->gz);
+	put_i16(&raw[14], (int16_t)(uint16_t)dist);
+	put_i16(&raw[16], st->throttle);
+	put_i16(&raw[18], st->steer);
+
+	return seal(raw, 20, out);
+}
+
+uint16_t TelProto_EncodeSts(uint8_t *out, uint8_t seq, uint8_t code)
+{
+	uint8_t raw[8];
+
+	raw[0] = TELPROTO_TYPE_STS;
+	raw[1] = seq;
+	raw[2] = code;
+
+	return seal(raw, 3, out);
+}
+
+uint16_t TelProto_EncodeCfg(uint8_t *out, uint8_t seq, uint8_t key, uint16_t value)
+{
+	uint8_t raw[8];
+
+	raw[0] = TELPROTO_TYPE_CFG;
+	raw[1] = seq;
+	raw[2] = key;
+	put_i16(&raw[3], (int16_t)value);
+
+	return seal(raw, 5, out);
+}
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+bench_edge_latency.py
+
+Anomaly score latency: RPi4 edge scorer vs. scoring on the RPi5.
+
+Latency here is "frame received by the gateway (ts_ms / t_rx) -> score
+available". An alert is raised on the same score, so this is also the
+alert latency minus the (identical) baseline check.
+
+--role edge   (RPi4, no broker needed)
+    Replays frames at --rate Hz through EdgeScorer exactly as gateway.py
+    does (child process, stdin pipe, CPU budget) and reports edge_ms,
+    scorer CPU and the stride the budget settled on.
+
+--role rpi5   (RPi5, while gateway.py --edge-score runs)
+    Subscribes to mobility/telemetry/parsed and mobility/anomaly/rpi4.
+    Every telemetry frame is scored locally with the same engine path as
+    MainWindow (FrameResampler + PredictorEngine); edge scores are taken
+    as they arrive. Both are measured on the RPi5 clock against the
+    gateway's ts_ms, so a constant NTP offset shifts both columns
+    equally and the difference between them does not depend on it.
+
+    python bench_edge_latency.py --role edge --seconds 60
+    python bench_edge_latency.py --role rpi5 --broker 192.168.0.75 --seconds 60
+"""
+
+import os
+import sys
+import json
+import time
+import math
+import random
+import argparse
+import threading
+
+from edge_scorer import EdgeScorer, DEFAULT_ENGINE_DIR
+
+
+def _summary(label: str, vals: list[float]) -> str:
+    if not vals:
+        return f"  {label:28s} n=0"
+    v = sorted(vals)
+    p = lambda q: v[min(len(v) - 1, int(q * len(v)))]
+    return f"  {label:28s} n={len(v):5d}  p50 {p(0.5):7.2f}  p95 {p(0.95):7.2f}  max {v[-1]:7.2f} ms"
+
+
+def _frames(seed: int = 0):
+    """Endless synthetic drive: straight / turn / idle phases with sensor noise."""
+    rng = random.Random(seed)
+    k = 0
+    while True:
+        phase = (k // 100) % 3
+        throttle = (60, 60, 0)[phase]
+        steer = (0, 80, 0)[phase]
+        yield {
+            "ax": int(rng.gauss(300 if throttle else 0, 150)),
+            "ay": int(rng.gauss(0, 150)),
+            "az": int(rng.gauss(16384, 150)),
+            "gx": int(rng.gauss(0, 80)),
+            "gy": int(rng.gauss(0, 80)),
+            "gz": int(rng.gauss(3000 if steer else 0, 200)),
+            "dist_cm": 120 + int(40 * math.sin(k / 50.0)),
+            "throttle": throttle,
+            "steer": steer,
+        }
+        k += 1
+
+
+def run_edge(args) -> None:
+    got = []
+    scorer = EdgeScorer(args.engine_dir, bundle_dir=args.bundle, cpu_budget=args.cpu_budget, cpus=args.cpus, on_score=got.append)
+    scorer.start()
+    t0 = time.monotonic()
+    while scorer.state == "loading" and time.monotonic() - t0 < 60:
+        time.sleep(0.05)
+    if scorer.state != "running":
+        sys.exit(f"scorer did not start ({scorer.state})")
+
+    period = 1.0 / args.rate
+    frames = _frames()
+    seq = 0
+    t_next = time.monotonic()
+    t_end = t_next + args.seconds
+    while t_next < t_end:
+        seq += 1
+        scorer.push_frame({"seq": seq, "ts_ms": int(time.time() * 1000), **next(frames)})
+        t_next += period
+        time.sleep(max(0.0, t_next - time.monotonic()))
+    time.sleep(1.0)
+    m = scorer.metrics()
+    scorer.stop()
+
+    print(f"edge scorer: {scorer.info}")
+    print(f"{seq} frames @ {args.rate:.0f} Hz, CPU budget {args.cpu_budget}")
+    print(_summary("frame -> score (edge_ms)", [g["edge_ms"] for g in got]))
+    print(f"  scores {m['scores']}, dropped frames {m['frames_dropped']}, "
+          f"scorer CPU {m['cpu']} core, stride {m['stride']}")
+
+
+def run_rpi5(args) -> None:
+    import paho.mqtt.client as mqtt
+
+    sys.path.insert(0, os.path.abspath(args.engine_dir))
+    os.chdir(args.engine_dir)
+    from config import MODEL_FRAME_MS
+    from predictor_engine import PredictorEngine
+    from frame_resampler import FrameResampler
+
+    kw = {"bundle_dir": args.bundle} if args.bundle else {}
+    engine = PredictorEngine(**kw)
+    resampler = FrameResampler(MODEL_FRAME_MS)
+    local, edge, edge_own = [], [], []
+    lock = threading.Lock()
+
+    def on_message(c, u, msg):
+        now_ms = time.time() * 1000.0
+        data = json.loads(msg.payload)
+        if msg.topic == "mobility/anomaly/rpi4":
+            with lock:
+                edge.append(now_ms - data["ts_ms"])
+                edge_own.append(data["edge_ms"])
+            return
+        ticks, gap = resampler.push(data["ts_ms"])
+        if gap:
+            engine.reset()
+        score = None
+        for _ in range(ticks):
+            s = engine.update(data)
+            if s is not None:
+                score = s
+        if score is not None:
+            with lock:
+                local.append(time.time() * 1000.0 - data["ts_ms"])
+
+    client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
+    client.on_message = on_message
+    client.on_connect = lambda c, u, f, rc, p: (
+        c.subscribe("mobility/telemetry/parsed", qos=0),
+        c.subscribe("mobility/anomaly/rpi4", qos=0),
+    )
+    client.connect(args.broker, args.port)
+    client.loop_start()
+    time.sleep(args.seconds)
+    client.loop_stop()
+
+    print(f"RPi5 engine on {engine.device}, {args.seconds:.0f} s (latency vs gateway ts_ms, RPi5 clock)")
+    with lock:
+        print(_summary("RPi5: frame -> score", local))
+        print(_summary("edge: frame -> score on RPi5", edge))
+        print(_summary("edge: frame -> score on RPi4", edge_own))
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Edge vs RPi5 anomaly score latency")
+    p.add_argument("--role", choices=["edge", "rpi5"], required=True)
+    p.add_argument("--seconds", type=float, default=60.0)
+    p.add_argument("--rate", type=float, default=20.0, help="edge role: replay rate (Hz)")
+    p.add_argument("--engine-dir", default=DEFAULT_ENGINE_DIR)
+    p.add_argument("--bundle", default=None)
+    p.add_argument("--cpu-budget", type=float, default=0.3)
+    p.add_argument("--cpus", default=None)
+    p.add_argument("--broker", default=None, help="rpi5 role: MQTT broker")
+    p.add_argument("--port", type=int, default=1883)
+    args = p.parse_args()
+    if args.role == "edge":
+        run_edge(args)
+    else:
+        if not args.broker:
+            p.error("--role rpi5 needs --broker")
+        run_rpi5(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+bench_gesture_jitter.py
+
+Telemetry forwarding jitter with Gesture mode off / on, recognizer in
+the gateway process (--gesture-proc thread) vs. its own process.
+
+A fake MCU (separate process) writes ASCII $TEL lines into a pty every
+--period-ms, each carrying its own send time (CLOCK_MONOTONIC, shared by
+all processes) in the ax field. The bench reads the pty with the
+gateway's main loop (in_waiting / read / UartRx.feed /
+handle_uart_events: TTC guard, JSON, publish; no broker, so the publish
+call returns early) while a real GestureWorker runs, and reports
+MCU write -> frame handled per scenario:
+
+    gui      camera running, Gesture mode off (the idle gateway)
+    thread   Gesture mode, MediaPipe inside the gateway process
+    process  Gesture mode, MediaPipe in the gesture_proc.py child
+
+    python bench_gesture_jitter.py --seconds 30                         # RPi4, camera + gesture_recognizer.task
+    python bench_gesture_jitter.py --camera-backend file:cam.yuyv --model synthetic:25,8
+"""
+
+import os
+import sys
+import time
+import tty
+import argparse
+import subprocess
+
+import serial
+
+import gateway
+from gateway_metrics import setup_logging
+
+SCENARIOS = ("gui", "thread", "process")
+
+
+def run_mcu(fd: int, period_ms: float, seconds: float) -> None:
+    """Fake MCU: absolute schedule, actual send time (us) in ax, seq in ay."""
+    period = period_ms / 1000.0
+    t_next = time.monotonic()
+    t_end = t_next + seconds
+    seq = 0
+    while t_next < t_end:
+        t_next += period
+        time.sleep(max(0.0, t_next - time.monotonic()))
+        seq += 1
+        os.write(fd, f"$TEL,{time.monotonic_ns() // 1000},{seq},16384,0,0,0,200,0,0\r\n".encode())
+
+
+def _summary(label: str, vals: list[float]) -> str:
+    if not vals:
+        return f"  {label:10s} n=0"
+    v = sorted(vals)
+    p = lambda q: v[min(len(v) - 1, int(q * len(v)))]
+    late = sum(1 for x in v if x > 5.0)
+    return (f"  {label:10s} n={len(v):5d}  p50 {p(0.5):6.2f}  p99 {p(0.99):6.2f}  "
+            f"p99.9 {p(0.999):6.2f}  max {v[-1]:6.2f} ms  >5ms {late}")
+
+
+def run_scenario(name: str, args) -> dict:
+    gateway.set_mode(gateway.MODE_GUI if name == "gui" else gateway.MODE_GESTURE)
+    worker = gateway.GestureWorker(
+        model_path=args.model,
+        width=args.width,
+        height=args.height,
+        backend=args.camera_backend,
+        proc="thread" if name == "thread" else "process",
+        cpus=args.gesture_cpus,
+    )
+    worker.start()
+    # warm up: camera open, model loaded, first results (Gesture mode)
+    t0 = time.monotonic()
+    while time.monotonic() - t0 < args.warmup:
+        time.sleep(0.1)
+    if name != "gui" and worker.metrics().get("results", 0) == 0:
+        worker.stop()
+        worker.join(2.0)
+        sys.exit(f"{name}: no recognizer results after {args.warmup:.0f} s ({worker.metrics()})")
+
+    master, slave = os.openpty()
+    tty.setraw(slave)
+    tty.setraw(master)
+    ser = serial.Serial(os.ttyname(slave), gateway.BAUD_RATE, timeout=0)
+    os.close(slave)
+    mcu = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), "--mcu-fd", str(master),
+         "--period-ms", str(args.period_ms), "--seconds", str(args.seconds)],
+        pass_fds=(master,),
+    )
+
+    res0 = worker.metrics().get("results", 0)
+    cpu0, wall0 = time.process_time(), time.monotonic()
+    lat = []
+    # the gateway main loop body (UART part)
+    while mcu.poll() is None or ser.in_waiting:
+        waiting = ser.in_waiting
+        if waiting > 0:
+            events = gateway.uart_rx.feed(ser.read(waiting))
+            gateway.handle_uart_events(events)
+            t_done = time.monotonic_ns() // 1000
+            lat += [(t_done - v["ax"]) / 1000.0 for kind, v, _ in events if kind == "tel"]
+        time.sleep(0.001)
+    wall = time.monotonic() - wall0
+    cpu = (time.process_time() - cpu0) / wall
+
+    m = worker.metrics()
+    worker.stop()
+    worker.join(3.0)
+    ser.close()
+    os.close(master)
+    return {
+        "lat": lat,
+        "gateway_cpu": cpu,
+        "rec_fps": (m.get("results", 0) - res0) / wall,
+        "rec_cpu": m.get("cpu"),
+    }
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Telemetry jitter with the gesture recognizer in-process vs. child process")
+    p.add_argument("--scenario", action="append", choices=SCENARIOS, help="repeatable (default: all)")
+    p.add_argument("--seconds", type=float, default=30.0)
+    p.add_argument("--warmup", type=float, default=5.0)
+    p.add_argument("--period-ms", type=float, default=gateway.TEL_PERIOD_BOOST_MS, help="$TEL period (default: boost)")
+    p.add_argument("--model", default="gesture_recognizer.task", help="model path or synthetic:GRAPH_MS,GIL_MS")
+    p.add_argument("--camera-backend", default="auto")
+    p.add_argument("--width", type=int, default=320)
+    p.add_argument("--height", type=int, default=240)
+    p.add_argument("--gesture-cpus", default=None)
+    p.add_argument("--log-level", default="WARNING")
+    p.add_argument("--mcu-fd", type=int, default=None, help=argparse.SUPPRESS)
+    args = p.parse_args()
+
+    if args.mcu_fd is not None:
+        run_mcu(args.mcu_fd, args.period_ms, args.seconds)
+        return
+    if not gateway.GESTURE_AVAILABLE:
+        sys.exit("needs OpenCV (gesture dependencies)")
+    setup_logging(args.log_level, gateway.LOG_RATE_PER_SEC, gateway.LOG_RATE_BURST)
+
+    results = {name: run_scenario(name, args) for name in (args.scenario or SCENARIOS)}
+
+    print(f"$TEL every {args.period_ms:g} ms for {args.seconds:g} s, camera {args.camera_backend}, "
+          f"model {args.model}, {os.cpu_count()} CPU")
+    print("MCU write -> frame handled by the gateway loop:")
+    for name, r in results.items():
+        print(_summary(name, r["lat"]))
+    for name, r in results.items():
+        rec = f", recognizer {r['rec_fps']:.1f} results/s" if name != "gui" else ""
+        child = f", child CPU {r['rec_cpu']:.2f}" if r["rec_cpu"] is not None else ""
+        print(f"  {name:10s} gateway CPU {r['gateway_cpu']:.2f}{rec}{child}")
+
+
+if __name__ == "__main__":
+    main()
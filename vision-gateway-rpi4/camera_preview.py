@@ -0,0 +1,358 @@
+"""
+camera_preview.py
+
+Downscaled JPEG preview of the gesture camera (gateway.py --preview).
+
+GestureWorker asks due() for every captured frame and hands the due ones
+to PreviewEncoder.offer() on its own thread. offer() resizes the frame
+(INTER_AREA) into one of two preallocated slots; mirroring / RGB->BGR,
+JPEG encoding and the MQTT publish run on the encoder thread.
+Both cv2 calls release the GIL, so recognition never waits on the
+preview:
+
+- latest wins: a frame that is not encoded yet is overwritten by the
+  next one (counted as "replaced"), the slot being encoded is never
+  written
+- frame skipping: frames arriving before the next due time return after
+  a clock read; the interval is max(1 / max_fps, cost / cpu_budget),
+  where cost is the encoder thread's CPU time per frame (EWMA), so a
+  slow core lowers the preview rate instead of taking CPU from the
+  recognizer
+- adaptive quality: after each frame the JPEG quality moves by
+  QUALITY_STEP toward the per-frame byte budget (target_kbps / fps)
+
+Demand: in "demand" mode frames are only taken while a viewer holds a
+lease (request(True), refreshed by the GUI every few seconds); "always"
+encodes regardless.
+
+Payload (MQTT, QoS 0): HEADER + JPEG bytes
+    magic b"PV" | version u8 | quality u8 | seq u32 |
+    ts_ms i64 (capture, wall clock) | width u16 | height u16 |
+    pub_ms u16 (capture -> publish on the gateway)
+The GUI (camera_view.py) keeps a copy of this layout.
+
+    python camera_preview.py            # encode cost / offer cost on synthetic frames
+    python camera_preview.py --video 0  # same, frames from a camera
+"""
+
+import time
+import struct
+import logging
+import threading
+
+import numpy as np
+
+try:
+    import cv2
+except Exception:  # gateway.py checks the gesture dependencies itself
+    cv2 = None
+
+log = logging.getLogger("gateway")
+
+HEADER = struct.Struct("<2sBBIqHHH")
+MAGIC = b"PV"
+VERSION = 1
+
+MODES = ("off", "demand", "always")
+
+QUALITY_STEP = 5
+COST_ALPHA = 0.2
+
+
+class PreviewEncoder(threading.Thread):
+    def __init__(
+        self,
+        publish,
+        width: int = 160,
+        height: int = 120,
+        max_fps: float = 10.0,
+        target_kbps: float = 400.0,
+        cpu_budget: float = 0.1,
+        quality: int = 60,
+        min_quality: int = 20,
+        max_quality: int = 85,
+        mirror: bool = True,
+        rgb: bool = False,
+        mode: str = "demand",
+        lease_sec: float = 5.0,
+        observe=None,
+    ):
+        """
+        publish(payload: bytes) : hands one preview frame to MQTT (encoder thread),
+                                  returns False if the client rejected it
+        target_kbps             : JPEG byte budget, sets the quality
+        cpu_budget              : encoder CPU time per wall second (1.0 = one core)
+        mirror                  : flip horizontally like the recognizer input
+        rgb                     : frames are RGB (capture.py sources, already mirrored)
+        lease_sec               : "demand" mode viewer lease
+        observe(name, dt_ns)    : optional histogram sink ("preview_offer", "preview_encode")
+        """
+        super().__init__(daemon=True, name="PreviewEncoder")
+        if mode not in MODES:
+            raise ValueError(f"unknown preview mode: {mode}")
+        self._publish = publish
+        self.size = (int(width), int(height))
+        self.max_fps = float(max_fps)
+        self.target_kbps = float(target_kbps)
+        self.cpu_budget = float(cpu_budget)
+        self.quality = int(quality)
+        self.min_quality = int(min_quality)
+        self.max_quality = int(max_quality)
+        self.mirror = bool(mirror)
+        self.rgb = bool(rgb)
+        self.mode = mode
+        self.lease_sec = float(lease_sec)
+        self._observe = observe
+
+        w, h = self.size
+        self._slots = [np.empty((h, w, 3), np.uint8), np.empty((h, w, 3), np.uint8)]
+        self._work = np.empty((h, w, 3), np.uint8)
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._stop_evt = threading.Event()
+        self._pending = None      # (slot, ts_ms) not encoded yet
+        self._reading = -1        # slot the encoder is working on
+
+        self._viewer_until = 0.0
+        self._next_due = 0.0
+        self._interval = 1.0 / self.max_fps
+        self._cost = 0.0          # encoder CPU seconds per frame (EWMA)
+        self._seq = 0
+
+        self.stats = {
+            "offered": 0,
+            "skipped": 0,
+            "replaced": 0,
+            "encoded": 0,
+            "publish_fail": 0,
+            "bytes": 0,
+            "bytes_last": 0,
+            "enc_ms_last": None,
+        }
+        self._cpu_win = (time.monotonic(), 0.0)
+        self._cpu = 0.0
+        self._thread_cpu = 0.0
+
+    # --------------------------------------------------
+    # Demand (MQTT thread)
+    # --------------------------------------------------
+    def request(self, on: bool, now: float | None = None) -> None:
+        """Viewer lease: on=True (re)starts it for lease_sec, False ends it."""
+        if now is None:
+            now = time.monotonic()
+        self._viewer_until = now + self.lease_sec if on else 0.0
+
+    def active(self, now: float | None = None) -> bool:
+        if self.mode == "always":
+            return True
+        if self.mode == "off":
+            return False
+        if now is None:
+            now = time.monotonic()
+        return now < self._viewer_until
+
+    # --------------------------------------------------
+    # Input (capture thread)
+    # --------------------------------------------------
+    def due(self, now: float | None = None) -> bool:
+        """Whether the next captured frame would be taken (lets the caller skip preparing it)."""
+        if now is None:
+            now = time.monotonic()
+        if now < self._next_due or not self.active(now):
+            self.stats["skipped"] += 1
+            return False
+        return True
+
+    def offer(self, frame: np.ndarray, ts_ms: int) -> None:
+        """One captured frame; returns without copying unless a preview frame is due."""
+        now = time.monotonic()
+        if not self.due(now):
+            return
+        t0 = time.perf_counter_ns()
+        # keep a fixed grid so capture jitter does not round 10 fps down to 7.5
+        self._next_due = max(self._next_due + self._interval, now)
+        self.stats["offered"] += 1
+
+        with self._lock:
+            idx = 1 - self._reading if self._reading >= 0 else 0
+            if self._pending is not None:
+                self.stats["replaced"] += 1
+            # resize straight into the slot; a caller frame is never kept
+            cv2.resize(frame, self.size, dst=self._slots[idx], interpolation=cv2.INTER_AREA)
+            self._pending = (idx, int(ts_ms))
+        self._ready.set()
+        if self._observe is not None:
+            self._observe("preview_offer", time.perf_counter_ns() - t0)
+
+    # --------------------------------------------------
+    # Encoder thread
+    # --------------------------------------------------
+    def run(self) -> None:
+        while not self._stop_evt.is_set():
+            if not self._ready.wait(0.5):
+                continue
+            self._ready.clear()
+            with self._lock:
+                job = self._pending
+                self._pending = None
+                if job is None:
+                    continue
+                self._reading = job[0]
+            try:
+                self._encode(*job)
+            except Exception as e:
+                log.warning(f"[PREVIEW] Encode failed: {e}", extra={"rl": "preview"})
+            finally:
+                with self._lock:
+                    self._reading = -1
+
+    def _encode(self, idx: int, ts_ms: int) -> None:
+        t0 = time.perf_counter_ns()
+        c0 = time.thread_time()
+        img = self._slots[idx]
+        if self.mirror:
+            cv2.flip(img, 1, dst=self._work)
+            img = self._work
+        if self.rgb:
+            # imencode expects BGR
+            cv2.cvtColor(img, cv2.COLOR_RGB2BGR, dst=self._work)
+            img = self._work
+        ok, jpg = cv2.imencode(".jpg", img, (cv2.IMWRITE_JPEG_QUALITY, self.quality))
+        if not ok:
+            return
+        self._seq = (self._seq + 1) & 0xFFFFFFFF
+        w, h = self.size
+        pub_ms = min(max(int(time.time() * 1000) - ts_ms, 0), 0xFFFF)
+        # the payload stays with paho until it is sent, so it is a new object per frame
+        payload = HEADER.pack(MAGIC, VERSION, self.quality, self._seq, ts_ms, w, h, pub_ms) + jpg.tobytes()
+        if not self._publish(payload):
+            self.stats["publish_fail"] += 1
+        cost = time.thread_time() - c0
+        enc_ns = time.perf_counter_ns() - t0
+
+        n = len(jpg)
+        self.stats["encoded"] += 1
+        self.stats["bytes"] += n
+        self.stats["bytes_last"] = n
+        self.stats["enc_ms_last"] = round(enc_ns / 1e6, 3)
+        if self._observe is not None:
+            self._observe("preview_encode", enc_ns)
+        self._thread_cpu += cost
+        self._adapt(cost, n)
+
+    def _adapt(self, cost: float, nbytes: int) -> None:
+        self._cost = cost if self._cost == 0.0 else self._cost + COST_ALPHA * (cost - self._cost)
+        min_interval = 1.0 / self.max_fps
+        if self.cpu_budget > 0:
+            self._interval = max(min_interval, self._cost / self.cpu_budget)
+        else:
+            self._interval = min_interval
+
+        budget = self.target_kbps * 1000.0 / 8.0 * self._interval
+        if nbytes > budget * 1.15 and self.quality > self.min_quality:
+            self.quality = max(self.min_quality, self.quality - QUALITY_STEP)
+        elif nbytes < budget * 0.75 and self.quality < self.max_quality:
+            self.quality = min(self.max_quality, self.quality + QUALITY_STEP)
+
+    def stop(self) -> None:
+        self._stop_evt.set()
+        self._ready.set()
+
+    def metrics(self) -> dict:
+        now = time.monotonic()
+        t_win, cpu_win = self._cpu_win
+        if now - t_win >= 1.0:
+            self._cpu = (self._thread_cpu - cpu_win) / (now - t_win)
+            self._cpu_win = (now, self._thread_cpu)
+        return {
+            "mode": self.mode,
+            "active": self.active(now),
+            "size": f"{self.size[0]}x{self.size[1]}",
+            "fps_limit": round(1.0 / self._interval, 1),
+            "quality": self.quality,
+            "cpu": round(self._cpu, 3),
+            **self.stats,
+        }
+
+
+# ---------------- Benchmark ----------------
+def _bench(argv: list[str] | None = None) -> None:
+    import argparse
+
+    p = argparse.ArgumentParser(description="Preview encoder cost (offer on the capture thread, encode on its own)")
+    p.add_argument("--video", default=None, help="camera index or video file (default: synthetic frames)")
+    p.add_argument("--capture", default="320x240", help="capture size of synthetic frames (default: 320x240)")
+    p.add_argument("--size", default="160x120", help="preview size (default: 160x120)")
+    p.add_argument("--fps", type=float, default=30.0, help="capture rate to simulate (default: 30)")
+    p.add_argument("--max-fps", type=float, default=10.0)
+    p.add_argument("--kbps", type=float, default=400.0)
+    p.add_argument("--cpu-budget", type=float, default=0.1)
+    p.add_argument("--seconds", type=float, default=10.0)
+    args = p.parse_args(argv)
+
+    cw, ch = (int(v) for v in args.capture.split("x"))
+    pw, ph = (int(v) for v in args.size.split("x"))
+
+    cap = None
+    if args.video is not None:
+        cap = cv2.VideoCapture(int(args.video) if args.video.isdigit() else args.video)
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, cw)
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, ch)
+
+    # synthetic scene: gradient + moving block + noise (noise keeps the JPEG honest)
+    rng = np.random.default_rng(0)
+    yy, xx = np.mgrid[0:ch, 0:cw]
+    base = np.dstack([(xx * 255 // cw), (yy * 255 // ch), ((xx + yy) * 255 // (cw + ch))]).astype(np.uint8)
+
+    sizes = []
+    offer_ns = []
+    due_ns = []
+    enc = PreviewEncoder(
+        lambda payload: sizes.append(len(payload)) or True,
+        width=pw, height=ph, max_fps=args.max_fps, target_kbps=args.kbps,
+        cpu_budget=args.cpu_budget, mode="always",
+        observe=lambda name, ns: due_ns.append(ns) if name == "preview_offer" else None,
+    )
+    enc.start()
+
+    period = 1.0 / args.fps
+    frames = 0
+    t_next = t0 = time.monotonic()
+    while time.monotonic() - t0 < args.seconds:
+        if cap is not None:
+            ok, frame = cap.read()
+            if not ok:
+                break
+        else:
+            frame = base.copy()
+            x = int((frames * 4) % max(1, cw - 40))
+            frame[ch // 3:ch // 3 + 40, x:x + 40] = (30, 200, 240)
+            frame += rng.integers(0, 12, frame.shape, dtype=np.uint8)
+        t = time.perf_counter_ns()
+        enc.offer(frame, int(time.time() * 1000))
+        offer_ns.append(time.perf_counter_ns() - t)
+        frames += 1
+        if cap is None:
+            t_next += period
+            time.sleep(max(0.0, t_next - time.monotonic()))
+    wall = time.monotonic() - t0
+    time.sleep(0.2)
+    enc.stop()
+    m = enc.metrics()
+
+    def pct(vals, q):
+        v = sorted(vals)
+        return v[min(len(v) - 1, int(q * len(v)))] if v else 0
+
+    print(f"capture {cw}x{ch} @ {frames / wall:.1f} fps -> preview {pw}x{ph}, {m['encoded']} frames "
+          f"({m['encoded'] / wall:.1f} fps), quality {m['quality']}, "
+          f"{sum(sizes) / max(1, len(sizes)) / 1024:.1f} KiB/frame, {sum(sizes) * 8 / wall / 1000:.0f} kbit/s")
+    print(f"  encoder thread CPU {enc._thread_cpu / wall:.3f} core "
+          f"({enc._thread_cpu / max(1, m['encoded']) * 1000:.2f} ms/frame)")
+    print(f"  offer() all calls p50 {pct(offer_ns, 0.5) / 1000:.1f} us  max {max(offer_ns) / 1000:.1f} us, "
+          f"due frames (resize) p50 {pct(due_ns, 0.5) / 1000:.1f} us  p99 {pct(due_ns, 0.99) / 1000:.1f} us   "
+          f"skipped {m['skipped']}, replaced {m['replaced']}")
+
+
+if __name__ == "__main__":
+    _bench()
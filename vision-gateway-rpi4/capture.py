@@ -0,0 +1,491 @@
+"""
+capture.py
+
+Camera capture backends for GestureWorker (gateway.py --camera-backend).
+
+A source splits capture from frame preparation:
+    read()  -> grab the next frame in the camera's own format (reused buffer)
+    rgb()   -> the same frame as mirrored RGB for MediaPipe / the preview,
+               converted at most once per read() into a preallocated buffer
+So frames nobody looks at (GUI mode without a preview viewer, recognizer
+busy) are never converted.
+
+Backends:
+- OpenCvSource ("opencv"): cv2.VideoCapture with its default BGR output
+  (the previous path, and the fallback). Prep = BGR->RGB into the
+  preallocated buffer, then an in-place flip.
+- V4l2Source ("v4l2" / "v4l2-mjpg"): asks V4L2 for YUYV or MJPEG with
+  CAP_PROP_CONVERT_RGB off, so OpenCV does not convert to BGR first.
+  YUYV is converted straight to RGB by one cvtColor into the output
+  buffer; MJPEG is decoded straight to RGB (IMREAD_COLOR_RGB). Mirroring
+  is set on the sensor (V4L2_CID_HFLIP) when the driver has it, so the
+  conversion is the only pass; otherwise the RGB buffer is flipped in
+  place. OpenCV has no single convert+mirror call, and a numpy gather
+  that mirrors the packed YUYV is slower than the in-cache flip.
+- File sources ("file:PATH"), fake cameras for tests / benchmarks, looped
+  and paced to `fps`: YuyvFileSource replays a raw YUYV dump (*.yuyv,
+  width*height*2 bytes per frame, see --record) through the same
+  conversion as V4l2Source; VideoFileSource opens anything
+  cv2.VideoCapture can (video file, image sequence) and prepares it like
+  OpenCvSource.
+
+"auto" tries V4L2 YUYV and falls back to OpenCV.
+
+    python capture.py --backend opencv --backend v4l2 --seconds 10   # prep cost per backend
+    python capture.py --record cam.yuyv --seconds 5                  # raw dump for FileSource
+    python capture.py --backend file:cam.yuyv --backend file:cam.mp4
+"""
+
+import os
+import time
+import fcntl
+import struct
+import logging
+
+import numpy as np
+
+try:
+    import cv2
+except Exception:  # gateway.py checks the gesture dependencies itself
+    cv2 = None
+
+log = logging.getLogger("gateway")
+
+BACKENDS = ("auto", "opencv", "v4l2", "v4l2-mjpg")
+
+# linux/videodev2.h
+VIDIOC_G_CTRL = 0xC008561B
+VIDIOC_S_CTRL = 0xC008561C
+V4L2_CID_HFLIP = 0x00980914
+_V4L2_CONTROL = struct.Struct("<Ii")
+
+
+# decode MJPEG straight to RGB (OpenCV >= 4.10)
+_IMREAD_RGB = getattr(cv2, "IMREAD_COLOR_RGB", None) if cv2 is not None else None
+
+
+class CaptureError(RuntimeError):
+    pass
+
+
+def _fourcc(code: str) -> int:
+    return cv2.VideoWriter_fourcc(*code)
+
+
+def _fourcc_str(value: float) -> str:
+    v = int(value)
+    return "".join(chr((v >> (8 * i)) & 0xFF) for i in range(4))
+
+
+def v4l2_ctrl(device: str, cid: int, value: int | None = None) -> int | None:
+    """Read (value=None) or set a V4L2 control; None if the driver refuses it."""
+    try:
+        fd = os.open(device, os.O_RDWR | os.O_NONBLOCK)
+    except OSError:
+        return None
+    try:
+        if value is None:
+            buf = bytearray(_V4L2_CONTROL.pack(cid, 0))
+            fcntl.ioctl(fd, VIDIOC_G_CTRL, buf)
+            return _V4L2_CONTROL.unpack(buf)[1]
+        fcntl.ioctl(fd, VIDIOC_S_CTRL, bytearray(_V4L2_CONTROL.pack(cid, int(value))))
+        return int(value)
+    except OSError:
+        return None
+    finally:
+        os.close(fd)
+
+
+# ---------------- Sources ----------------
+class FrameSource:
+    name = "base"
+
+    def __init__(self, width: int, height: int, mirror: bool = True, observe=None):
+        """
+        mirror               : selfie view (what the recognizer was tuned on)
+        observe(name, dt_ns) : optional histogram sink ("frame_prep")
+        """
+        self.width = int(width)
+        self.height = int(height)
+        self.mirror = bool(mirror)
+        self._observe = observe
+        self._rgb = None
+        self._fresh = False
+        self.info = {}
+
+    def open(self) -> None:
+        raise NotImplementedError
+
+    def is_open(self) -> bool:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+    def read(self) -> bool:
+        """Grab the next frame; False when none is available (caller retries)."""
+        ok = self._grab()
+        self._fresh = ok
+        return ok
+
+    def rgb(self) -> np.ndarray:
+        """
+        The last read() frame as mirrored RGB (h, w, 3). The buffer is
+        reused: it is valid until the next read(). mp.Image copies it.
+        """
+        if self._fresh:
+            t0 = time.perf_counter_ns()
+            self._prepare()
+            self._fresh = False
+            if self._observe is not None:
+                self._observe("frame_prep", time.perf_counter_ns() - t0)
+        return self._rgb
+
+    def _alloc(self, h: int, w: int) -> None:
+        """(Re)allocate the RGB buffer; only when the frame size changes."""
+        if self._rgb is None or self._rgb.shape[:2] != (h, w):
+            self._rgb = np.empty((h, w, 3), np.uint8)
+
+    def _grab(self) -> bool:
+        raise NotImplementedError
+
+    def _prepare(self) -> None:
+        raise NotImplementedError
+
+
+class OpenCvSource(FrameSource):
+    """cv2.VideoCapture default output (BGR): flip + BGR->RGB into preallocated buffers."""
+
+    name = "opencv"
+
+    def __init__(self, camera: int | str, width: int, height: int, mirror: bool = True, observe=None):
+        super().__init__(width, height, mirror, observe)
+        self.camera = camera
+        self._cap = None
+        self._bgr = None
+
+    def open(self) -> None:
+        self._cap = cv2.VideoCapture(self.camera)
+        if not self._cap.isOpened():
+            raise CaptureError(f"cannot open camera {self.camera!r}")
+        self._cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+        self._cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+        try:
+            self._cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        except Exception:
+            pass
+        self.info = {"backend": self.name, "format": "BGR", "mirror": "sw" if self.mirror else "off"}
+
+    def is_open(self) -> bool:
+        return self._cap is not None and self._cap.isOpened()
+
+    def close(self) -> None:
+        if self._cap is not None:
+            self._cap.release()
+
+    def _grab(self) -> bool:
+        # read() writes into the previous array when the size still matches
+        ok, frame = self._cap.read(self._bgr)
+        if not ok or frame is None:
+            return False
+        self._bgr = frame
+        return True
+
+    def _prepare(self) -> None:
+        self._alloc(*self._bgr.shape[:2])
+        cv2.cvtColor(self._bgr, cv2.COLOR_BGR2RGB, dst=self._rgb)
+        if self.mirror:
+            cv2.flip(self._rgb, 1, dst=self._rgb)
+
+
+class V4l2Source(FrameSource):
+    """V4L2 YUYV / MJPEG without OpenCV's BGR conversion; sensor mirroring when available."""
+
+    def __init__(self, index: int, width: int, height: int, fourcc: str = "YUYV", mirror: bool = True, observe=None):
+        super().__init__(width, height, mirror, observe)
+        self.index = int(index)
+        self.device = f"/dev/video{self.index}"
+        self.fourcc = fourcc
+        self.name = "v4l2" if fourcc == "YUYV" else "v4l2-mjpg"
+        self._cap = None
+        self._raw = None
+        self._hw_flip = False
+        self._hflip_prev = None
+
+    def open(self) -> None:
+        self._cap = cv2.VideoCapture(self.index, cv2.CAP_V4L2)
+        if not self._cap.isOpened():
+            raise CaptureError(f"cannot open {self.device} with V4L2")
+        self._cap.set(cv2.CAP_PROP_FOURCC, _fourcc(self.fourcc))
+        self._cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+        self._cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+        self._cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        self._cap.set(cv2.CAP_PROP_CONVERT_RGB, 0)
+
+        got = _fourcc_str(self._cap.get(cv2.CAP_PROP_FOURCC))
+        if got != self.fourcc:
+            self._cap.release()
+            raise CaptureError(f"{self.device} does not deliver {self.fourcc} (got {got!r})")
+        self.width = int(self._cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.height = int(self._cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        self._alloc(self.height, self.width)
+
+        if self.mirror:
+            self._hflip_prev = v4l2_ctrl(self.device, V4L2_CID_HFLIP)
+            self._hw_flip = self._hflip_prev is not None and v4l2_ctrl(self.device, V4L2_CID_HFLIP, 1) == 1
+        self.info = {
+            "backend": self.name,
+            "format": self.fourcc,
+            "size": f"{self.width}x{self.height}",
+            "mirror": ("sensor" if self._hw_flip else "sw") if self.mirror else "off",
+        }
+
+    def is_open(self) -> bool:
+        return self._cap is not None and self._cap.isOpened()
+
+    def close(self) -> None:
+        if self._cap is not None:
+            self._cap.release()
+        if self._hw_flip and self._hflip_prev is not None:
+            v4l2_ctrl(self.device, V4L2_CID_HFLIP, self._hflip_prev)
+
+    def _grab(self) -> bool:
+        # CONVERT_RGB off: one row of raw bytes (YUYV frame / JPEG stream)
+        ok, raw = self._cap.read(self._raw)
+        if not ok or raw is None or raw.size == 0:
+            return False
+        self._raw = raw
+        return True
+
+    def _prepare(self) -> None:
+        sw_flip = self.mirror and not self._hw_flip
+        if self.fourcc == "YUYV":
+            n = self.height * self.width * 2
+            yuyv = self._raw.reshape(-1)[:n].reshape(self.height, self.width, 2)
+            cv2.cvtColor(yuyv, cv2.COLOR_YUV2RGB_YUYV, dst=self._rgb)
+            if sw_flip:
+                cv2.flip(self._rgb, 1, dst=self._rgb)
+            return
+
+        # imdecode has no dst argument, so the decoded frame is copied (or flipped) into the buffer
+        if _IMREAD_RGB is not None:
+            img = cv2.imdecode(self._raw.reshape(-1), _IMREAD_RGB)
+        else:
+            img = cv2.imdecode(self._raw.reshape(-1), cv2.IMREAD_COLOR)
+            if img is not None:
+                cv2.cvtColor(img, cv2.COLOR_BGR2RGB, dst=img)
+        if img is None:
+            return
+        self._alloc(*img.shape[:2])
+        if sw_flip:
+            cv2.flip(img, 1, dst=self._rgb)
+        else:
+            np.copyto(self._rgb, img)
+
+
+class _Pacer:
+    """Replays a file at `fps` (0 = as fast as read() is called)."""
+
+    def __init__(self, fps: float):
+        self.fps = float(fps)
+        self._next = time.monotonic()
+
+    def wait(self) -> None:
+        if self.fps <= 0:
+            return
+        self._next += 1.0 / self.fps
+        delay = self._next - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        else:
+            self._next = time.monotonic()
+
+
+class VideoFileSource(OpenCvSource):
+    """Fake camera: video file / image / image sequence through the OpenCV path, looped."""
+
+    name = "file"
+
+    def __init__(self, path: str, width: int, height: int, fps: float = 30.0, loop: bool = True,
+                 mirror: bool = True, observe=None):
+        super().__init__(path, width, height, mirror, observe)
+        self.pacer = _Pacer(fps)
+        self.loop = loop
+
+    def open(self) -> None:
+        super().open()
+        self.info = {**self.info, "backend": self.name, "path": self.camera}
+
+    def _grab(self) -> bool:
+        self.pacer.wait()
+        if super()._grab():
+            return True
+        if not self.loop:
+            return False
+        self._cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        return super()._grab()
+
+
+class YuyvFileSource(FrameSource):
+    """Fake camera: raw YUYV dump (--record), converted like V4l2Source, looped."""
+
+    name = "file-yuyv"
+
+    def __init__(self, path: str, width: int, height: int, fps: float = 30.0, loop: bool = True,
+                 mirror: bool = True, observe=None):
+        super().__init__(width, height, mirror, observe)
+        self.path = path
+        self.pacer = _Pacer(fps)
+        self.loop = loop
+        self._f = None
+        self._buf = np.empty((self.height, self.width, 2), np.uint8)
+
+    def open(self) -> None:
+        if os.path.getsize(self.path) < self._buf.nbytes:
+            raise CaptureError(f"{self.path}: shorter than one {self.width}x{self.height} YUYV frame")
+        self._f = open(self.path, "rb")
+        self._alloc(self.height, self.width)
+        self.info = {"backend": self.name, "path": self.path, "format": "YUYV", "mirror": "sw" if self.mirror else "off"}
+
+    def is_open(self) -> bool:
+        return self._f is not None
+
+    def close(self) -> None:
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+
+    def _grab(self) -> bool:
+        self.pacer.wait()
+        if self._f.readinto(self._buf) == self._buf.nbytes:
+            return True
+        if not self.loop:
+            return False
+        self._f.seek(0)
+        return self._f.readinto(self._buf) == self._buf.nbytes
+
+    def _prepare(self) -> None:
+        cv2.cvtColor(self._buf, cv2.COLOR_YUV2RGB_YUYV, dst=self._rgb)
+        if self.mirror:
+            cv2.flip(self._rgb, 1, dst=self._rgb)
+
+
+def open_capture(spec: str, camera: int, width: int, height: int, mirror: bool = True, observe=None) -> FrameSource:
+    """
+    spec: "auto" | "opencv" | "v4l2" | "v4l2-mjpg" | "file:PATH".
+    Raises CaptureError (or OSError) when the requested source cannot open;
+    "auto" only raises if the OpenCV fallback fails too.
+    """
+    if cv2 is None:
+        raise CaptureError("OpenCV is not installed")
+    if spec.startswith("file:"):
+        path = spec[5:]
+        cls = YuyvFileSource if path.lower().endswith((".yuyv", ".yuv")) else VideoFileSource
+        src = cls(path, width, height, mirror=mirror, observe=observe)
+        src.open()
+        return src
+    if spec not in BACKENDS:
+        raise CaptureError(f"unknown capture backend: {spec}")
+
+    if spec in ("auto", "v4l2", "v4l2-mjpg"):
+        fourcc = "MJPG" if spec == "v4l2-mjpg" else "YUYV"
+        src = V4l2Source(camera, width, height, fourcc=fourcc, mirror=mirror, observe=observe)
+        try:
+            src.open()
+            return src
+        except CaptureError as e:
+            if spec != "auto":
+                raise
+            log.info(f"[CAMERA] V4L2 {fourcc} unavailable ({e}); using OpenCV default capture")
+
+    src = OpenCvSource(camera, width, height, mirror=mirror, observe=observe)
+    src.open()
+    return src
+
+
+# ---------------- Benchmark ----------------
+def _legacy_prep(bgr: np.ndarray) -> np.ndarray:
+    """The previous GestureWorker prep: two allocating full-frame passes."""
+    return cv2.cvtColor(cv2.flip(bgr, 1), cv2.COLOR_BGR2RGB)
+
+
+def _packed_yuyv(src: FrameSource) -> np.ndarray | None:
+    """The raw frame of a YUYV source (the previous path converted it to BGR inside read())."""
+    if isinstance(src, YuyvFileSource):
+        return src._buf
+    if isinstance(src, V4l2Source) and src.fourcc == "YUYV":
+        return src._raw.reshape(-1)[:src.height * src.width * 2].reshape(src.height, src.width, 2)
+    return None
+
+
+def _bench(argv: list[str] | None = None) -> None:
+    import argparse
+
+    p = argparse.ArgumentParser(description="Frame prep cost per capture backend")
+    p.add_argument("--backend", action="append", default=None,
+                   help="auto / opencv / v4l2 / v4l2-mjpg / file:PATH (repeatable, default: opencv + v4l2)")
+    p.add_argument("--camera", type=int, default=0)
+    p.add_argument("--size", default="320x240")
+    p.add_argument("--seconds", type=float, default=10.0)
+    p.add_argument("--record", default=None, help="write raw V4L2 YUYV frames to this file instead")
+    args = p.parse_args(argv)
+    w, h = (int(v) for v in args.size.split("x"))
+
+    if args.record:
+        src = V4l2Source(args.camera, w, h, mirror=False)
+        src.open()
+        n = 0
+        with open(args.record, "wb") as f:
+            t_end = time.monotonic() + args.seconds
+            while time.monotonic() < t_end:
+                if src.read():
+                    f.write(src._raw.tobytes())
+                    n += 1
+        src.close()
+        print(f"{n} frames {src.width}x{src.height} YUYV -> {args.record} (replay: --backend file:{args.record} --size {src.width}x{src.height})")
+        return
+
+    def pct(v, q):
+        return v[min(len(v) - 1, int(q * len(v)))] / 1000.0 if v else 0.0
+
+    for spec in args.backend or ["opencv", "v4l2"]:
+        prep = []
+        try:
+            src = open_capture(spec, args.camera, w, h, observe=lambda name, ns: prep.append(ns))
+        except (CaptureError, OSError) as e:
+            print(f"{spec:16s} unavailable: {e}")
+            continue
+        if isinstance(src, (VideoFileSource, YuyvFileSource)):
+            src.pacer.fps = 0.0
+        legacy = []
+        reads = []
+        n = 0
+        t_end = time.monotonic() + args.seconds
+        while time.monotonic() < t_end:
+            t0 = time.perf_counter_ns()
+            if not src.read():
+                break
+            reads.append(time.perf_counter_ns() - t0)
+            rgb = src.rgb()
+            n += 1
+            # same frame through the previous path, for comparison
+            yuyv = _packed_yuyv(src)
+            bgr = cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR) if yuyv is None else None
+            t0 = time.perf_counter_ns()
+            if yuyv is not None:
+                bgr = cv2.cvtColor(yuyv, cv2.COLOR_YUV2BGR_YUYV)
+            _legacy_prep(bgr)
+            legacy.append(time.perf_counter_ns() - t0)
+        src.close()
+        prep.sort()
+        legacy.sort()
+        reads.sort()
+        print(f"{spec:16s} {src.info}  {n} frames")
+        print(f"  {'prep (-> mirrored RGB)':36s} p50 {pct(prep, 0.5):7.1f} us  p99 {pct(prep, 0.99):7.1f} us")
+        label = "previous (YUYV->BGR, flip, cvtColor)" if _packed_yuyv(src) is not None else "previous (flip, cvtColor)"
+        print(f"  {label:36s} p50 {pct(legacy, 0.5):7.1f} us  p99 {pct(legacy, 0.99):7.1f} us")
+        print(f"  {'read()':36s} p50 {pct(reads, 0.5):7.1f} us  (includes waiting for the camera)")
+
+
+if __name__ == "__main__":
+    _bench()
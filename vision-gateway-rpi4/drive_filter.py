@@ -0,0 +1,183 @@
+"""
+drive_filter.py
+
+Latest-value filter for GUI drive commands (mobility/control/drive).
+
+Commands carry the publisher's seq, its wall-clock ts_ms and a ttl_ms.
+The RPi5 and RPi4 clocks are not assumed to agree, so ts_ms is never
+compared with the local clock directly.
+
+Ordering (seq):
+- A command is applied only if its seq is newer than the last applied
+  one (serial-number arithmetic mod 2**32, so a wrap is "newer").
+- A seq more than reset_gap behind, or any seq after reset_idle_sec
+  without an applied command, is a publisher restart: accepted, and
+  ordering starts over from it.
+- Publishers without seq (dataset-collect) are applied in arrival order.
+
+Expiry (ts_ms + local receive time):
+- offset = min(local receive ms - ts_ms) over the last offset_window_sec
+  is the clock offset plus the fastest recent transit.
+- age = (local receive ms - ts_ms) - offset is how much later than the
+  best recent command this one arrived, measured on the local clock. A
+  command expires when age > ttl_ms.
+- Any constant offset between the clocks cancels out. A forward step of
+  the publisher's clock is learned at once (a new minimum). After a
+  backward step, commands read as late until the old samples leave the
+  window, so the gateway drops them and the lease ramps the car down.
+- After a pause longer than offset_window_sec nothing is expired until
+  commands have flowed for a full window again, so a command (or a
+  burst) arriving alone after the pause is measured against the last
+  learned offset rather than against itself.
+"""
+
+import time
+from collections import deque
+
+SEQ_MOD = 1 << 32
+
+
+class DriveFilter:
+    def __init__(
+        self,
+        default_ttl_ms: int = 300,
+        reset_gap: int = 1000,
+        reset_idle_sec: float = 1.0,
+        offset_window_sec: float = 2.0,
+        clock=time.monotonic,
+        wall=time.time,
+    ):
+        """
+        default_ttl_ms    : commands without their own ttl_ms
+        reset_gap         : backward seq jump read as a publisher restart
+        reset_idle_sec    : after this long without an applied command any seq restarts ordering
+        offset_window_sec : clock offset = minimum over this window
+        """
+        self.default_ttl_ms = int(default_ttl_ms)
+        self.reset_gap = int(reset_gap)
+        self.reset_idle_sec = float(reset_idle_sec)
+        self.offset_window_sec = float(offset_window_sec)
+        self._clock = clock
+        self._wall = wall
+
+        self._last_seq = None
+        self._last_applied = None
+        self._samples = deque()   # (local monotonic, receive ms - ts_ms)
+        self._last_sample = None
+        self._resumed_at = None   # first sample after a pause > offset_window_sec
+        self.offset_ms = None
+        self.stats = {"applied": 0, "expired": 0, "stale": 0, "resets": 0}
+
+    def age_ms(self, ts_ms: int, now: float | None = None, now_ms: float | None = None) -> float:
+        """Learn from one ts_ms and return its age on the local clock (see module docstring)."""
+        if now is None:
+            now = self._clock()
+        if now_ms is None:
+            now_ms = self._wall() * 1000.0
+        delta = now_ms - ts_ms
+        if self._last_sample is not None and now - self._last_sample > self.offset_window_sec:
+            self._resumed_at = now
+        self._last_sample = now
+        # monotonic deque: only samples that can still become the minimum stay
+        while self._samples and self._samples[-1][1] >= delta:
+            self._samples.pop()
+        self._samples.append((now, delta))
+        expire = now - self.offset_window_sec
+        # keep the learned offset until a full window of fresh samples exists
+        if self._resumed_at is None or self._resumed_at <= expire:
+            while self._samples[0][0] < expire:
+                self._samples.popleft()
+        self.offset_ms = self._samples[0][1]
+        return delta - self.offset_ms
+
+    def _is_newer(self, seq: int, now: float) -> bool:
+        if self._last_seq is None:
+            return True
+        diff = (seq - self._last_seq) % SEQ_MOD
+        if 0 < diff < SEQ_MOD // 2:
+            return True
+        idle = self._last_applied is None or now - self._last_applied > self.reset_idle_sec
+        if idle or (self._last_seq - seq) % SEQ_MOD > self.reset_gap:
+            self.stats["resets"] += 1
+            return True
+        return False
+
+    def accept(self, data: dict, now: float | None = None, now_ms: float | None = None) -> bool:
+        if now is None:
+            now = self._clock()
+
+        ts_ms = data.get("ts_ms")
+        if ts_ms is not None:
+            ttl_ms = int(data.get("ttl_ms", self.default_ttl_ms))
+            if self.age_ms(int(ts_ms), now, now_ms) > ttl_ms:
+                self.stats["expired"] += 1
+                return False
+
+        seq = data.get("seq")
+        if seq is not None:
+            seq = int(seq) % SEQ_MOD
+            if not self._is_newer(seq, now):
+                self.stats["stale"] += 1
+                return False
+            self._last_seq = seq
+
+        self._last_applied = now
+        self.stats["applied"] += 1
+        return True
+
+    def metrics(self) -> dict:
+        return {
+            **self.stats,
+            "last_seq": self._last_seq,
+            "offset_ms": round(self.offset_ms, 1) if self.offset_ms is not None else None,
+        }
+
+
+def _bench() -> None:
+    """Scripted RPi5 clock scenarios against a 250 ms GUI refresh (no sleeping)."""
+    period, transit_ms = 0.25, 3.0
+
+    def run(label, events):
+        f = DriveFilter(default_ttl_ms=300)
+        results = []
+        for now, ts_ms, seq in events:
+            cmd = {"seq": seq, "ts_ms": ts_ms, "ttl_ms": 300}
+            results.append(f.accept(cmd, now=now, now_ms=now * 1000.0 + transit_ms))
+        dropped = [i for i, ok in enumerate(results) if not ok]
+        print(f"  {label:38s} applied {sum(results):3d}/{len(results)}  dropped at {dropped[:8]}  {f.metrics()}")
+
+    def gui(n, skew_ms=0.0, step_at=None, step_ms=0.0, restart_at=None, t0=0.0):
+        seq = 0
+        for i in range(n):
+            # a restarted GUI is back after ~3 s
+            now = t0 + i * period + (3.0 if restart_at is not None and i >= restart_at else 0.0)
+            seq = 1 if i == restart_at else seq + 1
+            ts = now * 1000.0 + skew_ms + (step_ms if step_at is not None and i >= step_at else 0.0)
+            yield now, ts, seq
+
+    print("DriveFilter, GUI refresh every 250 ms, ttl 300 ms")
+    run("clocks in sync", gui(40))
+    run("RPi5 clock 5 s ahead", gui(40, skew_ms=5000.0))
+    run("RPi5 clock 5 s behind", gui(40, skew_ms=-5000.0))
+    run("RPi5 NTP step +2 s at #20", gui(40, step_at=20, step_ms=2000.0))
+    run("RPi5 NTP step -2 s at #20", gui(40, step_at=20, step_ms=-2000.0))
+    run("GUI restart (seq -> 1) at #20", gui(40, restart_at=20))
+
+    late = list(gui(20))
+    _, ts, seq = late[10]
+    late.insert(12, (late[11][0] + 0.01, ts, seq))             # reordered duplicate
+    late.append((late[-1][0] + 0.1, late[-1][1] - 1000.0, 99))  # stuck for 1 s
+    run("reordered duplicate + 1 s late command", late)
+
+    # gateway reconnect: 3 s without commands, then a queued command
+    # stamped before the pause and a second one 1 s late, then live ones
+    idle = list(gui(20))
+    t = idle[-1][0] + 3.0
+    idle.append((t, idle[-1][1] + 250.0, 21))
+    idle.append((t + 0.01, t * 1000.0 - 1000.0, 22))
+    idle += [(now + t + 0.25, ts + t * 1000.0 + 250.0, seq + 22) for now, ts, seq in gui(8)]
+    run("late command after 3 s idle", idle)
+
+
+if __name__ == "__main__":
+    _bench()
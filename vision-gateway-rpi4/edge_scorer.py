@@ -0,0 +1,345 @@
+"""
+edge_scorer.py
+
+Optional anomaly scoring on the RPi4 (gateway.py --edge-score).
+
+The scorer runs the controller's PredictorEngine / BaselinePolicy /
+FrameResampler (control-ai-rpi5/gui-controller, imported from
+--edge-engine-dir) in a child process, so torch never shares the GIL or
+a core with the UART loop, and detection keeps working while the link
+to the RPi5 is down.
+
+Gateway -> scorer (child stdin): fixed-size binary records
+    tag (b"F" frame / b"H" brake hold-off) | seq u32 | ts_ms i64 |
+    t_rx (gateway time.monotonic(), f64) | ax ay az gx gy gz dist throttle steer (i32)
+  The pipe is non-blocking on the gateway side. A record is smaller
+  than PIPE_BUF, so a write is all-or-nothing; when the scorer falls
+  behind, frames are dropped (and counted) instead of stalling the loop.
+
+Scorer -> gateway (child stdout): one JSON object per line
+    {"type": "ready", ...} / {"type": "score", ...} / {"type": "stats", ...}
+  A score line carries the frame seq / ts_ms, state, threshold, the
+  alert flag (with attribution) and edge_ms = gateway receive -> score.
+
+CPU budget (fraction of one core, --edge-cpu-budget): the child runs
+with one torch thread, nice +10 and optional core pinning. Every second
+it compares its own CPU time to the budget and doubles the inference
+stride when over it (up to max_stride), halving it back once usage is
+below half the budget. Frame scaling is cheap; inference is what the
+stride controls.
+
+    python edge_scorer.py --child --engine-dir ../control-ai-rpi5/gui-controller
+"""
+
+import os
+import sys
+import json
+import time
+import struct
+import logging
+import argparse
+import threading
+import subprocess
+
+log = logging.getLogger("gateway")
+
+TEL_KEYS = ("ax", "ay", "az", "gx", "gy", "gz", "dist_cm", "throttle", "steer")
+_REC = struct.Struct("<cIqd9i")
+
+TAG_FRAME = b"F"
+TAG_HOLD = b"H"
+
+DEFAULT_ENGINE_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), os.pardir, "control-ai-rpi5", "gui-controller"
+)
+
+STATS_SEC = 5.0
+
+
+# ---------------- Gateway side ----------------
+class EdgeScorer(threading.Thread):
+    def __init__(
+        self,
+        engine_dir: str = DEFAULT_ENGINE_DIR,
+        bundle_dir: str | None = None,
+        cpu_budget: float = 0.3,
+        cpus: str | None = None,
+        max_stride: int = 40,
+        on_score=None,
+        on_exit=None,
+    ):
+        """
+        cpu_budget      : scorer CPU time per wall second (1.0 = one core)
+        cpus            : core list for sched_setaffinity, e.g. "3" or "2,3"
+        on_score(msg)   : every score line (reader thread)
+        on_exit(rc)     : scorer process ended (reader thread)
+        """
+        super().__init__(daemon=True, name="EdgeScorer")
+        self.engine_dir = os.path.abspath(engine_dir)
+        self.bundle_dir = bundle_dir
+        self.cpu_budget = float(cpu_budget)
+        self.cpus = cpus
+        self.max_stride = int(max_stride)
+        self._on_score = on_score
+        self._on_exit = on_exit
+
+        self.proc = None
+        self._fd = None
+        self.state = "stopped"
+        self.info = {}
+        self.last_stats = {}
+        self.stats = {
+            "frames_sent": 0,
+            "frames_dropped": 0,
+            "scores": 0,
+            "alerts": 0,
+            "edge_ms_last": None,
+            "edge_ms_max": 0.0,
+        }
+
+    def start(self) -> None:
+        cmd = [
+            sys.executable, os.path.abspath(__file__), "--child",
+            "--engine-dir", self.engine_dir,
+            "--cpu-budget", str(self.cpu_budget),
+            "--max-stride", str(self.max_stride),
+        ]
+        if self.bundle_dir:
+            cmd += ["--bundle", self.bundle_dir]
+        if self.cpus:
+            cmd += ["--cpus", self.cpus]
+        # stderr is inherited: the child's errors land in the gateway log
+        self.proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, bufsize=0)
+        self._fd = self.proc.stdin.fileno()
+        os.set_blocking(self._fd, False)
+        self.state = "loading"
+        super().start()
+
+    # --------------------------------------------------
+    # Input (gateway main loop only)
+    # --------------------------------------------------
+    def push_frame(self, payload: dict) -> None:
+        """One published telemetry payload (seq, ts_ms + $TEL fields)."""
+        try:
+            rec = _REC.pack(
+                TAG_FRAME, payload["seq"] & 0xFFFFFFFF, payload["ts_ms"], time.monotonic(),
+                *(int(payload[k]) for k in TEL_KEYS),
+            )
+        except (KeyError, struct.error):
+            self.stats["frames_dropped"] += 1
+            return
+        if self._write(rec):
+            self.stats["frames_sent"] += 1
+        else:
+            self.stats["frames_dropped"] += 1
+
+    def note_hold(self) -> None:
+        """US_BRAKE / TTC guard: baseline hold-off, as in the GUI."""
+        self._write(_REC.pack(TAG_HOLD, 0, int(time.time() * 1000), time.monotonic(), *([0] * 9)))
+
+    def _write(self, rec: bytes) -> bool:
+        if self.state not in ("loading", "running"):
+            return False
+        try:
+            return os.write(self._fd, rec) == len(rec)
+        except (BlockingIOError, BrokenPipeError, OSError):
+            return False
+
+    # --------------------------------------------------
+    # Output (reader thread)
+    # --------------------------------------------------
+    def run(self) -> None:
+        for line in self.proc.stdout:
+            try:
+                msg = json.loads(line)
+            except ValueError:
+                continue
+            kind = msg.get("type")
+            if kind == "score":
+                self.stats["scores"] += 1
+                if msg.get("alert"):
+                    self.stats["alerts"] += 1
+                edge_ms = msg.get("edge_ms")
+                if edge_ms is not None:
+                    self.stats["edge_ms_last"] = edge_ms
+                    self.stats["edge_ms_max"] = max(self.stats["edge_ms_max"], edge_ms)
+                if self._on_score:
+                    self._on_score(msg)
+            elif kind == "stats":
+                self.last_stats = msg
+            elif kind == "ready":
+                self.info = msg
+                self.state = "running"
+                log.info(f"[EDGE] Scorer ready: {msg}")
+        rc = self.proc.wait()
+        if self.state != "stopping":
+            log.error(f"[EDGE] Scorer exited (rc={rc})")
+        self.state = "exited"
+        if self._on_exit:
+            self._on_exit(rc)
+
+    def stop(self) -> None:
+        if self.proc is None:
+            return
+        self.state = "stopping"
+        try:
+            self.proc.stdin.close()
+            self.proc.wait(timeout=2.0)
+        except Exception:
+            self.proc.kill()
+
+    def metrics(self) -> dict:
+        return {
+            "state": self.state,
+            "pid": self.proc.pid if self.proc is not None else None,
+            "cpu_budget": self.cpu_budget,
+            **self.stats,
+            "cpu": self.last_stats.get("cpu"),
+            "stride": self.last_stats.get("stride"),
+            "backlog_ms": self.last_stats.get("backlog_ms"),
+        }
+
+
+# ---------------- Scorer process ----------------
+def _emit(obj: dict) -> None:
+    sys.stdout.write(json.dumps(obj, separators=(",", ":")) + "\n")
+    sys.stdout.flush()
+
+
+def _read_exact(f, n: int) -> bytes | None:
+    buf = f.read(n)
+    return buf if buf is not None and len(buf) == n else None
+
+
+def child_main(args: argparse.Namespace) -> None:
+    try:
+        os.nice(args.nice)
+    except OSError:
+        pass
+    if args.cpus:
+        try:
+            os.sched_setaffinity(0, {int(c) for c in args.cpus.split(",")})
+        except (AttributeError, OSError, ValueError) as e:
+            print(f"[EDGE] CPU affinity not applied: {e}", file=sys.stderr)
+
+    # the controller modules use paths relative to their own directory
+    sys.path.insert(0, args.engine_dir)
+    os.chdir(args.engine_dir)
+
+    import torch
+
+    torch.set_num_threads(1)
+
+    from config import MODEL_FRAME_MS, INFER_STRIDE
+    from predictor_engine import PredictorEngine
+    from baseline_policy import BaselinePolicy
+    from frame_resampler import FrameResampler
+
+    t0 = time.monotonic()
+    kw = {"bundle_dir": args.bundle} if args.bundle else {}
+    engine = PredictorEngine(device="cpu", **kw)
+    policy = BaselinePolicy()
+    resampler = FrameResampler(MODEL_FRAME_MS)
+    base_stride = engine.stride = max(1, int(INFER_STRIDE))
+    _emit({
+        "type": "ready",
+        "device": engine.device,
+        "T_IN": engine.T_IN,
+        "T_OUT": engine.T_OUT,
+        "stride": base_stride,
+        "load_s": round(time.monotonic() - t0, 2),
+    })
+
+    stdin = sys.stdin.buffer
+    prev_throttle = 0
+    frames = scores = 0
+    win_wall, win_cpu = time.monotonic(), time.process_time()
+    stats_at = win_wall + STATS_SEC
+    cpu = 0.0
+    backlog_ms = 0.0
+
+    while True:
+        rec = _read_exact(stdin, _REC.size)
+        if rec is None:
+            return
+        tag, seq, ts_ms, t_rx, *vals = _REC.unpack(rec)
+        now_wall = time.time()
+
+        if tag == TAG_HOLD:
+            policy.on_us_brake(now_wall)
+            continue
+
+        frames += 1
+        data = dict(zip(TEL_KEYS, vals))
+        throttle = data["throttle"]
+        if prev_throttle != 0 and throttle == 0:
+            # command -> 0 is the GUI BRAKE path (same approximation as score_sessions.py)
+            policy.on_brake(now_wall)
+        prev_throttle = throttle
+
+        ticks, gap = resampler.push(ts_ms)
+        if gap:
+            engine.reset()
+        score = None
+        for _ in range(ticks):
+            s = engine.update(data)
+            if s is not None:
+                score = s
+
+        if score is not None:
+            scores += 1
+            score = float(score)
+            state, thr, alert = policy.on_score(score, throttle, data["steer"], now_wall)
+            msg = {
+                "type": "score",
+                "seq": seq,
+                "ts_ms": ts_ms,
+                "state": state,
+                "score": score,
+                "thr": thr,
+                "alert": alert,
+                "stride": engine.stride,
+                "edge_ms": round((time.monotonic() - t_rx) * 1000.0, 2),
+            }
+            if alert:
+                msg["attribution"] = engine.last_attribution
+            _emit(msg)
+
+        now = time.monotonic()
+        backlog_ms = (now - t_rx) * 1000.0
+        if now - win_wall >= 1.0:
+            cpu = (time.process_time() - win_cpu) / (now - win_wall)
+            if cpu > args.cpu_budget and engine.stride < args.max_stride:
+                engine.stride = min(engine.stride * 2, args.max_stride)
+            elif cpu < args.cpu_budget * 0.5 and engine.stride > base_stride:
+                engine.stride = max(engine.stride // 2, base_stride)
+            win_wall, win_cpu = now, time.process_time()
+        if now >= stats_at:
+            stats_at = now + STATS_SEC
+            _emit({
+                "type": "stats",
+                "frames": frames,
+                "scores": scores,
+                "cpu": round(cpu, 3),
+                "stride": engine.stride,
+                "backlog_ms": round(backlog_ms, 2),
+            })
+
+
+def parse_args(argv: list[str]) -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Edge anomaly scorer process (started by gateway.py)")
+    p.add_argument("--child", action="store_true", help="run as the scorer process (stdin/stdout protocol)")
+    p.add_argument("--engine-dir", default=DEFAULT_ENGINE_DIR, help="gui-controller directory (predictor_engine.py)")
+    p.add_argument("--bundle", default=None, help="model bundle from training/train.py (optional)")
+    p.add_argument("--cpu-budget", type=float, default=0.3, help="CPU time per wall second (default: 0.3)")
+    p.add_argument("--cpus", default=None, help="pin to these cores, e.g. 3 (optional)")
+    p.add_argument("--max-stride", type=int, default=40, help="stride limit under the budget (default: 40)")
+    p.add_argument("--nice", type=int, default=10, help="nice increment (default: 10)")
+    return p.parse_args(argv)
+
+
+if __name__ == "__main__":
+    _args = parse_args(sys.argv[1:])
+    if not _args.child:
+        sys.exit("edge_scorer.py is started by gateway.py --edge-score (use --child to run the protocol directly)")
+    child_main(_args)
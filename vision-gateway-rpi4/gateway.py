@@ -9,12 +9,69 @@ Subscriptions:
     - "GUI"     -> send UART commands from mobility/control/drive
     - "Gesture" -> send UART commands from camera gesture recognition
 - mobility/control/drive (used only in GUI mode)
+- mobility/control/telemetry
+    - {"boost_sec": 3, "reason": "anomaly"} -> raise the telemetry rate
+    - {"policy": "fixed", "period_ms": 50} / {"policy": "auto"} /
+      {"policy": "default"} (back to --tel-rate)
+- mobility/control/preview
+    - {"on": true} / {"on": false} -> camera preview viewer lease
 
 Publications:
 - Telemetry:
     - UART "$TEL,..." -> mobility/telemetry/parsed
 - Alerts (optional):
     - UART "$STS,..." -> mobility/alert/event
+    - TTC guard events ("TTC_GUARD") -> mobility/alert/event
+    - UART link up / down ("UART_LINK") -> mobility/alert/event
+- Telemetry rate state -> mobility/telemetry/rate (retained)
+- Edge anomaly scores (--edge-score) -> mobility/anomaly/rpi4, alerts
+  ("ANOMALY", source "EDGE") -> mobility/alert/event
+- Camera preview (--preview) -> mobility/camera/preview (binary header + JPEG)
+
+UART link:
+- serial_link.SerialLink probes the candidate ports in parallel and
+  reopens the port with backoff after a disconnect; MQTT and the gesture
+  worker keep running while it is down (commands are dropped)
+- Telemetry is read in bulk and split by uart_proto.UartRx; at link up
+  the gateway requests binary COBS frames ("$PRO,BIN") and stays on
+  ASCII lines when the firmware does not switch (--uart-proto)
+- The $TEL period follows tel_rate.TelemetryRatePolicy (idle / cruise /
+  boost) and is set on the firmware with "$CFG,TEL_MS,<ms>" (--tel-rate)
+
+Observability:
+- Counters / latency histograms (gateway_metrics.py), published every
+  METRICS_PUBLISH_SEC on mobility/metrics/rpi4 and served over HTTP
+  (/metrics, /health)
+- Logging through the "gateway" logger (--log-level); per-command lines
+  are DEBUG and rate-limited
+
+Edge scoring (optional):
+- edge_scorer.EdgeScorer runs the controller's PredictorEngine in a child
+  process under a CPU budget; published frames are handed to it through
+  a non-blocking pipe (dropped, never waited on, when it falls behind)
+
+Camera:
+- capture.py sources (--camera-backend): V4L2 YUYV / MJPEG converted
+  straight to mirrored RGB in a reused buffer, OpenCV BGR as fallback,
+  file sources for tests; a frame is converted only when used
+
+Gesture recognition:
+- gesture_proc.py backends (--gesture-proc): MediaPipe in a child process
+  fed through a shared-memory frame ring, results back as fixed-size
+  records over a pipe (default), or in this process as before ("thread")
+
+Camera preview (optional):
+- camera_preview.PreviewEncoder takes frames from GestureWorker (in both
+  modes), downscales them into preallocated slots and encodes JPEG on its
+  own thread; frames are skipped, never queued, when it falls behind
+
+Safety:
+- Drive sources hold a lease (lease_watchdog.py): GUI commands / gesture
+  results must keep arriving, otherwise throttle is ramped down to 0
+- Every $TEL frame goes through TtcGuard (ttc_guard.py) before it is
+  published; a risky closing trend sends a throttle-limited $CMD right
+  away and caps later GUI / gesture commands until the operator backs off
+  or the range opens again.
 """
 
 import sys
@@ -22,21 +79,35 @@ import time
 import json
 import threading
 import os
+import logging
 import argparse
 
 import serial
 import paho.mqtt.client as mqtt
 
+from ttc_guard import TtcGuard, LEVEL_NAMES as TTC_LEVEL_NAMES
+from lease_watchdog import LeaseWatchdog
+from drive_filter import DriveFilter
+from gateway_metrics import Metrics, MetricsReporter, setup_logging
+from serial_link import SerialLink
+from uart_proto import UartRx, MODE_ASCII, MODE_BINARY
+from tel_rate import TelemetryRatePolicy
+from edge_scorer import EdgeScorer, DEFAULT_ENGINE_DIR
+from camera_preview import PreviewEncoder, MODES as PREVIEW_MODES
+from capture import open_capture, CaptureError, BACKENDS as CAPTURE_BACKENDS
+from gesture_proc import make_recognizer, PROCS as GESTURE_PROCS
+
+log = logging.getLogger("gateway")
+
 # ---------------- Optional gesture dependencies ----------------
+# MediaPipe is imported by the recognizer backend (gesture_proc.py), in
+# the child process unless --gesture-proc thread
 try:
-    import cv2
-    import mediapipe as mp
-    from mediapipe.tasks import python
-    from mediapipe.tasks.python import vision
+    import cv2  # noqa: F401  (capture.py / camera_preview.py)
 
     GESTURE_AVAILABLE = True
 except Exception as e:
-    print(f"[WARN] Gesture dependencies not available: {e}")
+    log.warning(f"[WARN] Gesture dependencies not available: {e}")
     GESTURE_AVAILABLE = False
 
 # ---------------- Configuration ----------------
@@ -44,9 +115,48 @@ BROKER_PORT = 1883
 
 TOPIC_DRIVE = "mobility/control/drive"
 TOPIC_MODE = "mobility/control/mode"
+TOPIC_TEL_CTRL = "mobility/control/telemetry"
 
 TOPIC_TEL = "mobility/telemetry/parsed"
 TOPIC_ALERT = "mobility/alert/event"
+TOPIC_METRICS = "mobility/metrics/rpi4"
+TOPIC_TEL_RATE = "mobility/telemetry/rate"
+TOPIC_ANOMALY = "mobility/anomaly/rpi4"
+TOPIC_PREVIEW = "mobility/camera/preview"
+TOPIC_PREVIEW_CTRL = "mobility/control/preview"
+
+# Delivery profiles (must match the controller's MQTT_PROFILES)
+QOS_TEL = 0        # stream; loss is visible through "seq"
+QOS_ALERT = 1
+QOS_DRIVE = 0      # latest-value commands with ts_ms/ttl_ms
+QOS_MODE = 1       # retained by the publisher
+QOS_METRICS = 0    # retained latest snapshot
+QOS_TEL_CTRL = 1
+QOS_TEL_RATE = 1   # retained latest state
+QOS_ANOMALY = 0    # score stream; alerts go through TOPIC_ALERT
+QOS_PREVIEW = 0    # frame stream; a lost frame is replaced by the next
+QOS_PREVIEW_CTRL = 0  # viewer lease, refreshed by the GUI
+
+# Drive commands without their own ttl_ms fall back to this
+DEFAULT_CMD_TTL_MS = 300
+
+# Metrics: MQTT snapshot period, HTTP endpoint (port 0 disables),
+# /health fails when no $TEL arrived for this long
+METRICS_PUBLISH_SEC = 10
+METRICS_HTTP_BIND = "0.0.0.0"
+METRICS_HTTP_PORT = 9108
+HEALTH_TEL_MAX_AGE_SEC = 2.0
+
+# Per-key log rate limit (records/sec, burst)
+LOG_RATE_PER_SEC = 5.0
+LOG_RATE_BURST = 10
+
+# Dead-man leases per drive source (the GUI re-publishes its current
+# command every 250 ms; the gesture worker refreshes on every result)
+LEASE_GUI_MS = 1000
+LEASE_GESTURE_MS = 500
+RAMP_STEPS = 3            # 60 -> 40 -> 20 -> 0
+RAMP_STEP_MS = 100
 
 DEFAULT_SERIAL_CANDIDATES = [
     "/dev/serial0",
@@ -57,17 +167,112 @@ DEFAULT_SERIAL_CANDIDATES = [
 
 BAUD_RATE = 115200
 
+# UART link supervisor: node poll while unplugged, backoff on failed reopen
+SERIAL_CHECK_SEC = 0.1
+SERIAL_BACKOFF_MIN_SEC = 0.05
+SERIAL_BACKOFF_MAX_SEC = 1.0
+
+# Binary telemetry negotiation ("$PRO,BIN"); firmware without it stays ASCII
+UART_PROTO_NEG_TIMEOUT_SEC = 0.5
+UART_PROTO_NEG_ATTEMPTS = 3
+
+# Telemetry period per policy level ("$CFG,TEL_MS"); firmware range 20..1000.
+# Unacked requests are resent, then the firmware is treated as fixed-rate.
+TEL_PERIOD_IDLE_MS = 200
+TEL_PERIOD_CRUISE_MS = 50
+TEL_PERIOD_BOOST_MS = 25
+TEL_RATE_ACK_TIMEOUT_SEC = 0.5
+TEL_RATE_ATTEMPTS = 3
+
+# Edge scorer: CPU time per wall second (1.0 = one core of the RPi4) and
+# the telemetry boost requested while a score nears its threshold
+EDGE_CPU_BUDGET = 0.3
+EDGE_MAX_STRIDE = 40
+EDGE_BOOST_RATIO = 0.8
+EDGE_BOOST_SEC = 3.0
+
+# Camera preview: size, rate / bandwidth / encoder CPU caps and the viewer
+# lease ("demand" mode encodes only while a GUI refreshes it)
+PREVIEW_WIDTH = 160
+PREVIEW_HEIGHT = 120
+PREVIEW_MAX_FPS = 10.0
+PREVIEW_KBPS = 400.0
+PREVIEW_CPU_BUDGET = 0.1
+PREVIEW_LEASE_SEC = 5.0
+
 MODE_GUI = "GUI"
 MODE_GESTURE = "Gesture"
 
 # ---------------- Shared state ----------------
-ser = None
+link: SerialLink | None = None   # link.ser is None while the UART is down
 uart_lock = threading.Lock()
 
+# UART stream parser (ASCII / binary) and format negotiation (main thread only)
+uart_rx = UartRx()
+uart_proto = "auto"
+proto_neg = {"attempts": 0, "sent_at": 0.0}
+
+# Telemetry rate policy (None with --tel-rate off) and $CFG sync state
+# (main thread only; "confirmed" is the period last acked by the firmware)
+rate_policy: TelemetryRatePolicy | None = None
+rate_sync = {
+    "want": None, "level": None, "reason": None, "confirmed": None,
+    "attempts": 0, "sent_at": 0.0, "supported": True,
+}
+
 current_mode = MODE_GUI
 mode_lock = threading.Lock()
 
 client = None
+mqtt_connected = False
+
+metrics = Metrics(
+    counters=(
+        "uart_rx_bytes", "uart_read_errors", "uart_write_errors",
+        "uart_link_down", "uart_link_up",
+        "tel_frames", "tel_parse_fail", "sts_events",
+        "mqtt_pub", "mqtt_pub_fail",
+        "cmd_tx", "cmd_gui", "cmd_dropped",
+        "gesture_frames", "gesture_results",
+        "preview_requests",
+    ),
+    histograms=(
+        "mqtt_publish",     # client.publish() call
+        "cmd_latency",      # drive message received -> $CMD written
+        "cmd_age",          # publisher ts_ms -> $CMD written (cross-host clocks)
+        "uart_lock_wait",   # time spent waiting for uart_lock
+        "uart_write",       # ser.write of one $CMD
+        "line_handle",      # one $TEL frame: guard + publish
+        "link_recovery",    # UART link down -> reopened
+        "preview_offer",    # preview resize on the gesture thread (due frames only)
+        "preview_encode",   # preview mirror + JPEG + publish (encoder thread)
+        "frame_prep",       # camera frame -> mirrored RGB (capture.py, converted frames only)
+        "gesture_result",   # frame handed to the recognizer -> result back in the gateway
+    ),
+)
+last_tel_mono = 0.0
+
+# Telemetry frame sequence number (QoS 0 loss accounting on the subscriber)
+tel_seq = 0
+
+# Drive command filter: seq ordering + expiry on the local clock (drive_filter.py)
+drive_filter = DriveFilter(default_ttl_ms=DEFAULT_CMD_TTL_MS)
+drive_lock = threading.Lock()
+
+# Edge time-to-collision guard (None when disabled with --no-ttc-guard)
+ttc_guard: TtcGuard | None = None
+
+# Dead-man watchdog over the drive sources
+watchdog: LeaseWatchdog | None = None
+
+# Edge anomaly scorer process (None unless --edge-score)
+edge_scorer: EdgeScorer | None = None
+
+# Camera preview encoder (None with --preview off)
+preview: PreviewEncoder | None = None
+
+# Camera + gesture recognition (metrics only; started by main)
+gesture_worker: "GestureWorker | None" = None
 
 # Runtime options (from argparse)
 BROKER_ADDRESS = None
@@ -79,11 +284,13 @@ def set_mode(new_mode: str) -> None:
     global current_mode
     with mode_lock:
         if new_mode not in (MODE_GUI, MODE_GESTURE):
-            print(f"[MODE] Ignored unknown mode: {new_mode}")
+            log.warning(f"[MODE] Ignored unknown mode: {new_mode}")
             return
         if current_mode != new_mode:
             current_mode = new_mode
-            print(f"[MODE] Switched -> {current_mode}")
+            log.info(f"[MODE] Switched -> {current_mode}")
+            if watchdog is not None:
+                watchdog.set_active(current_mode)
 
 
 def get_mode() -> str:
@@ -98,43 +305,320 @@ def make_control_packet(throttle: int, steer: int) -> str:
 
 
 def uart_send_cmd(throttle: int, steer: int, src: str = "") -> None:
-    """Send a UART command using a global lock to avoid concurrent writes."""
+    """
+    Send a UART command using a global lock to avoid concurrent writes.
+    Forward throttle is clamped while the TTC guard is active.
+    """
+    if ttc_guard is not None:
+        limited = ttc_guard.limit(throttle, operator=src == "GUI" or src.startswith("GEST:"))
+        if limited != throttle:
+            log.info(
+                "[TTC] Limited %s throttle %d -> %d", src or "cmd", throttle, limited,
+                extra={"rl": "ttc_limit"},
+            )
+            throttle = limited
+    if rate_policy is not None:
+        rate_policy.on_command(throttle, steer)
     packet = make_control_packet(throttle, steer)
+    if uart_write(packet.encode("utf-8")):
+        metrics.inc("cmd_tx")
+        log.debug("[CMD TX][%s] %s", src, packet.strip(), extra={"rl": "cmd_tx"})
+        if watchdog is not None:
+            watchdog.note_command(throttle, steer)
+
+
+def uart_write(data: bytes) -> bool:
+    """Write under uart_lock; a failed write reports the link as lost."""
+    sent = False
+    err = None
+    t0 = time.perf_counter_ns()
     with uart_lock:
-        if ser and ser.is_open:
-            ser.write(packet.encode("utf-8"))
-            tag = f"[{src}]" if src else ""
-            print(f"[CMD TX]{tag} {packet.strip()}")
+        t1 = time.perf_counter_ns()
+        s = link.ser if link is not None else None
+        if s is not None:
+            try:
+                s.write(data)
+                sent = True
+            except (serial.SerialException, OSError) as e:
+                err = e
+    t2 = time.perf_counter_ns()
+    metrics.observe("uart_lock_wait", t1 - t0)
+    if sent:
+        metrics.observe("uart_write", t2 - t1)
+    if err is not None:
+        metrics.inc("uart_write_errors")
+        link.lost(s, f"write: {err}")
+    return sent
+
+
+def mqtt_publish(topic: str, payload: str | bytes, qos: int, retain: bool = False) -> bool:
+    """
+    client.publish with publish-call latency and failure accounting.
+    Returns True if paho accepted the message (rc == MQTT_ERR_SUCCESS).
+    """
+    if client is None:
+        return False
+    t0 = time.perf_counter_ns()
+    info = client.publish(topic, payload, qos=qos, retain=retain)
+    metrics.observe("mqtt_publish", time.perf_counter_ns() - t0)
+    if info.rc != mqtt.MQTT_ERR_SUCCESS:
+        metrics.inc("mqtt_pub_fail")
+        return False
+    metrics.inc("mqtt_pub")
+    return True
+
+
+def make_telemetry(fields: dict) -> dict:
+    """Telemetry publish payload: gateway seq + receive time + parsed fields."""
+    global tel_seq
+    tel_seq += 1
+    return {"seq": tel_seq, "ts_ms": int(time.time() * 1000), **fields}
+
+
+def handle_uart_events(events: list) -> None:
+    """Dispatch frames decoded by UartRx (ASCII lines or binary frames)."""
+    global last_tel_mono
+    for kind, value, _ in events:
+        if kind == "tel":
+            t_frame = time.perf_counter_ns()
+            metrics.inc("tel_frames")
+            last_tel_mono = time.monotonic()
+            payload = make_telemetry(value)
+            run_ttc_guard(payload)
+            mqtt_publish(TOPIC_TEL, json.dumps(payload), QOS_TEL)
+            if rate_policy is not None:
+                ttc_level = TTC_LEVEL_NAMES[ttc_guard.level] if ttc_guard is not None else "CLEAR"
+                rate_policy.on_frame(value, ttc_level)
+            if edge_scorer is not None:
+                edge_scorer.push_frame(payload)
+            metrics.observe("line_handle", time.perf_counter_ns() - t_frame)
+
+        elif kind == "sts":
+            metrics.inc("sts_events")
+            if edge_scorer is not None and value == "US_BRAKE":
+                edge_scorer.note_hold()
+            log.info(f"[STS RX] {value}", extra={"rl": "sts_rx"})
+            alert_payload = {
+                "type": "ALERT",
+                "event": value,
+                "ts_ms": int(time.time() * 1000),
+            }
+            mqtt_publish(TOPIC_ALERT, json.dumps(alert_payload), QOS_ALERT)
+            log.info(f"[ALERT Pub] {alert_payload}", extra={"rl": "alert_pub"})
+
+        elif kind == "mode":
+            log.info(f"[UART] Telemetry format: {value}")
+            if value == MODE_ASCII:
+                # MCU fell back (reset): negotiate again, period is back to default
+                proto_neg["attempts"] = 0
+                reset_rate_sync()
+
+        elif kind == "cfg":
+            if "tel_ms" in value:
+                rate_sync["confirmed"] = value["tel_ms"]
+                log.info(f"[UART] Telemetry period: {value['tel_ms']} ms")
+                publish_rate_state()
+
+        elif kind == "error":
+            metrics.inc("tel_parse_fail")
+            log.warning(f"[TEL Parse Error] {value}", extra={"rl": "tel_parse"})
+
+
+def negotiate_uart_proto(now: float) -> None:
+    """Ask the firmware for binary telemetry until it switches or attempts run out."""
+    if uart_proto != "auto" or uart_rx.mode == MODE_BINARY:
+        return
+    if proto_neg["attempts"] >= UART_PROTO_NEG_ATTEMPTS:
+        return
+    if now - proto_neg["sent_at"] < UART_PROTO_NEG_TIMEOUT_SEC:
+        return
+    proto_neg["attempts"] += 1
+    proto_neg["sent_at"] = now
+    uart_write(b"$PRO,BIN\n")
+    if proto_neg["attempts"] == UART_PROTO_NEG_ATTEMPTS:
+        log.info(f"[UART] Requested binary telemetry {UART_PROTO_NEG_ATTEMPTS}x; staying ASCII if no reply")
+
+
+def reset_rate_sync() -> None:
+    """New link / MCU reset: the firmware runs its default period again."""
+    rate_sync.update(confirmed=None, attempts=0, sent_at=0.0, supported=True)
+
+
+def publish_rate_state() -> None:
+    mqtt_publish(
+        TOPIC_TEL_RATE,
+        json.dumps({
+            "period_ms": rate_sync["want"],
+            "level": rate_sync["level"],
+            "reason": rate_sync["reason"],
+            "policy": rate_policy.policy,
+            "confirmed": rate_sync["confirmed"] == rate_sync["want"],
+            "ts_ms": int(time.time() * 1000),
+        }),
+        QOS_TEL_RATE,
+        retain=True,
+    )
 
 
-def parse_telemetry(line: str) -> str | None:
+def sync_tel_rate(now: float) -> None:
+    """
+    Apply the policy's period with "$CFG,TEL_MS". Waits until the format
+    negotiation settled (the ack comes in the negotiated format) and
+    resends until acked; firmware without $CFG keeps its fixed 50 ms.
     """
-    Parse a "$TEL" UART line into a JSON string.
+    if rate_policy is None:
+        return
+    if uart_proto == "auto" and uart_rx.mode != MODE_BINARY:
+        if proto_neg["attempts"] < UART_PROTO_NEG_ATTEMPTS:
+            return
+        if now - proto_neg["sent_at"] < UART_PROTO_NEG_TIMEOUT_SEC:
+            return
 
-    Expected format:
-      $TEL,ax,ay,az,gx,gy,gz,dist_cm,throttle,steer
+    period, level, reason = rate_policy.decide(now)
+    if (period, level) != (rate_sync["want"], rate_sync["level"]):
+        if period != rate_sync["want"]:
+            rate_sync["attempts"] = 0
+            rate_sync["sent_at"] = 0.0
+        rate_sync.update(want=period, level=level, reason=reason)
+        log.info(f"[RATE] {level} ({reason}): {period} ms", extra={"rl": "tel_rate"})
+        publish_rate_state()
+
+    if not rate_sync["supported"] or rate_sync["confirmed"] == period:
+        return
+    if now - rate_sync["sent_at"] < TEL_RATE_ACK_TIMEOUT_SEC:
+        return
+    if rate_sync["attempts"] >= TEL_RATE_ATTEMPTS:
+        rate_sync["supported"] = False
+        log.warning(f"[RATE] No $CFG ack after {TEL_RATE_ATTEMPTS} tries; firmware rate is fixed")
+        return
+    rate_sync["attempts"] += 1
+    rate_sync["sent_at"] = now
+    uart_write(f"$CFG,TEL_MS,{period}\n".encode())
+
+
+def run_ttc_guard(payload: dict) -> None:
     """
-    try:
-        parts = line.split(",")
-        if len(parts) != 10:
-            return None
+    Feed one telemetry frame to the TTC guard. When it trips, send the
+    limited $CMD first (same frame), then publish the event.
+    """
+    if ttc_guard is None:
+        return
+    event = ttc_guard.update(payload, time.monotonic())
+    if event is None:
+        return
+
+    if event["level"] != "CLEAR":
+        uart_send_cmd(payload["throttle"], payload["steer"], src="TTC")
+        if edge_scorer is not None:
+            edge_scorer.note_hold()
+
+    alert_payload = {
+        "type": "ALERT",
+        "event": "TTC_GUARD",
+        **event,
+        "ts_ms": payload["ts_ms"],
+    }
+    mqtt_publish(TOPIC_ALERT, json.dumps(alert_payload), QOS_ALERT)
+    log.warning(f"[TTC] {alert_payload}")
+
+
+def on_lease_expired(source: str, throttle: int) -> None:
+    """Publish a dead-man expiry (the ramp-down is already under way)."""
+    alert_payload = {
+        "type": "ALERT",
+        "event": "LEASE_EXPIRED",
+        "source": source,
+        "throttle": throttle,
+        "ts_ms": int(time.time() * 1000),
+    }
+    mqtt_publish(TOPIC_ALERT, json.dumps(alert_payload), QOS_ALERT)
+
+
+def on_edge_score(msg: dict) -> None:
+    """Edge scorer result (its reader thread): score stream, alert, boost."""
+    mqtt_publish(
+        TOPIC_ANOMALY,
+        json.dumps({k: msg[k] for k in ("seq", "ts_ms", "state", "score", "thr", "alert", "edge_ms")}),
+        QOS_ANOMALY,
+    )
+    thr = msg.get("thr")
+    if rate_policy is not None and thr is not None and msg["score"] >= EDGE_BOOST_RATIO * thr:
+        rate_policy.request_boost(EDGE_BOOST_SEC, "edge_anomaly")
+    if not msg.get("alert"):
+        return
+    alert_payload = {
+        "type": "ALERT",
+        "event": "ANOMALY",
+        "source": "EDGE",
+        "state": msg["state"],
+        "score": msg["score"],
+        "thr": thr,
+        "seq": msg["seq"],
+        "edge_ms": msg["edge_ms"],
+        "attribution": msg.get("attribution"),
+        "ts_ms": msg["ts_ms"],
+    }
+    mqtt_publish(TOPIC_ALERT, json.dumps(alert_payload), QOS_ALERT)
+    log.warning(
+        f"[EDGE] ANOMALY state={msg['state']} score={msg['score']:.6f} thr={thr:.6f} ({msg['edge_ms']} ms)",
+        extra={"rl": "edge_alert"},
+    )
 
-        payload = {
-            "ts_ms": int(time.time() * 1000),
-            "ax": int(parts[1]),
-            "ay": int(parts[2]),
-            "az": int(parts[3]),
-            "gx": int(parts[4]),
-            "gy": int(parts[5]),
-            "gz": int(parts[6]),
-            "dist_cm": int(parts[7]),
-            "throttle": int(parts[8]),
-            "steer": int(parts[9].strip()),
-        }
-        return json.dumps(payload)
-    except Exception as e:
-        print(f"[TEL Parse Error] {e} | line={line}")
-        return None
+
+def _tel_age_sec() -> float | None:
+    return round(time.monotonic() - last_tel_mono, 2) if last_tel_mono else None
+
+
+def metrics_extra() -> dict:
+    """Component state merged into every metrics snapshot."""
+    with drive_lock:
+        drive = drive_filter.metrics()
+    return {
+        "mode": get_mode(),
+        "drive": drive,
+        "ttc": dict(ttc_guard.stats) if ttc_guard is not None else None,
+        "uart": {"format": uart_rx.mode, **uart_rx.stats},
+        "watchdog": watchdog.metrics() if watchdog is not None else None,
+        "edge": edge_scorer.metrics() if edge_scorer is not None else None,
+        "preview": preview.metrics() if preview is not None else None,
+        "gesture": gesture_worker.metrics() if gesture_worker is not None else None,
+        "tel_rate": {
+            "policy": rate_policy.policy,
+            "period_ms": rate_sync["want"],
+            "level": rate_sync["level"],
+            "confirmed_ms": rate_sync["confirmed"],
+            "supported": rate_sync["supported"],
+            **rate_policy.stats,
+        } if rate_policy is not None else None,
+        "link": {
+            "serial": link.metrics() if link is not None else None,
+            "mqtt_connected": mqtt_connected,
+            "tel_age_s": _tel_age_sec(),
+        },
+    }
+
+
+def health_checks() -> dict:
+    """/health: all checks must hold for 200."""
+    age = _tel_age_sec()
+    return {
+        "serial_open": link is not None and link.ser is not None,
+        "mqtt_connected": mqtt_connected,
+        "telemetry_fresh": age is not None and age < HEALTH_TEL_MAX_AGE_SEC,
+    }
+
+
+def accept_drive_command(data: dict) -> bool:
+    """
+    Latest-value filter for drive commands (drive_filter.DriveFilter).
+
+    - Expired: arrived more than ttl_ms later than the best recent command
+      (clock offset to the publisher learned, never compared raw)
+    - Stale  : seq not newer than the last applied command (reordered delivery)
+    Legacy payloads without seq / ts_ms skip the matching check.
+    """
+    with drive_lock:
+        return drive_filter.accept(data)
 
 
 def parse_mode_payload(payload_bytes: bytes) -> str:
@@ -155,61 +639,69 @@ def parse_mode_payload(payload_bytes: bytes) -> str:
     return s
 
 
-def _resolve_realpath(path: str) -> str:
-    """Return real path for device (symlink target)."""
-    try:
-        return os.path.realpath(path)
-    except Exception:
-        return path
-
-
-def _try_open_serial(port: str, baud: int, timeout: float = 0.1) -> serial.Serial | None:
-    """Try opening the given serial port; return Serial on success else None."""
-    try:
-        s = serial.Serial(port, baud, timeout=timeout)
-        s.flush()
-        return s
-    except Exception:
-        return None
+def on_link_up(port: str, down_ms: float | None) -> None:
+    """UART (re)opened by the link supervisor."""
+    real = os.path.realpath(port)
+    where = f"{port} -> {real}" if real != port else port
+    if down_ms is None:
+        log.info(f"[UART] Opened: {where} @ {BAUD_RATE}")
+        return
+    metrics.inc("uart_link_up")
+    metrics.observe("link_recovery", int(down_ms * 1_000_000))
+    log.warning(f"[UART] Link up: {where} after {down_ms:.0f} ms")
+    mqtt_publish(
+        TOPIC_ALERT,
+        json.dumps({
+            "type": "ALERT",
+            "event": "UART_LINK",
+            "state": "UP",
+            "port": port,
+            "down_ms": down_ms,
+            "ts_ms": int(time.time() * 1000),
+        }),
+        QOS_ALERT,
+    )
 
 
-def pick_serial_port(user_port: str | None, candidates: list[str]) -> tuple[str, serial.Serial]:
-    """
-    Pick a working serial port.
-    - If user_port is provided, try it first (and fail hard if not working).
-    - Else, probe candidates in order, return first that opens.
-    """
-    if user_port:
-        s = _try_open_serial(user_port, BAUD_RATE, timeout=0.1)
-        if not s:
-            raise RuntimeError(f"Failed to open requested serial port: {user_port}")
-        return user_port, s
-
-    tried = []
-    for p in candidates:
-        if not p:
-            continue
-        if not os.path.exists(p):
-            tried.append(f"{p} (missing)")
-            continue
-        s = _try_open_serial(p, BAUD_RATE, timeout=0.1)
-        if s:
-            return p, s
-        tried.append(f"{p} (open failed)")
-
-    raise RuntimeError("No usable serial port found. Tried: " + ", ".join(tried))
+def on_link_down(port: str, reason: str) -> None:
+    """UART lost; the supervisor reopens it while MQTT / gesture keep running."""
+    metrics.inc("uart_link_down")
+    log.warning(f"[UART] Link down: {port} ({reason})")
+    mqtt_publish(
+        TOPIC_ALERT,
+        json.dumps({
+            "type": "ALERT",
+            "event": "UART_LINK",
+            "state": "DOWN",
+            "port": port,
+            "reason": reason,
+            "ts_ms": int(time.time() * 1000),
+        }),
+        QOS_ALERT,
+    )
 
 
 # ---------------- MQTT callbacks ----------------
 def on_connect(mqtt_client, userdata, flags, reason_code, properties):
     """Subscribe to required topics after successful connection."""
+    global mqtt_connected
     if reason_code == 0:
-        print("[MQTT] Connected.")
-        print(f"[MQTT] Subscribing: {TOPIC_MODE}, {TOPIC_DRIVE}")
-        mqtt_client.subscribe(TOPIC_MODE)
-        mqtt_client.subscribe(TOPIC_DRIVE)
+        mqtt_connected = True
+        log.info("[MQTT] Connected.")
+        log.info(f"[MQTT] Subscribing: {TOPIC_MODE}, {TOPIC_DRIVE}, {TOPIC_TEL_CTRL}, {TOPIC_PREVIEW_CTRL}")
+        mqtt_client.subscribe(TOPIC_MODE, qos=QOS_MODE)
+        mqtt_client.subscribe(TOPIC_DRIVE, qos=QOS_DRIVE)
+        mqtt_client.subscribe(TOPIC_TEL_CTRL, qos=QOS_TEL_CTRL)
+        mqtt_client.subscribe(TOPIC_PREVIEW_CTRL, qos=QOS_PREVIEW_CTRL)
     else:
-        print(f"[MQTT] Connection failed: {reason_code}")
+        log.error(f"[MQTT] Connection failed: {reason_code}")
+
+
+def on_disconnect(mqtt_client, userdata, flags, reason_code, properties):
+    """Track the broker link for /health."""
+    global mqtt_connected
+    mqtt_connected = False
+    log.warning(f"[MQTT] Disconnected: {reason_code}")
 
 
 def on_message(mqtt_client, userdata, msg):
@@ -221,20 +713,59 @@ def on_message(mqtt_client, userdata, msg):
                 set_mode(new_mode)
             return
 
+        if msg.topic == TOPIC_TEL_CTRL:
+            if rate_policy is None:
+                return
+            data = json.loads(msg.payload.decode("utf-8", errors="ignore"))
+            if "policy" in data:
+                rate_policy.set_policy(str(data["policy"]), data.get("period_ms"))
+                log.info(f"[RATE] Policy: {data}")
+            if "boost_sec" in data:
+                rate_policy.request_boost(float(data["boost_sec"]), str(data.get("reason", "request")))
+                log.info(f"[RATE] Boost request: {data}", extra={"rl": "tel_boost"})
+            return
+
+        if msg.topic == TOPIC_PREVIEW_CTRL:
+            if preview is None:
+                return
+            data = json.loads(msg.payload.decode("utf-8", errors="ignore"))
+            on = bool(data.get("on", False))
+            if on and not preview.active():
+                log.info("[PREVIEW] Viewer connected")
+            preview.request(on)
+            metrics.inc("preview_requests")
+            return
+
         if msg.topic == TOPIC_DRIVE:
             # Drive commands are applied only in GUI mode
             if get_mode() != MODE_GUI:
                 return
 
+            t_rx = time.perf_counter_ns()
             payload_str = msg.payload.decode("utf-8", errors="ignore")
             data = json.loads(payload_str)
+            if not accept_drive_command(data):
+                metrics.inc("cmd_dropped")
+                log.info(
+                    f"[DRIVE] Dropped expired/stale command: {payload_str}",
+                    extra={"rl": "drive_drop"},
+                )
+                return
+            if watchdog is not None:
+                watchdog.refresh(MODE_GUI)
             throttle = int(data.get("throttle", 0))
             steer = int(data.get("steer", 0))
             uart_send_cmd(throttle, steer, src="GUI")
+
+            metrics.inc("cmd_gui")
+            metrics.observe("cmd_latency", time.perf_counter_ns() - t_rx)
+            if "ts_ms" in data:
+                age_ms = int(time.time() * 1000) - int(data["ts_ms"])
+                metrics.observe("cmd_age", age_ms * 1_000_000)
             return
 
     except Exception as e:
-        print(f"[MQTT RX Error] {e}")
+        log.warning(f"[MQTT RX Error] {e}", extra={"rl": "mqtt_rx"})
 
 
 # ---------------- Gesture mapping ----------------
@@ -261,8 +792,9 @@ class GestureWorker(threading.Thread):
     """
     Gesture recognition worker thread.
 
-    - Keeps the camera open continuously
-    - Runs inference only in Gesture mode
+    - Keeps the camera open continuously (frames also feed the preview)
+    - Runs inference only in Gesture mode, on a gesture_proc backend
+      (child process by default, MediaPipe in this process with "thread")
     - Drops frames when busy to maintain low latency
     - Uses only the latest recognition result
     """
@@ -274,16 +806,23 @@ class GestureWorker(threading.Thread):
         width: int = 320,
         height: int = 240,
         min_interval_sec: float = 0.12,
+        backend: str = "auto",
+        proc: str = "process",
+        cpus: str | None = None,
     ):
         super().__init__(daemon=True)
         self.model_path = model_path
         self.camera_id = camera_id
+        self.backend = backend
+        self.proc = proc
         self.width = width
         self.height = height
         self.min_interval_sec = min_interval_sec
 
         self._stop_evt = threading.Event()
-        self._recognizer = None
+        self._recognizer = make_recognizer(
+            proc, model_path, on_result=self._on_result, observe=metrics.observe, cpus=cpus
+        )
         self._cap = None
 
         self._last_sent_ts = 0.0
@@ -294,7 +833,6 @@ class GestureWorker(threading.Thread):
         self._cmd_steer = 0
 
         self._proc_lock = threading.Lock()
-        self._is_processing = False
         self._latest_result = None
         self._latest_result_ts_ms = 0
 
@@ -302,6 +840,9 @@ class GestureWorker(threading.Thread):
         """Signal the worker thread to stop."""
         self._stop_evt.set()
 
+    def metrics(self) -> dict:
+        return self._recognizer.metrics()
+
     def _apply_gesture_action(self, category_name: str) -> tuple[int, int] | None:
         """
         Return the updated (throttle, steer) based on the gesture action.
@@ -340,63 +881,54 @@ class GestureWorker(threading.Thread):
         self._last_sent_ts = now
         self._last_gesture = category_name
 
-    def _on_result(
-        self,
-        result: vision.GestureRecognizerResult,
-        unused_output_image: mp.Image,
-        timestamp_ms: int,
-    ) -> None:
-        """Async callback for MediaPipe gesture recognition results."""
+    def _on_result(self, name: str | None, score: float, timestamp_ms: int) -> None:
+        """Recognizer callback (backend thread): top gesture of the frame, None without a hand."""
         with self._proc_lock:
-            self._latest_result = result
+            self._latest_result = (name, score)
             self._latest_result_ts_ms = timestamp_ms
-            self._is_processing = False
-
-    def _init_mediapipe(self) -> None:
-        """Initialize MediaPipe GestureRecognizer in LIVE_STREAM mode."""
-        base_options = python.BaseOptions(model_asset_path=self.model_path)
-        options = vision.GestureRecognizerOptions(
-            base_options=base_options,
-            running_mode=vision.RunningMode.LIVE_STREAM,
-            num_hands=1,
-            min_hand_detection_confidence=0.5,
-            min_hand_presence_confidence=0.5,
-            min_tracking_confidence=0.5,
-            result_callback=self._on_result,
-        )
-        self._recognizer = vision.GestureRecognizer.create_from_options(options)
-
-    def _init_camera(self) -> None:
-        """Open the camera and apply resolution settings."""
-        self._cap = cv2.VideoCapture(self.camera_id)
-        self._cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
-        self._cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
 
+    def _start_recognizer(self, shape: tuple) -> None:
+        """Start the backend for frames of `shape`; on failure the camera keeps feeding the preview."""
         try:
-            self._cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
-        except Exception:
-            pass
+            self._recognizer.start(shape)
+            log.info(f"[GestureWorker] Recognizer: {self.proc}")
+        except Exception as e:
+            log.error(f"[GestureWorker] Recognizer init failed: {e}")
+            self._recognizer.state = "failed"
+
+    def _init_camera(self) -> None:
+        """Open the capture source (mirrored RGB frames); raises CaptureError / OSError."""
+        self._cap = open_capture(
+            self.backend, self.camera_id, self.width, self.height, mirror=True, observe=metrics.observe
+        )
+        log.info(f"[GestureWorker] Camera: {self._cap.info}")
 
     def run(self) -> None:
         """Main worker loop."""
         if not GESTURE_AVAILABLE:
-            print("[GestureWorker] Disabled (dependencies missing).")
+            log.warning("[GestureWorker] Disabled (dependencies missing).")
             return
 
         try:
             self._init_camera()
-            self._init_mediapipe()
-            print("[GestureWorker] Started.")
+            log.info("[GestureWorker] Started.")
+        except (CaptureError, OSError) as e:
+            log.error(f"[GestureWorker] Camera init failed: {e}")
+            return
         except Exception as e:
-            print(f"[GestureWorker] Init failed: {e}")
+            log.error(f"[GestureWorker] Init failed: {e}")
             return
 
         try:
-            while not self._stop_evt.is_set() and self._cap and self._cap.isOpened():
-                ok, frame = self._cap.read()
-                if not ok:
+            while not self._stop_evt.is_set() and self._cap and self._cap.is_open():
+                if not self._cap.read():
                     time.sleep(0.02)
                     continue
+                if self._recognizer.state == "stopped":
+                    # the frame ring is sized from the first real frame
+                    self._start_recognizer(self._cap.rgb().shape)
+                if preview is not None and preview.due():
+                    preview.offer(self._cap.rgb(), time.time_ns() // 1_000_000)
 
                 if get_mode() != MODE_GESTURE:
                     # When leaving Gesture mode, clear last gesture + reset commanded state.
@@ -409,22 +941,10 @@ class GestureWorker(threading.Thread):
                     time.sleep(0.03)
                     continue
 
-                with self._proc_lock:
-                    busy = self._is_processing
-
-                if not busy:
-                    frame = cv2.flip(frame, 1)
-                    rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                    mp_image = mp.Image(
-                        image_format=mp.ImageFormat.SRGB,
-                        data=rgb,
-                    )
-
-                    with self._proc_lock:
-                        self._is_processing = True
-
-                    ts_ms = time.time_ns() // 1_000_000
-                    self._recognizer.recognize_async(mp_image, ts_ms)
+                if self._recognizer.ready():
+                    # already mirrored RGB; the backend copies the reused buffer
+                    if self._recognizer.submit(self._cap.rgb(), time.time_ns() // 1_000_000):
+                        metrics.inc("gesture_frames")
                 else:
                     time.sleep(0.001)
 
@@ -434,54 +954,64 @@ class GestureWorker(threading.Thread):
                         result_to_use = self._latest_result
                         self._latest_result = None
 
-                if result_to_use and result_to_use.gestures:
-                    gesture = result_to_use.gestures[0][0]
-                    name = gesture.category_name
+                # camera + recognizer alive: renew the gesture lease
+                if result_to_use is not None:
+                    metrics.inc("gesture_results")
+                    if watchdog is not None:
+                        watchdog.refresh(MODE_GESTURE)
+
+                    name = result_to_use[0]
                     if name and name != "None":
                         self._send_by_gesture(name)
 
                 time.sleep(0.001)
 
         except Exception as e:
-            print(f"[GestureWorker] Runtime error: {e}")
+            log.error(f"[GestureWorker] Runtime error: {e}")
 
         finally:
             try:
-                if self._recognizer:
-                    self._recognizer.close()
+                self._recognizer.stop()
             except Exception:
                 pass
             try:
                 if self._cap:
-                    self._cap.release()
+                    self._cap.close()
             except Exception:
                 pass
-            print("[GestureWorker] Stopped and resources released.")
+            log.info("[GestureWorker] Stopped and resources released.")
 
 
 # ---------------- Initialization and main loop ----------------
 def init_serial() -> None:
-    """Open the UART port (auto-detect across RPi4/RPi5)."""
-    global ser, SERIAL_PORT
-
-    try:
-        chosen_port, opened = pick_serial_port(SERIAL_PORT, DEFAULT_SERIAL_CANDIDATES)
-        ser = opened
-        real = _resolve_realpath(chosen_port)
-        if chosen_port != real:
-            print(f"[UART] Opened: {chosen_port} -> {real} @ {BAUD_RATE}")
-        else:
-            print(f"[UART] Opened: {chosen_port} @ {BAUD_RATE}")
-    except Exception as e:
-        print(f"[UART] Open failed: {e}")
-        print("[HINT] If you know the exact device, run with: --serial /dev/ttyAMA0 (or /dev/serial0)")
-        sys.exit(1)
+    """
+    Open the UART (candidates probed in parallel, auto-detect across
+    RPi4/RPi5) and start the link supervisor. If nothing opens yet, the
+    gateway still starts and the supervisor keeps retrying.
+    """
+    global link
+
+    link = SerialLink(
+        DEFAULT_SERIAL_CANDIDATES,
+        BAUD_RATE,
+        port=SERIAL_PORT,
+        backoff_min_sec=SERIAL_BACKOFF_MIN_SEC,
+        backoff_max_sec=SERIAL_BACKOFF_MAX_SEC,
+        check_sec=SERIAL_CHECK_SEC,
+        on_up=on_link_up,
+        on_down=on_link_down,
+    )
+    if not link.open_now():
+        log.error(f"[UART] Open failed: {link.metrics()['reason']}; retrying in background")
+        log.error("[HINT] If you know the exact device, run with: --serial /dev/ttyAMA0 (or /dev/serial0)")
+    link.start()
 
 
 def init_mqtt() -> mqtt.Client:
     """Connect to MQTT broker and start the network loop."""
     mqtt_client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
     mqtt_client.on_connect = on_connect
+    mqtt_client.on_disconnect = on_disconnect
     mqtt_client.on_message = on_message
 
     try:
@@ -489,7 +1019,7 @@ def init_mqtt() -> mqtt.Client:
         mqtt_client.loop_start()
         return mqtt_client
     except Exception as e:
-        print(f"[MQTT] Connect failed: {e}")
+        log.error(f"[MQTT] Connect failed: {e}")
         sys.exit(1)
 
 
@@ -511,82 +1041,304 @@ def parse_args(argv: list[str]) -> argparse.Namespace:
         default=None,
         help="Serial device path (optional). If omitted, auto-detect among /dev/serial0,/dev/ttyAMA0,/dev/ttyS0,...",
     )
+    p.add_argument(
+        "--lease-gui-ms",
+        type=int,
+        default=LEASE_GUI_MS,
+        help=f"GUI command lease before ramp-down (default: {LEASE_GUI_MS})",
+    )
+    p.add_argument(
+        "--lease-gesture-ms",
+        type=int,
+        default=LEASE_GESTURE_MS,
+        help=f"Gesture worker lease before ramp-down (default: {LEASE_GESTURE_MS})",
+    )
+    p.add_argument(
+        "--no-ttc-guard",
+        action="store_true",
+        help="Disable the edge time-to-collision guard (MCU fail-safe only)",
+    )
+    p.add_argument(
+        "--uart-proto",
+        choices=["auto", "ascii"],
+        default="auto",
+        help="Telemetry format: auto = request binary frames, ASCII fallback (default: auto)",
+    )
+    p.add_argument(
+        "--tel-rate",
+        choices=["auto", "fixed", "off"],
+        default="auto",
+        help=f"Telemetry period: auto = idle/cruise/boost policy, fixed = {TEL_PERIOD_CRUISE_MS} ms, "
+             "off = never send $CFG (default: auto)",
+    )
+    p.add_argument(
+        "--edge-score",
+        action="store_true",
+        help="Score anomalies on the RPi4 too (PredictorEngine in a child process; needs torch)",
+    )
+    p.add_argument(
+        "--edge-engine-dir",
+        default=DEFAULT_ENGINE_DIR,
+        help="gui-controller directory with predictor_engine.py and the model (default: ../control-ai-rpi5/gui-controller)",
+    )
+    p.add_argument(
+        "--edge-bundle",
+        default=None,
+        help="Model bundle from training/train.py for the edge scorer (optional)",
+    )
+    p.add_argument(
+        "--edge-cpu-budget",
+        type=float,
+        default=EDGE_CPU_BUDGET,
+        help=f"Edge scorer CPU time per second, 1.0 = one core (default: {EDGE_CPU_BUDGET})",
+    )
+    p.add_argument(
+        "--edge-cpus",
+        default=None,
+        help="Pin the edge scorer to these cores, e.g. 3 (optional)",
+    )
+    p.add_argument(
+        "--camera-backend",
+        default="auto",
+        help=f"Gesture camera source: {' / '.join(CAPTURE_BACKENDS)} / file:PATH "
+             "(auto = V4L2 YUYV, OpenCV fallback; default: auto)",
+    )
+    p.add_argument(
+        "--gesture-proc",
+        choices=list(GESTURE_PROCS),
+        default="process",
+        help="Where MediaPipe runs: process = child process fed through shared memory, "
+             "thread = inside the gateway (default: process)",
+    )
+    p.add_argument(
+        "--gesture-cpus",
+        default=None,
+        help="Pin the gesture recognizer process to these cores, e.g. 2 (optional)",
+    )
+    p.add_argument(
+        "--preview",
+        choices=list(PREVIEW_MODES),
+        default="demand",
+        help="Camera preview on mobility/camera/preview: demand = only while a GUI viewer holds the lease, "
+             "always, off (default: demand)",
+    )
+    p.add_argument(
+        "--preview-size",
+        default=f"{PREVIEW_WIDTH}x{PREVIEW_HEIGHT}",
+        help=f"Preview frame size WxH (default: {PREVIEW_WIDTH}x{PREVIEW_HEIGHT})",
+    )
+    p.add_argument(
+        "--preview-fps",
+        type=float,
+        default=PREVIEW_MAX_FPS,
+        help=f"Preview frame rate limit (default: {PREVIEW_MAX_FPS:g})",
+    )
+    p.add_argument(
+        "--preview-kbps",
+        type=float,
+        default=PREVIEW_KBPS,
+        help=f"Preview bandwidth target, sets the JPEG quality (default: {PREVIEW_KBPS:g})",
+    )
+    p.add_argument(
+        "--log-level",
+        default="INFO",
+        choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+        help="Log level (default: INFO; DEBUG also logs every $CMD)",
+    )
+    p.add_argument(
+        "--metrics-port",
+        type=int,
+        default=METRICS_HTTP_PORT,
+        help=f"HTTP port for /metrics and /health (default: {METRICS_HTTP_PORT}, 0 disables)",
+    )
+    p.add_argument(
+        "--metrics-bind",
+        default=METRICS_HTTP_BIND,
+        help=f"HTTP bind address for /metrics and /health (default: {METRICS_HTTP_BIND})",
+    )
     return p.parse_args(argv)
 
 
 def main() -> None:
-    global client, BROKER_ADDRESS, BROKER_PORT, SERIAL_PORT
+    global client, ttc_guard, watchdog, uart_proto, rate_policy, edge_scorer, preview, gesture_worker
+    global BROKER_ADDRESS, BROKER_PORT, SERIAL_PORT
 
     args = parse_args(sys.argv[1:])
+    setup_logging(args.log_level, LOG_RATE_PER_SEC, LOG_RATE_BURST)
     BROKER_ADDRESS = args.broker
     BROKER_PORT = int(args.port)
     SERIAL_PORT = args.serial
+    uart_proto = args.uart_proto
+    uart_rx.auto = uart_proto == "auto"
+    if not args.no_ttc_guard:
+        ttc_guard = TtcGuard()
+    if args.tel_rate != "off":
+        rate_policy = TelemetryRatePolicy(
+            idle_ms=TEL_PERIOD_IDLE_MS,
+            cruise_ms=TEL_PERIOD_CRUISE_MS,
+            boost_ms=TEL_PERIOD_BOOST_MS,
+            policy=args.tel_rate,
+        )
+
+    if args.preview != "off" and GESTURE_AVAILABLE:
+        try:
+            width, height = (int(v) for v in args.preview_size.lower().split("x"))
+        except ValueError:
+            log.error(f"[PREVIEW] Bad --preview-size: {args.preview_size}")
+            sys.exit(1)
+        preview = PreviewEncoder(
+            lambda payload: mqtt_publish(TOPIC_PREVIEW, payload, QOS_PREVIEW),
+            width=width,
+            height=height,
+            max_fps=args.preview_fps,
+            target_kbps=args.preview_kbps,
+            cpu_budget=PREVIEW_CPU_BUDGET,
+            mirror=False,
+            rgb=True,
+            mode=args.preview,
+            lease_sec=PREVIEW_LEASE_SEC,
+            observe=metrics.observe,
+        )
 
     init_serial()
     client = init_mqtt()
 
+    watchdog = LeaseWatchdog(
+        lambda throttle, steer: uart_send_cmd(throttle, steer, src="WDOG"),
+        {MODE_GUI: args.lease_gui_ms / 1000.0, MODE_GESTURE: args.lease_gesture_ms / 1000.0},
+        ramp_steps=RAMP_STEPS,
+        ramp_step_sec=RAMP_STEP_MS / 1000.0,
+        on_expire=on_lease_expired,
+    )
+    watchdog.set_active(get_mode())
+    watchdog.start()
+
     gesture_worker = GestureWorker(
         model_path="gesture_recognizer.task",
         camera_id=0,
         width=320,
         height=240,
         min_interval_sec=0.12,
+        backend=args.camera_backend,
+        proc=args.gesture_proc,
+        cpus=args.gesture_cpus,
     )
     gesture_worker.start()
-
-    print("=== UART <-> MQTT Bridge Running ===")
-    print(f"[MQTT] Broker: {BROKER_ADDRESS}:{BROKER_PORT}")
-    print(f"[MODE] Default: {MODE_GUI} (publish to {TOPIC_MODE} to switch)")
-
+    if preview is not None:
+        preview.start()
+
+    if args.edge_score:
+        edge_scorer = EdgeScorer(
+            args.edge_engine_dir,
+            bundle_dir=args.edge_bundle,
+            cpu_budget=args.edge_cpu_budget,
+            cpus=args.edge_cpus,
+            max_stride=EDGE_MAX_STRIDE,
+            on_score=on_edge_score,
+        )
+        edge_scorer.start()
+
+    reporter = MetricsReporter(
+        metrics,
+        METRICS_PUBLISH_SEC,
+        publish=lambda text: mqtt_publish(TOPIC_METRICS, text, QOS_METRICS, retain=True),
+        extra=metrics_extra,
+        health=health_checks,
+    )
+    reporter.start()
+    if args.metrics_port:
+        try:
+            reporter.serve_http(args.metrics_bind, args.metrics_port)
+            log.info(f"[METRICS] HTTP: http://{args.metrics_bind}:{args.metrics_port}/metrics, /health")
+        except OSError as e:
+            log.error(f"[METRICS] HTTP bind failed: {e}")
+
+    log.info("=== UART <-> MQTT Bridge Running ===")
+    log.info(f"[MQTT] Broker: {BROKER_ADDRESS}:{BROKER_PORT}")
+    log.info(f"[MODE] Default: {MODE_GUI} (publish to {TOPIC_MODE} to switch)")
+    log.info(f"[TTC] Guard: {'on' if ttc_guard else 'off'}")
+    log.info(f"[UART] Telemetry format: {'binary (ASCII fallback)' if uart_proto == 'auto' else 'ASCII'}")
+    log.info(f"[RATE] Telemetry rate: {args.tel_rate}")
+    log.info(f"[EDGE] Scoring: {'on, budget %.2f core' % args.edge_cpu_budget if edge_scorer else 'off'}")
+    log.info(f"[GESTURE] Recognizer: {args.gesture_proc}")
+    log.info(f"[PREVIEW] Camera preview: {args.preview if preview else 'off'} -> {TOPIC_PREVIEW}")
+    log.info(f"[WDOG] Leases: GUI {args.lease_gui_ms} ms, Gesture {args.lease_gesture_ms} ms")
+    log.info(f"[METRICS] Publishing every {METRICS_PUBLISH_SEC} s to {TOPIC_METRICS}")
+
+    rx_handle = None
     try:
         while True:
-            if ser.in_waiting > 0:
+            s = link.ser
+            if s is None:
+                link.wait_up(0.1)
+                continue
+            if s is not rx_handle:
+                # first open or reopened link: the MCU may have reset to ASCII
+                rx_handle = s
+                uart_rx.reset()
+                proto_neg["attempts"] = 0
+                proto_neg["sent_at"] = 0.0
+                reset_rate_sync()
+            now = time.monotonic()
+            negotiate_uart_proto(now)
+            sync_tel_rate(now)
+
+            try:
+                waiting = s.in_waiting
+            except (serial.SerialException, OSError) as e:
+                link.lost(s, f"read: {e}")
+                continue
+
+            if waiting > 0:
                 try:
+                    t0 = time.perf_counter_ns()
                     with uart_lock:
-                        line = ser.readline().decode(
-                            "utf-8",
-                            errors="ignore",
-                        ).strip()
-
-                    if not line:
-                        time.sleep(0.001)
-                        continue
-
-                    if line.startswith("$TEL"):
-                        json_payload = parse_telemetry(line)
-                        if json_payload:
-                            client.publish(TOPIC_TEL, json_payload)
-
-                    elif line.startswith("$STS"):
-                        print(f"[STS RX] {line}")
-                        parts = line.split(",")
-                        if len(parts) >= 2:
-                            event_type = parts[1].strip()
-                            alert_payload = {
-                                "type": "ALERT",
-                                "event": event_type,
-                                "ts_ms": int(time.time() * 1000),
-                            }
-                            client.publish(
-                                TOPIC_ALERT,
-                                json.dumps(alert_payload),
-                            )
-                            print(f"[ALERT Pub] {alert_payload}")
-
-                    else:
-                        pass
+                        t1 = time.perf_counter_ns()
+                        raw = s.read(waiting)
+                    metrics.observe("uart_lock_wait", t1 - t0)
+                    metrics.inc("uart_rx_bytes", len(raw))
+                    handle_uart_events(uart_rx.feed(raw))
+
+                except (serial.SerialException, OSError) as e:
+                    link.lost(s, f"read: {e}")
+                    continue
 
                 except Exception as e:
-                    print(f"[UART] Read error: {e}")
+                    metrics.inc("uart_read_errors")
+                    log.warning(f"[UART] Read error: {e}", extra={"rl": "uart_read"})
 
             time.sleep(0.001)
 
     except KeyboardInterrupt:
-        print("\n[SYS] Stopping...")
+        log.info("[SYS] Stopping...")
 
     finally:
+        try:
+            reporter.stop()
+        except Exception:
+            pass
+
         try:
             gesture_worker.stop()
+            # lets the worker stop the recognizer process and free the frame ring
+            gesture_worker.join(timeout=2.0)
+        except Exception:
+            pass
+
+        try:
+            if edge_scorer is not None:
+                edge_scorer.stop()
+        except Exception:
+            pass
+
+        try:
+            if preview is not None:
+                preview.stop()
+        except Exception:
+            pass
+
+        try:
+            watchdog.stop()
         except Exception:
             pass
 
@@ -597,12 +1349,11 @@ def main() -> None:
             pass
 
         try:
-            if ser:
-                ser.close()
+            link.stop()
         except Exception:
             pass
 
-        print("[SYS] Clean shutdown complete.")
+        log.info("[SYS] Clean shutdown complete.")
 
 
 if __name__ == "__main__":
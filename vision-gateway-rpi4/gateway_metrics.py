@@ -0,0 +1,226 @@
+"""
+gateway_metrics.py
+
+Runtime metrics, health endpoint and rate-limited logging for gateway.py.
+
+- Metrics.inc(name, n) / Metrics.observe(name, dt_ns): counters and
+  latency histograms. observe() is a bit_length() bucket increment
+  (power-of-two ns buckets, same scheme as the RPi5 stage_profiler), so
+  it is cheap enough for every UART line and command. Updates are not
+  locked; under the GIL a lost increment is possible but rare.
+- MetricsReporter: every interval, computes per-second rates from the
+  counter deltas and publishes the snapshot (MQTT), and serves it over
+  HTTP:
+      GET /metrics  -> latest snapshot (JSON)
+      GET /health   -> 200 / 503 with the failing checks (JSON)
+- RateLimitFilter: logging filter that lets at most `per_sec` records per
+  key through (records logged with extra={"rl": key}); the next record
+  that passes reports how many were suppressed.
+"""
+
+import json
+import time
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+N_BUCKETS = 37  # bucket b holds [2^(b-1), 2^b) ns; last bucket is open-ended
+
+
+# ---------------- Metrics ----------------
+class Metrics:
+    def __init__(self, counters, histograms):
+        self.counters = dict.fromkeys(counters, 0)
+        self._hist = {h: [0] * N_BUCKETS for h in histograms}
+        self._sum = dict.fromkeys(histograms, 0)
+        self._max = dict.fromkeys(histograms, 0)
+        self.t_start = time.monotonic()
+
+    def inc(self, name: str, n: int = 1) -> None:
+        self.counters[name] += n
+
+    def observe(self, name: str, dt_ns: int) -> None:
+        if dt_ns < 0:
+            dt_ns = 0
+        b = dt_ns.bit_length()
+        self._hist[name][b if b < N_BUCKETS else N_BUCKETS - 1] += 1
+        self._sum[name] += dt_ns
+        if dt_ns > self._max[name]:
+            self._max[name] = dt_ns
+
+    def histograms(self) -> dict:
+        """
+        Per histogram: n, mean / p50 / p95 / p99 / max in microseconds.
+        Percentiles are bucket upper bounds (within 2x, capped at max).
+        """
+        out = {}
+        for name, hist in self._hist.items():
+            h = list(hist)
+            n = sum(h)
+            if n == 0:
+                out[name] = {"n": 0}
+                continue
+            mx = round(self._max[name] / 1000.0, 2)
+            pct = {}
+            for q in (50, 95, 99):
+                target = q / 100.0 * n
+                acc = 0
+                for b, c in enumerate(h):
+                    acc += c
+                    if acc >= target:
+                        pct[q] = min(mx, (2.0 ** b) / 1000.0)
+                        break
+            out[name] = {
+                "n": n,
+                "mean_us": round(self._sum[name] / n / 1000.0, 2),
+                "p50_us": pct[50],
+                "p95_us": pct[95],
+                "p99_us": pct[99],
+                "max_us": mx,
+            }
+        return out
+
+
+class MetricsReporter(threading.Thread):
+    """
+    Periodic snapshot + publish, and the HTTP endpoint.
+
+    extra()  -> dict merged into every snapshot (component stats)
+    health() -> {check: bool}; /health is 200 only when all are True
+    publish(json_text) is called every interval_sec (e.g. MQTT retained).
+    """
+
+    def __init__(self, metrics: Metrics, interval_sec, publish=None, extra=None, health=None):
+        super().__init__(daemon=True, name="MetricsReporter")
+        self.metrics = metrics
+        self.interval_sec = float(interval_sec)
+        self._publish = publish
+        self._extra = extra
+        self._health = health
+
+        self._stop_evt = threading.Event()
+        self._prev = (time.monotonic(), dict(metrics.counters))
+        self._rates = dict.fromkeys(metrics.counters, 0.0)
+        self._httpd = None
+
+    def snapshot(self) -> dict:
+        m = self.metrics
+        snap = {
+            "ts_ms": int(time.time() * 1000),
+            "uptime_s": round(time.monotonic() - m.t_start, 1),
+            "interval_s": self.interval_sec,
+            "counters": dict(m.counters),
+            "rates": dict(self._rates),
+            "hist": m.histograms(),
+        }
+        if self._extra:
+            snap.update(self._extra())
+        return snap
+
+    def health(self) -> tuple[bool, dict]:
+        checks = self._health() if self._health else {}
+        return all(checks.values()), checks
+
+    def _update_rates(self) -> None:
+        now = time.monotonic()
+        counters = dict(self.metrics.counters)
+        t_prev, prev = self._prev
+        dt = max(now - t_prev, 1e-9)
+        self._rates = {k: round((v - prev.get(k, 0)) / dt, 2) for k, v in counters.items()}
+        self._prev = (now, counters)
+
+    def run(self) -> None:
+        while not self._stop_evt.wait(self.interval_sec):
+            self._update_rates()
+            if self._publish:
+                try:
+                    self._publish(json.dumps(self.snapshot()))
+                except Exception as e:
+                    logging.getLogger("gateway").warning(f"[METRICS] Publish failed: {e}")
+
+    def stop(self) -> None:
+        self._stop_evt.set()
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+
+    # --------------------------------------------------
+    # HTTP
+    # --------------------------------------------------
+    def serve_http(self, host: str, port: int) -> None:
+        reporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split("?", 1)[0]
+                if path == "/metrics":
+                    code, body = 200, reporter.snapshot()
+                elif path == "/health":
+                    ok, checks = reporter.health()
+                    code, body = (200 if ok else 503), {"ok": ok, "checks": checks}
+                else:
+                    code, body = 404, {"error": "not found", "paths": ["/metrics", "/health"]}
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, fmt, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer((host, port), Handler)
+        self._httpd.daemon_threads = True
+        threading.Thread(target=self._httpd.serve_forever, daemon=True, name="MetricsHTTP").start()
+
+
+# ---------------- Logging ----------------
+class RateLimitFilter(logging.Filter):
+    """
+    Token bucket per record key (extra={"rl": key}); records without a key
+    always pass. Suppressed records are counted and reported on the next
+    record of the same key that passes.
+    """
+
+    def __init__(self, per_sec: float = 5.0, burst: int = 10, clock=time.monotonic):
+        super().__init__()
+        self.per_sec = float(per_sec)
+        self.burst = float(burst)
+        self._clock = clock
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        key = getattr(record, "rl", None)
+        if key is None:
+            return True
+
+        now = self._clock()
+        with self._lock:
+            tokens, last, suppressed = self._buckets.get(key, (self.burst, now, 0))
+            tokens = min(self.burst, tokens + (now - last) * self.per_sec)
+            if tokens < 1.0:
+                self._buckets[key] = (tokens, now, suppressed + 1)
+                return False
+            self._buckets[key] = (tokens - 1.0, now, 0)
+
+        if suppressed:
+            record.msg = f"{record.getMessage()} (+{suppressed} suppressed)"
+            record.args = None
+        return True
+
+
+def setup_logging(level: str = "INFO", per_sec: float = 5.0, burst: int = 10) -> logging.Logger:
+    """
+    "gateway" logger on stderr with the rate limiter attached. Messages
+    keep the existing "[TAG] ..." format.
+    """
+    log = logging.getLogger("gateway")
+    log.setLevel(getattr(logging, str(level).upper(), logging.INFO))
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(asctime)s.%(msecs)03d %(message)s", "%H:%M:%S"))
+    handler.addFilter(RateLimitFilter(per_sec, burst))
+    log.handlers[:] = [handler]
+    log.propagate = False
+    return log
@@ -0,0 +1,486 @@
+"""
+gesture_proc.py
+
+Gesture recognizer backends for GestureWorker (gateway.py --gesture-proc).
+
+"process" (default): MediaPipe runs in a child process, so the
+recognizer's Python work (mp.Image, result callbacks, result
+conversion) never holds the gateway's GIL while the main loop forwards
+telemetry. The camera, the preview and the gesture -> $CMD logic stay in
+the gateway.
+
+  Frames: one multiprocessing.shared_memory block holding SLOTS RGB
+      frames, created by the gateway once the camera frame size is known
+  Gateway -> child (stdin): fixed-size records
+      slot u8 | seq u32 | ts_ms i64
+    the slot belongs to the child from then on
+  Child -> gateway (stdout): fixed-size records
+      slot u8 | seq u32 | ts_ms i64 | gesture i8 | score f32 | infer_us u32 | cpu_ms u32
+    handing the slot back; gesture indexes GESTURE_NAMES (-1 = no hand).
+    The first record (slot SLOT_READY) reports the model as loaded.
+  At most max_in_flight frames belong to the child (one being
+  recognized, one queued) and the gateway copies only into a slot it
+  owns, so a slot is never written while it is read and no lock is
+  shared between the processes. With no slot free the frame is skipped,
+  as before.
+
+"thread": the previous path, MediaPipe LIVE_STREAM inside the gateway
+process (result callback on MediaPipe's thread).
+
+Both backends call on_result(name, score, ts_ms) from their own thread.
+model is a gesture_recognizer.task path, or "synthetic:GRAPH_MS,GIL_MS"
+for benchmarks on machines without the model: GRAPH_MS of GIL-free
+waiting (MediaPipe's graph threads) plus GIL_MS of Python work per frame,
+never recognizing a hand.
+
+    python gesture_proc.py --child --shm NAME --shape 240x320x3 --slots 3 --model gesture_recognizer.task
+"""
+
+import os
+import sys
+import time
+import struct
+import logging
+import argparse
+import threading
+import subprocess
+from multiprocessing import shared_memory
+
+import numpy as np
+
+log = logging.getLogger("gateway")
+
+PROCS = ("process", "thread")
+
+# canned categories of gesture_recognizer.task ("None" = hand, no gesture)
+GESTURE_NAMES = ("None", "Closed_Fist", "Open_Palm", "Pointing_Up", "Thumb_Down", "Thumb_Up", "Victory", "ILoveYou")
+_GESTURE_ID = {name: i for i, name in enumerate(GESTURE_NAMES)}
+NO_GESTURE = -1
+
+_FRAME = struct.Struct("<BIq")
+_RESULT = struct.Struct("<BIqbfII")
+SLOT_READY = 0xFF
+
+MAX_IN_FLIGHT = 2
+
+MIN_CONFIDENCE = 0.5
+
+
+# ---------------- Recognizers ----------------
+def top_gesture(result) -> tuple[str | None, float]:
+    """GestureRecognizerResult -> (category of the first hand, score); (None, 0.0) without a hand."""
+    if result is None or not result.gestures:
+        return None, 0.0
+    g = result.gestures[0][0]
+    return g.category_name, float(g.score)
+
+
+def _mp_recognizer(model_path: str, result_callback=None):
+    """MediaPipe GestureRecognizer: LIVE_STREAM with a callback, VIDEO (synchronous) without."""
+    import mediapipe as mp
+    from mediapipe.tasks import python
+    from mediapipe.tasks.python import vision
+
+    options = vision.GestureRecognizerOptions(
+        base_options=python.BaseOptions(model_asset_path=model_path),
+        running_mode=vision.RunningMode.LIVE_STREAM if result_callback else vision.RunningMode.VIDEO,
+        num_hands=1,
+        min_hand_detection_confidence=MIN_CONFIDENCE,
+        min_hand_presence_confidence=MIN_CONFIDENCE,
+        min_tracking_confidence=MIN_CONFIDENCE,
+        result_callback=result_callback,
+    )
+    return mp, vision.GestureRecognizer.create_from_options(options)
+
+
+class SyntheticModel:
+    """Stand-in for the MediaPipe model (benchmarks): GIL-free wait, then GIL-held Python work."""
+
+    def __init__(self, graph_ms: float, gil_ms: float):
+        self.graph_ms = float(graph_ms)
+        self.gil_ms = float(gil_ms)
+
+    @classmethod
+    def parse(cls, spec: str) -> "SyntheticModel | None":
+        """"synthetic:GRAPH_MS,GIL_MS" -> SyntheticModel, anything else -> None."""
+        if not spec.startswith("synthetic:"):
+            return None
+        graph_ms, gil_ms = (float(v) for v in spec[len("synthetic:"):].split(","))
+        return cls(graph_ms, gil_ms)
+
+    def run(self, rgb: np.ndarray, ts_ms: int) -> tuple[str | None, float]:
+        time.sleep(self.graph_ms / 1000.0)
+        end = time.perf_counter() + self.gil_ms / 1000.0
+        n = 0
+        while time.perf_counter() < end:
+            n += int(rgb[n % rgb.shape[0], 0, 0])
+        return None, 0.0
+
+    def close(self) -> None:
+        pass
+
+
+class _VideoModel:
+    """MediaPipe in VIDEO mode: recognize one frame synchronously (child process)."""
+
+    def __init__(self, model_path: str):
+        self._mp, self._rec = _mp_recognizer(model_path)
+        self._last_ts = -1
+
+    def run(self, rgb: np.ndarray, ts_ms: int) -> tuple[str | None, float]:
+        # VIDEO mode needs strictly increasing timestamps
+        ts_ms = max(int(ts_ms), self._last_ts + 1)
+        self._last_ts = ts_ms
+        image = self._mp.Image(image_format=self._mp.ImageFormat.SRGB, data=rgb)
+        return top_gesture(self._rec.recognize_for_video(image, ts_ms))
+
+    def close(self) -> None:
+        self._rec.close()
+
+
+# ---------------- In-process backend ----------------
+class InlineRecognizer:
+    """--gesture-proc thread: MediaPipe LIVE_STREAM in the gateway process (one frame in flight)."""
+
+    def __init__(self, model: str, on_result=None, observe=None):
+        """
+        on_result(name, score, ts_ms) : MediaPipe's result thread
+        observe(name, dt_ns)          : optional histogram sink ("gesture_result")
+        """
+        self.model = model
+        self._on_result = on_result
+        self._observe = observe
+        self._lock = threading.Lock()
+        self._busy = False
+        self._sent_ns = 0
+        self._mp = None
+        self._rec = None
+        self._synthetic = None
+        self._pending = None
+        self._cond = threading.Condition()
+        self.state = "stopped"
+        self.stats = {"frames_sent": 0, "results": 0}
+
+    def start(self, shape: tuple | None = None) -> None:
+        self._synthetic = SyntheticModel.parse(self.model)
+        if self._synthetic is not None:
+            threading.Thread(target=self._synthetic_loop, daemon=True, name="SyntheticRecognizer").start()
+        else:
+            self._mp, self._rec = _mp_recognizer(self.model, self._on_mp_result)
+        self.state = "running"
+
+    def ready(self) -> bool:
+        with self._lock:
+            return self.state == "running" and not self._busy
+
+    def submit(self, rgb: np.ndarray, ts_ms: int) -> bool:
+        with self._lock:
+            if self.state != "running" or self._busy:
+                return False
+            self._busy = True
+            self._sent_ns = time.perf_counter_ns()
+        self.stats["frames_sent"] += 1
+        if self._synthetic is not None:
+            with self._cond:
+                self._pending = (rgb.copy(), ts_ms)   # mp.Image copies as well
+                self._cond.notify()
+        else:
+            self._rec.recognize_async(self._mp.Image(image_format=self._mp.ImageFormat.SRGB, data=rgb), ts_ms)
+        return True
+
+    def _on_mp_result(self, result, unused_output_image, timestamp_ms: int) -> None:
+        self._deliver(*top_gesture(result), timestamp_ms)
+
+    def _synthetic_loop(self) -> None:
+        while True:
+            with self._cond:
+                while self._pending is None and self.state != "stopping":
+                    self._cond.wait()
+                if self.state == "stopping":
+                    return
+                rgb, ts_ms = self._pending
+                self._pending = None
+            self._deliver(*self._synthetic.run(rgb, ts_ms), ts_ms)
+
+    def _deliver(self, name: str | None, score: float, ts_ms: int) -> None:
+        with self._lock:
+            self._busy = False
+            sent_ns = self._sent_ns
+        if self._observe is not None:
+            self._observe("gesture_result", time.perf_counter_ns() - sent_ns)
+        self.stats["results"] += 1
+        if self._on_result:
+            self._on_result(name, score, ts_ms)
+
+    def stop(self) -> None:
+        self.state = "stopping"
+        with self._cond:
+            self._cond.notify()
+        if self._rec is not None:
+            self._rec.close()
+        self.state = "stopped"
+
+    def metrics(self) -> dict:
+        return {"proc": "thread", "state": self.state, **self.stats}
+
+
+# ---------------- Child-process backend ----------------
+def _read_exact(f, n: int) -> bytes | None:
+    buf = b""
+    while len(buf) < n:
+        chunk = f.read(n - len(buf))
+        if not chunk:
+            return None
+        buf += chunk
+    return buf
+
+
+class GestureProcess(threading.Thread):
+    """--gesture-proc process: recognizer child fed through a shared-memory frame ring."""
+
+    def __init__(self, model: str, on_result=None, observe=None, max_in_flight: int = MAX_IN_FLIGHT,
+                 cpus: str | None = None):
+        """
+        on_result(name, score, ts_ms) : every result (reader thread)
+        observe(name, dt_ns)          : optional histogram sink ("gesture_result")
+        max_in_flight                 : frames owned by the child; the ring has one slot more
+        cpus                          : core list for sched_setaffinity, e.g. "2" or "2,3"
+        """
+        super().__init__(daemon=True, name="GestureProcess")
+        self.model = model
+        self._on_result = on_result
+        self._observe = observe
+        self.max_in_flight = max(1, int(max_in_flight))
+        self.slots = self.max_in_flight + 1
+        self.cpus = cpus
+
+        self.proc = None
+        self._fd = None
+        self._shm = None
+        self._frames = []
+        self._lock = threading.Lock()
+        self._free = []
+        self._in_flight = 0
+        self._sent_ns = [0] * self.slots
+        self._seq = 0
+        self._cpu_win = None
+        self.state = "stopped"
+        self.info = {}
+        self.stats = {
+            "frames_sent": 0,
+            "frames_dropped": 0,
+            "results": 0,
+            "infer_ms_last": None,
+            "infer_ms_max": 0.0,
+            "cpu": None,
+        }
+
+    def start(self, shape: tuple) -> None:
+        """Create the ring for frames of `shape` (h, w, 3) and launch the child."""
+        frame_bytes = int(np.prod(shape))
+        self._shm = shared_memory.SharedMemory(create=True, size=frame_bytes * self.slots)
+        self._frames = [
+            np.ndarray(shape, np.uint8, buffer=self._shm.buf, offset=i * frame_bytes) for i in range(self.slots)
+        ]
+        self._free = list(range(self.slots))
+        self.info = {"shape": "x".join(str(v) for v in shape), "slots": self.slots}
+
+        cmd = [
+            sys.executable, os.path.abspath(__file__), "--child",
+            "--shm", self._shm.name,
+            "--shape", self.info["shape"],
+            "--slots", str(self.slots),
+            "--model", self.model,
+        ]
+        if self.cpus:
+            cmd += ["--cpus", self.cpus]
+        # stderr is inherited: the child's errors land in the gateway log
+        self.proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, bufsize=0)
+        self._fd = self.proc.stdin.fileno()
+        os.set_blocking(self._fd, False)
+        self.state = "loading"
+        super().start()
+
+    # --------------------------------------------------
+    # Input (GestureWorker thread only)
+    # --------------------------------------------------
+    def ready(self) -> bool:
+        with self._lock:
+            return self.state == "running" and self._in_flight < self.max_in_flight
+
+    def submit(self, rgb: np.ndarray, ts_ms: int) -> bool:
+        """Copy the frame into a free slot and hand it over; False (nothing sent) when none is free."""
+        with self._lock:
+            if self.state != "running" or self._in_flight >= self.max_in_flight:
+                return False
+            slot = self._free.pop()
+            self._in_flight += 1
+        np.copyto(self._frames[slot], rgb)
+        self._seq = (self._seq + 1) & 0xFFFFFFFF
+        self._sent_ns[slot] = time.perf_counter_ns()
+        rec = _FRAME.pack(slot, self._seq, ts_ms)
+        try:
+            ok = os.write(self._fd, rec) == len(rec)
+        except (BlockingIOError, BrokenPipeError, OSError):
+            ok = False
+        if not ok:
+            with self._lock:
+                self._free.append(slot)
+                self._in_flight -= 1
+            self.stats["frames_dropped"] += 1
+            return False
+        self.stats["frames_sent"] += 1
+        return True
+
+    # --------------------------------------------------
+    # Output (reader thread)
+    # --------------------------------------------------
+    def run(self) -> None:
+        while True:
+            rec = _read_exact(self.proc.stdout, _RESULT.size)
+            if rec is None:
+                break
+            slot, _seq, ts_ms, gesture, score, infer_us, cpu_ms = _RESULT.unpack(rec)
+            now = time.monotonic()
+            if slot == SLOT_READY:
+                self.info.update(pid=self.proc.pid, load_s=round(infer_us / 1e6, 2))
+                self._cpu_win = (now, cpu_ms)
+                self.state = "running"
+                log.info(f"[GESTURE] Recognizer process ready: {self.info}")
+                continue
+
+            dt_ns = time.perf_counter_ns() - self._sent_ns[slot]
+            with self._lock:
+                self._free.append(slot)
+                self._in_flight -= 1
+            if self._observe is not None:
+                self._observe("gesture_result", dt_ns)
+
+            infer_ms = infer_us / 1000.0
+            self.stats["results"] += 1
+            self.stats["infer_ms_last"] = infer_ms
+            self.stats["infer_ms_max"] = max(self.stats["infer_ms_max"], infer_ms)
+            t0, cpu0 = self._cpu_win
+            if now - t0 >= 1.0:
+                self.stats["cpu"] = round((cpu_ms - cpu0) / 1000.0 / (now - t0), 3)
+                self._cpu_win = (now, cpu_ms)
+
+            if self._on_result:
+                self._on_result(GESTURE_NAMES[gesture] if gesture >= 0 else None, score, ts_ms)
+
+        rc = self.proc.wait()
+        if self.state != "stopping":
+            log.error(f"[GESTURE] Recognizer process exited (rc={rc})")
+        self.state = "exited"
+
+    def stop(self) -> None:
+        if self.proc is not None:
+            if self.state != "exited":
+                self.state = "stopping"
+            try:
+                self.proc.stdin.close()
+                self.proc.wait(timeout=2.0)
+            except Exception:
+                self.proc.kill()
+            if self.is_alive():
+                self.join(timeout=1.0)
+        if self._shm is not None:
+            # views into the block must go before close()
+            self._frames = []
+            try:
+                self._shm.close()
+                self._shm.unlink()
+            except (BufferError, OSError):
+                pass
+            self._shm = None
+
+    def metrics(self) -> dict:
+        with self._lock:
+            in_flight = self._in_flight
+        return {
+            "proc": "process",
+            "state": self.state,
+            "pid": self.proc.pid if self.proc is not None else None,
+            "in_flight": in_flight,
+            **self.stats,
+        }
+
+
+def make_recognizer(proc: str, model: str, on_result=None, observe=None, cpus: str | None = None):
+    """Backend for --gesture-proc: start(shape) / ready() / submit(rgb, ts_ms) / stop() / metrics()."""
+    if proc == "thread":
+        return InlineRecognizer(model, on_result=on_result, observe=observe)
+    return GestureProcess(model, on_result=on_result, observe=observe, cpus=cpus)
+
+
+# ---------------- Recognizer process ----------------
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """Open the gateway's block without handing it to this process's resource tracker."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)   # Python >= 3.13
+    except TypeError:
+        from multiprocessing import resource_tracker
+
+        shm = shared_memory.SharedMemory(name=name)
+        # < 3.13 registers every attach and would unlink the block when the child exits
+        resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+
+def child_main(args: argparse.Namespace) -> None:
+    if args.cpus:
+        try:
+            os.sched_setaffinity(0, {int(c) for c in args.cpus.split(",")})
+        except (AttributeError, OSError, ValueError) as e:
+            print(f"[GESTURE] CPU affinity not applied: {e}", file=sys.stderr)
+
+    shape = tuple(int(v) for v in args.shape.split("x"))
+    frame_bytes = int(np.prod(shape))
+    shm = _attach(args.shm)
+    frames = [np.ndarray(shape, np.uint8, buffer=shm.buf, offset=i * frame_bytes) for i in range(args.slots)]
+
+    t0 = time.monotonic()
+    model = SyntheticModel.parse(args.model) or _VideoModel(args.model)
+    load_us = int((time.monotonic() - t0) * 1e6)
+
+    out = sys.stdout.buffer
+    out.write(_RESULT.pack(SLOT_READY, 0, 0, NO_GESTURE, 0.0, load_us, int(time.process_time() * 1000)))
+    out.flush()
+
+    stdin = sys.stdin.buffer
+    try:
+        while True:
+            rec = _read_exact(stdin, _FRAME.size)
+            if rec is None:
+                return
+            slot, seq, ts_ms = _FRAME.unpack(rec)
+            t_start = time.perf_counter_ns()
+            name, score = model.run(frames[slot], ts_ms)
+            infer_us = (time.perf_counter_ns() - t_start) // 1000
+            out.write(_RESULT.pack(
+                slot, seq, ts_ms, _GESTURE_ID.get(name, NO_GESTURE), score,
+                min(infer_us, 0xFFFFFFFF), int(time.process_time() * 1000) & 0xFFFFFFFF,
+            ))
+            out.flush()
+    finally:
+        model.close()
+        frames.clear()
+        shm.close()
+
+
+def parse_args(argv: list[str]) -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Gesture recognizer process (started by gateway.py)")
+    p.add_argument("--child", action="store_true", help="run as the recognizer process (stdin/stdout protocol)")
+    p.add_argument("--shm", default=None, help="shared-memory block name (frame ring)")
+    p.add_argument("--shape", default=None, help="frame shape HxWxC")
+    p.add_argument("--slots", type=int, default=MAX_IN_FLIGHT + 1, help="frames in the ring")
+    p.add_argument("--model", default="gesture_recognizer.task", help="model path or synthetic:GRAPH_MS,GIL_MS")
+    p.add_argument("--cpus", default=None, help="pin to these cores, e.g. 2 (optional)")
+    return p.parse_args(argv)
+
+
+if __name__ == "__main__":
+    _args = parse_args(sys.argv[1:])
+    if not _args.child or not _args.shm or not _args.shape:
+        sys.exit("gesture_proc.py is started by gateway.py (use --child to run the protocol directly)")
+    child_main(_args)
@@ -0,0 +1,269 @@
+"""
+lease_watchdog.py
+
+Dead-man watchdog for drive command sources.
+
+Each source (GUI over MQTT, the gesture worker) holds a lease that it
+renews with refresh(). Only the source of the current mode matters. When
+its lease runs out while the last $CMD still has non-zero throttle, the
+watchdog ramps throttle down to 0 in a few stages over UART (steer is
+kept), instead of leaving the car on its last command until the MCU
+fail-safe fires.
+
+Timing runs on its own thread against time.monotonic() deadlines
+(Condition.wait with the remaining time), so expiry detection does not
+depend on the UART/main loop and ramp steps do not accumulate drift.
+A refresh from the active source cancels a ramp in progress.
+
+    python lease_watchdog.py     # expiry / ramp timing precision, collector replay
+"""
+
+import time
+import logging
+import threading
+
+
+class LeaseWatchdog(threading.Thread):
+    def __init__(
+        self,
+        send,
+        leases: dict[str, float],
+        ramp_steps: int = 3,
+        ramp_step_sec: float = 0.1,
+        clock=time.monotonic,
+        on_expire=None,
+    ):
+        """
+        send(throttle, steer)       : UART command path (called without locks held)
+        leases                      : {source: lease seconds}
+        on_expire(source, throttle) : optional, called once per expiry (no locks held)
+        """
+        super().__init__(daemon=True, name="LeaseWatchdog")
+        self._send = send
+        self.leases = {s: float(v) for s, v in leases.items()}
+        self.ramp_steps = max(1, int(ramp_steps))
+        self.ramp_step_sec = float(ramp_step_sec)
+        self._clock = clock
+        self._on_expire = on_expire
+
+        self._cond = threading.Condition()
+        self._stopping = False
+
+        self._active = None
+        self._expiry = {}
+        self._last_refresh = {}
+        self._throttle = 0
+        self._steer = 0
+
+        # ramp state: None when idle
+        self._ramp_from = 0
+        self._ramp_k = 0
+        self._ramp_next = None
+
+        self.stats = {
+            "expired": dict.fromkeys(self.leases, 0),
+            "max_gap_ms": dict.fromkeys(self.leases, 0.0),
+            "ramps_done": 0,
+            "ramps_cancelled": 0,
+            "late_ms_last": 0.0,
+            "late_ms_max": 0.0,
+        }
+
+    # --------------------------------------------------
+    # Source side
+    # --------------------------------------------------
+    def set_active(self, source: str) -> None:
+        """Switch the leased source (mode change); it gets a fresh lease."""
+        with self._cond:
+            now = self._clock()
+            self._active = source
+            self._expiry[source] = now + self.leases[source]
+            self._last_refresh[source] = now
+            self._cancel_ramp()
+            self._cond.notify()
+
+    def refresh(self, source: str) -> None:
+        """Renew a source's lease (any accepted command or liveness tick)."""
+        with self._cond:
+            now = self._clock()
+            prev = self._last_refresh.get(source)
+            if prev is not None:
+                gap_ms = (now - prev) * 1000.0
+                if gap_ms > self.stats["max_gap_ms"][source]:
+                    self.stats["max_gap_ms"][source] = round(gap_ms, 1)
+            self._last_refresh[source] = now
+            self._expiry[source] = now + self.leases[source]
+            if source == self._active:
+                self._cancel_ramp()
+                self._cond.notify()
+
+    def note_command(self, throttle: int, steer: int) -> None:
+        """Record the $CMD actually sent (from any source, including the ramp)."""
+        with self._cond:
+            self._throttle = int(throttle)
+            self._steer = int(steer)
+            self._cond.notify()
+
+    def stop(self) -> None:
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+
+    def ramping(self) -> bool:
+        return self._ramp_next is not None
+
+    def metrics(self) -> dict:
+        with self._cond:
+            return {
+                "active": self._active,
+                "ramping": self._ramp_next is not None,
+                "expired": dict(self.stats["expired"]),
+                "max_gap_ms": dict(self.stats["max_gap_ms"]),
+                "ramps_done": self.stats["ramps_done"],
+                "ramps_cancelled": self.stats["ramps_cancelled"],
+                "late_ms_last": self.stats["late_ms_last"],
+                "late_ms_max": self.stats["late_ms_max"],
+            }
+
+    # --------------------------------------------------
+    # Watchdog thread
+    # --------------------------------------------------
+    def _cancel_ramp(self) -> None:
+        if self._ramp_next is not None:
+            self._ramp_next = None
+            self.stats["ramps_cancelled"] += 1
+
+    def _next_deadline(self):
+        if self._ramp_next is not None:
+            return self._ramp_next
+        if self._active is None or self._throttle == 0:
+            return None
+        return self._expiry.get(self._active)
+
+    def _late(self, now: float, due: float) -> None:
+        late_ms = round((now - due) * 1000.0, 3)
+        self.stats["late_ms_last"] = late_ms
+        if late_ms > self.stats["late_ms_max"]:
+            self.stats["late_ms_max"] = late_ms
+
+    def run(self) -> None:
+        while True:
+            expired = None
+            with self._cond:
+                if self._stopping:
+                    return
+                due = self._next_deadline()
+                now = self._clock()
+                if due is None:
+                    self._cond.wait()
+                    continue
+                if now < due:
+                    self._cond.wait(due - now)
+                    continue
+
+                self._late(now, due)
+                if self._ramp_next is None:
+                    # lease expired: start the ramp from the current throttle
+                    self.stats["expired"][self._active] += 1
+                    logging.getLogger("gateway").warning(
+                        f"[WDOG] {self._active} lease expired "
+                        f"({self.leases[self._active] * 1000:.0f} ms), ramping T:{self._throttle} -> 0"
+                    )
+                    self._ramp_from = self._throttle
+                    self._ramp_k = 0
+                    self._ramp_next = due
+                    expired = (self._active, self._throttle)
+
+                self._ramp_k += 1
+                throttle = int(round(self._ramp_from * (1.0 - self._ramp_k / self.ramp_steps)))
+                steer = self._steer
+                if self._ramp_k >= self.ramp_steps:
+                    self._ramp_next = None
+                    self.stats["ramps_done"] += 1
+                else:
+                    self._ramp_next += self.ramp_step_sec
+
+            self._send(throttle, steer)
+            if expired and self._on_expire:
+                self._on_expire(*expired)
+
+
+def _bench(rounds: int = 20, lease_sec: float = 0.2) -> None:
+    """
+    Expiry detection and ramp step lateness while the main thread runs
+    a gateway-like loop (work + sleep(0.001)) or pure busy Python, where
+    lateness is bounded by the interpreter switch interval.
+    """
+    import sys
+
+    for label, nap in (("gateway loop", 0.001), ("busy loop", 0.0)):
+        sent = []
+
+        def send(throttle, steer):
+            sent.append((time.monotonic(), throttle))
+            wd.note_command(throttle, steer)
+
+        wd = LeaseWatchdog(send, {"GUI": lease_sec}, ramp_steps=3, ramp_step_sec=0.05)
+        wd.start()
+
+        first = []
+        for _ in range(rounds):
+            sent.clear()
+            wd.set_active("GUI")
+            wd.note_command(60, 0)
+            t_last = time.monotonic()
+            while not sent or sent[-1][1] != 0:
+                sum(range(2000))
+                if nap:
+                    time.sleep(nap)
+            first.append((sent[0][0] - t_last - lease_sec) * 1000.0)
+
+        wd.stop()
+        first.sort()
+        m = wd.metrics()
+        print(f"[{label}] lease {lease_sec * 1000:.0f} ms, {rounds} expiries")
+        print(f"  expiry -> first ramp $CMD late: p50 {first[len(first) // 2]:.2f} ms, max {first[-1]:.2f} ms")
+        print(f"  ramp steps late (max)         : {m['late_ms_max']:.2f} ms")
+    print(f"switch interval: {sys.getswitchinterval() * 1000:.1f} ms")
+
+
+def _collector_replay(lease_sec: float = 1.0, segment_sec: float = 2.0) -> None:
+    """
+    dataset-collect timed segment (collect.sh: 2 s at throttle 60) against
+    the gateway GUI lease: one command per segment vs. the collector
+    re-sending it every 250 ms. The segment is labelled throttle 60 for
+    its whole duration, so any ramp inside it mislabels frames.
+    """
+    for label, refresh in (("one command", None), ("refresh 250 ms", 0.25)):
+        sent = []
+
+        def send(throttle, steer):
+            sent.append((time.monotonic(), throttle))
+            wd.note_command(throttle, steer)
+
+        wd = LeaseWatchdog(send, {"GUI": lease_sec}, ramp_steps=3, ramp_step_sec=0.1)
+        wd.start()
+        wd.set_active("GUI")
+
+        t0 = time.monotonic()
+        next_cmd = t0
+        while time.monotonic() - t0 < segment_sec:
+            now = time.monotonic()
+            if now >= next_cmd:
+                # accepted drive command: lease refresh + $CMD
+                wd.refresh("GUI")
+                send(60, 0)
+                next_cmd = now + refresh if refresh else float("inf")
+            time.sleep(0.005)
+        wd.stop()
+
+        ramp = [t - t0 for t, thr in sent if thr != 60]
+        cut = f"throttle cut at {ramp[0]:.2f} s, 0 at {ramp[-1]:.2f} s" if ramp else "throttle 60 held"
+        held = (ramp[0] if ramp else segment_sec) / segment_sec
+        print(f"  {label:15s} {cut:32s} labelled frames driven: {held * 100:5.1f}%")
+
+
+if __name__ == "__main__":
+    _bench()
+    print("collector segment 2 s, GUI lease 1000 ms:")
+    _collector_replay()
@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+replay_ttc.py
+
+Replay-based checks for ttc_guard.TtcGuard.
+
+1) Synthetic approach scenarios: a first-order vehicle model drives at a
+   wall while $TEL frames are sampled at 20 Hz with ultrasonic noise,
+   integer rounding and dropouts. For each scenario it reports
+   - reaction latency: time from the true TTC crossing ttc_warn_sec
+     (unguarded run, same noise) to the guard's first event (ms / frames)
+   - lead over the MCU fail-safe (dist_cm < 15 with forward throttle)
+   - minimum distance with the guard vs. MCU fail-safe only
+   Non-approach scenarios must produce no events (false positives).
+
+2) Recorded sessions (CSV with ts_ms, dist_cm, throttle, ax, or a
+   dataset-collect session directory): guard events vs. the frame where
+   the MCU fail-safe would have fired.
+
+3) Per-frame cost of TtcGuard.update().
+
+    python replay_ttc.py
+    python replay_ttc.py --seeds 20 data/wall_run.csv
+"""
+
+import os
+import csv
+import sys
+import glob
+import time
+import math
+import random
+import argparse
+
+from ttc_guard import TtcGuard, ACC_LSB_PER_G, G_CMS2
+
+MCU_BRAKE_CM = 15          # firmware fail-safe threshold (freertos.c)
+MCU_BRAKE_THROTTLE = -80   # reverse pulse for 10 control ticks
+TEL_PERIOD = 0.05          # $TEL every 50 ms
+CTRL_PERIOD = 0.02         # MCU control loop 20 ms
+SIM_DT = 0.005
+
+GUI_REFRESH = 0.25         # GUI re-publishes the held command (CONTROL_REFRESH_SEC)
+
+CM_PER_S_PER_THROTTLE = 1.5
+SPEED_TAU = 0.25
+
+
+# ---------------- Synthetic scenarios ----------------
+SCENARIOS = {
+    # name: (start_cm, throttle, operator_stop_cm or None, expect_event, gui_refresh)
+    "approach_slow": (200, 40, None, True, False),
+    "approach_mid": (200, 60, None, True, False),
+    "approach_fast": (250, 100, None, True, False),
+    "approach_refresh_40": (200, 40, None, True, True),
+    "approach_refresh_60": (200, 60, None, True, True),
+    "operator_stops_100cm": (250, 40, 100, False, False),
+    "cruise_open": (None, 60, None, False, False),
+    "cruise_refresh": (None, 60, None, False, True),
+    "reverse_away": (40, -60, None, False, False),
+}
+
+
+def simulate(start_cm, throttle, stop_cm, guard, rng, noise_cm=1.0, dropout=0.03, duration=8.0, refresh=False):
+    """
+    Drive the vehicle model; returns dict with first guard event time,
+    true TTC crossing time, MCU fail-safe time and minimum distance.
+
+    refresh: the operator holds `throttle` and the GUI re-sends it every
+    GUI_REFRESH through guard.limit(), as the gateway does; otherwise a
+    guard cap stays on the command for the rest of the run.
+    """
+    open_road = start_cm is None
+    d = 250.0 if open_road else float(start_cm)
+    v = 0.0
+    cmd = throttle
+    mcu_brake_ticks = 0
+    mcu_braking = False
+
+    t = 0.0
+    next_tel = 0.0
+    next_ctrl = 0.0
+    next_refresh = GUI_REFRESH
+    held = throttle         # operator's command (GUI)
+    applied = cmd
+    pending_cmd = None      # (apply_at, throttle) for UART + next control tick
+
+    out = {"event": None, "ttc_cross": None, "mcu": None, "min_d": d, "levels": []}
+
+    while t < duration:
+        if stop_cm is not None and d <= stop_cm and cmd > 0:
+            cmd = held = 0
+
+        # GUI refresh -> gateway uart_send_cmd (capped while the guard holds)
+        if refresh and t >= next_refresh:
+            next_refresh += GUI_REFRESH
+            pending_cmd = (t + CTRL_PERIOD, guard.limit(held, operator=True), True)
+
+        # MCU control loop
+        if t >= next_ctrl:
+            next_ctrl += CTRL_PERIOD
+            if pending_cmd and t >= pending_cmd[0]:
+                _, limited, resent = pending_cmd
+                if resent:
+                    cmd = limited
+                else:
+                    cmd = min(cmd, limited) if limited >= 0 else limited
+                pending_cmd = None
+            target = cmd
+            dist_meas = int(round(d))
+            if 0 < dist_meas < MCU_BRAKE_CM and target > 0:
+                mcu_braking = True
+                if out["mcu"] is None:
+                    out["mcu"] = t
+            if target <= 0:
+                mcu_braking = False
+                mcu_brake_ticks = 0
+            if mcu_braking:
+                if mcu_brake_ticks < 10:
+                    target = MCU_BRAKE_THROTTLE
+                    mcu_brake_ticks += 1
+                else:
+                    target = 0
+            applied = target
+
+        # vehicle
+        v_target = applied * CM_PER_S_PER_THROTTLE
+        acc = (v_target - v) / SPEED_TAU
+        v += acc * SIM_DT
+        if not open_road:
+            d -= v * SIM_DT
+        out["min_d"] = min(out["min_d"], d)
+
+        # ground-truth TTC to the MCU margin
+        if out["ttc_cross"] is None and v > 0 and not open_road:
+            gap = d - guard.stop_margin_cm
+            if gap <= 0 or gap / v < guard.ttc_warn_sec:
+                out["ttc_cross"] = t
+
+        # telemetry frame
+        if t >= next_tel:
+            next_tel += TEL_PERIOD
+            if rng.random() < dropout:
+                dist = 0
+            else:
+                dist = int(round(d + rng.gauss(0.0, noise_cm)))
+                if open_road:
+                    dist = int(round(150 + rng.gauss(0.0, 3.0 * noise_cm)))
+            ax = int(acc / G_CMS2 * ACC_LSB_PER_G + rng.gauss(0.0, 300.0))
+            frame = {"dist_cm": dist, "throttle": cmd, "ax": ax, "steer": 0}
+            ev = guard.update(frame, t)
+            if ev is not None:
+                out["levels"].append((round(t, 3), ev["level"]))
+                if ev["level"] != "CLEAR":
+                    if out["event"] is None:
+                        out["event"] = t
+                    pending_cmd = (t + CTRL_PERIOD, guard.limit(cmd), False)
+
+        if d <= 0:
+            out["min_d"] = 0.0
+            break
+        t += SIM_DT
+
+    return out
+
+
+class _NoGuard(TtcGuard):
+    """MCU fail-safe only (guard never fires)."""
+
+    def update(self, frame, now):
+        return None
+
+
+def run_synthetic(seeds):
+    """
+    Per scenario and seed, run the same noise sequence with and without
+    the guard. The true TTC crossing comes from the unguarded run, since
+    the guard's own throttle cap delays it in the guarded one.
+    """
+    rows = []
+    for name, (start, thr, stop_cm, expect, refresh) in SCENARIOS.items():
+        lat, lead, min_d, min_d_mcu, events, mcu_fired, trips = [], [], [], [], 0, 0, []
+        for seed in range(seeds):
+            ref = simulate(start, thr, stop_cm, _NoGuard(), random.Random(seed), refresh=refresh)
+            r = simulate(start, thr, stop_cm, TtcGuard(), random.Random(seed), refresh=refresh)
+            min_d.append(r["min_d"])
+            min_d_mcu.append(ref["min_d"])
+            mcu_fired += r["mcu"] is not None
+            trips.append(sum(1 for _, level in r["levels"] if level != "CLEAR"))
+            if r["event"] is None:
+                continue
+            events += 1
+            if ref["ttc_cross"] is not None:
+                lat.append(r["event"] - ref["ttc_cross"])
+            if ref["mcu"] is not None:
+                lead.append(ref["mcu"] - r["event"])
+        rows.append((name, expect, events, lat, lead, min_d, min_d_mcu, mcu_fired, trips))
+    return rows
+
+
+def _fmt_ms(vals):
+    if not vals:
+        return "-"
+    vals = sorted(vals)
+    return f"{vals[len(vals) // 2] * 1000:.0f}"
+
+
+def report_synthetic(seeds):
+    print(f"[1] synthetic scenarios ({seeds} seeds, $TEL {TEL_PERIOD * 1000:.0f} ms)")
+    print("  scenario               events  latency_ms  frames  mcu_lead_ms  min_d guard / mcu-only"
+          "  trips  mcu  ok")
+    ok_all = True
+    for name, expect, events, lat, lead, min_d, min_d_mcu, mcu_fired, trips in run_synthetic(seeds):
+        frames = "     -"
+        if lat:
+            worst = max(lat)
+            frames = f"{max(0, math.ceil(round(worst / TEL_PERIOD, 6))):6d}"
+        # with the guard, the MCU fail-safe must never be needed
+        ok = (events == seeds and mcu_fired == 0) if expect else (events == 0)
+        ok_all &= ok
+        print(
+            f"  {name:22s} {events:3d}/{seeds:<3d} {_fmt_ms(lat):>10s} {frames}  {_fmt_ms(lead):>11s}"
+            f"  {min(min_d):6.1f} / {min(min_d_mcu):6.1f}        {max(trips):5d} {mcu_fired:4d}  {'yes' if ok else 'NO'}"
+        )
+    print("  latency: median (true TTC < ttc_warn_sec -> first guard event), frames: worst case")
+    print("  mcu_lead: median time the guard acted before the MCU fail-safe would have")
+    print("  trips: most WARN/STOP events in one run (a release + re-trip loop shows up here)")
+    print("  mcu: guarded runs in which the MCU fail-safe still fired")
+    print(f"  *_refresh: the GUI re-sends the held throttle every {GUI_REFRESH * 1000:.0f} ms through guard.limit()")
+    return ok_all
+
+
+# ---------------- Recorded sessions ----------------
+def load_frames(path):
+    if os.path.isdir(path):
+        import numpy as np
+
+        cols = {}
+        for name in sorted(glob.glob(os.path.join(path, "chunk-*.npz"))):
+            with np.load(name) as z:
+                for c in ("ts_ms", "dist_cm", "throttle", "ax"):
+                    cols.setdefault(c, []).extend(z[c].tolist())
+        n = len(cols.get("ts_ms", []))
+        return [{c: cols[c][i] for c in cols} for i in range(n)]
+
+    with open(path, newline="") as f:
+        return [
+            {k: float(r[k]) for k in ("ts_ms", "dist_cm", "throttle", "ax")}
+            for r in csv.DictReader(f)
+        ]
+
+
+def report_recorded(paths):
+    print("\n[2] recorded sessions")
+    for path in paths:
+        frames = load_frames(path)
+        guard = TtcGuard()
+        mcu = None
+        events = []
+        for fr in frames:
+            now = fr["ts_ms"] / 1000.0
+            if mcu is None and 0 < fr["dist_cm"] < MCU_BRAKE_CM and fr["throttle"] > 0:
+                mcu = now
+            ev = guard.update(fr, now)
+            if ev is not None:
+                events.append((now, ev))
+        print(f"  {os.path.basename(os.path.normpath(path))}: frames={len(frames)} events={len(events)}")
+        for now, ev in events:
+            lead = f" lead={int((mcu - now) * 1000)} ms" if mcu is not None and ev["level"] != "CLEAR" else ""
+            print(f"    t={now - frames[0]['ts_ms'] / 1000.0:8.3f}s {ev}{lead}")
+        if mcu is not None:
+            print(f"    MCU fail-safe at t={mcu - frames[0]['ts_ms'] / 1000.0:.3f}s")
+
+
+# ---------------- Per-frame cost ----------------
+def report_cost(n=200_000):
+    rng = random.Random(0)
+    frames = [
+        {"dist_cm": int(120 + 30 * math.sin(i / 40.0) + rng.gauss(0, 1)), "throttle": 60, "ax": rng.randint(-500, 500)}
+        for i in range(4096)
+    ]
+    guard = TtcGuard()
+    t0 = time.perf_counter()
+    for i in range(n):
+        guard.update(frames[i & 4095], i * TEL_PERIOD)
+    per = (time.perf_counter() - t0) / n
+    print(f"\n[3] TtcGuard.update(): {per * 1e6:.2f} us/frame = {per / TEL_PERIOD * 100:.4f}% of a $TEL period")
+
+
+def main(argv):
+    p = argparse.ArgumentParser(description="TTC guard replay / latency check")
+    p.add_argument("recordings", nargs="*", help="CSV files or dataset-collect session dirs")
+    p.add_argument("--seeds", type=int, default=10)
+    args = p.parse_args(argv)
+
+    ok = report_synthetic(args.seeds)
+    if args.recordings:
+        report_recorded(args.recordings)
+    report_cost()
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
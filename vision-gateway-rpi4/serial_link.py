@@ -0,0 +1,368 @@
+"""
+serial_link.py
+
+Supervised UART link for gateway.py.
+
+- probe_ports(): opens all candidate ports in parallel (one thread per
+  distinct device; symlinks such as /dev/serial0 -> ttyAMA0 collapse to
+  one probe) and keeps the first one in candidate order. The others are
+  closed again.
+- SerialLink: owns the open port. The reader (gateway main loop) and the
+  command writers call lost() on a serial error; the supervisor thread
+  closes the port, reopens it and reports link down / up through
+  callbacks. While the link is down `ser` is None and commands are
+  dropped, so MQTT and the gesture worker keep running.
+
+Reopen policy: while no candidate device node exists (USB adapter
+unplugged) the supervisor only polls for it every check_sec; once a node
+is back, failed opens are retried with exponential backoff
+(backoff_min_sec .. backoff_max_sec). While up, the supervisor also
+watches the device node, since a removed device does not always make
+in_waiting / readline fail.
+
+    python serial_link.py     # pty teardown / recreate recovery timing
+"""
+
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import serial
+
+
+def open_serial(port: str, baud: int, timeout: float = 0.1) -> serial.Serial:
+    """Default opener; raises on failure."""
+    s = serial.Serial(port, baud, timeout=timeout)
+    s.flush()
+    return s
+
+
+def probe_ports(ports: list[str], baud: int, opener=open_serial) -> tuple[str | None, serial.Serial | None, list[str]]:
+    """
+    Try every existing candidate at once.
+    Returns (port, handle, tried); port / handle are None when nothing opened.
+    """
+    tried = []
+    targets, seen = [], set()
+    for p in ports:
+        if not p:
+            continue
+        if not os.path.exists(p):
+            tried.append(f"{p} (missing)")
+            continue
+        real = os.path.realpath(p)
+        if real in seen:
+            continue
+        seen.add(real)
+        targets.append(p)
+
+    def _open(p):
+        try:
+            return opener(p, baud)
+        except Exception as e:
+            tried.append(f"{p} ({e})")
+            return None
+
+    if len(targets) == 1:
+        handles = [_open(targets[0])]
+    elif targets:
+        with ThreadPoolExecutor(max_workers=len(targets), thread_name_prefix="SerialProbe") as ex:
+            handles = list(ex.map(_open, targets))
+    else:
+        handles = []
+
+    chosen = None
+    for p, h in zip(targets, handles):
+        if h is None:
+            continue
+        if chosen is None:
+            chosen = (p, h)
+        else:
+            try:
+                h.close()
+            except Exception:
+                pass
+    if chosen is None:
+        return None, None, tried
+    return chosen[0], chosen[1], tried
+
+
+class SerialLink(threading.Thread):
+    def __init__(
+        self,
+        candidates: list[str],
+        baud: int,
+        port: str | None = None,
+        opener=open_serial,
+        backoff_min_sec: float = 0.05,
+        backoff_max_sec: float = 1.0,
+        check_sec: float = 0.1,
+        on_up=None,
+        on_down=None,
+        clock=time.monotonic,
+    ):
+        """
+        port           : user-specified device; only this one is probed
+        on_up(port, down_ms)   : link (re)opened; down_ms is None at startup
+        on_down(port, reason)  : link lost (called once per loss, no locks held)
+        """
+        super().__init__(daemon=True, name="SerialLink")
+        self.targets = [port] if port else list(candidates)
+        self.baud = int(baud)
+        self._opener = opener
+        self.backoff_min_sec = float(backoff_min_sec)
+        self.backoff_max_sec = float(backoff_max_sec)
+        self.check_sec = float(check_sec)
+        self._on_up = on_up
+        self._on_down = on_down
+        self._clock = clock
+
+        self._cond = threading.Condition()
+        self._stopping = False
+
+        self.ser = None
+        self.port = None
+        self._down_since = clock()
+        self._reason = "not opened"
+
+        self.stats = {
+            "up": 0,
+            "down": 0,
+            "open_attempts": 0,
+            "recovery_ms_last": None,
+            "recovery_ms_max": 0.0,
+        }
+
+    # --------------------------------------------------
+    # Reader / writer side
+    # --------------------------------------------------
+    def open_now(self) -> bool:
+        """Synchronous first probe (startup); the supervisor retries if it fails."""
+        port, handle, tried = probe_ports(self.targets, self.baud, self._opener)
+        self.stats["open_attempts"] += 1
+        if handle is None:
+            self._reason = "no usable port: " + ", ".join(tried)
+            return False
+        self._set_up(port, handle)
+        return True
+
+    def lost(self, handle, reason: str) -> None:
+        """
+        Report an I/O error on `handle`. Only the first report for the
+        current handle counts; stale handles from racing threads are ignored.
+        """
+        with self._cond:
+            if handle is None or handle is not self.ser:
+                return
+            self.ser = None
+            self._down_since = self._clock()
+            self._reason = reason
+            self.stats["down"] += 1
+            port = self.port
+            self._cond.notify_all()
+        try:
+            handle.close()
+        except Exception:
+            pass
+        if self._on_down:
+            self._on_down(port, reason)
+
+    def wait_up(self, timeout: float):
+        """Block until the link is up (or timeout); returns the handle or None."""
+        with self._cond:
+            self._cond.wait_for(lambda: self.ser is not None or self._stopping, timeout)
+            return self.ser
+
+    def stop(self) -> None:
+        with self._cond:
+            self._stopping = True
+            handle, self.ser = self.ser, None
+            self._cond.notify_all()
+        if handle is not None:
+            try:
+                handle.close()
+            except Exception:
+                pass
+
+    def metrics(self) -> dict:
+        with self._cond:
+            up = self.ser is not None
+            return {
+                "up": up,
+                "port": self.port,
+                "down_for_s": None if up else round(self._clock() - self._down_since, 2),
+                "reason": None if up else self._reason,
+                **self.stats,
+            }
+
+    # --------------------------------------------------
+    # Supervisor thread
+    # --------------------------------------------------
+    def _set_up(self, port: str, handle) -> None:
+        with self._cond:
+            if self._stopping:
+                handle.close()
+                return
+            down_ms = None
+            if self.stats["up"] > 0:
+                down_ms = round((self._clock() - self._down_since) * 1000.0, 1)
+                self.stats["recovery_ms_last"] = down_ms
+                if down_ms > self.stats["recovery_ms_max"]:
+                    self.stats["recovery_ms_max"] = down_ms
+            self.ser = handle
+            self.port = port
+            self.stats["up"] += 1
+            self._cond.notify_all()
+        if self._on_up:
+            self._on_up(port, down_ms)
+
+    def run(self) -> None:
+        backoff = self.backoff_min_sec
+        while True:
+            with self._cond:
+                if self._stopping:
+                    return
+                handle = self.ser
+                if handle is not None:
+                    backoff = self.backoff_min_sec
+                    self._cond.wait(self.check_sec)
+                    handle = self.ser
+                    if handle is None or os.path.exists(self.port):
+                        continue
+            if handle is not None:
+                self.lost(handle, "device removed")
+                continue
+
+            # link down
+            if not any(os.path.exists(p) for p in self.targets if p):
+                with self._cond:
+                    self._cond.wait(self.check_sec)
+                continue
+
+            port, handle, tried = probe_ports(self.targets, self.baud, self._opener)
+            self.stats["open_attempts"] += 1
+            if handle is not None:
+                self._set_up(port, handle)
+                continue
+
+            self._reason = "reopen failed: " + ", ".join(tried)
+            with self._cond:
+                self._cond.wait(backoff)
+            backoff = min(backoff * 2.0, self.backoff_max_sec)
+
+
+def _bench(rounds: int = 10, outage_sec: float = 0.5, tel_period: float = 0.01) -> None:
+    """
+    Pty pair behind a symlink, torn down and recreated `rounds` times while
+    a reader runs the gateway's in_waiting / readline loop. Reports loss
+    detection (teardown -> on_down), reopen (recreate -> on_up) and
+    recreate -> first line read.
+    """
+    import tty
+    import random
+    import tempfile
+
+    tmp = tempfile.mkdtemp(prefix="serial_link_")
+    dev = os.path.join(tmp, "ttyBENCH")
+    state = {"master": None, "down_at": None, "up_at": None, "line_at": None}
+
+    def make_pty():
+        master, slave = os.openpty()
+        tty.setraw(slave)
+        name = os.ttyname(slave)
+        os.close(slave)
+        os.symlink(name, dev + ".new")
+        os.replace(dev + ".new", dev)
+        state["master"] = master
+
+    def teardown():
+        master, state["master"] = state["master"], None
+        os.unlink(dev)
+        os.close(master)
+
+    def writer():
+        seq = 0
+        while not stop_evt.is_set():
+            m = state["master"]
+            if m is not None:
+                try:
+                    os.write(m, f"$TEL,{seq},0,0,0,0,0,0,100,0,0\n".encode())
+                except OSError:
+                    pass
+                seq += 1
+            time.sleep(tel_period)
+
+    def reader():
+        while not stop_evt.is_set():
+            s = link.ser
+            if s is None:
+                link.wait_up(0.1)
+                continue
+            try:
+                if s.in_waiting > 0:
+                    if s.readline() and state["line_at"] is None:
+                        state["line_at"] = time.monotonic()
+                    continue
+            except (serial.SerialException, OSError) as e:
+                link.lost(s, str(e))
+                continue
+            time.sleep(0.001)
+
+    link = SerialLink(
+        [dev],
+        115200,
+        on_up=lambda port, down_ms: state.__setitem__("up_at", time.monotonic()),
+        on_down=lambda port, reason: state.__setitem__("down_at", (time.monotonic(), reason)),
+    )
+    stop_evt = threading.Event()
+    make_pty()
+    assert link.open_now()
+    link.start()
+    threads = [threading.Thread(target=writer, daemon=True), threading.Thread(target=reader, daemon=True)]
+    for t in threads:
+        t.start()
+
+    detect, reopen, first_line, reasons = [], [], [], {}
+    for _ in range(rounds):
+        time.sleep(0.3)
+        state["down_at"] = None
+        t_kill = time.monotonic()
+        teardown()
+        while state["down_at"] is None:
+            time.sleep(0.0005)
+        detect.append((state["down_at"][0] - t_kill) * 1000.0)
+        reason = state["down_at"][1]
+        reasons[reason] = reasons.get(reason, 0) + 1
+
+        # random outage so the recreate is not phase-locked to the poll period
+        time.sleep(outage_sec * random.uniform(0.5, 1.5))
+        state["up_at"] = state["line_at"] = None
+        t_back = time.monotonic()
+        make_pty()
+        while state["line_at"] is None:
+            time.sleep(0.0005)
+        reopen.append((state["up_at"] - t_back) * 1000.0)
+        first_line.append((state["line_at"] - t_back) * 1000.0)
+
+    stop_evt.set()
+    link.stop()
+    teardown()
+    os.rmdir(tmp)
+
+    def fmt(vals):
+        vals = sorted(vals)
+        return f"p50 {vals[len(vals) // 2]:6.1f} ms, max {vals[-1]:6.1f} ms"
+
+    m = link.metrics()
+    print(f"pty teardown / recreate x{rounds}, outage ~{outage_sec * 1000:.0f} ms, check {link.check_sec * 1000:.0f} ms")
+    print(f"  loss detected      : {fmt(detect)}")
+    print(f"  reopened           : {fmt(reopen)}")
+    print(f"  first line read    : {fmt(first_line)}")
+    print(f"  link down->up (max): {m['recovery_ms_max']:.1f} ms, open attempts {m['open_attempts']}")
+    for reason, n in reasons.items():
+        print(f"  down reason x{n}: {reason}")
+
+
+if __name__ == "__main__":
+    _bench()
@@ -0,0 +1,158 @@
+"""
+tel_rate.py
+
+Telemetry rate policy for gateway.py.
+
+The firmware sends $TEL every g_telPeriodMs (default 50 ms) and takes a
+new period with "$CFG,TEL_MS,<ms>". The policy picks one of three levels
+from what the gateway already sees:
+
+- IDLE   : no drive command / motion for idle_after_sec -> slow rate
+- CRUISE : moving (non-zero throttle in a command or a frame, yaw rate)
+- BOOST  : hard turn (|steer| with throttle, |gz|), TTC guard not CLEAR,
+           or an explicit request (anomaly detector over MQTT); held for
+           boost_hold_sec / the requested time
+
+A drive command is checked before it goes out, so leaving IDLE does not
+wait for the next (slow) frame. "fixed" pins one period (dataset
+collection needs a constant 50 ms time base); "default" goes back to
+the policy the gateway was started with.
+
+Calls come from the MQTT thread, the gesture worker and the main loop;
+one lock guards the state. decide() is cheap and called every loop.
+"""
+
+import time
+import threading
+
+LEVEL_IDLE = "IDLE"
+LEVEL_CRUISE = "CRUISE"
+LEVEL_BOOST = "BOOST"
+LEVEL_FIXED = "FIXED"
+
+POLICIES = ("auto", "fixed")
+
+# firmware TELPROTO_PERIOD_MIN / MAX (it clamps and acks the clamped value)
+PERIOD_MIN_MS = 20
+PERIOD_MAX_MS = 1000
+
+
+class TelemetryRatePolicy:
+    def __init__(
+        self,
+        idle_ms: int = 200,
+        cruise_ms: int = 50,
+        boost_ms: int = 25,
+        idle_after_sec: float = 2.0,
+        boost_hold_sec: float = 1.0,
+        max_boost_sec: float = 10.0,
+        motion_gz: int = 800,
+        turn_gz: int = 4000,
+        turn_steer: int = 50,
+        policy: str = "auto",
+        clock=time.monotonic,
+    ):
+        """
+        *_ms        : telemetry period per level
+        policy      : startup policy, restored by set_policy("default")
+        motion_gz   : |gz| (raw LSB) that counts as moving without throttle
+        turn_gz     : |gz| that counts as a hard turn -> BOOST
+        turn_steer  : |steer| with non-zero throttle -> BOOST
+        """
+        self.periods = {LEVEL_IDLE: int(idle_ms), LEVEL_CRUISE: int(cruise_ms), LEVEL_BOOST: int(boost_ms)}
+        self.idle_after_sec = float(idle_after_sec)
+        self.boost_hold_sec = float(boost_hold_sec)
+        self.max_boost_sec = float(max_boost_sec)
+        self.motion_gz = int(motion_gz)
+        self.turn_gz = int(turn_gz)
+        self.turn_steer = int(turn_steer)
+        self._clock = clock
+
+        self._lock = threading.Lock()
+        self.policy = "auto"
+        self.fixed_ms = int(cruise_ms)
+        self.default_policy = policy
+        self.set_policy(policy)
+
+        # start as moving: the firmware default is the cruise period anyway
+        self._last_motion = clock()
+        self._boost_until = 0.0
+        self._boost_reason = ""
+
+        self.stats = {"boosts": 0, "boost_requests": 0}
+
+    # --------------------------------------------------
+    # Inputs
+    # --------------------------------------------------
+    def on_command(self, throttle: int, steer: int, now: float | None = None) -> None:
+        """Drive command about to be sent (GUI, gesture, watchdog, TTC)."""
+        if throttle == 0:
+            return
+        if now is None:
+            now = self._clock()
+        with self._lock:
+            self._last_motion = now
+            if abs(steer) >= self.turn_steer:
+                self._boost(now, self.boost_hold_sec, "turn")
+
+    def on_frame(self, frame: dict, ttc_level: str = "CLEAR", now: float | None = None) -> None:
+        """One telemetry frame (after the TTC guard ran on it)."""
+        if now is None:
+            now = self._clock()
+        throttle = int(frame.get("throttle", 0))
+        gz = abs(int(frame.get("gz", 0)))
+        with self._lock:
+            if throttle != 0 or gz >= self.motion_gz:
+                self._last_motion = now
+            if ttc_level != "CLEAR":
+                self._boost(now, self.boost_hold_sec, "ttc")
+            elif gz >= self.turn_gz or (throttle != 0 and abs(int(frame.get("steer", 0))) >= self.turn_steer):
+                self._boost(now, self.boost_hold_sec, "turn")
+
+    def request_boost(self, sec: float, reason: str = "request", now: float | None = None) -> None:
+        """External boost (anomaly detector); capped at max_boost_sec."""
+        if now is None:
+            now = self._clock()
+        sec = min(max(float(sec), 0.0), self.max_boost_sec)
+        with self._lock:
+            self.stats["boost_requests"] += 1
+            self._boost(now, sec, reason)
+
+    def set_policy(self, policy: str, period_ms: int | None = None) -> None:
+        """
+        "auto", "fixed" (period_ms, default: cruise period) or "default"
+        (the startup policy); raises ValueError.
+        """
+        if policy == "default":
+            policy, period_ms = self.default_policy, None
+        if policy not in POLICIES:
+            raise ValueError(f"unknown telemetry policy: {policy}")
+        with self._lock:
+            self.policy = policy
+            if policy == "fixed":
+                ms = int(period_ms) if period_ms else self.periods[LEVEL_CRUISE]
+                self.fixed_ms = min(max(ms, PERIOD_MIN_MS), PERIOD_MAX_MS)
+
+    def _boost(self, now: float, sec: float, reason: str) -> None:
+        until = now + sec
+        if until > self._boost_until:
+            if self._boost_until <= now:
+                self.stats["boosts"] += 1
+            self._boost_until = until
+            self._boost_reason = reason
+
+    # --------------------------------------------------
+    # Output
+    # --------------------------------------------------
+    def decide(self, now: float | None = None) -> tuple[int, str, str]:
+        """(period_ms, level, reason) for the current state."""
+        if now is None:
+            now = self._clock()
+        with self._lock:
+            if self.policy == "fixed":
+                return self.fixed_ms, LEVEL_FIXED, "fixed"
+            if now < self._boost_until:
+                return self.periods[LEVEL_BOOST], LEVEL_BOOST, self._boost_reason
+            if now - self._last_motion < self.idle_after_sec:
+                return self.periods[LEVEL_CRUISE], LEVEL_CRUISE, "motion"
+            return self.periods[LEVEL_IDLE], LEVEL_IDLE, "idle"
@@ -0,0 +1,212 @@
+"""
+ttc_guard.py
+
+Edge time-to-collision guard, run by gateway.py on every "$TEL" frame
+before it is published.
+
+The STM32 fail-safe brakes only once dist_cm < 15 with forward throttle.
+This guard looks at the trend instead: an alpha-beta filter over dist_cm
+gives range and closing speed, the forward accel (ax) extrapolates the
+closing speed over a short horizon, and the resulting TTC to a stop
+margin decides a throttle cap:
+
+    TTC < ttc_warn_sec  -> forward throttle capped at warn_throttle
+    TTC < ttc_stop_sec  -> forward throttle capped at 0
+    (or dist below stop_dist_cm while closing)
+
+The cap is applied to the frame that detected it (the gateway sends a
+limited "$CMD" immediately) and to every later command. It is released
+only when TTC has stayed above ttc_release_sec for release_sec AND either
+- the operator sent a command at or below the cap (zero, reverse or a
+  slower forward: limit(..., operator=True)), or
+- the filtered range has opened by release_open_cm since the closest
+  point (the obstacle moved away).
+A stopped car has no closing speed, so TTC alone would release it and
+the GUI's periodic re-send of the held throttle would drive it at the
+obstacle again. Reverse / zero throttle is never limited.
+
+Per-frame cost is a fixed handful of float operations (no allocation,
+no history); `python replay_ttc.py` measures it and the reaction latency.
+"""
+
+import math
+
+LEVEL_CLEAR = 0
+LEVEL_WARN = 1
+LEVEL_STOP = 2
+LEVEL_NAMES = ("CLEAR", "WARN", "STOP")
+
+# MPU6050 +-2g range; body +x is forward (Remap_Axis in the firmware)
+ACC_LSB_PER_G = 16384.0
+G_CMS2 = 981.0
+
+
+class TtcGuard:
+    def __init__(
+        self,
+        ttc_warn_sec: float = 1.0,
+        ttc_stop_sec: float = 0.5,
+        ttc_release_sec: float = 1.5,
+        release_sec: float = 0.5,
+        release_open_cm: float = 10.0,
+        stop_margin_cm: float = 15.0,
+        stop_dist_cm: float = 20.0,
+        warn_throttle: int = 30,
+        min_closing_cms: float = 8.0,
+        max_dist_cm: float = 300.0,
+        max_gap_sec: float = 0.5,
+        alpha: float = 0.6,
+        beta: float = 0.3,
+        accel_horizon_sec: float = 0.2,
+        accel_ema: float = 0.3,
+    ):
+        self.ttc_warn_sec = float(ttc_warn_sec)
+        self.ttc_stop_sec = float(ttc_stop_sec)
+        self.ttc_release_sec = float(ttc_release_sec)
+        self.release_sec = float(release_sec)
+        self.release_open_cm = float(release_open_cm)
+        self.stop_margin_cm = float(stop_margin_cm)
+        self.stop_dist_cm = float(stop_dist_cm)
+        self.warn_throttle = int(warn_throttle)
+        self.min_closing_cms = float(min_closing_cms)
+        self.max_dist_cm = float(max_dist_cm)
+        self.max_gap_sec = float(max_gap_sec)
+        self.alpha = float(alpha)
+        self.beta = float(beta)
+        self.accel_horizon_sec = float(accel_horizon_sec)
+        self.accel_ema = float(accel_ema)
+
+        self.stats = {"frames": 0, "invalid": 0, "warn": 0, "stop": 0}
+        self.reset()
+
+    def reset(self) -> None:
+        self.level = LEVEL_CLEAR
+        self.cap = None            # forward throttle cap while active, else None
+        self.ttc = math.inf
+        self._d = None             # filtered range (cm)
+        self._v = 0.0              # range rate (cm/s, < 0 when closing)
+        self._a = 0.0              # filtered closing accel (cm/s^2, >= 0)
+        self._t = None
+        self._clear_since = None
+        self._acked = False        # operator command <= cap since the cap was set
+        self._d_min = None         # closest filtered range since the cap was set
+
+    # --------------------------------------------------
+    # Estimator
+    # --------------------------------------------------
+    def _filter(self, dist_cm: float, now: float) -> bool:
+        """Alpha-beta update; False when the frame carries no usable range."""
+        if dist_cm <= 0 or dist_cm > self.max_dist_cm:
+            self.stats["invalid"] += 1
+            return False
+
+        if self._d is None or self._t is None or now - self._t > self.max_gap_sec:
+            self._d, self._v, self._t = dist_cm, 0.0, now
+            return False
+
+        dt = now - self._t
+        if dt <= 0:
+            return False
+        d_pred = self._d + self._v * dt
+        r = dist_cm - d_pred
+        self._d = d_pred + self.alpha * r
+        self._v += self.beta * r / dt
+        self._t = now
+        return True
+
+    def _time_to_collision(self) -> float:
+        gap = self._d - self.stop_margin_cm
+        if gap <= 0:
+            return 0.0
+        # closing speed after accelerating for accel_horizon_sec more; a
+        # constant-accel extrapolation would flag every launch from standstill
+        vc = -self._v + self._a * self.accel_horizon_sec
+        if vc <= 0:
+            return math.inf
+        return gap / vc
+
+    # --------------------------------------------------
+    # Per-frame entry point
+    # --------------------------------------------------
+    def update(self, frame: dict, now: float) -> dict | None:
+        """
+        Feed one parsed telemetry frame (dist_cm, throttle, ax).
+
+        Returns an event dict when the guard level rises (the caller sends
+        a limited $CMD and publishes the event) or is released; else None.
+        """
+        self.stats["frames"] += 1
+        throttle = int(frame.get("throttle", 0))
+
+        acc = max(0.0, float(frame.get("ax", 0)) / ACC_LSB_PER_G * G_CMS2)
+        self._a += self.accel_ema * (acc - self._a)
+
+        if not self._filter(float(frame.get("dist_cm", 0)), now):
+            return None
+
+        closing = throttle > 0 and -self._v >= self.min_closing_cms
+        self.ttc = self._time_to_collision() if closing else math.inf
+
+        if closing and (self.ttc < self.ttc_stop_sec or self._d < self.stop_dist_cm):
+            level = LEVEL_STOP
+        elif self.ttc < self.ttc_warn_sec:
+            level = LEVEL_WARN
+        else:
+            level = LEVEL_CLEAR
+
+        if level > self.level:
+            self.level = level
+            self.cap = 0 if level == LEVEL_STOP else self.warn_throttle
+            self._clear_since = None
+            self._acked = False
+            self._d_min = self._d
+            self.stats["stop" if level == LEVEL_STOP else "warn"] += 1
+            return self._event(throttle)
+
+        # Release only after TTC stayed clear for release_sec (the telemetry
+        # throttle drops to the cap itself, so it is not a release signal)
+        # and the operator backed off or the range opened again
+        if self.level != LEVEL_CLEAR:
+            self._d_min = min(self._d_min, self._d)
+            opened = self._d - self._d_min >= self.release_open_cm
+            if self.ttc >= self.ttc_release_sec:
+                if self._clear_since is None:
+                    self._clear_since = now
+                if now - self._clear_since >= self.release_sec and (self._acked or opened):
+                    self.level = LEVEL_CLEAR
+                    self.cap = None
+                    self._clear_since = None
+                    event = self._event(throttle)
+                    event["release"] = "operator" if self._acked else "range"
+                    return event
+            else:
+                self._clear_since = None
+        return None
+
+    def _event(self, throttle: int) -> dict:
+        return {
+            "level": LEVEL_NAMES[self.level],
+            "ttc_ms": int(self.ttc * 1000) if math.isfinite(self.ttc) else None,
+            "dist_cm": round(self._d, 1),
+            "closing_cms": round(-self._v, 1),
+            "throttle": throttle,
+            "cap": self.cap,
+        }
+
+    # --------------------------------------------------
+    # Command limiting
+    # --------------------------------------------------
+    def limit(self, throttle: int, operator: bool = False) -> int:
+        """
+        Clamp a forward throttle command to the active cap. operator=True
+        for GUI / gesture commands: one at or below the cap allows the
+        release; re-sent forward commands stay capped.
+        """
+        cap = self.cap
+        if cap is None:
+            return throttle
+        if throttle <= cap:
+            if operator:
+                self._acked = True
+            return throttle
+        return cap
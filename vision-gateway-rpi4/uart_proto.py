@@ -0,0 +1,374 @@
+"""
+uart_proto.py
+
+STM32 -> gateway UART framing, ASCII and binary.
+
+ASCII (firmware default):
+    $TEL,ax,ay,az,gx,gy,gz,dist_cm,throttle,steer\\r\\n
+    $STS,EVENT\\r\\n
+
+Binary (after the gateway sends "$PRO,BIN"; firmware telproto.c):
+    COBS( type u8 | seq u8 | body | crc16 ) 0x00
+    TEL body : ax ay az gx gy gz (int16) dist_cm (uint16) throttle steer (int16)
+    STS body : event code (uint8)
+    CFG body : key (uint8) value (uint16)    ack of "$CFG,<key>,<value>"
+    little-endian; CRC-16/CCITT-FALSE (poly 0x1021, init 0xFFFF) over type..body
+
+The firmware acknowledges a switch with an ASCII "$STS,PRO,BIN" /
+"$STS,PRO,ASC" line. "$CFG,TEL_MS,<ms>" (telemetry period) is acked
+with a CFG frame in binary mode and "$STS,CFG,TEL_MS,<ms>" in ASCII
+mode. UartRx does not depend on the ack: a 0x00 byte in ASCII mode, or
+newline text with no delimiter in binary mode (MCU reset back to
+ASCII), also switches the parser. With auto=False (--uart-proto ascii)
+it stays in ASCII and drops stray 0x00 bytes.
+
+    python uart_proto.py     # pty throughput: ASCII vs binary
+"""
+
+import struct
+import binascii
+
+MODE_ASCII = "ascii"
+MODE_BINARY = "binary"
+
+TYPE_TEL = 0x01
+TYPE_STS = 0x02
+TYPE_CFG = 0x03
+
+STS_EVENTS = {0x01: "US_BRAKE"}
+CFG_KEYS = {0x01: "tel_ms"}
+
+TEL_KEYS = ("ax", "ay", "az", "gx", "gy", "gz", "dist_cm", "throttle", "steer")
+_TEL = struct.Struct("<BB6hHhh")
+_STS = struct.Struct("<BBB")
+_CFG = struct.Struct("<BBBH")
+_CRC = struct.Struct("<H")
+
+MAX_LINE = 128          # ASCII line without newline -> dropped
+MAX_BIN_PENDING = 64    # binary bytes without delimiter -> check for ASCII
+
+
+# ---------------- COBS / CRC ----------------
+def crc16(data: bytes) -> int:
+    return binascii.crc_hqx(data, 0xFFFF)
+
+
+def cobs_encode(data: bytes) -> bytes:
+    out = bytearray([0])
+    code_idx, code = 0, 1
+    for b in data:
+        if b == 0:
+            out[code_idx] = code
+            code_idx, code = len(out), 1
+            out.append(0)
+        else:
+            out.append(b)
+            code += 1
+            if code == 0xFF:
+                out[code_idx] = code
+                code_idx, code = len(out), 1
+                out.append(0)
+    out[code_idx] = code
+    return bytes(out)
+
+
+def cobs_decode(data: bytes) -> bytes:
+    out = bytearray()
+    i, n = 0, len(data)
+    while i < n:
+        code = data[i]
+        if code == 0:
+            raise ValueError("zero byte in COBS frame")
+        j = i + code
+        if j > n:
+            raise ValueError("truncated COBS block")
+        out += data[i + 1:j]
+        i = j
+        if code != 0xFF and i < n:
+            out.append(0)
+    return bytes(out)
+
+
+# ---------------- Encoders (firmware reference / bench) ----------------
+def encode_tel(seq: int, fields: dict) -> bytes:
+    body = _TEL.pack(
+        TYPE_TEL, seq & 0xFF,
+        *(int(fields[k]) for k in TEL_KEYS[:6]),
+        min(max(int(fields["dist_cm"]), 0), 0xFFFF),
+        int(fields["throttle"]), int(fields["steer"]),
+    )
+    return cobs_encode(body + _CRC.pack(crc16(body))) + b"\x00"
+
+
+def encode_sts(seq: int, code: int) -> bytes:
+    body = _STS.pack(TYPE_STS, seq & 0xFF, code)
+    return cobs_encode(body + _CRC.pack(crc16(body))) + b"\x00"
+
+
+def encode_cfg(seq: int, key: int, value: int) -> bytes:
+    body = _CFG.pack(TYPE_CFG, seq & 0xFF, key, value & 0xFFFF)
+    return cobs_encode(body + _CRC.pack(crc16(body))) + b"\x00"
+
+
+def encode_tel_line(fields: dict) -> bytes:
+    return ("$TEL," + ",".join(str(int(fields[k])) for k in TEL_KEYS) + "\r\n").encode()
+
+
+def parse_tel_line(line: str) -> dict:
+    """ASCII "$TEL" line -> fields; raises ValueError."""
+    parts = line.split(",")
+    if len(parts) != 10:
+        raise ValueError(f"expected 10 fields, got {len(parts)}")
+    return {k: int(v) for k, v in zip(TEL_KEYS, parts[1:])}
+
+
+# ---------------- Stream parser ----------------
+class UartRx:
+    """
+    feed(bytes) -> list of (kind, value, seq):
+        ("tel",   fields dict, mcu seq or None)
+        ("sts",   event name,  mcu seq or None)
+        ("cfg",   {"tel_ms": n}, mcu seq or None)         $CFG ack
+        ("line",  other ASCII line, None)
+        ("mode",  MODE_ASCII / MODE_BINARY, None)   parser switched
+        ("error", reason, None)                     frame dropped
+
+    auto=False keeps the parser in ASCII (binary was never requested), so
+    line noise with a 0x00 byte cannot switch it.
+    """
+
+    def __init__(self, auto: bool = True):
+        self.auto = auto
+        self.stats = {
+            "frames_ascii": 0,
+            "frames_binary": 0,
+            "crc_errors": 0,
+            "frame_errors": 0,
+            "seq_gaps": 0,
+            "mode_switches": 0,
+        }
+        self.reset()
+
+    def reset(self) -> None:
+        """New link / MCU: back to ASCII, drop partial data."""
+        self.mode = MODE_ASCII
+        self._buf = bytearray()
+        self._tel_seq = None
+
+    def _set_mode(self, mode: str, out: list) -> None:
+        if mode != self.mode:
+            self.mode = mode
+            self._tel_seq = None
+            self.stats["mode_switches"] += 1
+            out.append(("mode", mode, None))
+
+    def feed(self, data: bytes) -> list:
+        buf = self._buf
+        buf += data
+        out = []
+        while buf:
+            if self.mode == MODE_ASCII:
+                nl = buf.find(b"\n")
+                z = buf.find(b"\x00", 0, nl if nl != -1 else len(buf))
+                if z != -1 and not self.auto:
+                    # noise byte on a forced-ASCII link
+                    del buf[z]
+                    continue
+                if z != -1:
+                    # binary frames without a seen ack: the text after the last
+                    # newline is the first frame
+                    frame = bytes(buf[:z])
+                    del buf[:z + 1]
+                    self._set_mode(MODE_BINARY, out)
+                    if frame:
+                        self._frame(frame, out)
+                    continue
+                if nl == -1:
+                    if len(buf) > MAX_LINE:
+                        buf.clear()
+                        out.append(("error", "ASCII line too long", None))
+                    break
+                raw = bytes(buf[:nl])
+                del buf[:nl + 1]
+                self._line(raw.decode("utf-8", errors="ignore").strip(), out)
+            else:
+                z = buf.find(b"\x00")
+                if z == -1:
+                    if len(buf) > MAX_BIN_PENDING and b"\n" in buf:
+                        # MCU reset: plain text again; resync on the next line
+                        del buf[:buf.find(b"\n") + 1]
+                        self._set_mode(MODE_ASCII, out)
+                        continue
+                    break
+                frame = bytes(buf[:z])
+                del buf[:z + 1]
+                if frame:
+                    self._frame(frame, out)
+        return out
+
+    def _line(self, line: str, out: list) -> None:
+        i = line.find("$")
+        if i == -1:
+            return
+        line = line[i:]
+        if line.startswith("$TEL"):
+            try:
+                fields = parse_tel_line(line)
+            except ValueError as e:
+                out.append(("error", f"{e} | line={line}", None))
+                return
+            self.stats["frames_ascii"] += 1
+            out.append(("tel", fields, None))
+        elif line.startswith("$STS,PRO,"):
+            self._set_mode(MODE_BINARY if line.endswith("BIN") else MODE_ASCII, out)
+        elif line.startswith("$STS,CFG,"):
+            parts = line.split(",")
+            try:
+                out.append(("cfg", {parts[2].lower(): int(parts[3])}, None))
+            except (IndexError, ValueError):
+                out.append(("error", f"bad CFG ack | line={line}", None))
+        elif line.startswith("$STS"):
+            parts = line.split(",")
+            if len(parts) >= 2:
+                out.append(("sts", parts[1].strip(), None))
+        else:
+            out.append(("line", line, None))
+
+    def _frame(self, frame: bytes, out: list) -> None:
+        try:
+            data = cobs_decode(frame)
+        except ValueError as e:
+            self.stats["frame_errors"] += 1
+            out.append(("error", f"COBS: {e}", None))
+            return
+        if len(data) < 4 or crc16(data[:-2]) != _CRC.unpack_from(data, len(data) - 2)[0]:
+            self.stats["crc_errors"] += 1
+            out.append(("error", f"CRC mismatch ({len(data)} bytes)", None))
+            return
+
+        kind = data[0]
+        if kind == TYPE_TEL and len(data) == _TEL.size + 2:
+            v = _TEL.unpack_from(data)
+            seq = v[1]
+            if self._tel_seq is not None:
+                self.stats["seq_gaps"] += (seq - self._tel_seq - 1) & 0xFF
+            self._tel_seq = seq
+            self.stats["frames_binary"] += 1
+            out.append(("tel", dict(zip(TEL_KEYS, v[2:])), seq))
+        elif kind == TYPE_STS and len(data) == _STS.size + 2:
+            _, seq, code = _STS.unpack_from(data)
+            out.append(("sts", STS_EVENTS.get(code, f"0x{code:02X}"), seq))
+        elif kind == TYPE_CFG and len(data) == _CFG.size + 2:
+            _, seq, key, value = _CFG.unpack_from(data)
+            out.append(("cfg", {CFG_KEYS.get(key, f"0x{key:02X}"): value}, seq))
+        else:
+            self.stats["frame_errors"] += 1
+            out.append(("error", f"unknown frame type 0x{kind:02X} ({len(data)} bytes)", None))
+
+
+def _bench(n: int = 20000, baud: int = 115200) -> None:
+    """
+    Push n telemetry frames through a pty pair in each format and read
+    them back the way the gateway does (in_waiting + read + UartRx.feed).
+    Also times the previous readline() + split path for ASCII.
+    """
+    import os
+    import tty
+    import time
+    import random
+    import threading
+
+    import serial
+
+    rng = random.Random(0)
+    frames = [
+        {
+            "ax": rng.randint(-4000, 4000), "ay": rng.randint(-4000, 4000),
+            "az": rng.randint(14000, 18000), "gx": rng.randint(-500, 500),
+            "gy": rng.randint(-500, 500), "gz": rng.randint(-500, 500),
+            "dist_cm": rng.randint(5, 300), "throttle": rng.choice((0, 40, 60, -60)),
+            "steer": rng.randint(-100, 100),
+        }
+        for _ in range(n)
+    ]
+    streams = {
+        MODE_ASCII: b"".join(encode_tel_line(f) for f in frames),
+        MODE_BINARY: b"$STS,PRO,BIN\r\n" + b"".join(encode_tel(i, f) for i, f in enumerate(frames)),
+    }
+
+    def run(payload, reader):
+        master, slave = os.openpty()
+        tty.setraw(slave)
+        tty.setraw(master)
+        s = serial.Serial(os.ttyname(slave), baud, timeout=0.1)
+        os.close(slave)
+
+        def writer():
+            view = memoryview(payload)
+            while view:
+                k = os.write(master, view[:4096])
+                view = view[k:]
+
+        t = threading.Thread(target=writer, daemon=True)
+        t0 = time.perf_counter()
+        t.start()
+        got = reader(s)
+        dt = time.perf_counter() - t0
+        t.join()
+        s.close()
+        os.close(master)
+        return got, dt
+
+    def read_feed(s):
+        rx = UartRx()
+        got = []
+        while len(got) < n:
+            waiting = s.in_waiting
+            if not waiting:
+                time.sleep(0.0005)
+                continue
+            got += [v for kind, v, _ in rx.feed(s.read(waiting)) if kind == "tel"]
+        return got
+
+    def read_lines(s):
+        got = []
+        while len(got) < n:
+            if s.in_waiting > 0:
+                line = s.readline().decode("utf-8", errors="ignore").strip()
+                if line.startswith("$TEL"):
+                    parts = line.split(",")
+                    got.append({k: int(v) for k, v in zip(TEL_KEYS, parts[1:])})
+            else:
+                time.sleep(0.0005)
+        return got
+
+    print(f"{n} $TEL frames through a pty pair")
+    print("  format                bytes/frame  wire-limited @%d  pty decode      ok" % baud)
+    for label, mode, reader in (
+        ("ASCII readline+split", MODE_ASCII, read_lines),
+        ("ASCII UartRx", MODE_ASCII, read_feed),
+        ("binary UartRx", MODE_BINARY, read_feed),
+    ):
+        got, dt = run(streams[mode], reader)
+        per = len(streams[mode]) / n
+        wire = baud / 10.0 / per
+        print(
+            f"  {label:21s} {per:10.1f}  {wire:10.0f} frames/s  {n / dt:8.0f} frames/s  "
+            f"{'yes' if got == frames else 'NO'}"
+        )
+
+    rx = UartRx()
+    blob = streams[MODE_BINARY]
+    t0 = time.perf_counter()
+    rx.feed(blob)
+    per_bin = (time.perf_counter() - t0) / n
+    rx = UartRx()
+    blob = streams[MODE_ASCII]
+    t0 = time.perf_counter()
+    rx.feed(blob)
+    per_asc = (time.perf_counter() - t0) / n
+    print(f"  UartRx.feed CPU: ascii {per_asc * 1e6:.1f} us/frame, binary {per_bin * 1e6:.1f} us/frame")
+
+
+if __name__ == "__main__":
+    _bench()